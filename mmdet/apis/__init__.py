@@ -1,11 +1,12 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 from .inference import (async_inference_detector, inference_detector,
                         init_detector, show_result_pyplot)
+from .optimize import optimize_for_inference
 from .test import multi_gpu_test, single_gpu_test
 from .train import get_root_logger, set_random_seed, train_detector
 
 __all__ = [
     'get_root_logger', 'set_random_seed', 'train_detector', 'init_detector',
     'async_inference_detector', 'inference_detector', 'show_result_pyplot',
-    'multi_gpu_test', 'single_gpu_test'
+    'multi_gpu_test', 'single_gpu_test', 'optimize_for_inference'
 ]
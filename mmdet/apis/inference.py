@@ -12,9 +12,14 @@ from mmdet.core import get_classes
 from mmdet.datasets import replace_ImageToTensor
 from mmdet.datasets.pipelines import Compose
 from mmdet.models import build_detector
+from .optimize import optimize_for_inference
 
 
-def init_detector(config, checkpoint=None, device='cuda:0', cfg_options=None):
+def init_detector(config,
+                  checkpoint=None,
+                  device='cuda:0',
+                  cfg_options=None,
+                  optimize_level=0):
     """Initialize a detector from config file.
 
     Args:
@@ -24,6 +29,8 @@ def init_detector(config, checkpoint=None, device='cuda:0', cfg_options=None):
             will not load any weights.
         cfg_options (dict): Options to override some settings in the used
             config.
+        optimize_level (int): Level of :func:`optimize_for_inference`
+            applied to the detector, 0 to disable it. Default: 0.
 
     Returns:
         nn.Module: The constructed detector.
@@ -51,6 +58,8 @@ def init_detector(config, checkpoint=None, device='cuda:0', cfg_options=None):
     model.cfg = config  # save the config in the model for convenience
     model.to(device)
     model.eval()
+    if optimize_level:
+        model = optimize_for_inference(model, level=optimize_level)
     return model
 
 
@@ -0,0 +1,345 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import copy
+import warnings
+import weakref
+
+import torch
+import torch.nn as nn
+from mmcv.cnn import ConvModule
+from torch.nn.modules.batchnorm import _BatchNorm
+
+
+def _fold_conv_bn(conv, bn):
+    """Fold the running statistics and the affine parameters of ``bn`` into
+    the weight and bias of ``conv``, which precedes it."""
+    requires_grad = conv.weight.requires_grad
+    with torch.no_grad():
+        factor = torch.rsqrt(bn.running_var + bn.eps)
+        if bn.weight is not None:
+            factor = factor * bn.weight
+        bias = -bn.running_mean * factor
+        if conv.bias is not None:
+            bias = bias + conv.bias * factor
+        if bn.bias is not None:
+            bias = bias + bn.bias
+        shape = (-1, ) + (1, ) * (conv.weight.dim() - 1)
+        weight = conv.weight * factor.reshape(shape)
+    conv.weight = nn.Parameter(weight, requires_grad=requires_grad)
+    conv.bias = nn.Parameter(bias, requires_grad=requires_grad)
+
+
+def _is_foldable_bn(module):
+    return isinstance(module, _BatchNorm) and module.track_running_stats
+
+
+def fold_bn(module):
+    """Recursively fold the BN layers of ``module`` into the preceding convs.
+
+    Unlike :func:`mmcv.cnn.fuse_conv_bn`, the order of the layers of a
+    :obj:`ConvModule` is respected, so that the norm of a pre-activation
+    ``ConvModule`` is not folded. Frozen BN layers (``requires_grad=False``
+    or ``norm_eval=True``) are plain BN layers in eval mode and are folded
+    too. GN is normalized with the statistics of each input and cannot be
+    folded. The folded BN layers are replaced by :obj:`nn.Identity`.
+
+    Args:
+        module (nn.Module): The module in eval mode.
+
+    Returns:
+        nn.Module: The module itself.
+    """
+    if isinstance(module, ConvModule):
+        norm = module.norm if module.with_norm else None
+        if (type(module.conv) is nn.Conv2d and _is_foldable_bn(norm)
+                and module.order.index('conv') < module.order.index('norm')):
+            _fold_conv_bn(module.conv, norm)
+            setattr(module, module.norm_name, nn.Identity())
+        return module
+
+    last_conv = None
+    for name, child in module.named_children():
+        if _is_foldable_bn(child) and last_conv is not None:
+            _fold_conv_bn(last_conv, child)
+            module._modules[name] = nn.Identity()
+            last_conv = None
+        elif type(child) is nn.Conv2d:
+            last_conv = child
+        else:
+            last_conv = None
+            fold_bn(child)
+    return module
+
+
+class _HorizontalConvs(nn.Module):
+    """Convs applied to the same input, computed by one wider conv.
+
+    Each conv is replaced by a :obj:`_HorizontalConvBranch`. The first
+    branch called with an input computes the outputs of all branches and the
+    other branches called with the same tensor return their part. A branch
+    called with another input computes the wider conv again, so the results
+    are always correct. The outputs are only cached while the input is
+    alive, so they are released even if some branches are never called.
+    """
+
+    def __init__(self, conv, act, split_sizes):
+        super().__init__()
+        self.conv = conv
+        self.act = act
+        self.split_sizes = split_sizes
+        self._input = None
+        self._outputs = None
+
+    def forward(self, x, index):
+        if (self._input is None or self._input() is not x
+                or self._outputs[index] is None):
+            self._release()
+            outs = self.conv(x)
+            if self.act is not None:
+                outs = self.act(outs)
+            outs = list(outs.split(self.split_sizes, dim=1))
+            if outs[index].requires_grad:
+                # the autograd graph of the cached outputs would keep the
+                # input alive
+                return outs[index]
+            self._input = weakref.ref(x, self._release)
+            self._outputs = outs
+        out = self._outputs[index]
+        self._outputs[index] = None
+        if all(output is None for output in self._outputs):
+            # do not hold the features once every branch got its part
+            self._release()
+        return out
+
+    def _release(self, ref=None):
+        # ``ref`` is the reference to a freed input, which may be older
+        # than the cached one
+        if ref is None or ref is self._input:
+            self._input = self._outputs = None
+
+
+class _HorizontalConvBranch(nn.Module):
+
+    def __init__(self, convs, index):
+        super().__init__()
+        self.convs = convs
+        self.index = index
+
+    def forward(self, x):
+        return self.convs(x, self.index)
+
+
+def _fusable_conv_module(module):
+    """Return the conv and the activation of a conv-(act) module without
+    norm, or None if it cannot be fused with another one."""
+    if (not isinstance(module, ConvModule)
+            or type(module.conv) is not nn.Conv2d
+            or module.with_explicit_padding or module.with_spectral_norm
+            or module.order != ('conv', 'norm', 'act')):
+        return None
+    if module.with_norm and not isinstance(module.norm, nn.Identity):
+        return None
+    act = module.activate if module.with_activation else None
+    if act is not None and next(act.parameters(), None) is not None:
+        return None
+    return module.conv, act
+
+
+def fuse_head_towers(module):
+    """Fuse the first convs of the classification and regression towers of
+    the dense heads in ``module``.
+
+    The ``cls_convs`` and ``reg_convs`` of :obj:`AnchorHead` and
+    :obj:`AnchorFreeHead` subclasses (e.g. RetinaNet, FSAF, FreeAnchor,
+    FCOS without GN) are applied to the same feature map of each level. Their
+    first convs are computed by one conv with the output channels of both,
+    once BN is folded. Convs followed by GN are left as is.
+
+    Args:
+        module (nn.Module): The module in eval mode.
+
+    Returns:
+        nn.Module: The module itself.
+    """
+    for head in module.modules():
+        cls_convs = getattr(head, 'cls_convs', None)
+        reg_convs = getattr(head, 'reg_convs', None)
+        if not (isinstance(cls_convs, nn.ModuleList)
+                and isinstance(reg_convs, nn.ModuleList) and len(cls_convs)
+                and len(reg_convs)):
+            continue
+        cls_layer = _fusable_conv_module(cls_convs[0])
+        reg_layer = _fusable_conv_module(reg_convs[0])
+        if cls_layer is None or reg_layer is None:
+            continue
+        (cls_conv, cls_act), (reg_conv, reg_act) = cls_layer, reg_layer
+        conv_args = ('in_channels', 'kernel_size', 'stride', 'padding',
+                     'dilation', 'groups', 'padding_mode')
+        same_args = all(
+            getattr(cls_conv, arg) == getattr(reg_conv, arg)
+            for arg in conv_args)
+        if not same_args or repr(cls_act) != repr(reg_act):
+            continue
+
+        split_sizes = [cls_conv.out_channels, reg_conv.out_channels]
+        conv = nn.Conv2d(
+            cls_conv.in_channels,
+            sum(split_sizes),
+            cls_conv.kernel_size,
+            stride=cls_conv.stride,
+            padding=cls_conv.padding,
+            dilation=cls_conv.dilation,
+            groups=cls_conv.groups,
+            padding_mode=cls_conv.padding_mode).to(cls_conv.weight)
+        with torch.no_grad():
+            conv.weight.copy_(torch.cat([cls_conv.weight, reg_conv.weight]))
+            conv.bias.copy_(
+                torch.cat([
+                    branch.weight.new_zeros(branch.out_channels)
+                    if branch.bias is None else branch.bias
+                    for branch in (cls_conv, reg_conv)
+                ]))
+        conv.requires_grad_(cls_conv.weight.requires_grad)
+        convs = _HorizontalConvs(conv, cls_act, split_sizes)
+        cls_convs[0] = _HorizontalConvBranch(convs, 0)
+        reg_convs[0] = _HorizontalConvBranch(convs, 1)
+    return module
+
+
+def _to_channels_last(module):
+    return module.to(memory_format=torch.channels_last)
+
+
+def _freeze(module):
+    return module.requires_grad_(False)
+
+
+# passes of each level, in order
+_PASSES = [
+    ('freeze', _freeze),
+    ('fold_bn', fold_bn),
+    ('fuse_head_towers', fuse_head_towers),
+    ('channels_last', _to_channels_last),
+]
+_LEVEL_NUM_PASSES = [0, 2, 3, 4]
+
+
+def _dummy_forward(model, img):
+    # the dummy forward of two-stage detectors uses random proposals
+    devices = [img.device] if img.is_cuda else []
+    with torch.no_grad(), torch.random.fork_rng(devices=devices):
+        torch.manual_seed(0)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            return model.forward_dummy(img)
+
+
+def _max_error(outputs, ref_outputs, atol, rtol):
+    """Return the max error of the tensors in ``outputs`` relative to the
+    tolerance, which is above 1 if any tensor mismatches."""
+    if isinstance(ref_outputs, torch.Tensor):
+        if outputs.shape != ref_outputs.shape:
+            return float('inf')
+        if not ref_outputs.numel():
+            return 0.
+        diff = (outputs.float() - ref_outputs.float()).abs().max()
+        tol = atol + rtol * ref_outputs.float().abs().max()
+        return (diff / tol).item()
+    if isinstance(ref_outputs, dict):
+        outputs = [outputs[key] for key in ref_outputs]
+        ref_outputs = list(ref_outputs.values())
+    if isinstance(ref_outputs, (list, tuple)):
+        if len(outputs) != len(ref_outputs):
+            return float('inf')
+        errors = [
+            _max_error(output, ref_output, atol, rtol)
+            for output, ref_output in zip(outputs, ref_outputs)
+        ]
+        return max(errors, default=0.)
+    return 0. if outputs == ref_outputs else float('inf')
+
+
+def optimize_for_inference(model,
+                           level=2,
+                           verify=True,
+                           verify_shape=(1, 3, 320, 320),
+                           atol=1e-3,
+                           rtol=1e-3):
+    """Optimize a detector for inference.
+
+    The model is put in eval mode and the passes of ``level`` are applied:
+
+    - 1: freeze the parameters, so that no autograd graph is recorded even
+      without ``torch.no_grad()`` and the cached priors and attention biases
+      are reused, and fold BN into the preceding convs (see
+      :func:`fold_bn`). It is what ``--fuse-conv-bn`` of the test tools
+      does.
+    - 2: also fuse the first convs of the towers of the dense heads (see
+      :func:`fuse_head_towers`).
+    - 3: also convert the convs to the channels-last memory format, so that
+      all the feature maps are channels-last. It mostly pays off on GPUs with
+      tensor cores under fp16.
+
+    If ``verify`` is True, each pass is applied to a copy of the model and
+    the outputs of ``model.forward_dummy`` on a random image are compared
+    with the ones of the original model. A pass that changes the outputs
+    or fails is skipped with a warning.
+
+    Args:
+        model (nn.Module): The detector.
+        level (int): Optimization level from 0 (nothing) to 3. Default: 2.
+        verify (bool): Whether to check the outputs after each pass. Models
+            whose ``forward_dummy`` is missing or fails are not checked.
+            Default: True.
+        verify_shape (tuple[int]): Shape of the random image of the check.
+            Default: (1, 3, 320, 320).
+        atol (float): Absolute tolerance of the check. Default: 1e-3.
+        rtol (float): Tolerance of the check relative to the max absolute
+            value of each output. Default: 1e-3.
+
+    Returns:
+        nn.Module: The optimized model. It is ``model`` modified in place if
+        ``verify`` is False and a copy otherwise.
+
+    Example:
+        >>> from mmdet.apis import init_detector, optimize_for_inference
+        >>> model = init_detector(config, checkpoint, device='cuda:0')
+        >>> model = optimize_for_inference(model, level=2)
+    """
+    if not 0 <= level < len(_LEVEL_NUM_PASSES):
+        raise ValueError('level must be in [0, '
+                         f'{len(_LEVEL_NUM_PASSES) - 1}], but got {level}')
+    model.eval()
+    if verify and not hasattr(model, 'forward_dummy'):
+        warnings.warn(f'{model.__class__.__name__} has no forward_dummy, '
+                      'the optimized model is not verified')
+        verify = False
+    if verify:
+        param = next(model.parameters())
+        img = torch.rand(
+            verify_shape,
+            generator=torch.Generator().manual_seed(0)).to(param.device)
+        try:
+            ref_outputs = _dummy_forward(model, img)
+        except Exception as e:
+            warnings.warn('The optimized model is not verified, the dummy '
+                          f'forward of the model fails: {e!r}')
+            verify = False
+
+    for name, optimize in _PASSES[:_LEVEL_NUM_PASSES[level]]:
+        if not verify:
+            model = optimize(model)
+            continue
+        optimized_model = optimize(copy.deepcopy(model))
+        try:
+            error = _max_error(
+                _dummy_forward(optimized_model, img), ref_outputs, atol, rtol)
+        except Exception as e:
+            warnings.warn(f'The {name} pass is skipped, the optimized model '
+                          f'fails: {e!r}')
+            continue
+        if error > 1:
+            warnings.warn(f'The {name} pass is skipped, it changes the '
+                          f'outputs by {error:.3g} times the tolerance')
+            continue
+        model = optimized_model
+    return model
@@ -3,71 +3,196 @@ import os.path as osp
 import pickle
 import shutil
 import tempfile
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
+import matplotlib.pyplot as plt
 import mmcv
 import torch
 import torch.distributed as dist
+from matplotlib import rcsetup
 from mmcv.image import tensor2imgs
 from mmcv.runner import get_dist_info
 
 from mmdet.core import encode_mask_results
 
 
+class _PostprocessWorkers:
+    """A bounded pool of threads that post-process the results of batches.
+
+    The results are returned in the order of the batches. If
+    ``max_pending`` batches are being post-processed, :meth:`submit` waits
+    for the oldest one, so the workers cannot fall behind the model without
+    bound. Without workers, the batches are post-processed at once.
+
+    Args:
+        num_workers (int): Number of threads. Default: 0.
+        max_pending (int, optional): Maximum number of batches being
+            post-processed. Default: ``2 * num_workers``.
+    """
+
+    def __init__(self, num_workers=0, max_pending=None):
+        self.num_workers = num_workers
+        self.max_pending = max_pending or 2 * num_workers
+        self._executor = None
+        if num_workers > 0:
+            self._executor = ThreadPoolExecutor(num_workers)
+        self._pending = deque()
+
+    def submit(self, func, *args, **kwargs):
+        """Post-process a batch by ``func(*args, **kwargs)``.
+
+        Returns:
+            list: The outputs of the batches that are finished, in order.
+        """
+        if self._executor is None:
+            return [func(*args, **kwargs)]
+        self._pending.append(self._executor.submit(func, *args, **kwargs))
+        outputs = []
+        while self._pending and (len(self._pending) > self.max_pending
+                                 or self._pending[0].done()):
+            outputs.append(self._pending.popleft().result())
+        return outputs
+
+    def finish(self):
+        """Wait for all batches and stop the workers.
+
+        Returns:
+            list: The outputs of the remaining batches, in order.
+        """
+        outputs = []
+        try:
+            while self._pending:
+                outputs.append(self._pending.popleft().result())
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+        return outputs
+
+
+# matplotlib is not thread-safe, so the workers draw one by one
+_render_lock = threading.Lock()
+
+
+def _can_render_in_thread():
+    """Interactive backends of matplotlib only work in the main thread."""
+    backend = plt.get_backend().lower()
+    return backend in [bk.lower() for bk in rcsetup.non_interactive_bk]
+
+
+def _render_results(model, data, result, show, out_dir, show_score_thr):
+    batch_size = len(result)
+    if batch_size == 1 and isinstance(data['img'][0], torch.Tensor):
+        img_tensor = data['img'][0]
+    else:
+        img_tensor = data['img'][0].data[0]
+    img_metas = data['img_metas'][0].data[0]
+    imgs = tensor2imgs(img_tensor, **img_metas[0]['img_norm_cfg'])
+    assert len(imgs) == len(img_metas)
+
+    for i, (img, img_meta) in enumerate(zip(imgs, img_metas)):
+        h, w, _ = img_meta['img_shape']
+        img_show = img[:h, :w, :]
+
+        ori_h, ori_w = img_meta['ori_shape'][:-1]
+        img_show = mmcv.imresize(img_show, (ori_w, ori_h))
+
+        if out_dir:
+            out_file = osp.join(out_dir, img_meta['ori_filename'])
+        else:
+            out_file = None
+
+        model.module.show_result(
+            img_show,
+            result[i],
+            show=show,
+            out_file=out_file,
+            score_thr=show_score_thr)
+
+
+def _encode_results(result):
+    # encode mask results
+    if isinstance(result[0], tuple):
+        result = [(bbox_results, encode_mask_results(mask_results))
+                  for bbox_results, mask_results in result]
+    return result
+
+
+def _postprocess_results(model,
+                         data,
+                         result,
+                         show=False,
+                         out_dir=None,
+                         show_score_thr=0.3):
+    """Draw the results of a batch and encode their masks."""
+    if show or out_dir:
+        with _render_lock:
+            _render_results(model, data, result, show, out_dir, show_score_thr)
+    return _encode_results(result)
+
+
 def single_gpu_test(model,
                     data_loader,
                     show=False,
                     out_dir=None,
-                    show_score_thr=0.3):
+                    show_score_thr=0.3,
+                    num_postprocess_workers=0):
+    """Test model with a single gpu.
+
+    Args:
+        model (nn.Module): Model to be tested.
+        data_loader (nn.Dataloader): Pytorch data loader.
+        show (bool): Whether to show the results. Default: False.
+        out_dir (str, optional): Directory to draw the results in.
+            Default: None.
+        show_score_thr (float): Minimum score of the shown boxes.
+            Default: 0.3.
+        num_postprocess_workers (int): Number of threads that encode the
+            masks and draw the results while the model runs the next
+            batches. The results are drawn in the main thread if ``show``
+            is True or matplotlib uses an interactive backend. Default: 0.
+
+    Returns:
+        list: The prediction results.
+    """
     model.eval()
     results = []
     dataset = data_loader.dataset
     prog_bar = mmcv.ProgressBar(len(dataset))
-    for i, data in enumerate(data_loader):
-        with torch.no_grad():
-            result = model(return_loss=False, rescale=True, **data)
-
-        batch_size = len(result)
-        if show or out_dir:
-            if batch_size == 1 and isinstance(data['img'][0], torch.Tensor):
-                img_tensor = data['img'][0]
+    render_in_workers = not show and _can_render_in_thread()
+    workers = _PostprocessWorkers(num_postprocess_workers)
+
+    def collect(outputs):
+        for batch_results in outputs:
+            results.extend(batch_results)
+            for _ in range(len(batch_results)):
+                prog_bar.update()
+
+    try:
+        for i, data in enumerate(data_loader):
+            with torch.no_grad():
+                result = model(return_loss=False, rescale=True, **data)
+
+            if (show or out_dir) and not render_in_workers:
+                _render_results(model, data, result, show, out_dir,
+                                show_score_thr)
+                collect(workers.submit(_encode_results, result))
             else:
-                img_tensor = data['img'][0].data[0]
-            img_metas = data['img_metas'][0].data[0]
-            imgs = tensor2imgs(img_tensor, **img_metas[0]['img_norm_cfg'])
-            assert len(imgs) == len(img_metas)
-
-            for i, (img, img_meta) in enumerate(zip(imgs, img_metas)):
-                h, w, _ = img_meta['img_shape']
-                img_show = img[:h, :w, :]
-
-                ori_h, ori_w = img_meta['ori_shape'][:-1]
-                img_show = mmcv.imresize(img_show, (ori_w, ori_h))
-
-                if out_dir:
-                    out_file = osp.join(out_dir, img_meta['ori_filename'])
-                else:
-                    out_file = None
-
-                model.module.show_result(
-                    img_show,
-                    result[i],
-                    show=show,
-                    out_file=out_file,
-                    score_thr=show_score_thr)
-
-        # encode mask results
-        if isinstance(result[0], tuple):
-            result = [(bbox_results, encode_mask_results(mask_results))
-                      for bbox_results, mask_results in result]
-        results.extend(result)
-
-        for _ in range(batch_size):
-            prog_bar.update()
+                collect(
+                    workers.submit(_postprocess_results, model, data, result,
+                                   show, out_dir, show_score_thr))
+    finally:
+        collect(workers.finish())
     return results
 
 
-def multi_gpu_test(model, data_loader, tmpdir=None, gpu_collect=False):
+def multi_gpu_test(model,
+                   data_loader,
+                   tmpdir=None,
+                   gpu_collect=False,
+                   num_postprocess_workers=0):
     """Test model with multiple gpus.
 
     This method tests model with multiple gpus and collects the results
@@ -82,6 +207,8 @@ def multi_gpu_test(model, data_loader, tmpdir=None, gpu_collect=False):
         tmpdir (str): Path of directory to save the temporary results from
             different gpus under cpu mode.
         gpu_collect (bool): Option to use either gpu or cpu to collect results.
+        num_postprocess_workers (int): Number of threads that encode the
+            masks while the model runs the next batches. Default: 0.
 
     Returns:
         list: The prediction results.
@@ -93,19 +220,22 @@ def multi_gpu_test(model, data_loader, tmpdir=None, gpu_collect=False):
     if rank == 0:
         prog_bar = mmcv.ProgressBar(len(dataset))
     time.sleep(2)  # This line can prevent deadlock problem in some cases.
-    for i, data in enumerate(data_loader):
-        with torch.no_grad():
-            result = model(return_loss=False, rescale=True, **data)
-            # encode mask results
-            if isinstance(result[0], tuple):
-                result = [(bbox_results, encode_mask_results(mask_results))
-                          for bbox_results, mask_results in result]
-        results.extend(result)
+    workers = _PostprocessWorkers(num_postprocess_workers)
 
-        if rank == 0:
-            batch_size = len(result)
-            for _ in range(batch_size * world_size):
-                prog_bar.update()
+    def collect(outputs):
+        for batch_results in outputs:
+            results.extend(batch_results)
+            if rank == 0:
+                for _ in range(len(batch_results) * world_size):
+                    prog_bar.update()
+
+    try:
+        for i, data in enumerate(data_loader):
+            with torch.no_grad():
+                result = model(return_loss=False, rescale=True, **data)
+            collect(workers.submit(_encode_results, result))
+    finally:
+        collect(workers.finish())
 
     # collect results from all ranks
     if gpu_collect:
@@ -11,8 +11,9 @@ from mmcv.runner import (HOOKS, DistSamplerSeedHook, EpochBasedRunner,
 from mmcv.utils import build_from_cfg
 
 from mmdet.core import DistEvalHook, EvalHook
-from mmdet.datasets import (build_dataloader, build_dataset,
-                            replace_ImageToTensor)
+from mmdet.datasets import (DataWaitTimeHook, PipelineProfileHook,
+                            build_dataloader, build_dataset,
+                            enable_pipeline_cache, replace_ImageToTensor)
 from mmdet.utils import get_root_logger
 
 
@@ -35,6 +36,32 @@ def set_random_seed(seed, deterministic=False):
         torch.backends.cudnn.benchmark = False
 
 
+def _get_train_loader_cfg(cfg):
+    """Return the arguments of :func:`build_dataloader` for training.
+
+    ``samples_per_gpu`` and ``workers_per_gpu`` default to the ones of
+    ``cfg.data`` and can be overridden in ``cfg.data.train_dataloader``,
+    like the other loader options.
+
+    Args:
+        cfg (:obj:`mmcv.Config`): The config.
+
+    Returns:
+        dict: The keyword arguments of :func:`build_dataloader`, except
+            ``num_gpus``, ``dist`` and ``seed``, which are set by the
+            training.
+    """
+    loader_cfg = dict(
+        samples_per_gpu=cfg.data.samples_per_gpu,
+        workers_per_gpu=cfg.data.workers_per_gpu)
+    loader_cfg.update(cfg.data.get('train_dataloader', {}))
+    reserved_keys = {'num_gpus', 'dist', 'seed'} & set(loader_cfg)
+    if reserved_keys:
+        raise ValueError(f'{sorted(reserved_keys)} cannot be set in '
+                         'data.train_dataloader, they are set by the training')
+    return loader_cfg
+
+
 def train_detector(model,
                    dataset,
                    cfg,
@@ -60,15 +87,17 @@ def train_detector(model,
                 f'{cfg.data.imgs_per_gpu} in this experiments')
         cfg.data.samples_per_gpu = cfg.data.imgs_per_gpu
 
+    # high-throughput loader options, e.g. ``persistent_workers``,
+    # ``pin_memory``, ``prefetch_factor`` and ``device_prefetch``
+    train_loader_cfg = _get_train_loader_cfg(cfg)
     data_loaders = [
         build_dataloader(
             ds,
-            cfg.data.samples_per_gpu,
-            cfg.data.workers_per_gpu,
             # cfg.gpus will be ignored if distributed
-            len(cfg.gpu_ids),
+            num_gpus=len(cfg.gpu_ids),
             dist=distributed,
-            seed=cfg.seed) for ds in dataset
+            seed=cfg.seed,
+            **train_loader_cfg) for ds in dataset
     ]
 
     # put model on gpus
@@ -129,6 +158,12 @@ def train_detector(model,
     if distributed:
         if isinstance(runner, EpochBasedRunner):
             runner.register_hook(DistSamplerSeedHook())
+    if train_loader_cfg.get('pin_memory', False) or \
+            train_loader_cfg.get('device_prefetch', False):
+        runner.register_hook(DataWaitTimeHook())
+    if train_loader_cfg.get('profile_pipeline', False):
+        runner.register_hook(
+            PipelineProfileHook(interval=cfg.log_config.interval))
 
     # register eval hooks
     if validate:
@@ -139,13 +174,16 @@ def train_detector(model,
             cfg.data.val.pipeline = replace_ImageToTensor(
                 cfg.data.val.pipeline)
         val_dataset = build_dataset(cfg.data.val, dict(test_mode=True))
+        eval_cfg = cfg.get('evaluation', {})
+        pipeline_cache_dir = eval_cfg.pop('pipeline_cache_dir', None)
+        if pipeline_cache_dir is not None:
+            enable_pipeline_cache(val_dataset, pipeline_cache_dir)
         val_dataloader = build_dataloader(
             val_dataset,
             samples_per_gpu=val_samples_per_gpu,
             workers_per_gpu=cfg.data.workers_per_gpu,
             dist=distributed,
             shuffle=False)
-        eval_cfg = cfg.get('evaluation', {})
         eval_cfg['by_epoch'] = cfg.runner['type'] != 'IterBasedRunner'
         eval_hook = DistEvalHook if distributed else EvalHook
         # In this PR (https://github.com/open-mmlab/mmcv/pull/1193), the
@@ -7,6 +7,8 @@ import torch
 from torch.nn.modules.utils import _pair
 
 from .builder import PRIOR_GENERATORS
+from .prior_cache import PriorCache
+from .utils import batch_valid_flags
 
 
 @PRIOR_GENERATORS.register_module()
@@ -38,6 +40,8 @@ class AnchorGenerator:
             float is given, they will be used to shift the centers of anchors.
         center_offset (float): The offset of center in proportion to anchors'
             width and height. By default it is 0 in V2.0.
+        cache_size (int): The number of multi-level anchors and valid flags
+            kept in :attr:`prior_cache`, 0 disables the cache. Default: 16.
 
     Examples:
         >>> from mmdet.core import AnchorGenerator
@@ -57,6 +61,8 @@ class AnchorGenerator:
                 [11.5000, 11.5000, 20.5000, 20.5000]]), \
         tensor([[-9., -9., 9., 9.]])]
     """
+    # the default of the subclasses that do not take the argument
+    cache_size = 16
 
     def __init__(self,
                  strides,
@@ -67,7 +73,8 @@ class AnchorGenerator:
                  octave_base_scale=None,
                  scales_per_octave=None,
                  centers=None,
-                 center_offset=0.):
+                 center_offset=0.,
+                 cache_size=16):
         # check center and center_offset
         if center_offset != 0:
             assert centers is None, 'center cannot be set when center_offset' \
@@ -110,6 +117,7 @@ class AnchorGenerator:
         self.scale_major = scale_major
         self.centers = centers
         self.center_offset = center_offset
+        self.cache_size = cache_size
         self.base_anchors = self.gen_base_anchors()
 
     @property
@@ -128,6 +136,14 @@ class AnchorGenerator:
         """int: number of feature levels that the generator will be applied"""
         return len(self.strides)
 
+    @property
+    def prior_cache(self):
+        """:obj:`PriorCache`: The cache of multi-level anchors and valid
+        flags."""
+        if getattr(self, '_prior_cache', None) is None:
+            self._prior_cache = PriorCache(self.cache_size)
+        return self._prior_cache
+
     def gen_base_anchors(self):
         """Generate base anchors.
 
@@ -229,12 +245,13 @@ class AnchorGenerator:
                 num_base_anchors is the number of anchors for that level.
         """
         assert self.num_levels == len(featmap_sizes)
-        multi_level_anchors = []
-        for i in range(self.num_levels):
-            anchors = self.single_level_grid_priors(
-                featmap_sizes[i], level_idx=i, device=device)
-            multi_level_anchors.append(anchors)
-        return multi_level_anchors
+        key = ('grid_priors', tuple(map(tuple, featmap_sizes)), str(device))
+        return self.prior_cache.get(
+            key, lambda: [
+                self.single_level_grid_priors(
+                    featmap_sizes[i], level_idx=i, device=device)
+                for i in range(self.num_levels)
+            ])
 
     def single_level_grid_priors(self, featmap_size, level_idx, device='cuda'):
         """Generate grid anchors of a single level.
@@ -325,15 +342,15 @@ class AnchorGenerator:
                       'Please use ``grid_priors`` ')
 
         assert self.num_levels == len(featmap_sizes)
-        multi_level_anchors = []
-        for i in range(self.num_levels):
-            anchors = self.single_level_grid_anchors(
-                self.base_anchors[i].to(device),
-                featmap_sizes[i],
-                self.strides[i],
-                device=device)
-            multi_level_anchors.append(anchors)
-        return multi_level_anchors
+        key = ('grid_anchors', tuple(map(tuple, featmap_sizes)), str(device))
+        return self.prior_cache.get(
+            key, lambda: [
+                self.single_level_grid_anchors(
+                    self.base_anchors[i].to(device),
+                    featmap_sizes[i],
+                    self.strides[i],
+                    device=device) for i in range(self.num_levels)
+            ])
 
     def single_level_grid_anchors(self,
                                   base_anchors,
@@ -392,20 +409,33 @@ class AnchorGenerator:
         Return:
             list(torch.Tensor): Valid flags of anchors in multiple levels.
         """
+        return self.batch_valid_flags(featmap_sizes, [pad_shape], device)[0]
+
+    def batch_valid_flags(self, featmap_sizes, pad_shapes, device='cuda'):
+        """Generate valid flags of anchors of multiple images.
+
+        The flags of each distinct padded shape are looked up in
+        :attr:`prior_cache`, and those of the uncached shapes are computed
+        at once.
+
+        Args:
+            featmap_sizes (list(tuple)): List of feature map sizes in
+                multiple feature levels.
+            pad_shapes (list[tuple]): The padded shapes of the images.
+            device (str): Device where the anchors will be put on.
+
+        Return:
+            list(list(torch.Tensor)): Valid flags of anchors in multiple
+                levels of each image.
+        """
         assert self.num_levels == len(featmap_sizes)
-        multi_level_flags = []
-        for i in range(self.num_levels):
-            anchor_stride = self.strides[i]
-            feat_h, feat_w = featmap_sizes[i]
-            h, w = pad_shape[:2]
-            valid_feat_h = min(int(np.ceil(h / anchor_stride[1])), feat_h)
-            valid_feat_w = min(int(np.ceil(w / anchor_stride[0])), feat_w)
-            flags = self.single_level_valid_flags((feat_h, feat_w),
-                                                  (valid_feat_h, valid_feat_w),
-                                                  self.num_base_anchors[i],
-                                                  device=device)
-            multi_level_flags.append(flags)
-        return multi_level_flags
+        featmap_sizes = tuple(map(tuple, featmap_sizes))
+        keys = [('valid_flags', featmap_sizes, tuple(pad_shape[:2]),
+                 str(device)) for pad_shape in pad_shapes]
+        return self.prior_cache.get_many(
+            keys, lambda keys: batch_valid_flags(
+                featmap_sizes, self.strides, self.num_base_anchors,
+                [key[2] for key in keys], device))
 
     def single_level_valid_flags(self,
                                  featmap_size,
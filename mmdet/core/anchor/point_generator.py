@@ -1,9 +1,10 @@
 # Copyright (c) OpenMMLab. All rights reserved.
-import numpy as np
 import torch
 from torch.nn.modules.utils import _pair
 
 from .builder import PRIOR_GENERATORS
+from .prior_cache import PriorCache
+from .utils import batch_valid_flags
 
 
 @PRIOR_GENERATORS.register_module()
@@ -50,11 +51,14 @@ class MlvlPointGenerator:
             in multiple feature levels in order (w, h).
         offset (float): The offset of points, the value is normalized with
             corresponding stride. Defaults to 0.5.
+        cache_size (int): The number of multi-level points and valid flags
+            kept in :attr:`prior_cache`, 0 disables the cache. Default: 16.
     """
 
-    def __init__(self, strides, offset=0.5):
+    def __init__(self, strides, offset=0.5, cache_size=16):
         self.strides = [_pair(stride) for stride in strides]
         self.offset = offset
+        self.prior_cache = PriorCache(cache_size)
 
     @property
     def num_levels(self):
@@ -97,15 +101,16 @@ class MlvlPointGenerator:
             (coord_x, coord_y, stride_w, stride_h).
         """
         assert self.num_levels == len(featmap_sizes)
-        multi_level_priors = []
-        for i in range(self.num_levels):
-            priors = self.single_level_grid_priors(
-                featmap_sizes[i],
-                level_idx=i,
-                device=device,
-                with_stride=with_stride)
-            multi_level_priors.append(priors)
-        return multi_level_priors
+        key = ('grid_priors', tuple(map(tuple, featmap_sizes)), str(device),
+               with_stride)
+        return self.prior_cache.get(
+            key, lambda: [
+                self.single_level_grid_priors(
+                    featmap_sizes[i],
+                    level_idx=i,
+                    device=device,
+                    with_stride=with_stride) for i in range(self.num_levels)
+            ])
 
     def single_level_grid_priors(self,
                                  featmap_size,
@@ -167,19 +172,30 @@ class MlvlPointGenerator:
         Return:
             list(torch.Tensor): Valid flags of points of multiple levels.
         """
+        return self.batch_valid_flags(featmap_sizes, [pad_shape], device)[0]
+
+    def batch_valid_flags(self, featmap_sizes, pad_shapes, device='cuda'):
+        """Generate valid flags of points of multiple images.
+
+        Args:
+            featmap_sizes (list(tuple)): List of feature map sizes in
+                multiple feature levels, each size arrange as
+                as (h, w).
+            pad_shapes (list[tuple]): The padded shapes of the images.
+            device (str): The device where the anchors will be put on.
+
+        Return:
+            list(list(torch.Tensor)): Valid flags of points of multiple
+                levels of each image.
+        """
         assert self.num_levels == len(featmap_sizes)
-        multi_level_flags = []
-        for i in range(self.num_levels):
-            point_stride = self.strides[i]
-            feat_h, feat_w = featmap_sizes[i]
-            h, w = pad_shape[:2]
-            valid_feat_h = min(int(np.ceil(h / point_stride[1])), feat_h)
-            valid_feat_w = min(int(np.ceil(w / point_stride[0])), feat_w)
-            flags = self.single_level_valid_flags((feat_h, feat_w),
-                                                  (valid_feat_h, valid_feat_w),
-                                                  device=device)
-            multi_level_flags.append(flags)
-        return multi_level_flags
+        featmap_sizes = tuple(map(tuple, featmap_sizes))
+        keys = [('valid_flags', featmap_sizes, tuple(pad_shape[:2]),
+                 str(device)) for pad_shape in pad_shapes]
+        return self.prior_cache.get_many(
+            keys, lambda keys: batch_valid_flags(
+                featmap_sizes, self.strides, self.num_base_priors,
+                [key[2] for key in keys], device))
 
     def single_level_valid_flags(self,
                                  featmap_size,
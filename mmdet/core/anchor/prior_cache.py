@@ -0,0 +1,144 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+from collections import OrderedDict
+
+import torch
+
+
+def _is_static(key):
+    """Whether a key only consists of python scalars and strings."""
+    if isinstance(key, (tuple, list)):
+        return all(_is_static(k) for k in key)
+    return key is None or isinstance(key, (int, float, str, bool))
+
+
+class PriorCache:
+    """A bounded LRU cache of multi-level priors and valid flags.
+
+    The priors of a head only depend on the feature map sizes and the device,
+    and the valid flags also on the padded shape of the image, of which a
+    dataset usually has a handful. So the prior generators look them up in
+    this cache instead of generating them in every iteration.
+
+    Nothing is cached while tracing or exporting to ONNX, or if a key
+    contains tensors (e.g. dynamic feature map sizes), so the priors are
+    still traced.
+
+    Args:
+        max_size (int): The maximum number of cached entries, 0 disables the
+            cache. Default: 16.
+
+    Example:
+        >>> cache = PriorCache(max_size=2)
+        >>> cache.get(('a', 1), lambda: [1])
+        [1]
+        >>> cache.get(('a', 1), lambda: [2])
+        [1]
+        >>> cache.hits, cache.misses
+        (1, 1)
+    """
+
+    def __init__(self, max_size=16):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def is_cacheable(self, key):
+        """Whether the value of ``key`` may be cached now."""
+        if self.max_size <= 0:
+            return False
+        if torch.onnx.is_in_onnx_export() or torch.jit.is_tracing():
+            return False
+        return _is_static(key)
+
+    def _put(self, key, value):
+        self._entries[key] = value
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def get(self, key, compute):
+        """Return the cached list of tensors of ``key``.
+
+        Args:
+            key (tuple): The key of the value.
+            compute (callable): A function without arguments that computes
+                the value, a list of tensors, if it is not cached.
+
+        Returns:
+            list[Tensor]: The value.
+        """
+        if not self.is_cacheable(key):
+            return compute()
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        else:
+            self.misses += 1
+            self._put(key, tuple(compute()))
+        # the callers may modify the list but not the cached one
+        return list(self._entries[key])
+
+    def get_many(self, keys, compute):
+        """Return the cached lists of tensors of several keys.
+
+        The values of the keys that are not cached are computed by a single
+        call of ``compute``, each distinct key once.
+
+        Args:
+            keys (list[tuple]): The keys of the values.
+            compute (callable): A function that takes a list of distinct keys
+                and returns their values.
+
+        Returns:
+            list[list[Tensor]]: The values of the keys.
+        """
+        values = {}
+        missing = []
+        for key in keys:
+            if key in values or key in missing:
+                continue
+            if self.is_cacheable(key) and key in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                values[key] = self._entries[key]
+            else:
+                missing.append(key)
+        if missing:
+            for key, value in zip(missing, compute(missing)):
+                values[key] = tuple(value)
+                if self.is_cacheable(key):
+                    self.misses += 1
+                    self._put(key, values[key])
+        return [list(values[key]) for key in keys]
+
+    @property
+    def hit_rate(self):
+        """float: The ratio of the lookups that hit the cache."""
+        return self.hits / max(self.hits + self.misses, 1)
+
+    def info(self):
+        """Return the statistics of the cache.
+
+        Returns:
+            dict: The numbers of ``hits`` and ``misses``, the ``hit_rate``,
+                the ``size`` and the ``max_size`` of the cache.
+        """
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            hit_rate=self.hit_rate,
+            size=len(self),
+            max_size=self.max_size)
+
+    def clear(self):
+        """Remove the cached values and reset the statistics."""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        return (f'{self.__class__.__name__}(max_size={self.max_size}, '
+                f'size={len(self)}, hit_rate={self.hit_rate:.3f})')
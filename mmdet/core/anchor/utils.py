@@ -1,4 +1,5 @@
 # Copyright (c) OpenMMLab. All rights reserved.
+import numpy as np
 import torch
 
 
@@ -25,9 +26,12 @@ def anchor_inside_flags(flat_anchors,
     """Check whether the anchors are inside the border.
 
     Args:
-        flat_anchors (torch.Tensor): Flatten anchors, shape (n, 4).
+        flat_anchors (torch.Tensor): Flatten anchors, shape (n, 4), or
+            shape (B, n, 4) for the anchors of B images.
         valid_flags (torch.Tensor): An existing valid flags of anchors.
-        img_shape (tuple(int)): Shape of current image.
+        img_shape (tuple(int) | tuple(torch.Tensor)): Shape of current image.
+            For the anchors of B images, the heights and widths of the images
+            are tensors of shape (B, 1).
         allowed_border (int, optional): The border to allow the valid anchor.
             Defaults to 0.
 
@@ -38,15 +42,59 @@ def anchor_inside_flags(flat_anchors,
     img_h, img_w = img_shape[:2]
     if allowed_border >= 0:
         inside_flags = valid_flags & \
-            (flat_anchors[:, 0] >= -allowed_border) & \
-            (flat_anchors[:, 1] >= -allowed_border) & \
-            (flat_anchors[:, 2] < img_w + allowed_border) & \
-            (flat_anchors[:, 3] < img_h + allowed_border)
+            (flat_anchors[..., 0] >= -allowed_border) & \
+            (flat_anchors[..., 1] >= -allowed_border) & \
+            (flat_anchors[..., 2] < img_w + allowed_border) & \
+            (flat_anchors[..., 3] < img_h + allowed_border)
     else:
         inside_flags = valid_flags
     return inside_flags
 
 
+def batch_valid_flags(featmap_sizes,
+                      strides,
+                      num_base_priors,
+                      pad_shapes,
+                      device='cuda'):
+    """Generate the valid flags of the priors of multiple padded shapes.
+
+    The flags of all shapes are computed at once for each level, and are the
+    same as those of ``valid_flags`` of the prior generators.
+
+    Args:
+        featmap_sizes (list[tuple[int]]): Feature map sizes of multiple
+            levels, arranged as (h, w).
+        strides (list[tuple[int]]): Strides of the levels, arranged as (w, h).
+        num_base_priors (list[int]): Number of priors at a point of each
+            level.
+        pad_shapes (list[tuple[int]]): Padded shapes of the images.
+        device (str): Device where the flags will be put on.
+
+    Returns:
+        list[list[torch.Tensor]]: Valid flags of the priors of multiple levels
+            of each padded shape.
+    """
+    num_shapes = len(pad_shapes)
+    pad_hs = np.array([pad_shape[0] for pad_shape in pad_shapes])
+    pad_ws = np.array([pad_shape[1] for pad_shape in pad_shapes])
+    multi_level_flags = []
+    for (feat_h, feat_w), (stride_w, stride_h), num_priors in zip(
+            featmap_sizes, strides, num_base_priors):
+        valid_h = torch.tensor(
+            np.minimum(np.ceil(pad_hs / stride_h), feat_h), device=device)
+        valid_w = torch.tensor(
+            np.minimum(np.ceil(pad_ws / stride_w), feat_w), device=device)
+        valid_y = torch.arange(feat_h, device=device) < valid_h[:, None]
+        valid_x = torch.arange(feat_w, device=device) < valid_w[:, None]
+        # the priors are ordered by y, x and then the base priors
+        valid = valid_y[:, :, None, None] & valid_x[:, None, :, None]
+        valid = valid.expand(num_shapes, feat_h, feat_w, num_priors)
+        valid = valid.reshape(num_shapes, -1)
+        multi_level_flags.append(valid)
+    return [[flags[i] for flags in multi_level_flags]
+            for i in range(num_shapes)]
+
+
 def calc_region(bbox, ratio, featmap_size=None):
     """Calculate a proportional bbox region.
 
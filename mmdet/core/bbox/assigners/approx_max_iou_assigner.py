@@ -35,6 +35,9 @@ class ApproxMaxIoUAssigner(MaxIoUAssigner):
         gpu_assign_thr (int): The upper bound of the number of GT for GPU
             assign. When the number of gt is above this threshold, will assign
             on CPU device. Negative values mean not assign on CPU.
+        tile_size (int): If positive, the overlaps are computed and reduced
+            in tiles of ``tile_size`` squares and their approxs. See
+            :class:`MaxIoUAssigner`. Default: -1.
     """
 
     def __init__(self,
@@ -46,7 +49,8 @@ class ApproxMaxIoUAssigner(MaxIoUAssigner):
                  ignore_wrt_candidates=True,
                  match_low_quality=True,
                  gpu_assign_thr=-1,
-                 iou_calculator=dict(type='BboxOverlaps2D')):
+                 iou_calculator=dict(type='BboxOverlaps2D'),
+                 tile_size=-1):
         self.pos_iou_thr = pos_iou_thr
         self.neg_iou_thr = neg_iou_thr
         self.min_pos_iou = min_pos_iou
@@ -56,6 +60,7 @@ class ApproxMaxIoUAssigner(MaxIoUAssigner):
         self.gpu_assign_thr = gpu_assign_thr
         self.match_low_quality = match_low_quality
         self.iou_calculator = build_iou_calculator(iou_calculator)
+        self.tile_size = tile_size
 
     def assign(self,
                approxs,
@@ -104,38 +109,28 @@ class ApproxMaxIoUAssigner(MaxIoUAssigner):
             assign_result = self.assign_wrt_overlaps(overlaps, gt_labels)
             return assign_result
 
-        # re-organize anchors by approxs_per_octave x num_squares
-        approxs = torch.transpose(
-            approxs.view(num_squares, approxs_per_octave, 4), 0,
-            1).contiguous().view(-1, 4)
+        if self.tile_size > 0:
+            approxs = approxs.view(num_squares, approxs_per_octave, 4)
+            return self.assign_wrt_tiled_overlaps(
+                lambda start, end: self._get_approx_overlaps(
+                    approxs[start:end], squares[start:end], gt_bboxes,
+                    gt_bboxes_ignore), num_squares, gt_bboxes, gt_labels)
+
         assign_on_cpu = True if (self.gpu_assign_thr > 0) and (
             num_gts > self.gpu_assign_thr) else False
         # compute overlap and assign gt on CPU when number of GT is large
         if assign_on_cpu:
             device = approxs.device
             approxs = approxs.cpu()
+            squares = squares.cpu()
             gt_bboxes = gt_bboxes.cpu()
             if gt_bboxes_ignore is not None:
                 gt_bboxes_ignore = gt_bboxes_ignore.cpu()
             if gt_labels is not None:
                 gt_labels = gt_labels.cpu()
-        all_overlaps = self.iou_calculator(approxs, gt_bboxes)
-
-        overlaps, _ = all_overlaps.view(approxs_per_octave, num_squares,
-                                        num_gts).max(dim=0)
-        overlaps = torch.transpose(overlaps, 0, 1)
-
-        if (self.ignore_iof_thr > 0 and gt_bboxes_ignore is not None
-                and gt_bboxes_ignore.numel() > 0 and squares.numel() > 0):
-            if self.ignore_wrt_candidates:
-                ignore_overlaps = self.iou_calculator(
-                    squares, gt_bboxes_ignore, mode='iof')
-                ignore_max_overlaps, _ = ignore_overlaps.max(dim=1)
-            else:
-                ignore_overlaps = self.iou_calculator(
-                    gt_bboxes_ignore, squares, mode='iof')
-                ignore_max_overlaps, _ = ignore_overlaps.max(dim=0)
-            overlaps[:, ignore_max_overlaps > self.ignore_iof_thr] = -1
+        overlaps = self._get_approx_overlaps(
+            approxs.view(num_squares, approxs_per_octave, 4), squares,
+            gt_bboxes, gt_bboxes_ignore)
 
         assign_result = self.assign_wrt_overlaps(overlaps, gt_labels)
         if assign_on_cpu:
@@ -144,3 +139,31 @@ class ApproxMaxIoUAssigner(MaxIoUAssigner):
             if assign_result.labels is not None:
                 assign_result.labels = assign_result.labels.to(device)
         return assign_result
+
+    def _get_approx_overlaps(self,
+                             approxs,
+                             squares,
+                             gt_bboxes,
+                             gt_bboxes_ignore=None):
+        """Compute the max overlaps of the approxs of each square with gts.
+
+        Args:
+            approxs (Tensor): The approxs of the squares, shape
+                (n, approxs_per_octave, 4).
+            squares (Tensor): The squares, shape (n, 4).
+            gt_bboxes (Tensor): Groundtruth boxes, shape (k, 4).
+            gt_bboxes_ignore (Tensor, optional): Ignored groundtruth boxes.
+
+        Returns:
+            Tensor: The overlaps, shape (k, n), with ignored squares set to
+                -1.
+        """
+        num_squares, approxs_per_octave = approxs.shape[:2]
+        # re-organize anchors by approxs_per_octave x num_squares
+        approxs = torch.transpose(approxs, 0, 1).contiguous().view(-1, 4)
+        all_overlaps = self.iou_calculator(approxs, gt_bboxes)
+
+        overlaps, _ = all_overlaps.view(approxs_per_octave, num_squares,
+                                        -1).max(dim=0)
+        overlaps = torch.transpose(overlaps, 0, 1)
+        return self._ignore_overlaps(overlaps, squares, gt_bboxes_ignore)
@@ -1,5 +1,9 @@
 # Copyright (c) OpenMMLab. All rights reserved.
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import torch
+from torch.nn.utils.rnn import pad_sequence
 
 from ..builder import BBOX_ASSIGNERS
 from ..match_costs import build_match_cost
@@ -12,6 +16,79 @@ try:
 except ImportError:
     linear_sum_assignment = None
 
+# thread pools shared by the assigners, keyed by the number of workers
+_executors = {}
+
+
+def _get_executor(num_workers):
+    if num_workers not in _executors:
+        _executors[num_workers] = ThreadPoolExecutor(
+            num_workers, thread_name_prefix='hungarian')
+    return _executors[num_workers]
+
+
+def auction_assignment(cost, row_valid=None, eps=1e-3):
+    """Solve a batch of assignment problems with the auction algorithm.
+
+    Each valid row is assigned to a distinct column so that the total cost is
+    at most ``num_rows * eps`` larger than the minimum. All unassigned rows
+    bid for their best columns at once in each round (the Jacobi variant),
+    so the rounds only consist of tensor operations on the device of
+    ``cost``, and large problems are solved much faster than on the CPU.
+
+    Args:
+        cost (Tensor): The costs of shape (num_problems, num_rows,
+            num_cols), where num_rows <= num_cols.
+        row_valid (Tensor, optional): Boolean tensor of shape (num_problems,
+            num_rows) that marks the rows to assign, e.g. the rows that are
+            not padding. Default: None, all rows are assigned.
+        eps (float): The minimum increment of the bids. Default: 1e-3.
+
+    Returns:
+        Tensor: The assigned column of each row, -1 for invalid rows. Shape
+            (num_problems, num_rows).
+    """
+    num_problems, num_rows, num_cols = cost.shape
+    assert num_rows <= num_cols, 'There must not be more rows than columns.'
+    benefits = -cost.detach().float()
+    if row_valid is None:
+        row_valid = benefits.new_ones((num_problems, num_rows),
+                                      dtype=torch.bool)
+    prices = benefits.new_zeros((num_problems, num_cols))
+    owners = benefits.new_full((num_problems, num_cols), -1, dtype=torch.long)
+    row_cols = benefits.new_full((num_problems, num_rows),
+                                 -1,
+                                 dtype=torch.long)
+    while True:
+        bidding = (row_cols < 0) & row_valid
+        if not bidding.any():
+            break
+        values = benefits - prices[:, None]
+        if num_cols > 1:
+            top_values, top_cols = values.topk(2, dim=2)
+            increments = top_values[..., 0] - top_values[..., 1] + eps
+        else:
+            top_cols = values.new_zeros((num_problems, num_rows, 1),
+                                        dtype=torch.long)
+            increments = values.new_full((num_problems, num_rows), eps)
+        best_cols = top_cols[..., 0]
+        bids = prices.gather(1, best_cols) + increments
+        bids = bids.masked_fill(~bidding, -float('inf'))
+        # each column goes to its highest bidder
+        bid_matrix = values.new_full(values.shape, -float('inf')).scatter_(
+            2, best_cols[..., None], bids[..., None])
+        col_bids, winners = bid_matrix.max(dim=1)
+        problem_inds, col_inds = torch.nonzero(
+            col_bids > -float('inf'), as_tuple=True)
+        prev_owners = owners[problem_inds, col_inds]
+        outbid = prev_owners >= 0
+        row_cols[problem_inds[outbid], prev_owners[outbid]] = -1
+        new_owners = winners[problem_inds, col_inds]
+        row_cols[problem_inds, new_owners] = col_inds
+        owners[problem_inds, col_inds] = new_owners
+        prices[problem_inds, col_inds] = col_bids[problem_inds, col_inds]
+    return row_cols
+
 
 @BBOX_ASSIGNERS.register_module()
 class HungarianAssigner(BaseAssigner):
@@ -40,15 +117,35 @@ class HungarianAssigner(BaseAssigner):
         iou_mode (str | optional): "iou" (intersection over union), "iof"
                 (intersection over foreground), or "giou" (generalized
                 intersection over union). Default "giou".
+        solver (str, optional): "scipy" solves the matchings exactly with
+            `scipy.optimize.linear_sum_assignment` on the CPU, "auction"
+            solves them approximately with :func:`auction_assignment` on the
+            device of the predictions, which is faster for many queries.
+            Default "scipy".
+        num_workers (int, optional): The number of threads that solve the
+            matchings of :meth:`batch_assign` with scipy concurrently, 0 or 1
+            solves them serially. Default 4.
+        auction_eps (float, optional): The minimum bid increment of the
+            auction solver, the total cost of a matching is at most
+            ``num_gts * auction_eps`` larger than the optimal one.
+            Default 1e-3.
     """
 
     def __init__(self,
                  cls_cost=dict(type='ClassificationCost', weight=1.),
                  reg_cost=dict(type='BBoxL1Cost', weight=1.0),
-                 iou_cost=dict(type='IoUCost', iou_mode='giou', weight=1.0)):
+                 iou_cost=dict(type='IoUCost', iou_mode='giou', weight=1.0),
+                 solver='scipy',
+                 num_workers=4,
+                 auction_eps=1e-3):
+        assert solver in ('scipy', 'auction'), \
+            f'solver should be "scipy" or "auction", but got {solver}'
         self.cls_cost = build_match_cost(cls_cost)
         self.reg_cost = build_match_cost(reg_cost)
         self.iou_cost = build_match_cost(iou_cost)
+        self.solver = solver
+        self.num_workers = num_workers
+        self.auction_eps = auction_eps
 
     def assign(self,
                bbox_pred,
@@ -125,22 +222,180 @@ class HungarianAssigner(BaseAssigner):
         # weighted sum of above three costs
         cost = cls_cost + reg_cost + iou_cost
 
-        # 3. do Hungarian matching on CPU using linear_sum_assignment
-        cost = cost.detach().cpu()
-        if linear_sum_assignment is None:
-            raise ImportError('Please run "pip install scipy" '
-                              'to install scipy first.')
-        matched_row_inds, matched_col_inds = linear_sum_assignment(cost)
-        matched_row_inds = torch.from_numpy(matched_row_inds).to(
-            bbox_pred.device)
-        matched_col_inds = torch.from_numpy(matched_col_inds).to(
-            bbox_pred.device)
-
+        # 3. do Hungarian matching on CPU using linear_sum_assignment, or
+        # with the auction algorithm on the device
         # 4. assign backgrounds and foregrounds
-        # assign all indices to backgrounds first
-        assigned_gt_inds[:] = 0
-        # assign foregrounds based on matching results
-        assigned_gt_inds[matched_row_inds] = matched_col_inds + 1
-        assigned_labels[matched_row_inds] = gt_labels[matched_col_inds]
+        assigned_gt_inds = self._match([cost[None]], num_bboxes)[0, 0]
+        pos_inds = assigned_gt_inds > 0
+        assigned_labels[pos_inds] = gt_labels[assigned_gt_inds[pos_inds] - 1]
         return AssignResult(
             num_gts, assigned_gt_inds, None, labels=assigned_labels)
+
+    def batch_assign(self, bbox_preds, cls_preds, gt_bboxes_list,
+                     gt_labels_list, img_metas):
+        """Computes the matchings of several decoder layers and images.
+
+        The results are the same as those of :meth:`assign` for each layer
+        and image, but the costs of all layers and images are computed by one
+        call of each match cost, against the gts of each image padded to the
+        largest number of gts, and the costs of the gts of each image are
+        copied to the CPU at once. The matchings are then solved concurrently
+        by ``num_workers`` threads. So there is a single device to host
+        synchronization, instead of one per layer and image. The match costs
+        must accept batched inputs, like the ones of mmdet.
+
+        Args:
+            bbox_preds (Tensor): Predicted boxes with normalized coordinates
+                (cx, cy, w, h). Shape [num_layers, num_imgs, num_query, 4].
+            cls_preds (Tensor): Predicted classification logits, shape
+                [num_layers, num_imgs, num_query, num_class].
+            gt_bboxes_list (list[Tensor]): Ground truth boxes of each image
+                with unnormalized coordinates (x1, y1, x2, y2).
+            gt_labels_list (list[Tensor]): Labels of the gts of each image.
+            img_metas (list[dict]): Meta information of each image.
+
+        Returns:
+            list[list[:obj:`AssignResult`]]: The assigned results of each
+                image of each layer.
+        """
+        num_layers, num_imgs, num_query = bbox_preds.shape[:3]
+        num_gts = [gt_bboxes.size(0) for gt_bboxes in gt_bboxes_list]
+        factors = bbox_preds.new_tensor(
+            [[img_w, img_h, img_w, img_h]
+             for img_h, img_w, _ in (m['img_shape'] for m in img_metas)])
+        # the gts of each image, padded with zeros to the same number
+        gt_bboxes = pad_sequence(gt_bboxes_list, batch_first=True)
+        gt_labels = pad_sequence(gt_labels_list, batch_first=True)
+        max_gts = gt_bboxes.size(1)
+
+        # the costs of each layer and image, of shape
+        # [num_layers * num_imgs, num_query, max_gts]
+        def _batch(gts):
+            gts = gts.expand(num_layers, *gts.shape)
+            return gts.reshape(num_layers * num_imgs, *gts.shape[2:])
+
+        cls_cost = self.cls_cost(
+            cls_preds.reshape(num_layers * num_imgs, num_query, -1),
+            _batch(gt_labels))
+        reg_cost = self.reg_cost(
+            bbox_preds.reshape(num_layers * num_imgs, num_query, 4),
+            _batch(gt_bboxes / factors[:, None]))
+        bboxes = bbox_cxcywh_to_xyxy(bbox_preds) * factors[:, None]
+        iou_cost = self.iou_cost(
+            bboxes.reshape(num_layers * num_imgs, num_query, 4),
+            _batch(gt_bboxes))
+        cost = (cls_cost + reg_cost + iou_cost).view(num_layers, num_imgs,
+                                                     num_query, max_gts)
+        costs = [cost[:, i, :, :num_gts[i]] for i in range(num_imgs)]
+        assigned_gt_inds = self._match(costs, num_query)
+
+        # the labels of the matched gts, -1 for backgrounds
+        gt_inds = (assigned_gt_inds - 1).clamp(min=0)
+        assigned_labels = gt_labels.new_full(assigned_gt_inds.shape, -1)
+        if max_gts > 0:
+            matched_labels = gt_labels.expand(num_layers, -1,
+                                              -1).gather(2, gt_inds)
+            assigned_labels = torch.where(assigned_gt_inds > 0, matched_labels,
+                                          assigned_labels)
+        return [[
+            AssignResult(
+                num_gts[i],
+                assigned_gt_inds[layer, i],
+                None,
+                labels=assigned_labels[layer, i]) for i in range(num_imgs)
+        ] for layer in range(num_layers)]
+
+    def _match(self, costs, num_query):
+        """Solve the matchings of several images and layers.
+
+        Args:
+            costs (list[Tensor]): The costs of each image, of shape
+                [num_layers, num_query, num_gts].
+            num_query (int): The number of queries.
+
+        Returns:
+            Tensor: The 1-based index of the gt that each query is matched
+                to, 0 for backgrounds. Shape [num_layers, num_imgs,
+                num_query].
+        """
+        if self.solver == 'auction':
+            return self._auction_match(costs, num_query)
+        return self._scipy_match(costs, num_query)
+
+    def _scipy_match(self, costs, num_query):
+        """Solve the matchings with `scipy.optimize.linear_sum_assignment`.
+
+        The costs are copied to the CPU at once, and solved concurrently by
+        ``num_workers`` threads.
+        """
+        device = costs[0].device
+        num_layers = costs[0].size(0)
+        num_gts = [cost.size(2) for cost in costs]
+        costs = torch.cat([cost.detach().reshape(-1) for cost in costs])
+        costs = costs.cpu().numpy()
+        problems = []
+        offset = 0
+        for i, num in enumerate(num_gts):
+            size = num_layers * num_query * num
+            img_costs = costs[offset:offset + size].reshape(
+                num_layers, num_query, num)
+            offset += size
+            if num > 0 and num_query > 0:
+                problems += [(layer, i, img_costs[layer])
+                             for layer in range(num_layers)]
+
+        assigned_gt_inds = np.zeros((num_layers, len(num_gts), num_query),
+                                    dtype=np.int64)
+        if problems:
+            if linear_sum_assignment is None:
+                raise ImportError('Please run "pip install scipy" '
+                                  'to install scipy first.')
+            problem_costs = [problem[2] for problem in problems]
+            if self.num_workers > 1 and len(problems) > 1:
+                executor = _get_executor(self.num_workers)
+                matches = executor.map(linear_sum_assignment, problem_costs)
+            else:
+                matches = map(linear_sum_assignment, problem_costs)
+            for (layer, i, _), (row_inds, col_inds) in zip(problems, matches):
+                assigned_gt_inds[layer, i, row_inds] = col_inds + 1
+        return torch.from_numpy(assigned_gt_inds).to(device)
+
+    def _auction_match(self, costs, num_query):
+        """Solve the matchings with :func:`auction_assignment`.
+
+        The matchings of the images that have more gts than queries are
+        solved with scipy.
+        """
+        num_layers = costs[0].size(0)
+        num_gts = [cost.size(2) for cost in costs]
+        assigned_gt_inds = costs[0].new_zeros(
+            (num_layers, len(costs), num_query), dtype=torch.long)
+        auction_imgs = [
+            i for i, num in enumerate(num_gts) if 0 < num <= num_query
+        ]
+        scipy_imgs = [i for i, num in enumerate(num_gts) if num > num_query]
+        if auction_imgs:
+            # the gts bid for the queries, padded to the same number
+            max_gts = max(num_gts[i] for i in auction_imgs)
+            gt_costs = costs[0].new_zeros(
+                (len(auction_imgs), num_layers, max_gts, num_query))
+            gt_valid = gt_costs.new_zeros(gt_costs.shape[:3], dtype=torch.bool)
+            for j, i in enumerate(auction_imgs):
+                gt_costs[j, :, :num_gts[i]] = costs[i].detach().transpose(1, 2)
+                gt_valid[j, :, :num_gts[i]] = True
+            gt_queries = auction_assignment(
+                gt_costs.flatten(0, 1), gt_valid.flatten(0, 1),
+                self.auction_eps).view(gt_valid.shape)
+            # the invalid gts are scattered to an extra query
+            gt_queries[~gt_valid] = num_query
+            gt_inds = torch.arange(
+                1, max_gts + 1, device=gt_queries.device).expand_as(gt_queries)
+            query_gt_inds = assigned_gt_inds.new_zeros(
+                (len(auction_imgs), num_layers, num_query + 1))
+            query_gt_inds.scatter_(2, gt_queries, gt_inds)
+            assigned_gt_inds[:, auction_imgs] = query_gt_inds[
+                ..., :num_query].transpose(0, 1)
+        if scipy_imgs:
+            assigned_gt_inds[:, scipy_imgs] = self._scipy_match(
+                [costs[i] for i in scipy_imgs], num_query)
+        return assigned_gt_inds
@@ -7,6 +7,19 @@ from .assign_result import AssignResult
 from .base_assigner import BaseAssigner
 
 
+def _stack_padded(bboxes_list, ref):
+    """Stack boxes of different numbers, padded with zero boxes."""
+    bboxes_list = [
+        ref.new_zeros((0, 4)) if bboxes is None else bboxes[:, :4]
+        for bboxes in bboxes_list
+    ]
+    max_num = max(bboxes.size(0) for bboxes in bboxes_list)
+    padded = ref.new_zeros((len(bboxes_list), max_num, 4))
+    for i, bboxes in enumerate(bboxes_list):
+        padded[i, :bboxes.size(0)] = bboxes
+    return padded
+
+
 @BBOX_ASSIGNERS.register_module()
 class MaxIoUAssigner(BaseAssigner):
     """Assign a corresponding gt bbox or background to each bbox.
@@ -36,6 +49,12 @@ class MaxIoUAssigner(BaseAssigner):
         gpu_assign_thr (int): The upper bound of the number of GT for GPU
             assign. When the number of gt is above this threshold, will assign
             on CPU device. Negative values mean not assign on CPU.
+        tile_size (int): If positive, the overlaps are computed and reduced
+            in tiles of ``tile_size`` bboxes, so the memory of the assignment
+            is bounded by ``tile_size`` times the number of gts, and the
+            assignment stays on the device of the bboxes regardless of
+            ``gpu_assign_thr``. The result is the same as without tiling.
+            Negative values mean no tiling. Default: -1.
     """
 
     def __init__(self,
@@ -47,7 +66,8 @@ class MaxIoUAssigner(BaseAssigner):
                  ignore_wrt_candidates=True,
                  match_low_quality=True,
                  gpu_assign_thr=-1,
-                 iou_calculator=dict(type='BboxOverlaps2D')):
+                 iou_calculator=dict(type='BboxOverlaps2D'),
+                 tile_size=-1):
         self.pos_iou_thr = pos_iou_thr
         self.neg_iou_thr = neg_iou_thr
         self.min_pos_iou = min_pos_iou
@@ -57,6 +77,7 @@ class MaxIoUAssigner(BaseAssigner):
         self.gpu_assign_thr = gpu_assign_thr
         self.match_low_quality = match_low_quality
         self.iou_calculator = build_iou_calculator(iou_calculator)
+        self.tile_size = tile_size
 
     def assign(self, bboxes, gt_bboxes, gt_bboxes_ignore=None, gt_labels=None):
         """Assign gt to bboxes.
@@ -91,6 +112,12 @@ class MaxIoUAssigner(BaseAssigner):
             >>> expected_gt_inds = torch.LongTensor([1, 0])
             >>> assert torch.all(assign_result.gt_inds == expected_gt_inds)
         """
+        if self.tile_size > 0:
+            return self.assign_wrt_tiled_overlaps(
+                lambda start, end: self._get_overlaps(
+                    gt_bboxes, bboxes[start:end], gt_bboxes_ignore),
+                bboxes.size(0), gt_bboxes, gt_labels)
+
         assign_on_cpu = True if (self.gpu_assign_thr > 0) and (
             gt_bboxes.shape[0] > self.gpu_assign_thr) else False
         # compute overlap and assign gt on CPU when number of GT is large
@@ -103,8 +130,24 @@ class MaxIoUAssigner(BaseAssigner):
             if gt_labels is not None:
                 gt_labels = gt_labels.cpu()
 
+        overlaps = self._get_overlaps(gt_bboxes, bboxes, gt_bboxes_ignore)
+
+        assign_result = self.assign_wrt_overlaps(overlaps, gt_labels)
+        if assign_on_cpu:
+            assign_result.gt_inds = assign_result.gt_inds.to(device)
+            assign_result.max_overlaps = assign_result.max_overlaps.to(device)
+            if assign_result.labels is not None:
+                assign_result.labels = assign_result.labels.to(device)
+        return assign_result
+
+    def _get_overlaps(self, gt_bboxes, bboxes, gt_bboxes_ignore=None):
+        """Compute the overlaps of gts and bboxes, with the ignored bboxes
+        set to -1."""
         overlaps = self.iou_calculator(gt_bboxes, bboxes)
+        return self._ignore_overlaps(overlaps, bboxes, gt_bboxes_ignore)
 
+    def _ignore_overlaps(self, overlaps, bboxes, gt_bboxes_ignore=None):
+        """Set the overlaps of the bboxes that overlap ignored gts to -1."""
         if (self.ignore_iof_thr > 0 and gt_bboxes_ignore is not None
                 and gt_bboxes_ignore.numel() > 0 and bboxes.numel() > 0):
             if self.ignore_wrt_candidates:
@@ -116,14 +159,7 @@ class MaxIoUAssigner(BaseAssigner):
                     gt_bboxes_ignore, bboxes, mode='iof')
                 ignore_max_overlaps, _ = ignore_overlaps.max(dim=0)
             overlaps[:, ignore_max_overlaps > self.ignore_iof_thr] = -1
-
-        assign_result = self.assign_wrt_overlaps(overlaps, gt_labels)
-        if assign_on_cpu:
-            assign_result.gt_inds = assign_result.gt_inds.to(device)
-            assign_result.max_overlaps = assign_result.max_overlaps.to(device)
-            if assign_result.labels is not None:
-                assign_result.labels = assign_result.labels.to(device)
-        return assign_result
+        return overlaps
 
     def assign_wrt_overlaps(self, overlaps, gt_labels=None):
         """Assign w.r.t. the overlaps of bboxes with gts.
@@ -138,13 +174,11 @@ class MaxIoUAssigner(BaseAssigner):
         """
         num_gts, num_bboxes = overlaps.size(0), overlaps.size(1)
 
-        # 1. assign -1 by default
-        assigned_gt_inds = overlaps.new_full((num_bboxes, ),
-                                             -1,
-                                             dtype=torch.long)
-
         if num_gts == 0 or num_bboxes == 0:
             # No ground truth or boxes, return empty assignment
+            assigned_gt_inds = overlaps.new_full((num_bboxes, ),
+                                                 -1,
+                                                 dtype=torch.long)
             max_overlaps = overlaps.new_zeros((num_bboxes, ))
             if num_gts == 0:
                 # No truth, assign everything to background
@@ -168,19 +202,8 @@ class MaxIoUAssigner(BaseAssigner):
         # for each gt, the max iou of all proposals
         gt_max_overlaps, gt_argmax_overlaps = overlaps.max(dim=1)
 
-        # 2. assign negative: below
-        # the negative inds are set to be 0
-        if isinstance(self.neg_iou_thr, float):
-            assigned_gt_inds[(max_overlaps >= 0)
-                             & (max_overlaps < self.neg_iou_thr)] = 0
-        elif isinstance(self.neg_iou_thr, tuple):
-            assert len(self.neg_iou_thr) == 2
-            assigned_gt_inds[(max_overlaps >= self.neg_iou_thr[0])
-                             & (max_overlaps < self.neg_iou_thr[1])] = 0
-
-        # 3. assign positive: above positive IoU threshold
-        pos_inds = max_overlaps >= self.pos_iou_thr
-        assigned_gt_inds[pos_inds] = argmax_overlaps[pos_inds] + 1
+        assigned_gt_inds = self._assign_wrt_max_overlaps(
+            max_overlaps, argmax_overlaps)
 
         if self.match_low_quality:
             # Low-quality matching will overwrite the assigned_gt_inds assigned
@@ -199,15 +222,221 @@ class MaxIoUAssigner(BaseAssigner):
                     else:
                         assigned_gt_inds[gt_argmax_overlaps[i]] = i + 1
 
-        if gt_labels is not None:
-            assigned_labels = assigned_gt_inds.new_full((num_bboxes, ), -1)
-            pos_inds = torch.nonzero(
-                assigned_gt_inds > 0, as_tuple=False).squeeze()
-            if pos_inds.numel() > 0:
-                assigned_labels[pos_inds] = gt_labels[
-                    assigned_gt_inds[pos_inds] - 1]
-        else:
-            assigned_labels = None
+        assigned_labels = self._get_assigned_labels(assigned_gt_inds,
+                                                    gt_labels)
+
+        return AssignResult(
+            num_gts, assigned_gt_inds, max_overlaps, labels=assigned_labels)
+
+    def assign_wrt_tiled_overlaps(self,
+                                  overlaps_fn,
+                                  num_bboxes,
+                                  gt_bboxes,
+                                  gt_labels=None):
+        """Assign w.r.t. the overlaps of bboxes with gts, computed in tiles.
+
+        The overlaps of each tile of ``tile_size`` bboxes are reduced to the
+        max overlaps of the bboxes and the running max overlaps of the gts,
+        so the full overlaps are never materialized. If the low-quality
+        matches of ``gt_max_assign_all`` are needed, the overlaps of the
+        tiles are computed a second time to find the bboxes with the max
+        overlap of each gt. The result is the same as that of
+        :meth:`assign_wrt_overlaps` with the full overlaps.
+
+        Args:
+            overlaps_fn (callable): A function that takes the start and end
+                indices of a tile of bboxes and returns the overlaps of the
+                k gts and the bboxes of the tile, shape (k, end - start),
+                with ignored bboxes set to -1.
+            num_bboxes (int): The number of bboxes.
+            gt_bboxes (Tensor): Groundtruth boxes, shape (k, 4).
+            gt_labels (Tensor, optional): Labels of k gt_bboxes, shape (k, ).
+
+        Returns:
+            :obj:`AssignResult`: The assign result.
+        """
+        num_gts = gt_bboxes.size(0)
+        if num_gts == 0 or num_bboxes == 0:
+            return self.assign_wrt_overlaps(
+                gt_bboxes.new_zeros((num_gts, num_bboxes)), gt_labels)
+
+        tiles = [(start, min(start + self.tile_size, num_bboxes))
+                 for start in range(0, num_bboxes, self.tile_size)]
+        max_overlaps, argmax_overlaps = [], []
+        gt_max_overlaps = gt_argmax_overlaps = None
+        for start, end in tiles:
+            overlaps = overlaps_fn(start, end)
+            tile_max_overlaps, tile_argmax_overlaps = overlaps.max(dim=0)
+            max_overlaps.append(tile_max_overlaps)
+            argmax_overlaps.append(tile_argmax_overlaps)
+            tile_gt_max_overlaps, tile_gt_argmax_overlaps = overlaps.max(dim=1)
+            tile_gt_argmax_overlaps += start
+            if gt_max_overlaps is None:
+                gt_max_overlaps = tile_gt_max_overlaps
+                gt_argmax_overlaps = tile_gt_argmax_overlaps
+            else:
+                # keep the first bbox with the max overlap
+                update = tile_gt_max_overlaps > gt_max_overlaps
+                gt_max_overlaps = torch.where(update, tile_gt_max_overlaps,
+                                              gt_max_overlaps)
+                gt_argmax_overlaps = torch.where(update,
+                                                 tile_gt_argmax_overlaps,
+                                                 gt_argmax_overlaps)
+        max_overlaps = torch.cat(max_overlaps)
+        argmax_overlaps = torch.cat(argmax_overlaps)
+
+        assigned_gt_inds = self._assign_wrt_max_overlaps(
+            max_overlaps, argmax_overlaps)
+
+        if self.match_low_quality:
+            if self.gt_max_assign_all:
+                valid = gt_max_overlaps >= self.min_pos_iou
+                gt_inds = torch.arange(
+                    1, num_gts + 1, device=assigned_gt_inds.device)[:, None]
+                for start, end in tiles:
+                    overlaps = overlaps_fn(start, end)
+                    max_iou_inds = (overlaps == gt_max_overlaps[:, None]) & \
+                        valid[:, None]
+                    # the bboxes with the max overlap of several gts are
+                    # assigned to the last one as in assign_wrt_overlaps
+                    tile_gt_inds, _ = (max_iou_inds * gt_inds).max(dim=0)
+                    assigned_gt_inds[start:end] = torch.where(
+                        tile_gt_inds > 0, tile_gt_inds,
+                        assigned_gt_inds[start:end])
+            else:
+                for i in range(num_gts):
+                    if gt_max_overlaps[i] >= self.min_pos_iou:
+                        assigned_gt_inds[gt_argmax_overlaps[i]] = i + 1
+
+        assigned_labels = self._get_assigned_labels(assigned_gt_inds,
+                                                    gt_labels)
 
         return AssignResult(
             num_gts, assigned_gt_inds, max_overlaps, labels=assigned_labels)
+
+    def batch_assign(self,
+                     bboxes,
+                     gt_bboxes_list,
+                     gt_bboxes_ignore_list=None,
+                     bbox_valid=None):
+        """Assign gts to the bboxes of a batch of images at once.
+
+        The gts of the images are padded to the largest number of gts, so the
+        overlaps of all images are computed and reduced by a few batched
+        tensor ops instead of a loop of small ones. The result of each image
+        is the same as that of :meth:`assign`.
+
+        Args:
+            bboxes (Tensor): Bboxes of the images, shape (B, n, 4).
+            gt_bboxes_list (list[Tensor]): Groundtruth boxes of each image,
+                of shape (k_i, 4).
+            gt_bboxes_ignore_list (list[Tensor], optional): Ignored
+                groundtruth boxes of each image.
+            bbox_valid (Tensor, optional): Whether to assign each bbox, shape
+                (B, n). The invalid bboxes are treated as if they were not
+                given to :meth:`assign`.
+
+        Returns:
+            tuple[Tensor]: The assigned gt inds, which are 1-based indices of
+                the gts, 0 for negative bboxes and -1 for ignored or invalid
+                bboxes, and the max overlaps of the bboxes. Both are of shape
+                (B, n).
+        """
+        num_imgs, num_bboxes = bboxes.shape[:2]
+        if bbox_valid is None:
+            bbox_valid = bboxes.new_ones((num_imgs, num_bboxes),
+                                         dtype=torch.bool)
+        num_gts = torch.tensor(
+            [gt_bboxes.size(0) for gt_bboxes in gt_bboxes_list],
+            device=bboxes.device)
+        gt_bboxes = _stack_padded(gt_bboxes_list, bboxes)
+        max_num_gts = gt_bboxes.size(1)
+        if max_num_gts == 0:
+            # No truth, assign everything to background
+            return bbox_valid.long() - 1, bboxes.new_zeros(
+                (num_imgs, num_bboxes))
+        gt_valid = torch.arange(
+            max_num_gts, device=bboxes.device)[None] < num_gts[:, None]
+
+        overlaps = self.iou_calculator(gt_bboxes, bboxes)
+        if self.ignore_iof_thr > 0 and gt_bboxes_ignore_list is not None:
+            # the zero boxes of the padding do not overlap any bboxes
+            gt_bboxes_ignore = _stack_padded(gt_bboxes_ignore_list, bboxes)
+            if gt_bboxes_ignore.size(1) > 0:
+                if self.ignore_wrt_candidates:
+                    ignore_overlaps = self.iou_calculator(
+                        bboxes, gt_bboxes_ignore, mode='iof')
+                    ignore_max_overlaps, _ = ignore_overlaps.max(dim=2)
+                else:
+                    ignore_overlaps = self.iou_calculator(
+                        gt_bboxes_ignore, bboxes, mode='iof')
+                    ignore_max_overlaps, _ = ignore_overlaps.max(dim=1)
+                ignored = ignore_max_overlaps > self.ignore_iof_thr
+                overlaps.masked_fill_(ignored[:, None], -1)
+        # the overlaps of the padded gts and invalid bboxes are lower than
+        # those of the ignored bboxes, so they are never the max overlaps
+        valid = gt_valid[:, :, None] & bbox_valid[:, None, :]
+        overlaps.masked_fill_(~valid, -2)
+
+        max_overlaps, argmax_overlaps = overlaps.max(dim=1)
+        gt_max_overlaps, gt_argmax_overlaps = overlaps.max(dim=2)
+        assigned_gt_inds = self._assign_wrt_max_overlaps(
+            max_overlaps, argmax_overlaps)
+
+        if self.match_low_quality:
+            low_quality = (gt_max_overlaps >= self.min_pos_iou) & gt_valid
+            if self.gt_max_assign_all:
+                max_iou_inds = valid & low_quality[:, :, None] & (
+                    overlaps == gt_max_overlaps[:, :, None])
+                # later gts overwrite earlier ones as in assign_wrt_overlaps
+                for i in range(max_num_gts):
+                    assigned_gt_inds = torch.where(
+                        max_iou_inds[:, i], assigned_gt_inds.new_tensor(i + 1),
+                        assigned_gt_inds)
+            else:
+                img_inds = torch.arange(num_imgs, device=bboxes.device)
+                for i in range(max_num_gts):
+                    inds = (img_inds, gt_argmax_overlaps[:, i])
+                    assigned_gt_inds[inds] = torch.where(
+                        low_quality[:, i], assigned_gt_inds.new_tensor(i + 1),
+                        assigned_gt_inds[inds])
+
+        no_gts = (num_gts == 0)[:, None]
+        assigned_gt_inds = assigned_gt_inds.masked_fill(no_gts & bbox_valid, 0)
+        max_overlaps = max_overlaps.masked_fill(no_gts | ~bbox_valid, 0)
+        return assigned_gt_inds, max_overlaps
+
+    def _assign_wrt_max_overlaps(self, max_overlaps, argmax_overlaps):
+        """Assign the negative and positive bboxes by their max overlaps
+        (steps 1-3 of :meth:`assign`)."""
+        # 1. assign -1 by default
+        assigned_gt_inds = max_overlaps.new_full(
+            max_overlaps.shape, -1, dtype=torch.long)
+
+        # 2. assign negative: below
+        # the negative inds are set to be 0
+        if isinstance(self.neg_iou_thr, float):
+            assigned_gt_inds[(max_overlaps >= 0)
+                             & (max_overlaps < self.neg_iou_thr)] = 0
+        elif isinstance(self.neg_iou_thr, tuple):
+            assert len(self.neg_iou_thr) == 2
+            assigned_gt_inds[(max_overlaps >= self.neg_iou_thr[0])
+                             & (max_overlaps < self.neg_iou_thr[1])] = 0
+
+        # 3. assign positive: above positive IoU threshold
+        pos_inds = max_overlaps >= self.pos_iou_thr
+        assigned_gt_inds[pos_inds] = argmax_overlaps[pos_inds] + 1
+        return assigned_gt_inds
+
+    @staticmethod
+    def _get_assigned_labels(assigned_gt_inds, gt_labels=None):
+        if gt_labels is None:
+            return None
+        assigned_labels = assigned_gt_inds.new_full(
+            (assigned_gt_inds.size(0), ), -1)
+        pos_inds = torch.nonzero(
+            assigned_gt_inds > 0, as_tuple=False).squeeze()
+        if pos_inds.numel() > 0:
+            assigned_labels[pos_inds] = gt_labels[assigned_gt_inds[pos_inds] -
+                                                  1]
+        return assigned_labels
@@ -147,20 +147,10 @@ class SimOTAAssigner(BaseAssigner):
 
         valid_decoded_bbox = decoded_bboxes[valid_mask]
         valid_pred_scores = pred_scores[valid_mask]
-        num_valid = valid_decoded_bbox.size(0)
 
         pairwise_ious = bbox_overlaps(valid_decoded_bbox, gt_bboxes)
         iou_cost = -torch.log(pairwise_ious + eps)
-
-        gt_onehot_label = (
-            F.one_hot(gt_labels.to(torch.int64),
-                      pred_scores.shape[-1]).float().unsqueeze(0).repeat(
-                          num_valid, 1, 1))
-
-        valid_pred_scores = valid_pred_scores.unsqueeze(1).repeat(1, num_gt, 1)
-        cls_cost = F.binary_cross_entropy(
-            valid_pred_scores.sqrt_(), gt_onehot_label,
-            reduction='none').sum(-1)
+        cls_cost = self._get_cls_cost(valid_pred_scores, gt_labels)
 
         cost_matrix = (
             cls_cost * self.cls_weight + iou_cost * self.iou_weight +
@@ -181,6 +171,210 @@ class SimOTAAssigner(BaseAssigner):
         return AssignResult(
             num_gt, assigned_gt_inds, max_overlaps, labels=assigned_labels)
 
+    def batch_assign(self,
+                     pred_scores,
+                     priors,
+                     decoded_bboxes,
+                     gt_bboxes_list,
+                     gt_labels_list,
+                     eps=1e-7):
+        """Assign gt to the priors of several images using SimOTA.
+
+        The gts of the images are padded to the same number, so the center
+        priors, the costs, the dynamic-k selection and the resolution of the
+        matching conflicts of all images are computed together, without
+        leaving the device. The results are the same as those of
+        :meth:`assign` for each image, except that priors with tied costs may
+        be selected differently. It falls back to :meth:`assign` for each
+        image, with a warning, when the device is out of memory. Other errors
+        are raised.
+
+        Args:
+            pred_scores (Tensor): Classification scores of the images, a
+                3D-Tensor with shape [num_imgs, num_priors, num_classes].
+            priors (Tensor): All priors of the images, a 2D-Tensor with shape
+                [num_priors, 4] in [cx, xy, stride_w, stride_y] format.
+            decoded_bboxes (Tensor): Predicted bboxes, a 3D-Tensor with shape
+                [num_imgs, num_priors, 4] in [tl_x, tl_y, br_x, br_y] format.
+            gt_bboxes_list (list[Tensor]): Ground truth bboxes of each image
+                with shape [num_gts, 4] in [tl_x, tl_y, br_x, br_y] format.
+            gt_labels_list (list[Tensor]): Ground truth labels of each image
+                with shape [num_gts].
+            eps (float): A value added to the denominator for numerical
+                stability. Default 1e-7.
+        Returns:
+            list[:obj:`AssignResult`]: The assigned result of each image.
+        """
+        try:
+            return self._batch_assign(pred_scores, priors, decoded_bboxes,
+                                      gt_bboxes_list, gt_labels_list, eps)
+        except RuntimeError as e:
+            if 'out of memory' not in str(e):
+                raise
+            warnings.warn('OOM RuntimeError is raised due to the huge memory '
+                          'cost during label assignment. The images are '
+                          'assigned one by one in this batch. If you want to '
+                          'avoid this issue, try to reduce the batch size or '
+                          'image size.')
+            torch.cuda.empty_cache()
+            return [
+                self.assign(
+                    pred_scores[i],
+                    priors,
+                    decoded_bboxes[i],
+                    gt_bboxes_list[i],
+                    gt_labels_list[i],
+                    eps=eps) for i in range(len(gt_bboxes_list))
+            ]
+
+    def _batch_assign(self, pred_scores, priors, decoded_bboxes,
+                      gt_bboxes_list, gt_labels_list, eps):
+        INF = 100000000
+        num_imgs, num_bboxes = decoded_bboxes.shape[:2]
+        num_gts = [gt_bboxes.size(0) for gt_bboxes in gt_bboxes_list]
+        max_num_gts = max(num_gts)
+        if max_num_gts == 0 or num_bboxes == 0:
+            return [
+                self._assign(pred_scores[i], priors, decoded_bboxes[i],
+                             gt_bboxes_list[i], gt_labels_list[i], None, eps)
+                for i in range(num_imgs)
+            ]
+
+        # pad the gts of all images to the same number
+        gt_bboxes = decoded_bboxes.new_zeros((num_imgs, max_num_gts, 4))
+        gt_labels = decoded_bboxes.new_zeros((num_imgs, max_num_gts),
+                                             dtype=torch.long)
+        gt_valid = decoded_bboxes.new_zeros((num_imgs, max_num_gts),
+                                            dtype=torch.bool)
+        for i, num in enumerate(num_gts):
+            gt_bboxes[i, :num] = gt_bboxes_list[i]
+            gt_labels[i, :num] = gt_labels_list[i]
+            gt_valid[i, :num] = True
+
+        is_in_gts, is_in_cts = self._get_in_gt_and_in_center_masks(
+            priors, gt_bboxes)
+        is_in_gts &= gt_valid[:, None]
+        is_in_cts &= gt_valid[:, None]
+        # in boxes or in centers, shape: [num_imgs, num_priors]
+        valid_mask = is_in_gts.any(dim=2) | is_in_cts.any(dim=2)
+        # the pairs of invalid priors or padded gts
+        invalid_pairs = ~(valid_mask[..., None] & gt_valid[:, None])
+
+        pairwise_ious = bbox_overlaps(decoded_bboxes, gt_bboxes)
+        pairwise_ious = pairwise_ious.masked_fill(invalid_pairs, 0)
+        iou_cost = -torch.log(pairwise_ious + eps)
+        cls_cost = self._get_cls_cost(pred_scores, gt_labels)
+        cost_matrix = (
+            cls_cost * self.cls_weight + iou_cost * self.iou_weight +
+            (~(is_in_gts & is_in_cts)) * INF)
+        cost_matrix = cost_matrix.masked_fill(invalid_pairs, float('inf'))
+
+        # dynamic k of each gt
+        candidate_topk = min(self.candidate_topk, num_bboxes)
+        topk_ious, _ = torch.topk(pairwise_ious, candidate_topk, dim=1)
+        dynamic_ks = torch.clamp(topk_ious.sum(1).int(), min=1)
+        # select the dynamic_k priors of the lowest costs of each gt
+        topk_costs, topk_inds = torch.topk(
+            cost_matrix, candidate_topk, dim=1, largest=False)
+        ranks = torch.arange(candidate_topk, device=cost_matrix.device)
+        selected = (ranks[:, None] < dynamic_ks[:, None]) & (
+            topk_costs < float('inf'))
+        matching_matrix = torch.zeros_like(invalid_pairs).scatter_(
+            1, topk_inds, selected)
+
+        # the priors matched to several gts are matched to the one with the
+        # lowest cost
+        _, cost_argmin = torch.min(cost_matrix, dim=2)
+        prior_match_gt_mask = matching_matrix.sum(2) > 1
+        matching_matrix = torch.where(
+            prior_match_gt_mask[..., None],
+            F.one_hot(cost_argmin, max_num_gts).bool(), matching_matrix)
+        fg_mask = matching_matrix.any(dim=2)
+        matched_gt_inds = matching_matrix.to(cost_matrix.dtype).argmax(dim=2)
+
+        # convert to AssignResult format
+        assigned_gt_inds = torch.where(fg_mask, matched_gt_inds + 1,
+                                       matched_gt_inds.new_zeros(()))
+        assigned_labels = torch.where(fg_mask,
+                                      gt_labels.gather(1, matched_gt_inds),
+                                      gt_labels.new_full((), -1))
+        max_overlaps = torch.where(
+            fg_mask,
+            pairwise_ious.gather(2, matched_gt_inds[..., None])[..., 0],
+            pairwise_ious.new_full((), -INF))
+        assign_results = []
+        for i, num in enumerate(num_gts):
+            # images without gts are assigned as in `_assign`
+            overlaps = max_overlaps[i] if num > 0 else max_overlaps.new_zeros(
+                (num_bboxes, ))
+            assign_results.append(
+                AssignResult(
+                    num,
+                    assigned_gt_inds[i],
+                    overlaps,
+                    labels=assigned_labels[i]))
+        return assign_results
+
+    @staticmethod
+    def _get_cls_cost(pred_scores, gt_labels):
+        """The binary cross entropy between the square roots of the scores
+        and the one-hot labels of the gts, summed over the classes.
+
+        It is computed from the costs of each class, without the pairwise
+        one-hot labels.
+
+        Args:
+            pred_scores (Tensor): Classification scores of shape
+                [..., num_priors, num_classes].
+            gt_labels (Tensor): Ground truth labels of shape [..., num_gts].
+
+        Returns:
+            Tensor: The costs of shape [..., num_priors, num_gts].
+        """
+        scores = pred_scores.sqrt()
+        # the logs are clamped as in F.binary_cross_entropy
+        pos_cost = -torch.clamp(scores.log(), min=-100)
+        neg_cost = -torch.clamp((1 - scores).log(), min=-100)
+        index = gt_labels.to(torch.int64).unsqueeze(-2).expand(
+            *scores.shape[:-1], gt_labels.size(-1))
+        label_cost = pos_cost.gather(-1, index) - neg_cost.gather(-1, index)
+        return neg_cost.sum(-1, keepdim=True) + label_cost
+
+    def _get_in_gt_and_in_center_masks(self, priors, gt_bboxes):
+        """Whether the prior centers are in the gts and in the gt centers.
+
+        Args:
+            priors (Tensor): Priors of shape [num_priors, 4].
+            gt_bboxes (Tensor): Ground truth bboxes of shape
+                [num_imgs, num_gts, 4].
+
+        Returns:
+            tuple[Tensor]: The masks of shape [num_imgs, num_priors,
+                num_gts].
+        """
+        x = priors[:, 0, None]
+        y = priors[:, 1, None]
+        stride_x = priors[:, 2, None]
+        stride_y = priors[:, 3, None]
+        gt_bboxes = gt_bboxes[:, None]
+
+        # is prior centers in gt bboxes
+        l_ = x - gt_bboxes[..., 0]
+        t_ = y - gt_bboxes[..., 1]
+        r_ = gt_bboxes[..., 2] - x
+        b_ = gt_bboxes[..., 3] - y
+        is_in_gts = (l_ > 0) & (t_ > 0) & (r_ > 0) & (b_ > 0)
+
+        # is prior centers in gt centers
+        gt_cxs = (gt_bboxes[..., 0] + gt_bboxes[..., 2]) / 2.0
+        gt_cys = (gt_bboxes[..., 1] + gt_bboxes[..., 3]) / 2.0
+        cl_ = x - (gt_cxs - self.center_radius * stride_x)
+        ct_ = y - (gt_cys - self.center_radius * stride_y)
+        cr_ = (gt_cxs + self.center_radius * stride_x) - x
+        cb_ = (gt_cys + self.center_radius * stride_y) - y
+        is_in_cts = (cl_ > 0) & (ct_ > 0) & (cr_ > 0) & (cb_ > 0)
+        return is_in_gts, is_in_cts
+
     def get_in_gt_and_in_center_info(self, priors, gt_bboxes):
         num_gt = gt_bboxes.size(0)
 
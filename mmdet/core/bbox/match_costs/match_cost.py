@@ -6,6 +6,16 @@ from mmdet.core.bbox.transforms import bbox_cxcywh_to_xyxy, bbox_xyxy_to_cxcywh
 from .builder import MATCH_COST
 
 
+def _gather_labels(cost, gt_labels):
+    """Return ``cost[..., gt_labels]`` of each batch, i.e. the costs of the
+    classes of the gts, of shape [..., num_query, num_gt]."""
+    if gt_labels.dim() == 1:
+        return cost[..., gt_labels]
+    index = gt_labels.unsqueeze(-2).expand(*cost.shape[:-1],
+                                           gt_labels.size(-1))
+    return cost.gather(-1, index)
+
+
 @MATCH_COST.register_module()
 class BBoxL1Cost:
     """BBoxL1Cost.
@@ -35,9 +45,10 @@ class BBoxL1Cost:
         Args:
             bbox_pred (Tensor): Predicted boxes with normalized coordinates
                 (cx, cy, w, h), which are all in range [0, 1]. Shape
-                [num_query, 4].
+                [num_query, 4], or [B, num_query, 4] for a batch.
             gt_bboxes (Tensor): Ground truth boxes with normalized
-                coordinates (x1, y1, x2, y2). Shape [num_gt, 4].
+                coordinates (x1, y1, x2, y2). Shape [num_gt, 4], or
+                [B, num_gt, 4] for a batch.
 
         Returns:
             torch.Tensor: bbox_cost value with weight
@@ -84,8 +95,10 @@ class FocalLossCost:
         """
         Args:
             cls_pred (Tensor): Predicted classification logits, shape
-                [num_query, num_class].
-            gt_labels (Tensor): Label of `gt_bboxes`, shape (num_gt,).
+                [num_query, num_class], or [B, num_query, num_class] for a
+                batch.
+            gt_labels (Tensor): Label of `gt_bboxes`, shape (num_gt,), or
+                (B, num_gt) for a batch.
 
         Returns:
             torch.Tensor: cls_cost value with weight
@@ -95,7 +108,8 @@ class FocalLossCost:
             1 - self.alpha) * cls_pred.pow(self.gamma)
         pos_cost = -(cls_pred + self.eps).log() * self.alpha * (
             1 - cls_pred).pow(self.gamma)
-        cls_cost = pos_cost[:, gt_labels] - neg_cost[:, gt_labels]
+        cls_cost = _gather_labels(pos_cost, gt_labels) - _gather_labels(
+            neg_cost, gt_labels)
         return cls_cost * self.weight
 
 
@@ -128,8 +142,10 @@ class ClassificationCost:
         """
         Args:
             cls_pred (Tensor): Predicted classification logits, shape
-                [num_query, num_class].
-            gt_labels (Tensor): Label of `gt_bboxes`, shape (num_gt,).
+                [num_query, num_class], or [B, num_query, num_class] for a
+                batch.
+            gt_labels (Tensor): Label of `gt_bboxes`, shape (num_gt,), or
+                (B, num_gt) for a batch.
 
         Returns:
             torch.Tensor: cls_cost value with weight
@@ -139,7 +155,7 @@ class ClassificationCost:
         # The 1 is a constant that doesn't change the matching,
         # so it can be omitted.
         cls_score = cls_pred.softmax(-1)
-        cls_cost = -cls_score[:, gt_labels]
+        cls_cost = -_gather_labels(cls_score, gt_labels)
         return cls_cost * self.weight
 
 
@@ -170,9 +186,11 @@ class IoUCost:
         """
         Args:
             bboxes (Tensor): Predicted boxes with unnormalized coordinates
-                (x1, y1, x2, y2). Shape [num_query, 4].
+                (x1, y1, x2, y2). Shape [num_query, 4], or [B, num_query, 4]
+                for a batch.
             gt_bboxes (Tensor): Ground truth boxes with unnormalized
-                coordinates (x1, y1, x2, y2). Shape [num_gt, 4].
+                coordinates (x1, y1, x2, y2). Shape [num_gt, 4], or
+                [B, num_gt, 4] for a batch.
 
         Returns:
             torch.Tensor: iou_cost value with weight
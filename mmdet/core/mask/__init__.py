@@ -1,9 +1,12 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 from .mask_target import mask_target
-from .structures import BaseInstanceMasks, BitmapMasks, PolygonMasks
-from .utils import encode_mask_results, split_combined_polys
+from .structures import (BaseInstanceMasks, BitmapMasks, CroppedBitmapMasks,
+                         PolygonMasks)
+from .utils import (encode_cropped_mask, encode_mask_results,
+                    split_combined_polys)
 
 __all__ = [
     'split_combined_polys', 'mask_target', 'BaseInstanceMasks', 'BitmapMasks',
-    'PolygonMasks', 'encode_mask_results'
+    'PolygonMasks', 'encode_mask_results', 'CroppedBitmapMasks',
+    'encode_cropped_mask'
 ]
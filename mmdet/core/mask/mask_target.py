@@ -1,8 +1,11 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 import numpy as np
 import torch
+from mmcv.ops.roi_align import roi_align
 from torch.nn.modules.utils import _pair
 
+from .structures import BitmapMasks
+
 
 def mask_target(pos_proposals_list, pos_assigned_gt_inds_list, gt_masks_list,
                 cfg):
@@ -20,6 +23,11 @@ def mask_target(pos_proposals_list, pos_assigned_gt_inds_list, gt_masks_list,
     Returns:
         list[Tensor]: Mask target of each image.
 
+    Note:
+        If all GT masks are :obj:`BitmapMasks`, the targets of all images
+        are computed by :func:`bitmap_mask_target` with a single
+        ``roi_align`` on the device of the proposals.
+
     Example:
         >>> import mmcv
         >>> import mmdet
@@ -55,6 +63,11 @@ def mask_target(pos_proposals_list, pos_assigned_gt_inds_list, gt_masks_list,
         >>>     gt_masks_list, cfg)
         >>> assert mask_targets.shape == (5,) + cfg['mask_size']
     """
+    if len(pos_proposals_list) > 0 and all(
+            type(gt_masks) is BitmapMasks for gt_masks in gt_masks_list):
+        return bitmap_mask_target(pos_proposals_list,
+                                  pos_assigned_gt_inds_list, gt_masks_list,
+                                  cfg)
     cfg_list = [cfg for _ in range(len(pos_proposals_list))]
     mask_targets = map(mask_target_single, pos_proposals_list,
                        pos_assigned_gt_inds_list, gt_masks_list, cfg_list)
@@ -125,3 +138,92 @@ def mask_target_single(pos_proposals, pos_assigned_gt_inds, gt_masks, cfg):
         mask_targets = pos_proposals.new_zeros((0, ) + mask_size)
 
     return mask_targets
+
+
+def bitmap_mask_target(pos_proposals_list, pos_assigned_gt_inds_list,
+                       gt_masks_list, cfg):
+    """Compute mask target for positive proposals in a batch of bitmap masks.
+
+    Unlike :func:`mask_target_single`, which uploads all the GT masks of an
+    image and downloads the targets for each image, only the GT masks that
+    are assigned to positive proposals are uploaded, in a single transfer
+    for the whole batch. The targets of all images are computed by one
+    ``roi_align`` and stay on the device. The only host sync is the copy of
+    the assigned GT indices.
+
+    The masks of images of different sizes are padded to the largest size
+    by repeating their last row and column, so the targets are the same as
+    those of :func:`mask_target_single`.
+
+    Args:
+        pos_proposals_list (list[Tensor]): Positive proposals in multiple
+            images.
+        pos_assigned_gt_inds_list (list[Tensor]): Assigned GT indices for each
+            positive proposals.
+        gt_masks_list (list[:obj:`BitmapMasks`]): Ground truth masks of
+            each image.
+        cfg (dict): Config dict that specifies the mask size.
+
+    Returns:
+        Tensor: Mask target of the positive proposals of all images.
+    """
+    device = pos_proposals_list[0].device
+    mask_size = _pair(cfg.mask_size)
+    binarize = not cfg.get('soft_mask_target', False)
+    num_pos = [proposals.size(0) for proposals in pos_proposals_list]
+    if sum(num_pos) == 0:
+        return torch.cat([
+            proposals.new_zeros((0, ) + mask_size)
+            for proposals in pos_proposals_list
+        ])
+
+    all_inds = torch.cat(pos_assigned_gt_inds_list).cpu().numpy()
+    masks_list, mask_inds, bboxes_list = [], [], []
+    num_masks = 0
+    start = 0
+    for proposals, gt_masks, num in zip(pos_proposals_list, gt_masks_list,
+                                        num_pos):
+        inds = all_inds[start:start + num]
+        start += num
+        if num == 0:
+            continue
+        # each referenced mask is uploaded once even if it is assigned to
+        # several proposals
+        uniq_inds, inverse = np.unique(inds, return_inverse=True)
+        masks_list.append(gt_masks.masks[uniq_inds])
+        mask_inds.append(inverse + num_masks)
+        num_masks += len(uniq_inds)
+
+        maxh, maxw = gt_masks.height, gt_masks.width
+        bboxes = proposals.clone()
+        bboxes[:, [0, 2]] = bboxes[:, [0, 2]].clamp(0, maxw)
+        bboxes[:, [1, 3]] = bboxes[:, [1, 3]].clamp(0, maxh)
+        bboxes_list.append(bboxes)
+
+    max_h = max(masks.shape[1] for masks in masks_list)
+    max_w = max(masks.shape[2] for masks in masks_list)
+    if all(masks.shape[1:] == (max_h, max_w) for masks in masks_list):
+        masks = np.concatenate(masks_list)
+    else:
+        masks = np.empty((num_masks, max_h, max_w),
+                         dtype=np.result_type(*masks_list))
+        start = 0
+        for _masks in masks_list:
+            n, h, w = _masks.shape
+            masks[start:start + n, :h, :w] = _masks
+            # roi_align clamps the samples beyond the last row and column
+            # of each mask to them
+            masks[start:start + n, h:, :w] = _masks[:, -1:]
+            masks[start:start + n, :, w:] = masks[start:start + n, :, w - 1:w]
+            start += n
+
+    bboxes = torch.cat(bboxes_list)
+    mask_inds = torch.from_numpy(np.concatenate(mask_inds)).to(
+        device=device, dtype=bboxes.dtype)
+    rois = torch.cat([mask_inds[:, None], bboxes], dim=1)
+    gt_masks_th = torch.from_numpy(masks).to(device).to(dtype=rois.dtype)
+    targets = roi_align(gt_masks_th[:, None], rois, mask_size, 1.0, 0, 'avg',
+                        True).squeeze(1)
+    if binarize:
+        targets = targets >= 0.5
+    return targets.float()
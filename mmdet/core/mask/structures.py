@@ -6,6 +6,7 @@ import mmcv
 import numpy as np
 import pycocotools.mask as maskUtils
 import torch
+from mmcv.image.geometric import cv2_interp_codes
 from mmcv.ops.roi_align import roi_align
 
 
@@ -1069,3 +1070,460 @@ def polygon_to_bitmap(polygons, height, width):
     rle = maskUtils.merge(rles)
     bitmap_mask = maskUtils.decode(rle).astype(np.bool)
     return bitmap_mask
+
+
+def polygon_to_cropped_bitmap(polygons, height, width):
+    """Convert masks from the form of polygons to bitmaps cropped to their
+    bounding boxes.
+
+    Only the box of the polygons is rasterized, so no full-size bitmap is
+    created. The result equals cropping the output of
+    :func:`polygon_to_bitmap`.
+
+    Args:
+        polygons (list[ndarray]): masks in polygon representation
+        height (int): mask height
+        width (int): mask width
+
+    Return:
+        tuple[ndarray]: the cropped bitmap and its integer box in format
+            [x1, y1, x2, y2].
+    """
+    if len(polygons) == 0:
+        return bitmap_to_cropped_bitmap(np.zeros((0, 0), dtype=np.uint8))
+    coords = np.concatenate([np.asarray(p).reshape(-1) for p in polygons])
+    x1 = int(np.clip(np.floor(coords[0::2].min()), 0, width))
+    y1 = int(np.clip(np.floor(coords[1::2].min()), 0, height))
+    x2 = int(np.clip(np.ceil(coords[0::2].max()) + 1, 0, width))
+    y2 = int(np.clip(np.ceil(coords[1::2].max()) + 1, 0, height))
+    if x2 <= x1 or y2 <= y1:
+        return bitmap_to_cropped_bitmap(np.zeros((0, 0), dtype=np.uint8))
+    shifted = []
+    for p in polygons:
+        p = np.array(p, dtype=np.float64).reshape(-1)
+        p[0::2] -= x1
+        p[1::2] -= y1
+        shifted.append(p)
+    rles = maskUtils.frPyObjects(shifted, y2 - y1, x2 - x1)
+    bitmap = maskUtils.decode(maskUtils.merge(rles))
+    return bitmap_to_cropped_bitmap(bitmap, x1, y1)
+
+
+def bitmap_to_cropped_bitmap(mask, x_offset=0, y_offset=0):
+    """Crop a bitmap to the box of its foreground pixels.
+
+    Args:
+        mask (ndarray): The bitmap of shape (h, w).
+        x_offset (int): Offset added to the x coordinates of the box.
+        y_offset (int): Offset added to the y coordinates of the box.
+
+    Returns:
+        tuple[ndarray]: The cropped bitmap and its box in format
+            [x1, y1, x2, y2] shifted by the offsets. Bitmaps without
+            foreground give an empty (0, 0) crop and a zero box.
+    """
+    ys = np.flatnonzero(mask.any(axis=1))
+    xs = np.flatnonzero(mask.any(axis=0))
+    if len(xs) == 0 or len(ys) == 0:
+        empty = np.zeros((0, 0), dtype=mask.dtype)
+        return empty, np.zeros(4, dtype=np.int64)
+    x1, x2, y1, y2 = xs[0], xs[-1] + 1, ys[0], ys[-1] + 1
+    bbox = np.array(
+        [x1 + x_offset, y1 + y_offset, x2 + x_offset, y2 + y_offset],
+        dtype=np.int64)
+    return np.ascontiguousarray(mask[y1:y2, x1:x2]), bbox
+
+
+def _nearest_src_index(src_size, dst_size):
+    """Source pixel of each output pixel of a nearest resize, computed the
+    same way as ``cv2.INTER_NEAREST``."""
+    inv_scale = 1. / (dst_size / src_size)
+    index = np.floor(np.arange(dst_size) * inv_scale).astype(np.int64)
+    return np.minimum(index, src_size - 1)
+
+
+class CroppedBitmapMasks(BaseInstanceMasks):
+    """This class represents masks in the form of bitmaps cropped to the
+    bounding boxes of the instances.
+
+    Different from :obj:`BitmapMasks`, which keeps a full (N, H, W) array,
+    only the pixels inside the box of each instance are stored. Crowded
+    images with many small instances thus need much less memory. All the
+    geometric operations work on the crops directly, and full-size bitmaps
+    are only created by :meth:`to_ndarray` and :meth:`to_tensor`.
+    :meth:`crop_and_resize`, which computes the mask targets, only uploads
+    the crops of the assigned instances.
+
+    The operations give the same results as :obj:`BitmapMasks` except for
+    the interpolating warps (non-nearest resize, translate, shear and
+    rotate), where rounding may differ for a few boundary pixels. The
+    padding and border values of the masks must be 0.
+
+    Args:
+        masks (list[ndarray]): Cropped bitmaps of the instances. The i-th
+            bitmap has the shape (y2 - y1, x2 - x1) of the i-th box.
+        bboxes (ndarray): Integer boxes in format [x1, y1, x2, y2] of the
+            crops in the full masks, shape (N, 4).
+        height (int): height of masks
+        width (int): width of masks
+
+    Example:
+        >>> from mmdet.core.mask.structures import *  # NOQA
+        >>> full = BitmapMasks.random(num_masks=3, height=32, width=32)
+        >>> self = CroppedBitmapMasks.from_bitmaps(full)
+        >>> assert np.all(self.to_ndarray() == full.to_ndarray())
+
+        >>> # demo crop_and_resize
+        >>> num_boxes = 5
+        >>> bboxes = np.array([[0, 0, 30, 10.0]] * num_boxes)
+        >>> out_shape = (14, 14)
+        >>> inds = torch.randint(0, len(self), size=(num_boxes,))
+        >>> new = self.crop_and_resize(bboxes, out_shape, inds, 'cpu')
+        >>> assert len(new) == num_boxes
+    """
+
+    def __init__(self, masks, bboxes, height, width):
+        self.height = height
+        self.width = width
+        assert isinstance(masks, list)
+        bboxes = np.asarray(bboxes, dtype=np.int64).reshape(-1, 4)
+        assert len(masks) == len(bboxes)
+        for mask, bbox in zip(masks, bboxes):
+            assert mask.shape == (bbox[3] - bbox[1], bbox[2] - bbox[0])
+        self.masks = masks
+        self.bboxes = bboxes
+
+    @classmethod
+    def from_bitmaps(cls, masks):
+        """Crop :obj:`BitmapMasks` to the boxes of the instances.
+
+        Args:
+            masks (:obj:`BitmapMasks`): The full-size bitmap masks.
+
+        Returns:
+            :obj:`CroppedBitmapMasks`: The cropped masks.
+        """
+        crops, bboxes = [], []
+        for mask in masks:
+            crop, bbox = bitmap_to_cropped_bitmap(mask)
+            crops.append(crop)
+            bboxes.append(bbox)
+        return cls(crops, bboxes, masks.height, masks.width)
+
+    @classmethod
+    def from_polygons(cls, masks):
+        """Rasterize :obj:`PolygonMasks` within the boxes of the instances.
+
+        Args:
+            masks (:obj:`PolygonMasks`): The polygon masks.
+
+        Returns:
+            :obj:`CroppedBitmapMasks`: The cropped masks.
+        """
+        crops, bboxes = [], []
+        for poly_per_obj in masks:
+            crop, bbox = polygon_to_cropped_bitmap(poly_per_obj, masks.height,
+                                                   masks.width)
+            crops.append(crop)
+            bboxes.append(bbox)
+        return cls(crops, bboxes, masks.height, masks.width)
+
+    def __getitem__(self, index):
+        """Index the cropped masks.
+
+        Args:
+            index (int | ndarray): Indices in the format of integer or ndarray.
+
+        Returns:
+            :obj:`CroppedBitmapMasks`: Indexed cropped masks.
+        """
+        inds = np.arange(len(self))[index].reshape(-1)
+        return CroppedBitmapMasks([self.masks[i] for i in inds],
+                                  self.bboxes[inds], self.height, self.width)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._paste(i)
+
+    def __repr__(self):
+        s = self.__class__.__name__ + '('
+        s += f'num_masks={len(self.masks)}, '
+        s += f'height={self.height}, '
+        s += f'width={self.width})'
+        return s
+
+    def __len__(self):
+        """Number of masks."""
+        return len(self.masks)
+
+    def _paste(self, i):
+        """Paste the i-th crop into a full-size bitmap."""
+        x1, y1, x2, y2 = self.bboxes[i]
+        mask = np.zeros((self.height, self.width), dtype=self.masks[i].dtype)
+        mask[y1:y2, x1:x2] = self.masks[i]
+        return mask
+
+    def rescale(self, scale, interpolation='nearest'):
+        """See :func:`BaseInstanceMasks.rescale`."""
+        new_w, new_h = mmcv.rescale_size((self.width, self.height), scale)
+        return self.resize((new_h, new_w), interpolation=interpolation)
+
+    def resize(self, out_shape, interpolation='nearest'):
+        """See :func:`BaseInstanceMasks.resize`."""
+        out_h, out_w = out_shape
+        if interpolation != 'nearest':
+            # the sampling grid of cv2.resize with half-pixel centers
+            scale_x, scale_y = out_w / self.width, out_h / self.height
+            matrix = np.array([[scale_x, 0, 0.5 * scale_x - 0.5],
+                               [0, scale_y, 0.5 * scale_y - 0.5]],
+                              dtype=np.float64)
+            return self._warp_affine(matrix, out_shape, interpolation)
+
+        src_x = _nearest_src_index(self.width, out_w)
+        src_y = _nearest_src_index(self.height, out_h)
+        resized_masks, resized_bboxes = [], []
+        for mask, (x1, y1, x2, y2) in zip(self.masks, self.bboxes):
+            # src indexes are sorted, so each box maps to a contiguous range
+            new_x1, new_x2 = np.searchsorted(src_x, [x1, x2])
+            new_y1, new_y2 = np.searchsorted(src_y, [y1, y2])
+            resized_masks.append(mask[np.ix_(src_y[new_y1:new_y2] - y1,
+                                             src_x[new_x1:new_x2] - x1)])
+            resized_bboxes.append([new_x1, new_y1, new_x2, new_y2])
+        return CroppedBitmapMasks(resized_masks, resized_bboxes, *out_shape)
+
+    def flip(self, flip_direction='horizontal'):
+        """See :func:`BaseInstanceMasks.flip`."""
+        assert flip_direction in ('horizontal', 'vertical', 'diagonal')
+        flipped_bboxes = self.bboxes.copy()
+        if flip_direction in ('horizontal', 'diagonal'):
+            flipped_bboxes[:, 0] = self.width - self.bboxes[:, 2]
+            flipped_bboxes[:, 2] = self.width - self.bboxes[:, 0]
+        if flip_direction in ('vertical', 'diagonal'):
+            flipped_bboxes[:, 1] = self.height - self.bboxes[:, 3]
+            flipped_bboxes[:, 3] = self.height - self.bboxes[:, 1]
+        flipped_masks = [
+            np.ascontiguousarray(mmcv.imflip(mask, direction=flip_direction))
+            for mask in self.masks
+        ]
+        return CroppedBitmapMasks(flipped_masks, flipped_bboxes, self.height,
+                                  self.width)
+
+    def pad(self, out_shape, pad_val=0):
+        """See :func:`BaseInstanceMasks.pad`."""
+        assert pad_val == 0, 'CroppedBitmapMasks only supports padding ' \
+            f'with 0, got {pad_val}.'
+        assert out_shape[0] >= self.height and out_shape[1] >= self.width
+        return CroppedBitmapMasks(self.masks, self.bboxes, *out_shape)
+
+    def crop(self, bbox):
+        """See :func:`BaseInstanceMasks.crop`."""
+        assert isinstance(bbox, np.ndarray)
+        assert bbox.ndim == 1
+
+        # clip the boundary
+        bbox = bbox.copy()
+        bbox[0::2] = np.clip(bbox[0::2], 0, self.width)
+        bbox[1::2] = np.clip(bbox[1::2], 0, self.height)
+        x1, y1, x2, y2 = bbox.astype(np.int64)
+        w = np.maximum(x2 - x1, 1)
+        h = np.maximum(y2 - y1, 1)
+
+        cropped_masks, cropped_bboxes = [], []
+        for mask, (bx1, by1, bx2, by2) in zip(self.masks, self.bboxes):
+            ix1, iy1 = max(bx1, x1), max(by1, y1)
+            ix2, iy2 = min(bx2, x1 + w), min(by2, y1 + h)
+            if ix2 <= ix1 or iy2 <= iy1:
+                cropped_masks.append(np.zeros((0, 0), dtype=mask.dtype))
+                cropped_bboxes.append([0, 0, 0, 0])
+                continue
+            cropped_masks.append(mask[iy1 - by1:iy2 - by1,
+                                      ix1 - bx1:ix2 - bx1].copy())
+            cropped_bboxes.append([ix1 - x1, iy1 - y1, ix2 - x1, iy2 - y1])
+        return CroppedBitmapMasks(cropped_masks, cropped_bboxes, h, w)
+
+    def crop_and_resize(self,
+                        bboxes,
+                        out_shape,
+                        inds,
+                        device='cpu',
+                        interpolation='bilinear',
+                        binarize=True):
+        """See :func:`BaseInstanceMasks.crop_and_resize`.
+
+        The crops of the assigned instances are stacked into one batch with
+        the rois shifted into the crop coordinates. Every crop keeps one
+        extra row/column on each side to reproduce the zero background and
+        the border clamping of ``roi_align`` on the full masks.
+        """
+        if len(self.masks) == 0:
+            empty_masks = np.empty((0, *out_shape), dtype=np.uint8)
+            return BitmapMasks(empty_masks, *out_shape)
+
+        # convert bboxes to tensor
+        if isinstance(bboxes, np.ndarray):
+            bboxes = torch.from_numpy(bboxes).to(device=device)
+        if isinstance(inds, torch.Tensor):
+            inds = inds.cpu().numpy()
+        inds = np.asarray(inds, dtype=np.int64)
+
+        num_bbox = bboxes.shape[0]
+        if num_bbox == 0:
+            return BitmapMasks([], *out_shape)
+
+        unique_inds, batch_inds = np.unique(inds, return_inverse=True)
+        canvas_h, canvas_w = 1, 1
+        layouts = []
+        for i in unique_inds:
+            x1, y1, x2, y2 = self.bboxes[i]
+            # a zero row/column in front unless the crop touches the border
+            left, top = int(x1 > 0), int(y1 > 0)
+            layouts.append((left, top))
+            canvas_h = max(canvas_h, top + y2 - y1 + 1)
+            canvas_w = max(canvas_w, left + x2 - x1 + 1)
+        canvas = np.zeros((len(unique_inds), canvas_h, canvas_w),
+                          dtype=np.float32)
+        shifts = np.zeros((len(unique_inds), 2), dtype=np.float32)
+        for k, (i, (left, top)) in enumerate(zip(unique_inds, layouts)):
+            x1, y1, x2, y2 = self.bboxes[i]
+            h, w = y2 - y1, x2 - x1
+            canvas[k, top:top + h, left:left + w] = self.masks[i]
+            # roi_align clamps at the border of the full masks
+            if h > 0 and w > 0:
+                if y2 == self.height:
+                    canvas[k, top + h, left:left + w] = self.masks[i][-1]
+                if x2 == self.width:
+                    canvas[k, top:top + h + 1, left + w] = \
+                        canvas[k, top:top + h + 1, left + w - 1]
+            shifts[k] = (x1 - left, y1 - top)
+
+        shifts = torch.from_numpy(shifts).to(device=device)[batch_inds]
+        shifts = shifts.to(dtype=bboxes.dtype).repeat(1, 2)
+        fake_inds = torch.from_numpy(batch_inds).to(
+            device=device, dtype=bboxes.dtype)[:, None]
+        rois = torch.cat([fake_inds, bboxes - shifts], dim=1)  # Nx5
+        canvas = torch.from_numpy(canvas).to(device=device, dtype=rois.dtype)
+        targets = roi_align(canvas[:, None, :, :], rois, out_shape, 1.0, 0,
+                            'avg', True).squeeze(1)
+        if binarize:
+            resized_masks = (targets >= 0.5).cpu().numpy()
+        else:
+            resized_masks = targets.cpu().numpy()
+        return BitmapMasks(resized_masks, *out_shape)
+
+    def expand(self, expanded_h, expanded_w, top, left):
+        """See :func:`BaseInstanceMasks.expand`."""
+        expanded_bboxes = self.bboxes + np.array([left, top, left, top])
+        return CroppedBitmapMasks(self.masks, expanded_bboxes, expanded_h,
+                                  expanded_w)
+
+    def _warp_affine(self, matrix, out_shape, interpolation='bilinear'):
+        """Warp each crop with an affine matrix of the full masks.
+
+        Args:
+            matrix (ndarray): The 2x3 matrix mapping the input coordinates
+                to the output coordinates, as used by ``cv2.warpAffine``.
+            out_shape (tuple[int]): Shape for output mask, format (h, w).
+            interpolation (str): Interpolation method, see
+                :func:`mmcv.imresize`.
+
+        Returns:
+            :obj:`CroppedBitmapMasks`: The warped masks.
+        """
+        out_h, out_w = out_shape
+        warped_masks, warped_bboxes = [], []
+        for mask, (x1, y1, x2, y2) in zip(self.masks, self.bboxes):
+            corners = np.array([[x1, y1], [x2, y1], [x1, y2], [x2, y2]],
+                               dtype=np.float64)
+            corners = corners @ matrix[:, :2].T + matrix[:, 2]
+            # one pixel of margin for the interpolation
+            new_x1, new_y1 = np.floor(corners.min(axis=0)).astype(int) - 1
+            new_x2, new_y2 = np.ceil(corners.max(axis=0)).astype(int) + 2
+            new_x1, new_x2 = np.clip([new_x1, new_x2], 0, out_w)
+            new_y1, new_y2 = np.clip([new_y1, new_y2], 0, out_h)
+            if mask.size == 0 or new_x2 <= new_x1 or new_y2 <= new_y1:
+                warped_masks.append(np.zeros((0, 0), dtype=mask.dtype))
+                warped_bboxes.append(np.zeros(4, dtype=np.int64))
+                continue
+            # move the origins of input and output to the crops
+            local_matrix = matrix.copy()
+            local_matrix[:, 2] += matrix[:, :2] @ [x1, y1] - [new_x1, new_y1]
+            warped = cv2.warpAffine(
+                np.ascontiguousarray(mask),
+                local_matrix, (int(new_x2 - new_x1), int(new_y2 - new_y1)),
+                flags=cv2_interp_codes[interpolation],
+                borderValue=0)
+            warped, bbox = bitmap_to_cropped_bitmap(warped, new_x1, new_y1)
+            warped_masks.append(warped)
+            warped_bboxes.append(bbox)
+        return CroppedBitmapMasks(warped_masks, warped_bboxes, *out_shape)
+
+    def translate(self,
+                  out_shape,
+                  offset,
+                  direction='horizontal',
+                  fill_val=0,
+                  interpolation='bilinear'):
+        """See :func:`BitmapMasks.translate`."""
+        assert fill_val == 0, 'CroppedBitmapMasks only supports fill_val ' \
+            f'0, got {fill_val}.'
+        if direction == 'horizontal':
+            matrix = np.array([[1, 0, offset], [0, 1, 0]], dtype=np.float64)
+        elif direction == 'vertical':
+            matrix = np.array([[1, 0, 0], [0, 1, offset]], dtype=np.float64)
+        return self._warp_affine(matrix, out_shape, interpolation)
+
+    def shear(self,
+              out_shape,
+              magnitude,
+              direction='horizontal',
+              border_value=0,
+              interpolation='bilinear'):
+        """See :func:`BitmapMasks.shear`."""
+        assert border_value == 0, 'CroppedBitmapMasks only supports ' \
+            f'border_value 0, got {border_value}.'
+        if direction == 'horizontal':
+            matrix = np.array([[1, magnitude, 0], [0, 1, 0]], dtype=np.float64)
+        elif direction == 'vertical':
+            matrix = np.array([[1, 0, 0], [magnitude, 1, 0]], dtype=np.float64)
+        return self._warp_affine(matrix, out_shape, interpolation)
+
+    def rotate(self, out_shape, angle, center=None, scale=1.0, fill_val=0):
+        """See :func:`BitmapMasks.rotate`."""
+        assert fill_val == 0, 'CroppedBitmapMasks only supports fill_val ' \
+            f'0, got {fill_val}.'
+        if center is None:
+            center = ((self.width - 1) * 0.5, (self.height - 1) * 0.5)
+        matrix = cv2.getRotationMatrix2D(center, -angle, scale)
+        return self._warp_affine(matrix, out_shape)
+
+    @property
+    def areas(self):
+        """See :py:attr:`BaseInstanceMasks.areas`."""
+        return np.array([mask.sum() for mask in self.masks], dtype=np.int64)
+
+    def to_ndarray(self):
+        """See :func:`BaseInstanceMasks.to_ndarray`."""
+        dtype = self.masks[0].dtype if len(self.masks) else np.uint8
+        ndarray_masks = np.zeros((len(self), self.height, self.width),
+                                 dtype=dtype)
+        for i, (mask, bbox) in enumerate(zip(self.masks, self.bboxes)):
+            x1, y1, x2, y2 = bbox
+            ndarray_masks[i, y1:y2, x1:x2] = mask
+        return ndarray_masks
+
+    def to_tensor(self, dtype, device):
+        """See :func:`BaseInstanceMasks.to_tensor`."""
+        return torch.tensor(self.to_ndarray(), dtype=dtype, device=device)
+
+    def to_bitmap(self):
+        """Convert the cropped masks to full-size bitmap masks."""
+        return BitmapMasks(self.to_ndarray(), self.height, self.width)
+
+    def get_bboxes(self):
+        num_masks = len(self)
+        boxes = np.zeros((num_masks, 4), dtype=np.float32)
+        for idx, (mask, bbox) in enumerate(zip(self.masks, self.bboxes)):
+            _, tight_bbox = bitmap_to_cropped_bitmap(mask, bbox[0], bbox[1])
+            if mask.any():
+                boxes[idx, :] = tight_bbox
+        return boxes
@@ -33,10 +33,56 @@ def split_combined_polys(polys, poly_lens, polys_per_mask):
     return mask_polys_list
 
 
+def encode_cropped_mask(mask, bbox, height, width):
+    """Encode a mask cropped to a box to the RLE code of the full mask.
+
+    The result is the same as encoding the full ``(height, width)`` mask with
+    ``pycocotools.mask.encode``, but the full mask is never created.
+
+    Args:
+        mask (ndarray): The binary mask inside the box, shape (y2 - y1,
+            x2 - x1).
+        bbox (Sequence[int]): The box [x1, y1, x2, y2] of the crop in the
+            full mask.
+        height (int): Height of the full mask.
+        width (int): Width of the full mask.
+
+    Returns:
+        dict: RLE encoded mask.
+
+    Example:
+        >>> full = np.zeros((4, 5), dtype=np.uint8)
+        >>> full[1:3, 2:4] = 1
+        >>> rle = encode_cropped_mask(full[1:3, 2:4], [2, 1, 4, 3], 4, 5)
+        >>> assert rle == mask_util.encode(np.asfortranarray(full))
+    """
+    x1, y1, x2, y2 = map(int, bbox)
+    mask_h, mask_w = mask.shape
+    # RLE runs go through the columns, so find the changes of each column
+    # of the crop padded with a zero at both ends
+    padded = np.zeros((mask_w, mask_h + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask.T != 0
+    cols, rows = np.nonzero(np.diff(padded, axis=1))
+    changes = (cols + x1) * height + rows + y1
+    if y1 == 0 and y2 == height and len(changes) > 0:
+        # a run that goes on in the next column ends and starts at the
+        # same index
+        changes, counts = np.unique(changes, return_counts=True)
+        changes = changes[counts == 1]
+    counts = np.diff(np.concatenate([[0], changes, [height * width]]))
+    if len(changes) > 0 and changes[-1] == height * width:
+        counts = counts[:-1]
+    return mask_util.frPyObjects(
+        dict(counts=counts.tolist(), size=[height, width]), height, width)
+
+
 # TODO: move this function to more proper place
 def encode_mask_results(mask_results):
     """Encode bitmap mask to RLE code.
 
+    Masks that are already RLE encoded, e.g. by
+    :meth:`FCNMaskHead.get_seg_masks` with ``encode_masks=True``, are kept.
+
     Args:
         mask_results (list | tuple[list]): bitmap mask results.
             In mask scoring rcnn, mask_results is a tuple of (segm_results,
@@ -53,6 +99,9 @@ def encode_mask_results(mask_results):
     encoded_mask_results = [[] for _ in range(num_classes)]
     for i in range(len(cls_segms)):
         for cls_segm in cls_segms[i]:
+            if isinstance(cls_segm, dict):
+                encoded_mask_results[i].append(cls_segm)
+                continue
             encoded_mask_results[i].append(
                 mask_util.encode(
                     np.array(
@@ -95,6 +95,193 @@ def multiclass_nms(multi_bboxes,
         return dets, labels[keep]
 
 
+def _rank_in_groups(groups, scores):
+    """Rank the scores in descending order within each group."""
+    num = scores.numel()
+    arange = torch.arange(num, device=scores.device)
+    score_ranks = torch.empty_like(arange)
+    score_ranks[scores.argsort(descending=True)] = arange
+    # the keys are unique, so the sorting needs not be stable
+    sorted_keys, order = (groups * num + score_ranks).sort()
+    sorted_groups = sorted_keys // num
+    is_first = torch.ones_like(sorted_groups, dtype=torch.bool)
+    is_first[1:] = sorted_groups[1:] != sorted_groups[:-1]
+    group_starts = torch.where(is_first, arange,
+                               torch.zeros_like(arange)).cummax(0)[0]
+    ranks = torch.empty_like(arange)
+    ranks[order] = arange - group_starts
+    return ranks
+
+
+def _grouped_nms(bboxes, scores, groups, nms_cfg):
+    """NMS within the groups of boxes of several images.
+
+    Different from :func:`batched_nms`, which offsets the boxes of the i-th
+    group by ``i`` times the maximum coordinate, the groups are tiled in
+    two dimensions, so the offsets, and the rounding errors of the IoUs,
+    grow with the square root of the number of groups.
+    """
+    nms_cfg = nms_cfg.copy()
+    nms_cfg.pop('class_agnostic', None)
+    nms_cfg['split_thr'] = len(bboxes) + 1
+    span = bboxes.max() - bboxes.min() + 1
+    groups = groups.unique(return_inverse=True)[1]
+    num_cols = int(groups.max().item()**0.5) + 1
+    offsets = torch.stack([groups % num_cols, groups // num_cols], dim=1)
+    offsets = offsets.to(bboxes) * span
+    dets, keep = batched_nms(
+        bboxes + offsets.repeat(1, 2),
+        scores,
+        groups,
+        nms_cfg,
+        class_agnostic=True)
+    return torch.cat([bboxes[keep], dets[:, -1:]], dim=1), keep
+
+
+def batched_multiclass_nms(multi_bboxes,
+                           multi_scores,
+                           score_thr,
+                           nms_cfg,
+                           max_num=-1,
+                           score_factors=None,
+                           return_inds=False,
+                           topk=-1,
+                           max_per_class=-1):
+    """NMS for the multi-class bboxes of a batch of images.
+
+    The results are the same as applying :func:`multiclass_nms` to each
+    image, but only the boxes of the scores above ``score_thr`` are gathered
+    instead of expanding all the boxes to all the classes, and the NMS of
+    the images is done together. The boxes of each image and class are
+    separated by offsets, which may change the rounding of IoUs that are
+    equal to the threshold. On GPU, the images are put into groups with less
+    than ``nms_cfg.split_thr`` boxes, and an image with more boxes is
+    processed alone by :func:`batched_nms`. On CPU, each image is processed
+    alone, as the cost of NMS grows quadratically with the number of boxes.
+
+    Args:
+        multi_bboxes (list[Tensor] | Tensor): The boxes of each image,
+            shape (n, #class*4) or (n, 4).
+        multi_scores (list[Tensor] | Tensor): The scores of each image,
+            shape (n, #class), where the last column contains scores of the
+            background class, but this will be ignored.
+        score_thr (float): bbox threshold, bboxes with scores lower than it
+            will not be considered.
+        nms_cfg (dict): The config of :func:`batched_nms`.
+        max_num (int, optional): if there are more than max_num bboxes of an
+            image after NMS, only top max_num will be kept. Default to -1.
+        score_factors (list[Tensor] | Tensor, optional): The factors of
+            each image multiplied to scores before applying NMS, shape (n, ).
+            Default to None.
+        return_inds (bool, optional): Whether return the indices of kept
+            bboxes. Default to False.
+        topk (int, optional): If positive, only the top ``topk`` bboxes
+            above ``score_thr`` of each image are kept before NMS. Default
+            to -1.
+        max_per_class (int, optional): If positive, only the top
+            ``max_per_class`` bboxes above ``score_thr`` of each class of an
+            image are kept before NMS. Default to -1.
+
+    Returns:
+        list[tuple]: (dets, labels, indices (optional)) of each image, as
+            returned by :func:`multiclass_nms`.
+    """
+    num_imgs = len(multi_scores)
+    num_classes = multi_scores[0].size(1) - 1
+    num_rows = [len(scores) for scores in multi_scores]
+    row_offsets = [sum(num_rows[:i]) for i in range(num_imgs)]
+    scores = torch.cat(list(multi_scores))[:, :-1]
+    bboxes = torch.cat(list(multi_bboxes))
+    img_ids = torch.cat([
+        scores.new_full((num, ), i, dtype=torch.long)
+        for i, num in enumerate(num_rows)
+    ])
+
+    # remove low scoring boxes before gathering the boxes of the classes
+    rows, labels = (scores > score_thr).nonzero(as_tuple=True)
+    scores = scores[rows, labels]
+    # multiply score_factor after threshold to preserve more bboxes
+    if score_factors is not None:
+        score_factors = torch.cat([f.reshape(-1) for f in score_factors])
+        scores = scores * score_factors[rows]
+    img_ids = img_ids[rows]
+    groups = img_ids * num_classes + labels
+    if max_per_class > 0 and rows.numel() > 0:
+        valid = _rank_in_groups(groups, scores) < max_per_class
+        rows, labels, scores = rows[valid], labels[valid], scores[valid]
+        img_ids, groups = img_ids[valid], groups[valid]
+    if topk > 0 and rows.numel() > 0:
+        valid = _rank_in_groups(img_ids, scores) < topk
+        rows, labels, scores = rows[valid], labels[valid], scores[valid]
+        img_ids, groups = img_ids[valid], groups[valid]
+    if bboxes.size(1) > 4:
+        bboxes = bboxes.view(bboxes.size(0), -1, 4)[rows, labels]
+    else:
+        bboxes = bboxes[rows]
+
+    nms_cfg = nms_cfg.copy()
+    nms_max_num = nms_cfg.pop('max_num', -1)
+    split_thr = nms_cfg.get('split_thr', 10000)
+    if nms_cfg.get('class_agnostic', False):
+        groups = img_ids
+
+    # the candidates of an image are contiguous, so are those of a chunk of
+    # images. The NMS on CPU compares all pairs of boxes of a chunk, so each
+    # image is a chunk there.
+    num_cands = torch.bincount(img_ids, minlength=num_imgs).tolist()
+    if not bboxes.is_cuda:
+        split_thr = 0
+    chunks, chunk, chunk_size = [], [], 0
+    for i, num in enumerate(num_cands):
+        if chunk and chunk_size + num >= split_thr:
+            chunks.append(chunk)
+            chunk, chunk_size = [], 0
+        chunk.append(i)
+        chunk_size += num
+    chunks.append(chunk)
+
+    dets_list, keep_list = [], []
+    for chunk in chunks:
+        start = sum(num_cands[:chunk[0]])
+        end = start + sum(num_cands[i] for i in chunk)
+        if end == start:
+            continue
+        if len(chunk) == 1:
+            # the same as multiclass_nms
+            dets, keep = batched_nms(bboxes[start:end], scores[start:end],
+                                     labels[start:end], nms_cfg)
+        else:
+            dets, keep = _grouped_nms(bboxes[start:end], scores[start:end],
+                                      groups[start:end], nms_cfg)
+        dets_list.append(dets)
+        keep_list.append(keep + start)
+    if keep_list:
+        dets = torch.cat(dets_list)
+        keep = torch.cat(keep_list)
+    else:
+        dets = bboxes.new_zeros((0, 5))
+        keep = rows.new_zeros((0, ))
+
+    max_nums = [num for num in (max_num, nms_max_num) if num > 0]
+    kept_img_ids = img_ids[keep]
+    results = []
+    for i in range(num_imgs):
+        # the dets of an image are sorted by their scores
+        img_keep = (kept_img_ids == i).nonzero(as_tuple=False).view(-1)
+        if max_nums:
+            img_keep = img_keep[:min(max_nums)]
+        img_dets = dets[img_keep]
+        img_cands = keep[img_keep]
+        img_labels = labels[img_cands]
+        if return_inds:
+            inds = (rows[img_cands] -
+                    row_offsets[i]) * num_classes + img_labels
+            results.append((img_dets, img_labels, inds))
+        else:
+            results.append((img_dets, img_labels))
+    return results
+
+
 def fast_nms(multi_bboxes,
              multi_scores,
              multi_coeffs,
@@ -5,7 +5,7 @@ import numpy as np
 import torch
 from six.moves import map, zip
 
-from ..mask.structures import BitmapMasks, PolygonMasks
+from ..mask.structures import BaseInstanceMasks
 
 
 def multi_apply(func, *args, **kwargs):
@@ -47,13 +47,13 @@ def mask2ndarray(mask):
     """Convert Mask to ndarray..
 
     Args:
-        mask (:obj:`BitmapMasks` or :obj:`PolygonMasks` or
-        torch.Tensor or np.ndarray): The mask to be converted.
+        mask (:obj:`BaseInstanceMasks` or torch.Tensor or np.ndarray): The
+            mask to be converted.
 
     Returns:
         np.ndarray: Ndarray mask of shape (n, h, w) that has been converted
     """
-    if isinstance(mask, (BitmapMasks, PolygonMasks)):
+    if isinstance(mask, BaseInstanceMasks):
         mask = mask.to_ndarray()
     elif isinstance(mask, torch.Tensor):
         mask = mask.detach().cpu().numpy()
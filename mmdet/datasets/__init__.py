@@ -8,8 +8,13 @@ from .dataset_wrappers import (ClassBalancedDataset, ConcatDataset,
                                MultiImageMixDataset, RepeatDataset)
 from .deepfashion import DeepFashionDataset
 from .lvis import LVISDataset, LVISV1Dataset, LVISV05Dataset
-from .samplers import DistributedGroupSampler, DistributedSampler, GroupSampler
-from .utils import (NumClassCheckHook, get_loading_pipeline,
+from .prefetcher import DataPrefetcher
+from .samplers import (AspectRatioBucketSampler, DistributedGroupSampler,
+                       DistributedSampler, GroupSampler)
+from .utils import (DataWaitTimeHook, ImageCacheHook, NumClassCheckHook,
+                    PipelineProfileHook, enable_pipeline_cache,
+                    enable_pipeline_profiling, get_loading_pipeline,
+                    get_pipeline_profilers, get_pipeline_transforms,
                     replace_ImageToTensor)
 from .voc import VOCDataset
 from .wider_face import WIDERFaceDataset
@@ -22,5 +27,9 @@ __all__ = [
     'DistributedSampler', 'build_dataloader', 'ConcatDataset', 'RepeatDataset',
     'ClassBalancedDataset', 'WIDERFaceDataset', 'DATASETS', 'PIPELINES',
     'build_dataset', 'replace_ImageToTensor', 'get_loading_pipeline',
-    'NumClassCheckHook', 'CocoPanopticDataset', 'MultiImageMixDataset'
+    'NumClassCheckHook', 'CocoPanopticDataset', 'MultiImageMixDataset',
+    'ImageCacheHook', 'get_pipeline_transforms', 'DataPrefetcher',
+    'DataWaitTimeHook', 'AspectRatioBucketSampler', 'PipelineProfileHook',
+    'enable_pipeline_profiling', 'get_pipeline_profilers',
+    'enable_pipeline_cache'
 ]
@@ -2,15 +2,19 @@
 import copy
 import platform
 import random
+import warnings
 from functools import partial
 
 import numpy as np
+import torch
 from mmcv.parallel import collate
 from mmcv.runner import get_dist_info
-from mmcv.utils import Registry, build_from_cfg
+from mmcv.utils import TORCH_VERSION, Registry, build_from_cfg, digit_version
 from torch.utils.data import DataLoader
 
-from .samplers import DistributedGroupSampler, DistributedSampler, GroupSampler
+from .prefetcher import DataPrefetcher
+from .samplers import (AspectRatioBucketSampler, DistributedGroupSampler,
+                       DistributedSampler, GroupSampler)
 
 if platform.system() != 'Windows':
     # https://github.com/pytorch/pytorch/issues/973
@@ -87,6 +91,13 @@ def build_dataloader(dataset,
                      dist=True,
                      shuffle=True,
                      seed=None,
+                     persistent_workers=False,
+                     pin_memory=False,
+                     prefetch_factor=2,
+                     device_prefetch=False,
+                     num_prefetch=1,
+                     bucket_cfg=None,
+                     profile_pipeline=False,
                      **kwargs):
     """Build PyTorch DataLoader.
 
@@ -103,16 +114,51 @@ def build_dataloader(dataset,
         dist (bool): Distributed training/test or not. Default: True.
         shuffle (bool): Whether to shuffle the data at every epoch.
             Default: True.
+        persistent_workers (bool): If True, the worker processes are kept
+            alive between epochs instead of being restarted. Only works with
+            PyTorch>=1.7.0 and ``workers_per_gpu > 0``. Default: False.
+        pin_memory (bool): Whether to copy the collated batches to pinned
+            memory, which makes the host to device copies asynchronous.
+            Default: False.
+        prefetch_factor (int): Number of batches loaded in advance by each
+            worker. Only works with PyTorch>=1.7.0 and ``workers_per_gpu > 0``.
+            Default: 2.
+        device_prefetch (bool): Whether to copy the next batch to the current
+            GPU while the current iteration runs, see
+            :class:`DataPrefetcher`. It requires one GPU per process and
+            implies ``pin_memory``. Default: False.
+        num_prefetch (int): Number of batches the :class:`DataPrefetcher`
+            loads ahead if ``pin_memory`` or ``device_prefetch`` is set.
+            Default: 1.
+        bucket_cfg (dict, optional): Arguments of
+            :class:`AspectRatioBucketSampler`, e.g.
+            ``dict(num_ratio_buckets=8, img_scale=(1333, 800))``. If given,
+            it replaces the group samplers when ``shuffle=True``.
+            Default: None.
+        profile_pipeline (bool): Whether to profile the transforms of the
+            pipelines of the dataset in all workers, see
+            :func:`enable_pipeline_profiling`. Default: False.
         kwargs: any keyword argument to be used to initialize DataLoader
 
     Returns:
-        DataLoader: A PyTorch dataloader.
+        DataLoader | DataPrefetcher: A PyTorch dataloader, wrapped by a
+            :class:`DataPrefetcher` if ``pin_memory`` or ``device_prefetch``
+            is set. Without CUDA both options only prefetch in a background
+            thread.
     """
     rank, world_size = get_dist_info()
     if dist:
         # DistributedGroupSampler will definitely shuffle the data to satisfy
         # that images on each GPU are in the same group
-        if shuffle:
+        if shuffle and bucket_cfg is not None:
+            sampler = AspectRatioBucketSampler(
+                dataset,
+                samples_per_gpu,
+                world_size,
+                rank,
+                seed=seed,
+                **bucket_cfg)
+        elif shuffle:
             sampler = DistributedGroupSampler(
                 dataset, samples_per_gpu, world_size, rank, seed=seed)
         else:
@@ -121,7 +167,18 @@ def build_dataloader(dataset,
         batch_size = samples_per_gpu
         num_workers = workers_per_gpu
     else:
-        sampler = GroupSampler(dataset, samples_per_gpu) if shuffle else None
+        if shuffle and bucket_cfg is not None:
+            sampler = AspectRatioBucketSampler(
+                dataset,
+                num_gpus * samples_per_gpu,
+                num_replicas=1,
+                rank=0,
+                seed=seed,
+                **bucket_cfg)
+        elif shuffle:
+            sampler = GroupSampler(dataset, samples_per_gpu)
+        else:
+            sampler = None
         batch_size = num_gpus * samples_per_gpu
         num_workers = num_gpus * workers_per_gpu
 
@@ -129,6 +186,21 @@ def build_dataloader(dataset,
         worker_init_fn, num_workers=num_workers, rank=rank,
         seed=seed) if seed is not None else None
 
+    if (TORCH_VERSION != 'parrots'
+            and digit_version(TORCH_VERSION) >= digit_version('1.7.0')):
+        if num_workers > 0:
+            kwargs['persistent_workers'] = persistent_workers
+            kwargs['prefetch_factor'] = prefetch_factor
+    elif persistent_workers is True:
+        warnings.warn('persistent_workers is invalid because your pytorch '
+                      'version is lower than 1.7.0')
+
+    if profile_pipeline:
+        from .utils import enable_pipeline_profiling
+        enable_pipeline_profiling(dataset)
+
+    # The pinning of the DataLoader skips the tensors in DataContainer, so
+    # it is done by the DataPrefetcher instead.
     data_loader = DataLoader(
         dataset,
         batch_size=batch_size,
@@ -139,6 +211,20 @@ def build_dataloader(dataset,
         worker_init_fn=init_fn,
         **kwargs)
 
+    if device_prefetch and not dist and num_gpus > 1:
+        warnings.warn('device_prefetch only supports one GPU per process, '
+                      'the batches are only pinned for DataParallel.')
+        device_prefetch = False
+    if pin_memory or device_prefetch:
+        device = None
+        if device_prefetch and torch.cuda.is_available():
+            device = torch.cuda.current_device()
+        data_loader = DataPrefetcher(
+            data_loader,
+            pin_memory=True,
+            device=device,
+            num_prefetch=num_prefetch)
+
     return data_loader
 
 
@@ -50,6 +50,10 @@ class CustomDataset(Dataset):
             boxes of the dataset's classes will be filtered out. This option
             only works when `test_mode=False`, i.e., we never filter images
             during tests.
+        pipeline_cfg (dict, optional): Other arguments of the
+            :obj:`Compose` of ``pipeline``, e.g. ``dict(fuse_geometric=True)``
+            to apply the consecutive geometric transforms with a single warp.
+            Default: None.
     """
 
     CLASSES = None
@@ -63,7 +67,8 @@ class CustomDataset(Dataset):
                  seg_prefix=None,
                  proposal_file=None,
                  test_mode=False,
-                 filter_empty_gt=True):
+                 filter_empty_gt=True,
+                 pipeline_cfg=None):
         self.ann_file = ann_file
         self.data_root = data_root
         self.img_prefix = img_prefix
@@ -103,7 +108,9 @@ class CustomDataset(Dataset):
             self._set_group_flag()
 
         # processing pipeline
-        self.pipeline = Compose(pipeline)
+        if pipeline_cfg is None:
+            pipeline_cfg = dict()
+        self.pipeline = Compose(pipeline, **pipeline_cfg)
 
     def __len__(self):
         """Total number of samples of data."""
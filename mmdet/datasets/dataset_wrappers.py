@@ -3,6 +3,7 @@ import bisect
 import collections
 import copy
 import math
+import time
 from collections import defaultdict
 
 import numpy as np
@@ -11,6 +12,7 @@ from torch.utils.data.dataset import ConcatDataset as _ConcatDataset
 
 from .builder import DATASETS, PIPELINES
 from .coco import CocoDataset
+from .pipelines.profiler import PipelineProfiler, img_nbytes
 
 
 @DATASETS.register_module()
@@ -285,6 +287,44 @@ class ClassBalancedDataset:
         return len(self.repeat_indices)
 
 
+class _SampleCache:
+    """The recently loaded samples of :class:`MultiImageMixDataset`.
+
+    It has the interface of a dataset used by ``get_indexes`` of the mixing
+    transforms.
+
+    Args:
+        max_size (int): Maximum number of samples.
+        random_pop (bool): Whether to remove a random sample instead of the
+            oldest one when the cache is full.
+    """
+
+    def __init__(self, max_size, random_pop=True):
+        self.max_size = max_size
+        self.random_pop = random_pop
+        self.samples = []
+
+    def __len__(self):
+        return len(self.samples)
+
+    def __getitem__(self, idx):
+        return self.samples[idx]
+
+    @property
+    def is_full(self):
+        return len(self.samples) >= self.max_size
+
+    def get_ann_info(self, idx):
+        sample = self.samples[idx]
+        return dict(bboxes=sample['gt_bboxes'], labels=sample['gt_labels'])
+
+    def append(self, sample):
+        if self.is_full:
+            index = np.random.randint(len(self)) if self.random_pop else 0
+            self.samples.pop(index)
+        self.samples.append(sample)
+
+
 @DATASETS.register_module()
 class MultiImageMixDataset:
     """A wrapper of multiple images mixed dataset.
@@ -296,6 +336,15 @@ class MultiImageMixDataset:
     process. At the same time, we provide the `dynamic_scale` parameter
     to dynamically change the output image size.
 
+    If ``max_cached_samples`` is positive, the recently loaded samples are
+    kept in a cache, like in YOLOX. Once the cache is full, the transforms
+    with ``get_indexes`` draw the indexes of their mix partners from the
+    cache instead of the dataset, so the partners are neither loaded nor
+    deep-copied. Such transforms must not modify ``mix_results`` in place.
+    Every sample loaded by :meth:`__getitem__` is added to the cache and
+    replaces a random (or the oldest) cached sample if the cache is full.
+    With several dataloader workers, every worker has its own cache.
+
     Args:
         dataset (:obj:`CustomDataset`): The dataset to be mixed.
         pipeline (Sequence[dict]): Sequence of transform object or
@@ -304,13 +353,25 @@ class MultiImageMixDataset:
             dynamically. Default to None.
         skip_type_keys (list[str], optional): Sequence of type string to
             be skip pipeline. Default to None.
+        max_cached_samples (int): Size of the cache of samples. Default to
+            0, i.e. no cache.
+        random_pop (bool): Whether to replace a random cached sample instead
+            of the oldest one when the cache is full. Default to True.
+        cache_img_scale (tuple[int], optional): If given, the cached samples
+            are resized to this scale with ``keep_ratio=True``, which bounds
+            the memory of the cache. It should be the ``img_scale`` of the
+            mixing transforms, which resize their partners in the same way.
+            Default to None.
     """
 
     def __init__(self,
                  dataset,
                  pipeline,
                  dynamic_scale=None,
-                 skip_type_keys=None):
+                 skip_type_keys=None,
+                 max_cached_samples=0,
+                 random_pop=True,
+                 cache_img_scale=None):
         assert isinstance(pipeline, collections.abc.Sequence)
         if skip_type_keys is not None:
             assert all([
@@ -334,41 +395,105 @@ class MultiImageMixDataset:
         if hasattr(self.dataset, 'flag'):
             self.flag = dataset.flag
         self.num_samples = len(dataset)
+        self.profiler = None
 
         if dynamic_scale is not None:
             assert isinstance(dynamic_scale, tuple)
         self._dynamic_scale = dynamic_scale
 
+        self._cache = None
+        self._cache_resize = None
+        if max_cached_samples > 0:
+            self._cache = _SampleCache(max_cached_samples, random_pop)
+            if cache_img_scale is not None:
+                self._cache_resize = build_from_cfg(
+                    dict(
+                        type='Resize',
+                        img_scale=cache_img_scale,
+                        keep_ratio=True), PIPELINES)
+
     def __len__(self):
         return self.num_samples
 
+    def enable_profiling(self, flush_interval=1.):
+        """Profile the transforms of the pipeline, like
+        :meth:`Compose.enable_profiling`.
+
+        The time of a mixing transform does not include the loading of its
+        partners, which is counted by the pipeline of the wrapped dataset.
+
+        Args:
+            flush_interval (float): Interval (in seconds) for the workers to
+                report their counters. Default: 1.
+
+        Returns:
+            :obj:`PipelineProfiler`: The profiler.
+        """
+        if self.profiler is None:
+            self.profiler = PipelineProfiler(self.pipeline_types,
+                                             flush_interval)
+        return self.profiler
+
+    def _add_to_cache(self, sample):
+        if self._cache_resize is not None:
+            # the resized arrays are new, the sample is unchanged. The keys
+            # set by a Resize of the dataset pipeline are dropped, otherwise
+            # the cache resize would reuse them
+            sample = dict(sample)
+            for key in ['scale', 'scale_factor', 'img_shape', 'keep_ratio']:
+                sample.pop(key, None)
+            sample = self._cache_resize(sample)
+        self._cache.append(sample)
+
+    def _load(self, idx):
+        sample = self.dataset[idx]
+        if self._cache is not None:
+            self._add_to_cache(sample)
+        return copy.deepcopy(sample)
+
+    def _get_mix_results(self, transform):
+        if self._cache is not None and self._cache.is_full:
+            indexes = transform.get_indexes(self._cache)
+            if not isinstance(indexes, collections.abc.Sequence):
+                indexes = [indexes]
+            return [self._cache[index] for index in indexes]
+        indexes = transform.get_indexes(self.dataset)
+        if not isinstance(indexes, collections.abc.Sequence):
+            indexes = [indexes]
+        return [self._load(index) for index in indexes]
+
     def __getitem__(self, idx):
-        results = copy.deepcopy(self.dataset[idx])
-        for (transform, transform_type) in zip(self.pipeline,
-                                               self.pipeline_types):
+        results = self._load(idx)
+        for i, (transform, transform_type) in enumerate(
+                zip(self.pipeline, self.pipeline_types)):
             if self._skip_type_keys is not None and \
                     transform_type in self._skip_type_keys:
                 continue
 
             if hasattr(transform, 'get_indexes'):
-                indexes = transform.get_indexes(self.dataset)
-                if not isinstance(indexes, collections.abc.Sequence):
-                    indexes = [indexes]
-                mix_results = [
-                    copy.deepcopy(self.dataset[index]) for index in indexes
-                ]
-                results['mix_results'] = mix_results
+                results['mix_results'] = self._get_mix_results(transform)
 
             if self._dynamic_scale is not None:
                 # Used for subsequent pipeline to automatically change
                 # the output image size. E.g MixUp, Resize.
                 results['scale'] = self._dynamic_scale
 
-            results = transform(results)
+            if self.profiler is not None:
+                in_bytes = img_nbytes(results)
+                start_time = time.perf_counter()
+                results = transform(results)
+                elapsed = time.perf_counter() - start_time
+                out_bytes = img_nbytes(results)
+                dropped = results is None
+                self.profiler.record(i, elapsed, in_bytes, out_bytes, dropped)
+            else:
+                results = transform(results)
 
             if 'mix_results' in results:
                 results.pop('mix_results')
 
+        if self.profiler is not None:
+            self.profiler.step()
         return results
 
     def update_skip_type_keys(self, skip_type_keys):
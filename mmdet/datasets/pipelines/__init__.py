@@ -5,9 +5,13 @@ from .auto_augment import (AutoAugment, BrightnessTransform, ColorTransform,
 from .compose import Compose
 from .formating import (Collect, DefaultFormatBundle, ImageToTensor,
                         ToDataContainer, ToTensor, Transpose, to_tensor)
+from .geometric import FusedGeometric, fuse_geometric_transforms
+from .image_cache import SharedImageCache
 from .instaboost import InstaBoost
 from .loading import (LoadAnnotations, LoadImageFromFile, LoadImageFromWebcam,
                       LoadMultiChannelImageFromFiles, LoadProposals)
+from .pipeline_cache import PipelineCache
+from .profiler import PipelineProfiler
 from .test_time_aug import MultiScaleFlipAug
 from .transforms import (Albu, CutOut, Expand, MinIoURandomCrop, MixUp, Mosaic,
                          Normalize, Pad, PhotoMetricDistortion, RandomAffine,
@@ -24,5 +28,6 @@ __all__ = [
     'InstaBoost', 'RandomCenterCropPad', 'AutoAugment', 'CutOut', 'Shear',
     'Rotate', 'ColorTransform', 'EqualizeTransform', 'BrightnessTransform',
     'ContrastTransform', 'Translate', 'RandomShift', 'Mosaic', 'MixUp',
-    'RandomAffine'
+    'RandomAffine', 'SharedImageCache', 'FusedGeometric',
+    'fuse_geometric_transforms', 'PipelineProfiler', 'PipelineCache'
 ]
@@ -58,6 +58,9 @@ class AutoAugment:
             composed by several augmentations (dict). When AutoAugment is
             called, a random policy in ``policies`` will be selected to
             augment images.
+        fuse_geometric (bool): Whether to apply the consecutive geometric
+            transforms of each policy with a single warp, see
+            :class:`FusedGeometric`. Default: False.
 
     Examples:
         >>> replace = (104, 116, 124)
@@ -87,7 +90,7 @@ class AutoAugment:
         >>> results = augmentation(results)
     """
 
-    def __init__(self, policies):
+    def __init__(self, policies, fuse_geometric=False):
         assert isinstance(policies, list) and len(policies) > 0, \
             'Policies must be a non-empty list.'
         for policy in policies:
@@ -99,7 +102,10 @@ class AutoAugment:
                     ' "type".'
 
         self.policies = copy.deepcopy(policies)
-        self.transforms = [Compose(policy) for policy in self.policies]
+        self.fuse_geometric = fuse_geometric
+        self.transforms = [
+            Compose(policy, fuse_geometric) for policy in self.policies
+        ]
 
     def __call__(self, results):
         transform = np.random.choice(self.transforms)
@@ -1,9 +1,11 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 import collections
+import time
 
 from mmcv.utils import build_from_cfg
 
 from ..builder import PIPELINES
+from .profiler import PipelineProfiler, img_nbytes
 
 
 @PIPELINES.register_module()
@@ -13,9 +15,24 @@ class Compose:
     Args:
         transforms (Sequence[dict | callable]): Sequence of transform object or
             config dict to be composed.
+        fuse_geometric (bool): Whether to apply the consecutive geometric
+            transforms with a single warp, see :class:`FusedGeometric`. The
+            pipeline of a dataset is fused by ``pipeline_cfg`` of the dataset
+            config, see :class:`CustomDataset`. Default: False.
+        profile (bool): Whether to count the calls, wall time, image bytes
+            and dropped results of each transform with a
+            :class:`PipelineProfiler`, see :meth:`enable_profiling`.
+            Default: False.
+        cache_dir (str, optional): If given, the results of the
+            deterministic transforms at the start of the pipeline are cached
+            in this directory, see :meth:`enable_cache`. Default: None.
     """
 
-    def __init__(self, transforms):
+    def __init__(self,
+                 transforms,
+                 fuse_geometric=False,
+                 profile=False,
+                 cache_dir=None):
         assert isinstance(transforms, collections.abc.Sequence)
         self.transforms = []
         for transform in transforms:
@@ -26,6 +43,51 @@ class Compose:
                 self.transforms.append(transform)
             else:
                 raise TypeError('transform must be callable or a dict')
+        if fuse_geometric:
+            from .geometric import fuse_geometric_transforms
+            self.transforms = fuse_geometric_transforms(self.transforms)
+        self.profiler = None
+        if profile:
+            self.enable_profiling()
+        self.cache = None
+        if cache_dir is not None:
+            self.enable_cache(cache_dir)
+
+    def enable_profiling(self, flush_interval=1.):
+        """Profile the transforms.
+
+        It must be called before the dataloader workers are started, the
+        profiler is then shared by all of them.
+
+        Args:
+            flush_interval (float): Interval (in seconds) for the workers to
+                report their counters. Default: 1.
+
+        Returns:
+            :obj:`PipelineProfiler`: The profiler.
+        """
+        if self.profiler is None:
+            names = [t.__class__.__name__ for t in self.transforms]
+            self.profiler = PipelineProfiler(names, flush_interval)
+        return self.profiler
+
+    def enable_cache(self, cache_dir):
+        """Cache the deterministic transforms at the start of the pipeline.
+
+        See :class:`PipelineCache` for the cached transforms. Nothing is
+        cached if the pipeline does not start with ``LoadImageFromFile``.
+
+        Args:
+            cache_dir (str): The directory of the cache.
+
+        Returns:
+            :obj:`PipelineCache` | None: The cache, None if no transform can
+                be cached.
+        """
+        from .pipeline_cache import PipelineCache
+        cache = PipelineCache(self.transforms, cache_dir)
+        self.cache = cache if cache.num_transforms > 0 else None
+        return self.cache
 
     def __call__(self, data):
         """Call function to apply transforms sequentially.
@@ -36,13 +98,34 @@ class Compose:
         Returns:
            dict: Transformed data.
         """
+        start = 0
+        if self.cache is not None:
+            data = self.cache(data)
+            start = self.cache.num_transforms
 
-        for t in self.transforms:
+        if self.profiler is not None:
+            return self._profiled_call(data, start)
+
+        for t in self.transforms[start:]:
             data = t(data)
             if data is None:
                 return None
         return data
 
+    def _profiled_call(self, data, start=0):
+        in_bytes = img_nbytes(data)
+        for i, t in enumerate(self.transforms[start:], start):
+            start_time = time.perf_counter()
+            data = t(data)
+            elapsed = time.perf_counter() - start_time
+            out_bytes = img_nbytes(data)
+            self.profiler.record(i, elapsed, in_bytes, out_bytes, data is None)
+            if data is None:
+                break
+            in_bytes = out_bytes
+        self.profiler.step()
+        return data
+
     def __repr__(self):
         format_string = self.__class__.__name__ + '('
         for t in self.transforms:
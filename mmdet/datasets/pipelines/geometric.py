@@ -0,0 +1,448 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import cv2
+import mmcv
+import numpy as np
+from mmcv.utils import build_from_cfg
+
+from mmdet.core import CroppedBitmapMasks, PolygonMasks
+from ..builder import PIPELINES
+from .auto_augment import (Rotate, Shear, Translate, bbox2fields,
+                           random_negative)
+from .transforms import RandomAffine, RandomFlip, Resize
+
+# cv2 warps at most 512 channels at once
+_MAX_WARP_CHANNELS = 512
+
+
+def _translation(x, y):
+    return np.array([[1., 0., x], [0., 1., y], [0., 0., 1.]])
+
+
+def _homogeneous(matrix):
+    """Convert a 2x3 affine matrix to a 3x3 one."""
+    return np.concatenate([matrix, [[0., 0., 1.]]]).astype(np.float64)
+
+
+def _img_fill_val(transform):
+    if isinstance(transform, (Shear, Rotate, Translate)):
+        return tuple(transform.img_fill_val)
+    elif isinstance(transform, RandomAffine):
+        return tuple(float(val) for val in transform.border_val)
+    return None
+
+
+def is_fusable(transform):
+    """Whether a transform can be fused by :class:`FusedGeometric`.
+
+    Args:
+        transform (callable): A pipeline transform.
+
+    Returns:
+        bool: True for :class:`Resize` with the cv2 backend and clipping of
+            the boxes, :class:`RandomFlip`, :class:`Shear` with bilinear
+            interpolation, :class:`Rotate`, :class:`Translate` and
+            :class:`RandomAffine`. Subclasses are not fusable.
+    """
+    if type(transform) is Resize:
+        return transform.backend == 'cv2' and transform.bbox_clip_border
+    elif type(transform) is Shear:
+        return transform.interpolation == 'bilinear'
+    return type(transform) in (RandomFlip, Rotate, Translate, RandomAffine)
+
+
+def _compatible(transforms, transform):
+    """Whether ``transform`` uses the same fill values as ``transforms``."""
+    for key in [_img_fill_val, lambda t: getattr(t, 'seg_ignore_label', None)]:
+        values = {key(t) for t in transforms + [transform]} - {None}
+        if len(values) > 1:
+            return False
+    return True
+
+
+def fuse_geometric_transforms(transforms):
+    """Replace the runs of fusable transforms by :class:`FusedGeometric`.
+
+    Consecutive transforms are fused if :func:`is_fusable` and if they fill
+    the borders of the images and segmentation maps with the same values.
+    Runs of a single transform are kept as they are.
+
+    Args:
+        transforms (list[callable]): Built pipeline transforms.
+
+    Returns:
+        list[callable]: The transforms with the fused runs.
+    """
+    fused, run = [], []
+
+    def flush():
+        if len(run) > 1:
+            fused.append(FusedGeometric(list(run)))
+        else:
+            fused.extend(run)
+        run.clear()
+
+    for transform in transforms:
+        if not is_fusable(transform):
+            flush()
+            fused.append(transform)
+            continue
+        if not _compatible(run, transform):
+            flush()
+        run.append(transform)
+    flush()
+    return fused
+
+
+@PIPELINES.register_module()
+class FusedGeometric:
+    """Apply a sequence of geometric transforms with a single warp.
+
+    The random parameters of every transform are sampled exactly like the
+    transform itself does, in the same order, and the transforms are composed
+    into one 3x3 matrix. The images, masks and segmentation maps are then
+    warped once and the boxes are transformed once, instead of once per
+    transform.
+
+    The supported transforms are :class:`Resize`, :class:`RandomFlip`,
+    :class:`Shear`, :class:`Rotate`, :class:`Translate` and
+    :class:`RandomAffine`, see :func:`is_fusable`. All of them must fill the
+    borders with the same values. The results differ slightly from the
+    sequential transforms:
+
+    - The images are interpolated once, so they are sharper. The masks and
+      segmentation maps use nearest neighbor interpolation.
+    - The boxes are the bounding boxes of the transformed corners of the
+      input boxes, instead of the corners of the intermediate boxes, so they
+      are tighter. They are clipped and filtered once at the end with the
+      filters of the applied transforms.
+    - The content moved out of the image by a transform and back into it by
+      a following one is kept.
+    - :class:`RandomAffine` also transforms the masks and segmentation maps.
+
+    The sequential transforms can be fused automatically with
+    ``Compose(transforms, fuse_geometric=True)``, e.g. by
+    ``pipeline_cfg=dict(fuse_geometric=True)`` in a dataset config, or
+    ``AutoAugment(policies, fuse_geometric=True)``.
+
+    Args:
+        transforms (list[dict | callable]): The transforms or their configs.
+
+    Examples:
+        >>> transform = FusedGeometric([
+        >>>     dict(type='Resize', img_scale=(1333, 800), keep_ratio=True),
+        >>>     dict(type='RandomFlip', flip_ratio=0.5),
+        >>>     dict(type='Rotate', level=5, prob=0.5),
+        >>>     dict(type='Translate', level=5, prob=0.5)
+        >>> ])
+    """
+
+    def __init__(self, transforms):
+        assert isinstance(transforms, list) and len(transforms) > 0
+        self.transforms = []
+        for transform in transforms:
+            if isinstance(transform, dict):
+                transform = build_from_cfg(transform, PIPELINES)
+            assert is_fusable(transform), \
+                f'{transform.__class__.__name__} cannot be fused.'
+            assert _compatible(self.transforms, transform), \
+                'The fused transforms must use the same fill values.'
+            self.transforms.append(transform)
+        fill_vals = [_img_fill_val(t) for t in self.transforms]
+        fill_vals = [val for val in fill_vals if val is not None]
+        self.img_fill_val = fill_vals[0] if fill_vals else None
+        seg_ignore_labels = [
+            t.seg_ignore_label for t in self.transforms
+            if hasattr(t, 'seg_ignore_label')
+        ]
+        self.seg_ignore_label = seg_ignore_labels[0] \
+            if seg_ignore_labels else 255
+        self._steps = {
+            Resize: self._resize,
+            RandomFlip: self._flip,
+            Shear: self._shear,
+            Rotate: self._rotate,
+            Translate: self._translate,
+            RandomAffine: self._affine
+        }
+
+    @staticmethod
+    def _set_min_bbox_size(state, min_bbox_size):
+        if state['min_bbox_size'] is None:
+            state['min_bbox_size'] = min_bbox_size
+        else:
+            state['min_bbox_size'] = max(state['min_bbox_size'], min_bbox_size)
+
+    def _resize(self, transform, results, state):
+        """Same parameters and metas as :meth:`Resize.__call__`."""
+        h, w = state['shape']
+        transform._set_scale(results)
+        if transform.keep_ratio:
+            new_w, new_h = mmcv.rescale_size((w, h), results['scale'])
+        else:
+            new_w, new_h = results['scale']
+        w_scale, h_scale = new_w / w, new_h / h
+        results['scale_factor'] = np.array(
+            [w_scale, h_scale, w_scale, h_scale], dtype=np.float32)
+        results['keep_ratio'] = transform.keep_ratio
+        state['pad_shape'] = (new_h, new_w)
+        box_matrix = np.diag([w_scale, h_scale, 1.])
+        # cv2.resize aligns the pixel centers
+        img_matrix = _translation(-0.5, -0.5) @ box_matrix @ _translation(
+            0.5, 0.5)
+        return img_matrix, box_matrix, (new_h, new_w)
+
+    def _flip(self, transform, results, state):
+        """Same parameters and metas as :meth:`RandomFlip.__call__`."""
+        if 'flip' not in results:
+            cur_dir = transform._choose_direction()
+            results['flip'] = cur_dir is not None
+        if 'flip_direction' not in results:
+            results['flip_direction'] = cur_dir
+        if not results['flip']:
+            return None
+        h, w = state['shape']
+        direction = results['flip_direction']
+        if direction not in ['horizontal', 'vertical', 'diagonal']:
+            raise ValueError(f"Invalid flipping direction '{direction}'")
+        img_matrix, box_matrix = np.eye(3), np.eye(3)
+        if direction in ['horizontal', 'diagonal']:
+            img_matrix[0] = box_matrix[0] = [-1., 0., w]
+            img_matrix[0, 2] = w - 1
+        if direction in ['vertical', 'diagonal']:
+            img_matrix[1] = box_matrix[1] = [0., -1., h]
+            img_matrix[1, 2] = h - 1
+        return img_matrix, box_matrix, state['shape']
+
+    def _shear(self, transform, results, state):
+        """Same parameters as :meth:`Shear.__call__`."""
+        if np.random.rand() > transform.prob:
+            return None
+        magnitude = random_negative(transform.magnitude,
+                                    transform.random_negative_prob)
+        matrix = np.eye(3)
+        if transform.direction == 'horizontal':
+            matrix[0, 1] = magnitude
+        else:
+            matrix[1, 0] = magnitude
+        self._set_min_bbox_size(state, 0)
+        return matrix, matrix, state['shape']
+
+    def _rotate(self, transform, results, state):
+        """Same parameters as :meth:`Rotate.__call__`."""
+        if np.random.rand() > transform.prob:
+            return None
+        h, w = state['shape']
+        center = transform.center
+        if center is None:
+            center = ((w - 1) * 0.5, (h - 1) * 0.5)
+        angle = random_negative(transform.angle,
+                                transform.random_negative_prob)
+        matrix = _homogeneous(
+            cv2.getRotationMatrix2D(center, -angle, transform.scale))
+        self._set_min_bbox_size(state, 0)
+        return matrix, matrix, state['shape']
+
+    def _translate(self, transform, results, state):
+        """Same parameters as :meth:`Translate.__call__`."""
+        if np.random.rand() > transform.prob:
+            return None
+        offset = random_negative(transform.offset,
+                                 transform.random_negative_prob)
+        if transform.direction == 'horizontal':
+            matrix = _translation(offset, 0)
+        else:
+            matrix = _translation(0, offset)
+        self._set_min_bbox_size(state, transform.min_size)
+        return matrix, matrix, state['shape']
+
+    def _affine(self, transform, results, state):
+        """Same parameters as :meth:`RandomAffine.__call__`."""
+        h, w = state['shape']
+        matrix, scaling_ratio = transform._get_random_homography_matrix(h, w)
+        out_shape = (h + transform.border[0] * 2, w + transform.border[1] * 2)
+        # the boxes are filtered by comparing them to the input boxes
+        state['affine_filters'].append(
+            (transform, state['box_matrix'], state['shape'], scaling_ratio))
+        return matrix.astype(np.float64), matrix.astype(np.float64), out_shape
+
+    def _warp(self, img, matrix, out_shape, interpolation, border_value):
+        out_h, out_w = out_shape
+        kwargs = dict(
+            dsize=(out_w, out_h),
+            flags=cv2.INTER_NEAREST
+            if interpolation == 'nearest' else cv2.INTER_LINEAR)
+        if border_value is None:
+            kwargs['borderMode'] = cv2.BORDER_REPLICATE
+        else:
+            kwargs['borderValue'] = border_value
+        if np.allclose(matrix[2], [0., 0., 1.]):
+            warp, matrix = cv2.warpAffine, matrix[:2]
+        else:
+            warp = cv2.warpPerspective
+        if img.ndim == 3 and img.shape[2] > _MAX_WARP_CHANNELS:
+            chunks = [
+                warp(img[..., i:i + _MAX_WARP_CHANNELS], matrix, **kwargs)
+                for i in range(0, img.shape[2], _MAX_WARP_CHANNELS)
+            ]
+            return np.concatenate(
+                [chunk.reshape(out_h, out_w, -1) for chunk in chunks], axis=2)
+        warped = warp(img, matrix, **kwargs)
+        if img.ndim == 3 and warped.ndim == 2:
+            warped = warped[..., None]
+        return warped
+
+    def _warp_masks(self, masks, img_matrix, box_matrix, out_shape, fill_val):
+        out_h, out_w = out_shape
+        if isinstance(masks, PolygonMasks):
+            warped_masks = []
+            for poly_per_obj in masks.masks:
+                warped_poly = []
+                for p in poly_per_obj:
+                    coords = np.stack([p[0::2], p[1::2], np.ones(len(p) // 2)])
+                    coords = box_matrix @ coords
+                    coords = coords[:2] / coords[2]
+                    coords[0] = np.clip(coords[0], 0, out_w)
+                    coords[1] = np.clip(coords[1], 0, out_h)
+                    warped_poly.append(coords.T.reshape(-1).astype(p.dtype))
+                warped_masks.append(warped_poly)
+            return PolygonMasks(warped_masks, out_h, out_w)
+        is_affine = np.allclose(img_matrix[2], [0., 0., 1.])
+        if isinstance(masks, CroppedBitmapMasks):
+            if is_affine:
+                return masks._warp_affine(img_matrix[:2], out_shape, 'nearest')
+            masks = masks.to_bitmap()
+            return CroppedBitmapMasks.from_bitmaps(
+                self._warp_masks(masks, img_matrix, box_matrix, out_shape,
+                                 fill_val))
+        if len(masks) == 0:
+            warped = np.empty((0, out_h, out_w), dtype=np.uint8)
+        else:
+            warped = self._warp(
+                masks.masks.transpose((1, 2, 0)), img_matrix, out_shape,
+                'nearest', fill_val).transpose((2, 0, 1))
+        return type(masks)(warped, out_h, out_w)
+
+    def _warp_bboxes(self, bboxes, matrix, out_shape):
+        num_bboxes = len(bboxes)
+        if num_bboxes == 0:
+            return bboxes.copy()
+        xs = bboxes[:, [0, 2, 2, 0]].reshape(-1)
+        ys = bboxes[:, [1, 1, 3, 3]].reshape(-1)
+        points = matrix @ np.stack([xs, ys, np.ones_like(xs)])
+        points = points[:2] / points[2]
+        xs = points[0].reshape(num_bboxes, 4)
+        ys = points[1].reshape(num_bboxes, 4)
+        warped = np.stack([xs.min(1), ys.min(1), xs.max(1), ys.max(1)], 1)
+        warped[:, 0::2] = warped[:, 0::2].clip(0, out_shape[1])
+        warped[:, 1::2] = warped[:, 1::2].clip(0, out_shape[0])
+        return warped.astype(bboxes.dtype)
+
+    def _filter_invalid(self, results, state):
+        bbox2label, bbox2mask, _ = bbox2fields()
+        for key in results.get('bbox_fields', []):
+            bboxes = results[key]
+            valid = np.ones(len(bboxes), dtype=bool)
+            if state['min_bbox_size'] is not None:
+                min_size = state['min_bbox_size']
+                valid &= (bboxes[:, 2] - bboxes[:, 0] > min_size) & (
+                    bboxes[:, 3] - bboxes[:, 1] > min_size)
+            for transform, matrix, shape, scaling_ratio in \
+                    state['affine_filters']:
+                # the input boxes of RandomAffine
+                bboxes_in = self._warp_bboxes(state['origin_bboxes'][key],
+                                              matrix, shape)
+                valid &= transform.filter_gt_bboxes(bboxes_in * scaling_ratio,
+                                                    bboxes)
+            valid_inds = np.nonzero(valid)[0]
+            results[key] = bboxes[valid_inds]
+            # label fields. e.g. gt_labels and gt_labels_ignore
+            label_key = bbox2label.get(key)
+            if label_key in results:
+                results[label_key] = results[label_key][valid_inds]
+            # mask fields, e.g. gt_masks and gt_masks_ignore
+            mask_key = bbox2mask.get(key)
+            if mask_key in results:
+                results[mask_key] = results[mask_key][valid_inds]
+
+    def __call__(self, results):
+        """Call function to sample the parameters of the transforms and warp
+        images, bounding boxes, masks and semantic segmentation maps once.
+
+        Args:
+            results (dict): Result dict from loading pipeline.
+
+        Returns:
+            dict: Transformed results, with the same keys as added by the
+                transforms.
+        """
+        img_shape = results['img'].shape
+        state = dict(
+            origin_bboxes={
+                key: results[key]
+                for key in results.get('bbox_fields', [])
+            },
+            shape=img_shape[:2],
+            box_matrix=np.eye(3),
+            # None means no filtering of the boxes
+            min_bbox_size=None,
+            affine_filters=[],
+            pad_shape=None)
+        img_matrix = np.eye(3)
+        # only the borders of Resize and RandomFlip are replicated
+        border_value = None
+        for transform in self.transforms:
+            step = self._steps[type(transform)](transform, results, state)
+            if step is None:
+                continue
+            step_img_matrix, step_box_matrix, state['shape'] = step
+            img_matrix = step_img_matrix @ img_matrix
+            state['box_matrix'] = step_box_matrix @ state['box_matrix']
+            if _img_fill_val(transform) is not None:
+                border_value = self.img_fill_val
+
+        out_shape = state['shape']
+        if state['pad_shape'] is not None:
+            results['pad_shape'] = state['pad_shape'] + img_shape[2:]
+        if out_shape != img_shape[:2] or not np.allclose(
+                img_matrix, np.eye(3)):
+            self._warp_results(results, img_matrix, state['box_matrix'],
+                               out_shape, border_value)
+        if state['min_bbox_size'] is not None or state['affine_filters']:
+            self._filter_invalid(results, state)
+        return results
+
+    def _warp_results(self, results, img_matrix, box_matrix, out_shape,
+                      border_value):
+        """Warp the images, boxes, masks and segmentation maps."""
+        # the masks and segmentation maps are only padded if the images are
+        mask_fill_val, seg_fill_val = (None, None) if border_value is None \
+            else (0, self.seg_ignore_label)
+        for key in results.get('img_fields', ['img']):
+            img = results[key]
+            fill_val = border_value
+            if fill_val is not None and img.ndim == 3:
+                fill_val = fill_val[:img.shape[2]]
+            results[key] = self._warp(img, img_matrix, out_shape, 'bilinear',
+                                      fill_val).astype(img.dtype)
+        results['img_shape'] = results['img'].shape
+
+        for key in results.get('bbox_fields', []):
+            results[key] = self._warp_bboxes(results[key], box_matrix,
+                                             out_shape)
+        for key in results.get('mask_fields', []):
+            if results[key] is None:
+                continue
+            results[key] = self._warp_masks(results[key], img_matrix,
+                                            box_matrix, out_shape,
+                                            mask_fill_val)
+        for key in results.get('seg_fields', []):
+            seg = results[key]
+            results[key] = self._warp(seg, img_matrix, out_shape, 'nearest',
+                                      seg_fill_val).astype(seg.dtype)
+
+    def __repr__(self):
+        repr_str = self.__class__.__name__ + '('
+        for t in self.transforms:
+            repr_str += f'\n    {t}'
+        repr_str += '\n)'
+        return repr_str
@@ -0,0 +1,277 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import bisect
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from multiprocessing.managers import BaseManager
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+
+class _CacheIndex:
+    """Bookkeeping of a :obj:`SharedImageCache`, hosted in a manager process.
+
+    The index owns no image data. It hands out byte ranges of the shared
+    arena, tracks their LRU order and keeps the hit/miss counters. Entries
+    that are being read (pinned) or written (not ready) are never evicted.
+    The reservation of a writer that died before committing is released by
+    the next :meth:`reserve`, so that it does not stay pinned forever.
+
+    Args:
+        capacity (int): Size of the shared arena in bytes.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        # key -> [offset, nbytes, meta, pins, ready]
+        self._entries = OrderedDict()
+        # sorted list of free (offset, size) extents
+        self._free = [(0, capacity)]
+        # key -> pid of the writer, for the entries not committed yet
+        self._reserved = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.used_bytes = 0
+
+    def acquire(self, key):
+        """Pin a ready entry and return ``(offset, nbytes, meta)`` or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or not entry[4]:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            entry[3] += 1
+            self.hits += 1
+            return entry[0], entry[1], entry[2]
+
+    def release(self, key):
+        """Unpin an entry previously returned by :meth:`acquire`."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[3] > 0:
+                entry[3] -= 1
+
+    def reserve(self, key, nbytes, pid):
+        """Allocate ``nbytes`` for ``key`` and return the offset.
+
+        Least recently used entries are evicted until a free extent is large
+        enough. None is returned if the key is already present or the data
+        cannot fit, in which case the caller simply does not cache it.
+        ``pid`` is the process of the writer.
+        """
+        with self._lock:
+            self._release_dead_reservations()
+            if key in self._entries or nbytes > self.capacity:
+                return None
+            offset = self._alloc(nbytes)
+            while offset is None:
+                victim = self._lru_unpinned_key()
+                if victim is None:
+                    return None
+                self._evict(victim)
+                offset = self._alloc(nbytes)
+            self._entries[key] = [offset, nbytes, None, 1, False]
+            self._reserved[key] = pid
+            self.used_bytes += nbytes
+            return offset
+
+    def commit(self, key, meta):
+        """Publish an entry whose data has been written by the reserver."""
+        with self._lock:
+            if self._reserved.pop(key, None) is None:
+                return
+            entry = self._entries[key]
+            entry[2] = meta
+            entry[3] = 0
+            entry[4] = True
+
+    def stats(self):
+        with self._lock:
+            return dict(
+                hits=self.hits,
+                misses=self.misses,
+                evictions=self.evictions,
+                num_entries=len(self._entries),
+                used_bytes=self.used_bytes,
+                capacity=self.capacity)
+
+    def _alloc(self, nbytes):
+        # first fit
+        for i, (offset, size) in enumerate(self._free):
+            if size >= nbytes:
+                if size == nbytes:
+                    self._free.pop(i)
+                else:
+                    self._free[i] = (offset + nbytes, size - nbytes)
+                return offset
+        return None
+
+    def _lru_unpinned_key(self):
+        for key, entry in self._entries.items():
+            if entry[4] and entry[3] == 0:
+                return key
+        return None
+
+    def _release_dead_reservations(self):
+        for key, pid in list(self._reserved.items()):
+            if not _is_alive(pid):
+                del self._reserved[key]
+                self._remove(key)
+
+    def _evict(self, key):
+        self._remove(key)
+        self.evictions += 1
+
+    def _remove(self, key):
+        offset, nbytes = self._entries.pop(key)[:2]
+        self.used_bytes -= nbytes
+        # insert the extent back and coalesce it with its neighbours
+        i = bisect.bisect(self._free, (offset, nbytes))
+        self._free.insert(i, (offset, nbytes))
+        if i + 1 < len(self._free) and \
+                offset + nbytes == self._free[i + 1][0]:
+            nbytes += self._free.pop(i + 1)[1]
+            self._free[i] = (offset, nbytes)
+        if i > 0 and sum(self._free[i - 1]) == offset:
+            prev_offset, prev_size = self._free.pop(i - 1)
+            self._free[i - 1] = (prev_offset, prev_size + nbytes)
+
+
+def _is_alive(pid):
+    """Whether the process ``pid`` is running (and is not a zombie)."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            # the state follows the parenthesized command name
+            return f.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except (OSError, IndexError):
+        return True
+
+
+class _CacheManager(BaseManager):
+    pass
+
+
+_CacheManager.register('CacheIndex', _CacheIndex)
+
+
+def _release_cache(manager, shm, pid):
+    if os.getpid() != pid:
+        return
+    shm.close()
+    try:
+        shm.unlink()
+    except FileNotFoundError:
+        pass
+    manager.shutdown()
+
+
+class SharedImageCache:
+    """A byte-budgeted LRU cache shared by all dataloader workers.
+
+    The cache data lives in one shared memory arena of ``max_bytes`` that is
+    created by the process constructing the cache (usually the main process
+    while building the dataset) and attached by the workers, whether they
+    are forked or spawned. The LRU index and the hit/miss counters live in a
+    small manager process, so every worker sees the images decoded by the
+    others and the main process can report the counters.
+
+    Values are either ``bytes`` (the encoded file content) or numpy arrays
+    (e.g. decoded uint8 images). A value is always copied out of the arena,
+    so callers are free to modify what :meth:`get` returns.
+
+    Args:
+        max_bytes (int): Size of the shared arena in bytes.
+
+    Example:
+        >>> cache = SharedImageCache(max_bytes=1024)
+        >>> cache.put('a', np.ones((2, 3), dtype=np.uint8))
+        >>> cache.get('a').shape
+        (2, 3)
+        >>> cache.get('b') is None
+        True
+        >>> cache.stats()['hits'], cache.stats()['misses']
+        (1, 1)
+    """
+
+    def __init__(self, max_bytes):
+        assert max_bytes > 0
+        self.max_bytes = int(max_bytes)
+        self._manager = _CacheManager()
+        self._manager.start()
+        self._index = self._manager.CacheIndex(self.max_bytes)
+        self._shm = SharedMemory(create=True, size=self.max_bytes)
+        self._finalizer = weakref.finalize(self, _release_cache, self._manager,
+                                           self._shm, os.getpid())
+
+    def __getstate__(self):
+        # workers only need the index proxy and the arena, which are both
+        # picklable; the manager and the finalizer stay with the creator
+        state = self.__dict__.copy()
+        state.pop('_manager')
+        state.pop('_finalizer')
+        return state
+
+    def get(self, key):
+        """Return a copy of the cached value of ``key`` or None on a miss."""
+        found = self._index.acquire(key)
+        if found is None:
+            return None
+        offset, nbytes, meta = found
+        try:
+            buf = self._shm.buf[offset:offset + nbytes]
+            if meta is None:
+                value = bytes(buf)
+            else:
+                shape, dtype = meta
+                value = np.frombuffer(buf, dtype=dtype).reshape(shape).copy()
+            buf.release()
+        finally:
+            self._index.release(key)
+        return value
+
+    def put(self, key, value):
+        """Cache ``value`` under ``key``.
+
+        Returns:
+            bool: Whether the value was stored. It is not stored if the key
+                is already cached or the value is larger than the arena.
+        """
+        if isinstance(value, np.ndarray):
+            data = np.ascontiguousarray(value)
+            meta = (data.shape, data.dtype.str)
+            data = data.reshape(-1).view(np.uint8)
+        else:
+            data = np.frombuffer(value, dtype=np.uint8)
+            meta = None
+        nbytes = data.nbytes
+        offset = self._index.reserve(key, nbytes, os.getpid())
+        if offset is None:
+            return False
+        arena = np.frombuffer(
+            self._shm.buf, dtype=np.uint8, count=nbytes, offset=offset)
+        arena[:] = data
+        del arena
+        self._index.commit(key, meta)
+        return True
+
+    def stats(self):
+        """dict: Hit/miss/eviction counters and the memory usage."""
+        return self._index.stats()
+
+    def close(self):
+        """Release the arena and stop the manager in the owner process."""
+        self._finalizer()
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}(max_bytes={self.max_bytes})'
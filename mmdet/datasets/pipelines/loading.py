@@ -5,8 +5,11 @@ import mmcv
 import numpy as np
 import pycocotools.mask as maskUtils
 
-from mmdet.core import BitmapMasks, PolygonMasks
+from mmdet.core import BitmapMasks, CroppedBitmapMasks, PolygonMasks
+from mmdet.core.mask.structures import (bitmap_to_cropped_bitmap,
+                                        polygon_to_cropped_bitmap)
 from ..builder import PIPELINES
+from .image_cache import SharedImageCache
 
 try:
     from panopticapi.utils import rgb2id
@@ -32,16 +35,33 @@ class LoadImageFromFile:
         file_client_args (dict): Arguments to instantiate a FileClient.
             See :class:`mmcv.fileio.FileClient` for details.
             Defaults to ``dict(backend='disk')``.
+        cache_cfg (dict, optional): Config of a :obj:`SharedImageCache`
+            shared by all dataloader workers, which avoids reading and
+            decoding the same image in every epoch. It accepts ``max_bytes``
+            (the memory budget) and ``mode``, which is ``'decoded'`` to cache
+            the decoded uint8 arrays or ``'bytes'`` to cache the encoded
+            file content. Hit/miss counters are logged by
+            :obj:`ImageCacheHook`. Defaults to None (no caching).
     """
 
     def __init__(self,
                  to_float32=False,
                  color_type='color',
-                 file_client_args=dict(backend='disk')):
+                 file_client_args=dict(backend='disk'),
+                 cache_cfg=None):
         self.to_float32 = to_float32
         self.color_type = color_type
         self.file_client_args = file_client_args.copy()
         self.file_client = None
+        self.cache_cfg = None
+        self.cache = None
+        if cache_cfg is not None:
+            self.cache_cfg = cache_cfg.copy()
+            cache_cfg = cache_cfg.copy()
+            self.cache_mode = cache_cfg.pop('mode', 'decoded')
+            assert self.cache_mode in ('decoded', 'bytes')
+            # the cache must be created before the dataloader workers start
+            self.cache = SharedImageCache(**cache_cfg)
 
     def __call__(self, results):
         """Call functions to load image and get image meta information.
@@ -62,8 +82,11 @@ class LoadImageFromFile:
         else:
             filename = results['img_info']['filename']
 
-        img_bytes = self.file_client.get(filename)
-        img = mmcv.imfrombytes(img_bytes, flag=self.color_type)
+        if self.cache is None:
+            img_bytes = self.file_client.get(filename)
+            img = mmcv.imfrombytes(img_bytes, flag=self.color_type)
+        else:
+            img = self._load_cached(filename)
         if self.to_float32:
             img = img.astype(np.float32)
 
@@ -75,11 +98,31 @@ class LoadImageFromFile:
         results['img_fields'] = ['img']
         return results
 
+    def _load_cached(self, filename):
+        """Load an image through the shared cache."""
+        if self.cache_mode == 'bytes':
+            img_bytes = self.cache.get(filename)
+            if img_bytes is None:
+                img_bytes = self.file_client.get(filename)
+                self.cache.put(filename, img_bytes)
+            return mmcv.imfrombytes(img_bytes, flag=self.color_type)
+
+        key = f'{self.color_type}:{filename}'
+        img = self.cache.get(key)
+        if img is None:
+            img_bytes = self.file_client.get(filename)
+            img = mmcv.imfrombytes(img_bytes, flag=self.color_type)
+            self.cache.put(key, img)
+        return img
+
     def __repr__(self):
         repr_str = (f'{self.__class__.__name__}('
                     f'to_float32={self.to_float32}, '
                     f"color_type='{self.color_type}', "
-                    f'file_client_args={self.file_client_args})')
+                    f'file_client_args={self.file_client_args}')
+        if self.cache_cfg is not None:
+            repr_str += f', cache_cfg={self.cache_cfg}'
+        repr_str += ')'
         return repr_str
 
 
@@ -216,6 +259,10 @@ class LoadAnnotations:
         file_client_args (dict): Arguments to instantiate a FileClient.
             See :class:`mmcv.fileio.FileClient` for details.
             Defaults to ``dict(backend='disk')``.
+        crop_masks (bool): Whether to keep the bitmaps cropped to the boxes
+            of the instances with :obj:`CroppedBitmapMasks`, which saves
+            most of the memory of crowded images. Only valid when
+            ``poly2mask`` is True. Default: False.
     """
 
     def __init__(self,
@@ -224,12 +271,14 @@ class LoadAnnotations:
                  with_mask=False,
                  with_seg=False,
                  poly2mask=True,
-                 file_client_args=dict(backend='disk')):
+                 file_client_args=dict(backend='disk'),
+                 crop_masks=False):
         self.with_bbox = with_bbox
         self.with_label = with_label
         self.with_mask = with_mask
         self.with_seg = with_seg
         self.poly2mask = poly2mask
+        self.crop_masks = crop_masks
         self.file_client_args = file_client_args.copy()
         self.file_client = None
 
@@ -293,6 +342,26 @@ class LoadAnnotations:
         mask = maskUtils.decode(rle)
         return mask
 
+    def _poly2cropped_mask(self, mask_ann, img_h, img_w):
+        """Private function to convert masks represented with polygon to
+        bitmaps cropped to the boxes of the masks.
+
+        Args:
+            mask_ann (list | dict): Polygon mask annotation input.
+            img_h (int): The height of the image.
+            img_w (int): The width of the image.
+
+        Returns:
+            tuple[numpy.ndarray]: The cropped bitmap mask and its box in
+                format [x1, y1, x2, y2].
+        """
+
+        if isinstance(mask_ann, list):
+            return polygon_to_cropped_bitmap(mask_ann, img_h, img_w)
+        # RLE annotations have to be decoded to the full size
+        mask = self._poly2mask(mask_ann, img_h, img_w)
+        return bitmap_to_cropped_bitmap(mask)
+
     def process_polygons(self, polygons):
         """Convert polygons to list of ndarray and filter invalid polygons.
 
@@ -320,11 +389,20 @@ class LoadAnnotations:
             dict: The dict contains loaded mask annotations.
                 If ``self.poly2mask`` is set ``True``, `gt_mask` will contain
                 :obj:`PolygonMasks`. Otherwise, :obj:`BitmapMasks` is used.
+                :obj:`CroppedBitmapMasks` is used instead of
+                :obj:`BitmapMasks` if ``self.crop_masks`` is set ``True``.
         """
 
         h, w = results['img_info']['height'], results['img_info']['width']
         gt_masks = results['ann_info']['masks']
-        if self.poly2mask:
+        if self.poly2mask and self.crop_masks:
+            crops, bboxes = [], []
+            for mask in gt_masks:
+                crop, bbox = self._poly2cropped_mask(mask, h, w)
+                crops.append(crop)
+                bboxes.append(bbox)
+            gt_masks = CroppedBitmapMasks(crops, bboxes, h, w)
+        elif self.poly2mask:
             gt_masks = BitmapMasks(
                 [self._poly2mask(mask, h, w) for mask in gt_masks], h, w)
         else:
@@ -386,7 +464,8 @@ class LoadAnnotations:
         repr_str += f'with_mask={self.with_mask}, '
         repr_str += f'with_seg={self.with_seg}, '
         repr_str += f'poly2mask={self.poly2mask}, '
-        repr_str += f'poly2mask={self.file_client_args})'
+        repr_str += f'poly2mask={self.file_client_args}, '
+        repr_str += f'crop_masks={self.crop_masks})'
         return repr_str
 
 
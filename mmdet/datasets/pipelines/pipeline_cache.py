@@ -0,0 +1,233 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import hashlib
+import os
+import os.path as osp
+import pickle
+
+import numpy as np
+
+from .loading import LoadImageFromFile
+from .test_time_aug import MultiScaleFlipAug
+from .transforms import Pad, RandomFlip, Resize
+
+# bump it when the format of the cached files changes
+_CACHE_VERSION = 1
+
+
+def _is_plain(value):
+    if isinstance(value, (list, tuple)):
+        return all(_is_plain(v) for v in value)
+    if isinstance(value, dict):
+        return all(_is_plain(v) for v in value.values())
+    return value is None or isinstance(value, (str, int, float, bool))
+
+
+def _describe(transform):
+    """Describe the configuration of a transform by its plain attributes."""
+    attrs = sorted((key, value) for key, value in vars(transform).items()
+                   if _is_plain(value))
+    return f'{transform.__class__.__name__}{attrs}'
+
+
+def _is_deterministic(transform, in_tta=False):
+    """Whether a transform maps the same input to the same uint8 output.
+
+    ``RandomFlip`` is only deterministic in :obj:`MultiScaleFlipAug`, which
+    decides the flipping.
+    """
+    if type(transform) is LoadImageFromFile:
+        return not transform.to_float32
+    if type(transform) is Resize:
+        return transform.ratio_range is None and (
+            transform.img_scale is None or len(transform.img_scale) == 1)
+    if type(transform) is RandomFlip:
+        return in_tta
+    return type(transform) is Pad
+
+
+def _num_deterministic(transforms, in_tta=False):
+    num = 0
+    for transform in transforms:
+        if not _is_deterministic(transform, in_tta):
+            break
+        num += 1
+    return num
+
+
+class PipelineCache:
+    """Persistent on-disk cache of the deterministic prefix of a pipeline.
+
+    The prefix consists of ``LoadImageFromFile`` and the following
+    deterministic transforms (``Resize`` with a fixed scale and ``Pad``). If
+    the prefix is followed by :obj:`MultiScaleFlipAug`, the deterministic
+    transforms at the start of its pipeline (``Resize``, ``RandomFlip`` and
+    ``Pad``) are cached as well, for each scale and flip. So with a typical
+    test pipeline only ``Normalize``, ``Pad``, ``ImageToTensor`` and
+    ``Collect`` are run for a cached image.
+
+    For each image, the uint8 images of the results are stored in a
+    ``.npy`` file, which is memory mapped when read, and the rest of the
+    results in a ``.pkl`` file. The files are stored in a sub-directory of
+    ``cache_dir`` named by the hash of the configuration of the cached
+    transforms, so a change of the configuration starts a new cache. A
+    cached image is recomputed if the size or the modification time of its
+    source file changed. Writes are atomic, so the dataloader workers and
+    the processes of distributed testing can share the cache.
+
+    Args:
+        transforms (list[callable]): The transforms of a pipeline.
+        cache_dir (str): The directory of the cache.
+
+    Attributes:
+        num_transforms (int): The number of transforms at the start of
+            ``transforms`` that are replaced by the cache, it is 0 if the
+            pipeline does not start with ``LoadImageFromFile``.
+    """
+
+    def __init__(self, transforms, cache_dir):
+        transforms = list(transforms)
+        num_prefix = 0
+        # the images are identified by their files
+        if transforms and type(transforms[0]) is LoadImageFromFile:
+            num_prefix = _num_deterministic(transforms)
+        self.prefix = transforms[:num_prefix]
+        self.tta = None
+        self.tta_prefix = []
+        if num_prefix > 0 and num_prefix < len(transforms) and isinstance(
+                transforms[num_prefix], MultiScaleFlipAug):
+            tta = transforms[num_prefix]
+            tta_transforms = tta.transforms.transforms
+            num_tta_prefix = _num_deterministic(tta_transforms, in_tta=True)
+            if num_tta_prefix > 0:
+                self.tta = tta
+                self.tta_prefix = tta_transforms[:num_tta_prefix]
+                self.tta_suffix = tta_transforms[num_tta_prefix:]
+        self.num_transforms = num_prefix + int(self.tta is not None)
+
+        descriptions = [f'version={_CACHE_VERSION}']
+        descriptions += [_describe(t) for t in self.prefix]
+        if self.tta is not None:
+            descriptions.append(f'{self.tta.scale_key}={self.tta.img_scale}, '
+                                f'flip={self.tta.flip}, '
+                                f'flip_direction={self.tta.flip_direction}')
+            descriptions += [_describe(t) for t in self.tta_prefix]
+        self.config_hash = hashlib.sha1(
+            '\n'.join(descriptions).encode()).hexdigest()[:16]
+        self.cache_dir = osp.join(cache_dir, self.config_hash)
+        if self.num_transforms > 0:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _get_paths(self, filename):
+        key = hashlib.sha1(osp.abspath(filename).encode()).hexdigest()
+        path = osp.join(self.cache_dir, key)
+        return path + '.npy', path + '.pkl'
+
+    @staticmethod
+    def _get_filename(results):
+        if results.get('img_prefix') is not None:
+            return osp.join(results['img_prefix'],
+                            results['img_info']['filename'])
+        return results['img_info']['filename']
+
+    @staticmethod
+    def _get_source_stat(filename):
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def _load(self, filename, source_stat):
+        array_path, meta_path = self._get_paths(filename)
+        try:
+            with open(meta_path, 'rb') as f:
+                meta = pickle.load(f)
+            if meta['source_stat'] != source_stat:
+                return None
+            data = np.load(array_path, mmap_mode='r')
+        except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+            return None
+        aug_results = []
+        for results, arrays in zip(meta['results'], meta['arrays']):
+            results = results.copy()
+            for key, (offset, shape) in arrays.items():
+                end = offset + int(np.prod(shape))
+                # copy so that the transforms may modify the images in place
+                results[key] = np.array(data[offset:end]).reshape(shape)
+            aug_results.append(results)
+        return aug_results
+
+    def _save(self, filename, source_stat, aug_results):
+        meta_results, meta_arrays, chunks = [], [], []
+        offset = 0
+        for results in aug_results:
+            results = results.copy()
+            arrays = {}
+            for key in results.get('img_fields', ['img']):
+                img = results.pop(key, None)
+                if not isinstance(img, np.ndarray) or img.dtype != np.uint8:
+                    return
+                arrays[key] = (offset, img.shape)
+                chunks.append(img.reshape(-1))
+                offset += img.size
+            meta_results.append(results)
+            meta_arrays.append(arrays)
+        meta = dict(
+            source_stat=source_stat, results=meta_results, arrays=meta_arrays)
+
+        array_path, meta_path = self._get_paths(filename)
+        suffix = f'.{os.getpid()}.tmp'
+        # the meta file is written last, so a complete meta file marks a
+        # complete entry
+        with open(array_path + suffix, 'wb') as f:
+            np.save(f, np.concatenate(chunks))
+        os.replace(array_path + suffix, array_path)
+        with open(meta_path + suffix, 'wb') as f:
+            pickle.dump(meta, f)
+        os.replace(meta_path + suffix, meta_path)
+
+    def _run_prefix(self, results):
+        for t in self.prefix:
+            results = t(results)
+        if self.tta is None:
+            return [results]
+        aug_results = []
+        for _results in self.tta._augment(results):
+            for t in self.tta_prefix:
+                _results = t(_results)
+            aug_results.append(_results)
+        return aug_results
+
+    def __call__(self, results):
+        """Apply the first ``num_transforms`` transforms with the cache.
+
+        Args:
+            results (dict): The input of the pipeline.
+
+        Returns:
+            dict: The results of the first ``num_transforms`` transforms.
+        """
+        filename = self._get_filename(results)
+        source_stat = self._get_source_stat(filename)
+        aug_results = None
+        if source_stat is not None:
+            aug_results = self._load(filename, source_stat)
+        if aug_results is None:
+            aug_results = self._run_prefix(results)
+            if source_stat is not None:
+                self._save(filename, source_stat, aug_results)
+        else:
+            aug_results = [{**results, **r} for r in aug_results]
+
+        if self.tta is None:
+            return aug_results[0]
+        aug_data = []
+        for _results in aug_results:
+            for t in self.tta_suffix:
+                _results = t(_results)
+            aug_data.append(_results)
+        return self.tta._merge(aug_data)
+
+    def __repr__(self):
+        return (f'{self.__class__.__name__}(cache_dir={self.cache_dir}, '
+                f'num_transforms={self.num_transforms})')
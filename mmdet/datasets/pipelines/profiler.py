@@ -0,0 +1,208 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import os
+import threading
+import time
+import weakref
+from multiprocessing.managers import BaseManager
+
+import numpy as np
+import torch
+from mmcv.parallel import DataContainer
+
+# columns of the per-transform counters
+_CALLS, _DROPS, _TIME, _IN_BYTES, _OUT_BYTES = range(5)
+
+
+def _nbytes(value):
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, torch.Tensor):
+        return value.numel() * value.element_size()
+    if isinstance(value, DataContainer):
+        return _nbytes(value.data)
+    if isinstance(value, (list, tuple)):
+        return sum(_nbytes(v) for v in value)
+    return 0
+
+
+def img_nbytes(results):
+    """Return the number of bytes of the images in a result dict.
+
+    The images are the fields listed in ``img_fields`` (``img`` if there is
+    no such key), which may be numpy arrays, tensors, :obj:`DataContainer`
+    or lists of them.
+    """
+    if not isinstance(results, dict):
+        return 0
+    return sum(
+        _nbytes(results.get(key))
+        for key in results.get('img_fields', ['img']))
+
+
+class _ProfileCounters:
+    """Counters of a :obj:`PipelineProfiler`, hosted in a manager process.
+
+    Args:
+        num_transforms (int): Number of profiled transforms.
+    """
+
+    def __init__(self, num_transforms):
+        self._counters = np.zeros((num_transforms, 5), dtype=np.float64)
+        self._lock = threading.Lock()
+
+    def add(self, counters):
+        with self._lock:
+            self._counters += np.asarray(counters)
+
+    def get(self):
+        with self._lock:
+            return self._counters.tolist()
+
+    def reset(self):
+        with self._lock:
+            self._counters[:] = 0
+
+
+class _ProfileManager(BaseManager):
+    pass
+
+
+_ProfileManager.register('ProfileCounters', _ProfileCounters)
+
+
+def _stop_manager(manager, pid):
+    if os.getpid() == pid:
+        manager.shutdown()
+
+
+class PipelineProfiler:
+    """Per-transform cost counters of a pipeline, shared by all workers.
+
+    For every transform, the number of calls, the number of results dropped
+    (the transform returned None), the wall time and the bytes of the input
+    and output images are counted. Each process accumulates the counters
+    locally and adds them to the counters in a small manager process every
+    ``flush_interval`` seconds, so the process that created the profiler can
+    report the costs of all dataloader workers.
+
+    Args:
+        names (list[str]): Names of the profiled transforms.
+        flush_interval (float): Interval (in seconds) to send the local
+            counters to the manager. Default: 1.
+
+    Example:
+        >>> profiler = PipelineProfiler(['LoadImageFromFile', 'Resize'])
+        >>> profiler.record(1, 0.01, 100, 400, dropped=False)
+        >>> stats = profiler.stats()
+        >>> stats[1]['calls'], stats[1]['out_bytes']
+        (1, 400)
+    """
+
+    def __init__(self, names, flush_interval=1.):
+        self.names = list(names)
+        self.flush_interval = flush_interval
+        self._manager = _ProfileManager()
+        self._manager.start()
+        self._counters = self._manager.ProfileCounters(len(self.names))
+        self._finalizer = weakref.finalize(self, _stop_manager, self._manager,
+                                           os.getpid())
+        self._reset_local()
+
+    def _reset_local(self):
+        self._pid = os.getpid()
+        self._local = np.zeros((len(self.names), 5), dtype=np.float64)
+        self._last_flush = time.perf_counter()
+
+    def __getstate__(self):
+        # workers only need the proxy of the counters
+        state = self.__dict__.copy()
+        state.pop('_manager')
+        state.pop('_finalizer')
+        return state
+
+    def record(self, idx, elapsed, in_bytes, out_bytes, dropped):
+        """Count a call of the ``idx``-th transform."""
+        if os.getpid() != self._pid:
+            # forked workers must not count the counters of their parent
+            self._reset_local()
+        self._local[idx] += (1, dropped, elapsed, in_bytes, out_bytes)
+
+    def step(self):
+        """Flush the local counters if ``flush_interval`` has passed."""
+        if time.perf_counter() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Add the local counters to the shared ones."""
+        if os.getpid() != self._pid:
+            self._reset_local()
+            return
+        if self._local.any():
+            self._counters.add(self._local.tolist())
+            self._local[:] = 0
+        self._last_flush = time.perf_counter()
+
+    def stats(self):
+        """Return the counters of all processes.
+
+        The counters that the workers have not flushed yet are missing.
+
+        Returns:
+            list[dict]: For each transform, its ``name``, number of
+                ``calls`` and ``drops``, the total ``time`` (s) and the
+                total ``in_bytes`` and ``out_bytes`` of the images.
+        """
+        self.flush()
+        stats = []
+        for name, counters in zip(self.names, self._counters.get()):
+            stats.append(
+                dict(
+                    name=name,
+                    calls=int(counters[_CALLS]),
+                    drops=int(counters[_DROPS]),
+                    time=counters[_TIME],
+                    in_bytes=int(counters[_IN_BYTES]),
+                    out_bytes=int(counters[_OUT_BYTES])))
+        return stats
+
+    def reset(self):
+        """Reset the shared and the local counters."""
+        self._counters.reset()
+        self._reset_local()
+
+    def close(self):
+        """Stop the manager in the owner process."""
+        self._finalizer()
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}(names={self.names})'
+
+
+def format_profile(stats, topk=None):
+    """Format the stats of :meth:`PipelineProfiler.stats` as a table.
+
+    The transforms are sorted by their total time.
+
+    Args:
+        stats (list[dict]): The stats of the transforms.
+        topk (int, optional): Only show the ``topk`` most expensive
+            transforms. Default: None.
+
+    Returns:
+        str: The table.
+    """
+    total_time = sum(s['time'] for s in stats)
+    stats = sorted(stats, key=lambda s: s['time'], reverse=True)[:topk]
+    lines = [
+        f'{"transform":<32}{"calls":>8}{"time (%)":>10}{"ms/call":>10}'
+        f'{"drop (%)":>10}{"in MB":>8}{"out MB":>8}'
+    ]
+    for s in stats:
+        calls = max(s['calls'], 1)
+        lines.append(f'{s["name"]:<32}{s["calls"]:>8}'
+                     f'{100 * s["time"] / max(total_time, 1e-12):>10.1f}'
+                     f'{1000 * s["time"] / calls:>10.3f}'
+                     f'{100 * s["drops"] / calls:>10.1f}'
+                     f'{s["in_bytes"] / calls / 2**20:>8.2f}'
+                     f'{s["out_bytes"] / calls / 2**20:>8.2f}')
+    return '\n'.join(lines)
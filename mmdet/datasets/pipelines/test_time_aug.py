@@ -5,6 +5,7 @@ import mmcv
 
 from ..builder import PIPELINES
 from .compose import Compose
+from .transforms import RandomFlip
 
 
 @PIPELINES.register_module()
@@ -26,6 +27,10 @@ class MultiScaleFlipAug:
             dict(type='Collect', keys=['img']),
         ]
 
+    The transforms before ``RandomFlip`` (here ``Resize``) are applied once
+    per scale and their results are shared by all flips of the scale, so
+    they must not depend on the flipping.
+
     After MultiScaleFLipAug with above configuration, the results are wrapped
     into lists of the same length as followed:
 
@@ -92,20 +97,65 @@ class MultiScaleFlipAug:
            dict[str: list]: The augmented data, where each value is wrapped
                into a list.
         """
+        transforms = self.transforms.transforms
+        num_shared = self._num_shared()
+        if not self.flip or num_shared == 0:
+            aug_data = [
+                self.transforms(_results)
+                for _results in self._augment(results)
+            ]
+            return self._merge(aug_data)
 
         aug_data = []
+        for scale in self.img_scale:
+            _results = results.copy()
+            _results[self.scale_key] = scale
+            # e.g. resize once for all flips
+            _results = self._apply(transforms[:num_shared], _results)
+            for flip, direction in self._flip_args():
+                flip_results = _results.copy()
+                flip_results['flip'] = flip
+                flip_results['flip_direction'] = direction
+                aug_data.append(
+                    self._apply(transforms[num_shared:], flip_results))
+        return self._merge(aug_data)
+
+    def _num_shared(self):
+        """Number of transforms before ``RandomFlip``, 0 without it."""
+        for i, t in enumerate(self.transforms.transforms):
+            if isinstance(t, RandomFlip):
+                return i
+        return 0
+
+    @staticmethod
+    def _apply(transforms, results):
+        for t in transforms:
+            results = t(results)
+            if results is None:
+                return None
+        return results
+
+    def _flip_args(self):
         flip_args = [(False, None)]
         if self.flip:
             flip_args += [(True, direction)
                           for direction in self.flip_direction]
+        return flip_args
+
+    def _augment(self, results):
+        """Return a shallow copy of the results for each augmentation."""
+        aug_results = []
         for scale in self.img_scale:
-            for flip, direction in flip_args:
+            for flip, direction in self._flip_args():
                 _results = results.copy()
                 _results[self.scale_key] = scale
                 _results['flip'] = flip
                 _results['flip_direction'] = direction
-                data = self.transforms(_results)
-                aug_data.append(data)
+                aug_results.append(_results)
+        return aug_results
+
+    @staticmethod
+    def _merge(aug_data):
         # list of dict to dict of list
         aug_data_dict = {key: [] for key in aug_data[0]}
         for data in aug_data:
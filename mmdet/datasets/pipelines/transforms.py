@@ -204,6 +204,28 @@ class Resize:
         results['scale'] = scale
         results['scale_idx'] = scale_idx
 
+    def _set_scale(self, results):
+        """Set ``results['scale']`` from the given ``scale`` or
+        ``scale_factor``, or by random sampling."""
+        if 'scale' not in results:
+            if 'scale_factor' in results:
+                img_shape = results['img'].shape[:2]
+                scale_factor = results['scale_factor']
+                assert isinstance(scale_factor, float)
+                results['scale'] = tuple(
+                    [int(x * scale_factor) for x in img_shape][::-1])
+            else:
+                self._random_scale(results)
+        else:
+            if not self.override:
+                assert 'scale_factor' not in results, (
+                    'scale and scale_factor cannot be both set.')
+            else:
+                results.pop('scale')
+                if 'scale_factor' in results:
+                    results.pop('scale_factor')
+                self._random_scale(results)
+
     def _resize_img(self, results):
         """Resize images with ``results['scale']``."""
         for key in results.get('img_fields', ['img']):
@@ -284,25 +306,7 @@ class Resize:
                 'keep_ratio' keys are added into result dict.
         """
 
-        if 'scale' not in results:
-            if 'scale_factor' in results:
-                img_shape = results['img'].shape[:2]
-                scale_factor = results['scale_factor']
-                assert isinstance(scale_factor, float)
-                results['scale'] = tuple(
-                    [int(x * scale_factor) for x in img_shape][::-1])
-            else:
-                self._random_scale(results)
-        else:
-            if not self.override:
-                assert 'scale_factor' not in results, (
-                    'scale and scale_factor cannot be both set.')
-            else:
-                results.pop('scale')
-                if 'scale_factor' in results:
-                    results.pop('scale_factor')
-                self._random_scale(results)
-
+        self._set_scale(results)
         self._resize_img(results)
         self._resize_bboxes(results)
         self._resize_masks(results)
@@ -417,6 +421,28 @@ class RandomFlip:
             raise ValueError(f"Invalid flipping direction '{direction}'")
         return flipped
 
+    def _choose_direction(self):
+        """Randomly choose a flip direction, None means no flipping."""
+        if isinstance(self.direction, list):
+            # None means non-flip
+            direction_list = self.direction + [None]
+        else:
+            # None means non-flip
+            direction_list = [self.direction, None]
+
+        if isinstance(self.flip_ratio, list):
+            non_flip_ratio = 1 - sum(self.flip_ratio)
+            flip_ratio_list = self.flip_ratio + [non_flip_ratio]
+        else:
+            non_flip_ratio = 1 - self.flip_ratio
+            # exclude non-flip
+            single_ratio = self.flip_ratio / (len(direction_list) - 1)
+            flip_ratio_list = [single_ratio] * (len(direction_list) - 1) + [
+                non_flip_ratio
+            ]
+
+        return np.random.choice(direction_list, p=flip_ratio_list)
+
     def __call__(self, results):
         """Call function to flip bounding boxes, masks, semantic segmentation
         maps.
@@ -430,25 +456,7 @@ class RandomFlip:
         """
 
         if 'flip' not in results:
-            if isinstance(self.direction, list):
-                # None means non-flip
-                direction_list = self.direction + [None]
-            else:
-                # None means non-flip
-                direction_list = [self.direction, None]
-
-            if isinstance(self.flip_ratio, list):
-                non_flip_ratio = 1 - sum(self.flip_ratio)
-                flip_ratio_list = self.flip_ratio + [non_flip_ratio]
-            else:
-                non_flip_ratio = 1 - self.flip_ratio
-                # exclude non-flip
-                single_ratio = self.flip_ratio / (len(direction_list) - 1)
-                flip_ratio_list = [single_ratio] * (len(direction_list) -
-                                                    1) + [non_flip_ratio]
-
-            cur_dir = np.random.choice(direction_list, p=flip_ratio_list)
-
+            cur_dir = self._choose_direction()
             results['flip'] = cur_dir is not None
         if 'flip_direction' not in results:
             results['flip_direction'] = cur_dir
@@ -949,6 +957,14 @@ class PhotoMetricDistortion:
     7. random contrast (mode 1)
     8. randomly swap channels
 
+    The input image is either float32 or uint8. The random parameters are
+    sampled in the same way for both, but uint8 images are distorted with
+    lookup tables: brightness and contrast are one table lookup and
+    saturation and hue are one lookup on the HSV image, which is faster and
+    needs a quarter of the memory of the float32 passes. The results are
+    clipped to [0, 255] and quantized after each lookup, and the HSV
+    conversion is skipped if neither saturation nor hue is changed.
+
     Args:
         brightness_delta (int): delta of brightness.
         contrast_range (tuple): range of contrast.
@@ -980,9 +996,12 @@ class PhotoMetricDistortion:
             assert results['img_fields'] == ['img'], \
                 'Only single img_fields is allowed'
         img = results['img']
+        if img.dtype == np.uint8:
+            results['img'] = self._distort_uint8(img)
+            return results
         assert img.dtype == np.float32, \
             'PhotoMetricDistortion needs the input image of dtype ' \
-            'np.float32, please set "to_float32=True" in ' \
+            'np.float32 or np.uint8, please set "to_float32=True" in ' \
             '"LoadImageFromFile" pipeline'
         # random brightness
         if random.randint(2):
@@ -1030,6 +1049,73 @@ class PhotoMetricDistortion:
         results['img'] = img
         return results
 
+    @staticmethod
+    def _lookup(img, table):
+        """Map the values of an uint8 image with a float table of 256
+        values (per channel)."""
+        table = np.clip(np.round(table), 0, 255).astype(np.uint8)
+        return cv2.LUT(img, table)
+
+    def _distort_uint8(self, img):
+        """Distort an uint8 image with the random parameters sampled in the
+        same order as in :meth:`__call__`."""
+        values = np.arange(256, dtype=np.float32)
+        # lookup table of the values before the HSV conversion
+        table = values
+        if random.randint(2):
+            delta = random.uniform(-self.brightness_delta,
+                                   self.brightness_delta)
+            table = table + delta
+
+        mode = random.randint(2)
+        if mode == 1:
+            if random.randint(2):
+                alpha = random.uniform(self.contrast_lower,
+                                       self.contrast_upper)
+                table = table * alpha
+
+        saturation = hue = None
+        if random.randint(2):
+            saturation = random.uniform(self.saturation_lower,
+                                        self.saturation_upper)
+        if random.randint(2):
+            hue = random.uniform(-self.hue_delta, self.hue_delta)
+
+        alpha = None
+        if mode == 0:
+            if random.randint(2):
+                alpha = random.uniform(self.contrast_lower,
+                                       self.contrast_upper)
+
+        if saturation is None and hue is None:
+            # the HSV conversion and back is the identity
+            if alpha is not None:
+                table = table * alpha
+            if not np.array_equal(table, values):
+                img = self._lookup(img, table)
+        else:
+            if not np.array_equal(table, values):
+                img = self._lookup(img, table)
+            # the hue of uint8 images is in [0, 180), in units of 2 degrees
+            hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
+            hue_table = values
+            if hue is not None:
+                hue_table = np.round(values + hue / 2) % 180
+            saturation_table = values
+            if saturation is not None:
+                saturation_table = values * saturation
+            hsv = self._lookup(
+                hsv,
+                np.stack([hue_table, saturation_table, values], axis=-1)[None])
+            img = cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)
+            if alpha is not None:
+                img = self._lookup(img, values * alpha)
+
+        # randomly swap channels
+        if random.randint(2):
+            img = img[..., random.permutation(3)]
+        return img
+
     def __repr__(self):
         repr_str = self.__class__.__name__
         repr_str += f'(\nbrightness_delta={self.brightness_delta},\n'
@@ -2058,10 +2144,11 @@ class Mosaic:
 
         loc_strs = ('top_left', 'top_right', 'bottom_left', 'bottom_right')
         for i, loc in enumerate(loc_strs):
+            # the patches are not modified, the mix results may be cached
             if loc == 'top_left':
-                results_patch = copy.deepcopy(results)
+                results_patch = results
             else:
-                results_patch = copy.deepcopy(results['mix_results'][i - 1])
+                results_patch = results['mix_results'][i - 1]
 
             img_i = results_patch['img']
             h_i, w_i = img_i.shape[:2]
@@ -2081,7 +2168,7 @@ class Mosaic:
             mosaic_img[y1_p:y2_p, x1_p:x2_p] = img_i[y1_c:y2_c, x1_c:x2_c]
 
             # adjust coordinate
-            gt_bboxes_i = results_patch['gt_bboxes']
+            gt_bboxes_i = results_patch['gt_bboxes'].copy()
             gt_labels_i = results_patch['gt_labels']
 
             if gt_bboxes_i.shape[0] > 0:
@@ -2363,7 +2450,7 @@ class MixUp:
                                         x_offset:x_offset + target_w]
 
         # 6. adjust bbox
-        retrieve_gt_bboxes = retrieve_results['gt_bboxes']
+        retrieve_gt_bboxes = retrieve_results['gt_bboxes'].copy()
         retrieve_gt_bboxes[:, 0::2] = np.clip(
             retrieve_gt_bboxes[:, 0::2] * scale_ratio, 0, origin_w)
         retrieve_gt_bboxes[:, 1::2] = np.clip(
@@ -2485,15 +2572,23 @@ class RandomAffine:
         self.min_area_ratio = min_area_ratio
         self.max_aspect_ratio = max_aspect_ratio
 
-    def __call__(self, results):
-        img = results['img']
-        height = img.shape[0] + self.border[0] * 2
-        width = img.shape[1] + self.border[1] * 2
+    def _get_random_homography_matrix(self, height, width):
+        """Randomly sample the warp matrix of an image.
+
+        Args:
+            height (int): Height of the input image.
+            width (int): Width of the input image.
 
+        Returns:
+            tuple[np.ndarray, float]: The 3x3 warp matrix and the sampled
+                scaling ratio.
+        """
         # Center
         center_matrix = np.eye(3, dtype=np.float32)
-        center_matrix[0, 2] = -img.shape[1] / 2  # x translation (pixels)
-        center_matrix[1, 2] = -img.shape[0] / 2  # y translation (pixels)
+        center_matrix[0, 2] = -width / 2  # x translation (pixels)
+        center_matrix[1, 2] = -height / 2  # y translation (pixels)
+        height = height + self.border[0] * 2
+        width = width + self.border[1] * 2
 
         # Rotation
         rotation_degree = random.uniform(-self.max_rotate_degree,
@@ -2522,6 +2617,14 @@ class RandomAffine:
         warp_matrix = (
             translate_matrix @ shear_matrix @ rotation_matrix @ scaling_matrix
             @ center_matrix)
+        return warp_matrix, scaling_ratio
+
+    def __call__(self, results):
+        img = results['img']
+        height = img.shape[0] + self.border[0] * 2
+        width = img.shape[1] + self.border[1] * 2
+        warp_matrix, scaling_ratio = self._get_random_homography_matrix(
+            img.shape[0], img.shape[1])
 
         img = cv2.warpPerspective(
             img,
@@ -0,0 +1,206 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import queue
+import threading
+import time
+
+import torch
+from mmcv.parallel import DataContainer as DC
+
+
+def _stage(data, pin_memory=False, device=None):
+    """Pin and/or copy the tensors of a collated batch to ``device``.
+
+    ``DataContainer`` is not understood by the pinning logic of PyTorch, so
+    the batch is walked here instead. The contents of ``cpu_only`` containers
+    (e.g. ``img_metas``) are left untouched.
+    """
+    if isinstance(data, torch.Tensor):
+        if pin_memory and not data.is_pinned():
+            data = data.pin_memory()
+        if device is not None:
+            data = data.to(device, non_blocking=True)
+        return data
+    elif isinstance(data, DC):
+        if data.cpu_only:
+            return data
+        return DC(
+            _stage(data.data, pin_memory, device),
+            stack=data.stack,
+            padding_value=data.padding_value,
+            cpu_only=data.cpu_only,
+            pad_dims=data.pad_dims)
+    elif isinstance(data, dict):
+        return type(data)({
+            k: _stage(v, pin_memory, device)
+            for k, v in data.items()
+        })
+    elif isinstance(data, (list, tuple)):
+        return type(data)(_stage(v, pin_memory, device) for v in data)
+    return data
+
+
+def _record_stream(data, stream):
+    if isinstance(data, torch.Tensor):
+        if data.is_cuda:
+            data.record_stream(stream)
+    elif isinstance(data, DC):
+        _record_stream(data.data, stream)
+    elif isinstance(data, dict):
+        for v in data.values():
+            _record_stream(v, stream)
+    elif isinstance(data, (list, tuple)):
+        for v in data:
+            _record_stream(v, stream)
+
+
+class DataPrefetcher:
+    """Load batches of a dataloader in a background thread.
+
+    While the current iteration runs, the next ``num_prefetch`` batches are
+    fetched from the wrapped dataloader, their tensors are copied to pinned
+    memory and, if ``device`` is given, to the device on a side CUDA stream.
+    The model then receives batches whose ``DataContainer`` contents already
+    live on the device, and the scatter of ``MMDataParallel`` or
+    ``MMDistributedDataParallel`` becomes a no-op for them.
+
+    Without CUDA the batches are prefetched as they are, so the same config
+    can be used for testing on CPU.
+
+    Other attributes (``dataset``, ``sampler``, ``batch_size``, ...) are
+    looked up on the wrapped dataloader, so the prefetcher can be used by the
+    runners and hooks in place of it.
+
+    Args:
+        data_loader (DataLoader): The dataloader to wrap.
+        pin_memory (bool): Whether to copy the batches to pinned memory.
+            Default: True.
+        device (int | str | torch.device, optional): Device to stage the
+            batches on. Only one device per process is supported, i.e.
+            distributed training or non-distributed training with one GPU.
+            Default: None.
+        num_prefetch (int): Number of batches to load ahead. Default: 1.
+
+    Attributes:
+        data_wait_time (float): Seconds the last batch was waited for, i.e.
+            the time the consumer was blocked by data loading.
+    """
+
+    def __init__(self,
+                 data_loader,
+                 pin_memory=True,
+                 device=None,
+                 num_prefetch=1):
+        assert num_prefetch >= 1
+        self.data_loader = data_loader
+        cuda = torch.cuda.is_available()
+        self.pin_memory = pin_memory and cuda
+        if device is not None and cuda:
+            device = torch.device(device)
+            assert device.type == 'cuda', \
+                f'Batches can only be staged on CUDA devices, got {device}'
+            if device.index is None:
+                device = torch.device('cuda', torch.cuda.current_device())
+        else:
+            device = None
+        self.device = device
+        self.num_prefetch = num_prefetch
+        self.data_wait_time = 0.
+        self._iterator = None
+
+    def __len__(self):
+        return len(self.data_loader)
+
+    def __getattr__(self, name):
+        # only called for attributes that are not found on the prefetcher
+        if name == 'data_loader':
+            raise AttributeError(name)
+        return getattr(self.data_loader, name)
+
+    def __iter__(self):
+        # An epoch may be left early. Its loop has to finish before the next
+        # one starts since persistent workers share one DataLoader iterator.
+        if self._iterator is not None:
+            self._iterator.stop()
+        self._iterator = _PrefetchIterator(self)
+        return self._iterator
+
+
+_END = object()
+
+
+def _put(out_queue, done, item):
+    # give up if the consumer has been discarded
+    while not done.is_set():
+        try:
+            out_queue.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _prefetch_loop(data_loader, out_queue, done, pin_memory, device):
+    # The loop must not reference the consumer, otherwise a consumer that
+    # stops early would never be collected and the loop would never end.
+    stream = None
+    if device is not None:
+        torch.cuda.set_device(device)
+        stream = torch.cuda.Stream(device)
+    try:
+        for data in data_loader:
+            event = None
+            if stream is not None:
+                with torch.cuda.stream(stream):
+                    data = _stage(data, pin_memory, device)
+                    event = torch.cuda.Event()
+                    event.record(stream)
+            elif pin_memory:
+                data = _stage(data, pin_memory=True)
+            if not _put(out_queue, done, (data, event, None)):
+                return
+    except Exception as e:
+        _put(out_queue, done, (None, None, e))
+        return
+    _put(out_queue, done, (_END, None, None))
+
+
+class _PrefetchIterator:
+
+    def __init__(self, prefetcher):
+        self.prefetcher = prefetcher
+        self.queue = queue.Queue(maxsize=prefetcher.num_prefetch)
+        self.done = threading.Event()
+        self.thread = threading.Thread(
+            target=_prefetch_loop,
+            args=(prefetcher.data_loader, self.queue, self.done,
+                  prefetcher.pin_memory, prefetcher.device),
+            daemon=True)
+        self.thread.start()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.done.is_set():
+            raise StopIteration
+        start = time.perf_counter()
+        data, event, error = self.queue.get()
+        self.prefetcher.data_wait_time = time.perf_counter() - start
+        if error is not None:
+            self.done.set()
+            raise error
+        if data is _END:
+            self.done.set()
+            raise StopIteration
+        if event is not None:
+            current_stream = torch.cuda.current_stream(self.prefetcher.device)
+            current_stream.wait_event(event)
+            _record_stream(data, current_stream)
+        return data
+
+    def stop(self):
+        self.done.set()
+        self.thread.join()
+
+    def __del__(self):
+        self.done.set()
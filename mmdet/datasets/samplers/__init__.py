@@ -1,5 +1,11 @@
 # Copyright (c) OpenMMLab. All rights reserved.
+from .bucket_sampler import (AspectRatioBucketSampler, get_img_shapes,
+                             padding_efficiency, rescale_shapes)
 from .distributed_sampler import DistributedSampler
 from .group_sampler import DistributedGroupSampler, GroupSampler
 
-__all__ = ['DistributedSampler', 'DistributedGroupSampler', 'GroupSampler']
+__all__ = [
+    'DistributedSampler', 'DistributedGroupSampler', 'GroupSampler',
+    'AspectRatioBucketSampler', 'get_img_shapes', 'padding_efficiency',
+    'rescale_shapes'
+]
@@ -0,0 +1,221 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import math
+
+import numpy as np
+import torch
+from mmcv.runner import get_dist_info
+from torch.utils.data import Sampler
+
+from mmdet.utils import get_root_logger
+
+
+def get_img_shapes(dataset):
+    """Get the (height, width) of all images of a (wrapped) dataset.
+
+    Args:
+        dataset (Dataset): A dataset with ``width`` and ``height`` in its
+            ``data_infos``, or :obj:`ConcatDataset`, :obj:`RepeatDataset`,
+            :obj:`ClassBalancedDataset` or :obj:`MultiImageMixDataset` of
+            such datasets.
+
+    Returns:
+        np.ndarray: Array of shape (len(dataset), 2).
+    """
+    if hasattr(dataset, 'datasets'):
+        return np.concatenate([get_img_shapes(ds) for ds in dataset.datasets])
+    elif hasattr(dataset, 'times'):
+        return np.tile(get_img_shapes(dataset.dataset), (dataset.times, 1))
+    elif hasattr(dataset, 'repeat_indices'):
+        return get_img_shapes(dataset.dataset)[dataset.repeat_indices]
+    elif hasattr(dataset, 'dataset'):
+        return get_img_shapes(dataset.dataset)
+    assert hasattr(dataset, 'data_infos'), \
+        f'Cannot get the image shapes of {dataset.__class__.__name__}'
+    return np.array([[info['height'], info['width']]
+                     for info in dataset.data_infos],
+                    dtype=np.float64).reshape(-1, 2)
+
+
+def rescale_shapes(shapes, img_scale):
+    """Rescale image shapes like ``Resize`` with ``keep_ratio=True``.
+
+    Args:
+        shapes (np.ndarray): Image shapes (height, width) of shape (N, 2).
+        img_scale (tuple[int]): The target scale (long edge, short edge).
+
+    Returns:
+        np.ndarray: The rescaled shapes.
+    """
+    max_long_edge, max_short_edge = max(img_scale), min(img_scale)
+    long_edge = shapes.max(axis=1)
+    short_edge = shapes.min(axis=1)
+    scale_factor = np.minimum(max_long_edge / long_edge,
+                              max_short_edge / short_edge)
+    return np.floor(shapes * scale_factor[:, None] + 0.5)
+
+
+def padding_efficiency(shapes, indices, samples_per_gpu, size_divisor=32):
+    """Compute the fraction of the padded batches taken by the images.
+
+    Args:
+        shapes (np.ndarray): Image shapes (height, width) of shape (N, 2).
+        indices (list[int]): Sampled indices, consecutive groups of
+            ``samples_per_gpu`` form a batch.
+        samples_per_gpu (int): Batch size.
+        size_divisor (int): The padded shapes are multiples of it, like in
+            ``Pad``. Default: 32.
+
+    Returns:
+        float: Sum of the image areas divided by the sum of the padded batch
+            areas.
+    """
+    num_batches = len(indices) // samples_per_gpu
+    if num_batches == 0:
+        return 1.
+    indices = np.asarray(indices[:num_batches * samples_per_gpu])
+    batch_shapes = shapes[indices].reshape(num_batches, samples_per_gpu, 2)
+    padded = np.ceil(batch_shapes.max(axis=1) / size_divisor) * size_divisor
+    return float(
+        batch_shapes.prod(axis=2).sum() /
+        (padded.prod(axis=1).sum() * samples_per_gpu))
+
+
+class AspectRatioBucketSampler(Sampler):
+    """Sampler that batches images of similar aspect ratios and sizes.
+
+    Unlike :class:`GroupSampler` and :class:`DistributedGroupSampler`, which
+    only split the images into landscape and portrait ones, the images are
+    divided into ``num_ratio_buckets`` aspect ratio buckets and each of them
+    into ``num_size_buckets`` area buckets. The bucket boundaries are
+    quantiles, so the buckets are about equally populated. Every batch is
+    drawn from a single bucket, which reduces the padding of the batches.
+
+    The order only depends on ``seed`` and the epoch. Like
+    :class:`DistributedGroupSampler`, the buckets are padded by repeating
+    images so that every process gets the same number of whole batches.
+    If :meth:`set_epoch` is not called, the epoch is advanced at the end of
+    every iteration.
+
+    After each iteration, the padding efficiency (image area / padded batch
+    area) of the batches of this process is stored in
+    ``self.padding_efficiency`` and logged.
+
+    Args:
+        dataset (Dataset): Dataset used for sampling, see
+            :func:`get_img_shapes`.
+        samples_per_gpu (int): Batch size of each process. Default: 1.
+        num_replicas (int, optional): Number of processes participating in
+            distributed training. Default: None.
+        rank (int, optional): Rank of the current process. Default: None.
+        seed (int): Random seed, identical across all processes.
+            Default: 0.
+        num_ratio_buckets (int): Number of aspect ratio buckets. Default: 8.
+        num_size_buckets (int): Number of area buckets in each aspect ratio
+            bucket. Default: 1.
+        img_scale (tuple[int], optional): If the pipeline resizes the images
+            to a fixed scale with ``keep_ratio=True``, the scale can be given
+            to bucket and report the padding of the resized images.
+            Default: None.
+        size_divisor (int): Size divisor of ``Pad``, only used to report the
+            padding efficiency. Default: 32.
+    """
+
+    def __init__(self,
+                 dataset,
+                 samples_per_gpu=1,
+                 num_replicas=None,
+                 rank=None,
+                 seed=0,
+                 num_ratio_buckets=8,
+                 num_size_buckets=1,
+                 img_scale=None,
+                 size_divisor=32):
+        _rank, _num_replicas = get_dist_info()
+        if num_replicas is None:
+            num_replicas = _num_replicas
+        if rank is None:
+            rank = _rank
+        self.dataset = dataset
+        self.samples_per_gpu = samples_per_gpu
+        self.num_replicas = num_replicas
+        self.rank = rank
+        self.epoch = 0
+        self._epoch_set = False
+        self.seed = seed if seed is not None else 0
+        self.size_divisor = size_divisor
+        self.padding_efficiency = None
+
+        shapes = get_img_shapes(dataset)
+        assert len(shapes) == len(dataset)
+        if img_scale is not None:
+            shapes = rescale_shapes(shapes, img_scale)
+        self.shapes = shapes
+
+        self.flag = self._bucket(shapes, num_ratio_buckets, num_size_buckets)
+        self.bucket_sizes = np.bincount(self.flag)
+        group_size = self.samples_per_gpu * self.num_replicas
+        self.total_size = sum(
+            int(math.ceil(size / group_size)) * group_size
+            for size in self.bucket_sizes if size > 0)
+        self.num_samples = self.total_size // self.num_replicas
+
+    @staticmethod
+    def _bucket(shapes, num_ratio_buckets, num_size_buckets):
+        log_ratios = np.log(shapes[:, 1] / shapes[:, 0])
+        areas = shapes.prod(axis=1)
+        quantiles = np.linspace(0, 1, num_ratio_buckets + 1)[1:-1]
+        ratio_ids = np.searchsorted(
+            np.quantile(log_ratios, quantiles), log_ratios, side='right')
+        flag = np.zeros(len(shapes), dtype=np.int64)
+        quantiles = np.linspace(0, 1, num_size_buckets + 1)[1:-1]
+        for ratio_id in np.unique(ratio_ids):
+            inds = np.where(ratio_ids == ratio_id)[0]
+            size_ids = np.searchsorted(
+                np.quantile(areas[inds], quantiles), areas[inds], side='right')
+            flag[inds] = ratio_id * num_size_buckets + size_ids
+        return flag
+
+    def __iter__(self):
+        # deterministically shuffle based on epoch
+        g = torch.Generator()
+        g.manual_seed(self.epoch + self.seed)
+
+        group_size = self.samples_per_gpu * self.num_replicas
+        indices = []
+        for i, size in enumerate(self.bucket_sizes):
+            if size == 0:
+                continue
+            indice = np.where(self.flag == i)[0]
+            indice = indice[torch.randperm(int(size), generator=g).numpy()]
+            # pad the bucket by repeating its images
+            extra = int(math.ceil(size / group_size)) * group_size - size
+            indice = np.concatenate(
+                [np.tile(indice, extra // size + 1), indice[:extra % size]])
+            indices.append(indice)
+        indices = np.concatenate(indices)
+        assert len(indices) == self.total_size
+
+        batches = indices.reshape(-1, self.samples_per_gpu)
+        batches = batches[torch.randperm(len(batches), generator=g).numpy()]
+
+        # subsample
+        offset = self.num_samples * self.rank
+        indices = batches.reshape(-1)[offset:offset + self.num_samples]
+        assert len(indices) == self.num_samples
+
+        self.padding_efficiency = padding_efficiency(self.shapes, indices,
+                                                     self.samples_per_gpu,
+                                                     self.size_divisor)
+        get_root_logger().info(
+            f'Padding efficiency of the batches of epoch {self.epoch}: '
+            f'{self.padding_efficiency:.3f}')
+        if not self._epoch_set:
+            self.epoch += 1
+        return iter(indices.tolist())
+
+    def __len__(self):
+        return self.num_samples
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+        self._epoch_set = True
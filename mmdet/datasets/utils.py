@@ -7,6 +7,9 @@ from mmcv.runner.hooks import HOOKS, Hook
 
 from mmdet.datasets.builder import PIPELINES
 from mmdet.datasets.pipelines import LoadAnnotations, LoadImageFromFile
+from mmdet.datasets.pipelines.image_cache import SharedImageCache
+from mmdet.datasets.pipelines.profiler import format_profile
+from mmdet.datasets.prefetcher import DataPrefetcher
 from mmdet.models.dense_heads import GARPNHead, RPNHead
 from mmdet.models.roi_heads.mask_heads import FusedSemanticHead
 
@@ -162,3 +165,238 @@ class NumClassCheckHook(Hook):
             runner (obj:`EpochBasedRunner`): Epoch based Runner.
         """
         self._check_head(runner)
+
+
+def get_pipeline_transforms(dataset):
+    """Collect the transforms of all pipelines used by a dataset.
+
+    Dataset wrappers (e.g. :obj:`RepeatDataset`, :obj:`ConcatDataset` and
+    :obj:`MultiImageMixDataset`) are unwrapped and nested transforms such as
+    the ones in :obj:`MultiScaleFlipAug` are included.
+
+    Args:
+        dataset (:obj:`Dataset`): The (wrapped) dataset.
+
+    Returns:
+        list: The transform objects.
+    """
+
+    def _expand(transforms):
+        if hasattr(transforms, 'transforms'):
+            transforms = transforms.transforms
+        for transform in transforms:
+            yield transform
+            if hasattr(transform, 'transforms'):
+                yield from _expand(transform.transforms)
+
+    transforms = []
+    if hasattr(dataset, 'datasets'):
+        for ds in dataset.datasets:
+            transforms.extend(get_pipeline_transforms(ds))
+    if hasattr(dataset, 'dataset'):
+        transforms.extend(get_pipeline_transforms(dataset.dataset))
+    if getattr(dataset, 'pipeline', None) is not None:
+        transforms.extend(_expand(dataset.pipeline))
+    return transforms
+
+
+def _get_pipelines(dataset):
+    """Return the :obj:`Compose` pipelines used by a dataset and the
+    wrappers that apply their transforms themselves, e.g.
+    :obj:`MultiImageMixDataset`, which can be profiled like a pipeline."""
+    pipelines = []
+    if hasattr(dataset, 'datasets'):
+        for ds in dataset.datasets:
+            pipelines.extend(_get_pipelines(ds))
+    if hasattr(dataset, 'dataset'):
+        pipelines.extend(_get_pipelines(dataset.dataset))
+    pipeline = getattr(dataset, 'pipeline', None)
+    if hasattr(pipeline, 'enable_profiling'):
+        pipelines.append(pipeline)
+    elif hasattr(dataset, 'enable_profiling'):
+        pipelines.append(dataset)
+    return pipelines
+
+
+def enable_pipeline_profiling(dataset, flush_interval=1.):
+    """Profile the transforms of all pipelines used by a dataset.
+
+    It must be called before the dataloader workers are started. Only the
+    top level transforms are profiled, e.g. the time of the transforms in
+    :obj:`MultiScaleFlipAug` is counted as its time.
+
+    Args:
+        dataset (:obj:`Dataset`): The (wrapped) dataset.
+        flush_interval (float): Interval (in seconds) for the workers to
+            report their counters. Default: 1.
+
+    Returns:
+        list[:obj:`PipelineProfiler`]: The profilers of the pipelines.
+    """
+    return [
+        pipeline.enable_profiling(flush_interval)
+        for pipeline in _get_pipelines(dataset)
+    ]
+
+
+def get_pipeline_profilers(dataset):
+    """Return the profilers of the pipelines used by a dataset.
+
+    Args:
+        dataset (:obj:`Dataset`): The (wrapped) dataset.
+
+    Returns:
+        list[:obj:`PipelineProfiler`]: The profilers of the profiled
+            pipelines.
+    """
+    return [
+        pipeline.profiler for pipeline in _get_pipelines(dataset)
+        if getattr(pipeline, 'profiler', None) is not None
+    ]
+
+
+def enable_pipeline_cache(dataset, cache_dir):
+    """Cache the deterministic prefix of the pipelines used by a dataset.
+
+    It is meant for test pipelines, whose loading, resizing and flipping
+    only depend on the image, see :class:`PipelineCache`.
+
+    Args:
+        dataset (:obj:`Dataset`): The (wrapped) dataset.
+        cache_dir (str): The directory of the cache.
+
+    Returns:
+        list[:obj:`PipelineCache`]: The caches of the pipelines that start
+            with cacheable transforms.
+    """
+    caches = [
+        pipeline.enable_cache(cache_dir)
+        for pipeline in _get_pipelines(dataset)
+        if hasattr(pipeline, 'enable_cache')
+    ]
+    return [cache for cache in caches if cache is not None]
+
+
+@HOOKS.register_module()
+class ImageCacheHook(Hook):
+    """Report the counters of the shared image caches in the runner log.
+
+    The caches are the :obj:`SharedImageCache` instances of the transforms in
+    the training pipeline, e.g. ``LoadImageFromFile`` with ``cache_cfg``.
+    The hit rate since the start of training and the used memory (in MB) are
+    added to the log buffer as ``cache_hit_rate`` and ``cache_mem``.
+
+    Args:
+        interval (int): The interval (in iterations) to query the counters.
+            It is best set to the interval of the logger hooks.
+            Default: 50.
+    """
+
+    def __init__(self, interval=50):
+        self.interval = interval
+        self._caches = None
+        self._log_vars = {}
+
+    def _find_caches(self, runner):
+        self._caches = []
+        for transform in get_pipeline_transforms(runner.data_loader.dataset):
+            cache = getattr(transform, 'cache', None)
+            if isinstance(cache, SharedImageCache) and \
+                    cache not in self._caches:
+                self._caches.append(cache)
+        if not self._caches:
+            runner.logger.warning('ImageCacheHook is registered but no '
+                                  'SharedImageCache is found in the '
+                                  'training pipeline.')
+
+    def after_train_iter(self, runner):
+        if self._caches is None:
+            self._find_caches(runner)
+        if not self._caches:
+            return
+        if not self._log_vars or self.every_n_iters(runner, self.interval):
+            hits, misses, used_bytes = 0, 0, 0
+            for cache in self._caches:
+                stats = cache.stats()
+                hits += stats['hits']
+                misses += stats['misses']
+                used_bytes += stats['used_bytes']
+            self._log_vars = dict(
+                cache_hit_rate=hits / max(hits + misses, 1),
+                cache_mem=used_bytes / 1024 / 1024)
+        # update every iteration so that the averaged value in the log is
+        # the latest one
+        runner.log_buffer.update(self._log_vars)
+
+
+@HOOKS.register_module()
+class DataWaitTimeHook(Hook):
+    """Report how long the iterations wait for the :obj:`DataPrefetcher`.
+
+    The time (in seconds) the runner was blocked by data loading before each
+    iteration is added to the log buffer as ``data_wait``. Unlike
+    ``data_time``, it does not include the host to device copies and the
+    work of the other hooks, so it drops to zero when the dataloader keeps
+    up with the model.
+    """
+
+    def after_train_iter(self, runner):
+        # IterBasedRunner wraps the dataloader in an IterLoader
+        data_loader = getattr(runner.data_loader, '_dataloader',
+                              runner.data_loader)
+        if isinstance(data_loader, DataPrefetcher):
+            runner.log_buffer.update(
+                dict(data_wait=data_loader.data_wait_time))
+
+
+@HOOKS.register_module()
+class PipelineProfileHook(Hook):
+    """Report the most expensive transforms of the training pipelines.
+
+    The pipelines must be profiled, e.g. by ``profile_pipeline=True`` in
+    ``data.train_dataloader`` or :func:`enable_pipeline_profiling`. Every
+    ``interval`` iterations, the ``topk`` transforms with the largest total
+    time in the interval are logged with their time per call, drop rate and
+    the mean size of their input and output images, summed over all
+    dataloader workers.
+
+    Args:
+        interval (int): The logging interval (in iterations). It is best set
+            to the interval of the logger hooks. Default: 50.
+        topk (int): Number of transforms to report. Default: 5.
+    """
+
+    def __init__(self, interval=50, topk=5):
+        self.interval = interval
+        self.topk = topk
+        self._profilers = None
+        self._last_stats = {}
+
+    def _find_profilers(self, runner):
+        # IterBasedRunner wraps the dataloader in an IterLoader
+        data_loader = getattr(runner.data_loader, '_dataloader',
+                              runner.data_loader)
+        self._profilers = get_pipeline_profilers(data_loader.dataset)
+        if not self._profilers:
+            runner.logger.warning('PipelineProfileHook is registered but no '
+                                  'pipeline of the training set is '
+                                  'profiled.')
+
+    def after_train_iter(self, runner):
+        if self._profilers is None:
+            self._find_profilers(runner)
+        if not self._profilers or not self.every_n_iters(
+                runner, self.interval):
+            return
+        for i, profiler in enumerate(self._profilers):
+            stats = profiler.stats()
+            last_stats = self._last_stats.get(i)
+            self._last_stats[i] = stats
+            if last_stats is not None:
+                stats = [{
+                    key: value - last[key] if key != 'name' else value
+                    for key, value in s.items()
+                } for s, last in zip(stats, last_stats)]
+            runner.logger.info(
+                f'Pipeline cost of the last {self.interval} iterations '
+                f'(pipeline {i}):\n' + format_profile(stats, self.topk))
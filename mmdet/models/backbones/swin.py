@@ -11,6 +11,7 @@ from mmcv.cnn.bricks.transformer import FFN, build_dropout
 from mmcv.runner import BaseModule, ModuleList, _load_checkpoint
 from mmcv.utils import to_2tuple
 
+from mmdet.core import PriorCache
 from ...utils import get_root_logger
 from ..builder import BACKBONES
 from ..utils.ckpt_convert import swin_converter
@@ -65,6 +66,8 @@ class WindowMSA(BaseModule):
         rel_position_index = rel_index_coords + rel_index_coords.T
         rel_position_index = rel_position_index.flip(1).contiguous()
         self.register_buffer('relative_position_index', rel_position_index)
+        self._bias_cache = None
+        self._bias_cache_key = None
 
         self.qkv = nn.Linear(embed_dims, embed_dims * 3, bias=qkv_bias)
         self.attn_drop = nn.Dropout(attn_drop_rate)
@@ -93,13 +96,7 @@ class WindowMSA(BaseModule):
         q = q * self.scale
         attn = (q @ k.transpose(-2, -1))
 
-        relative_position_bias = self.relative_position_bias_table[
-            self.relative_position_index.view(-1)].view(
-                self.window_size[0] * self.window_size[1],
-                self.window_size[0] * self.window_size[1],
-                -1)  # Wh*Ww,Wh*Ww,nH
-        relative_position_bias = relative_position_bias.permute(
-            2, 0, 1).contiguous()  # nH, Wh*Ww, Wh*Ww
+        relative_position_bias = self.get_relative_position_bias()
         attn = attn + relative_position_bias.unsqueeze(0)
 
         if mask is not None:
@@ -116,6 +113,37 @@ class WindowMSA(BaseModule):
         x = self.proj_drop(x)
         return x
 
+    def get_relative_position_bias(self):
+        """Gather the relative position bias of the window.
+
+        The bias does not depend on the input, so it is kept while no
+        gradient of the table is needed, e.g. at inference, until the table
+        is modified or moved. Nothing is kept while tracing or exporting to
+        ONNX.
+
+        Returns:
+            Tensor: The bias of shape (nH, Wh*Ww, Wh*Ww).
+        """
+        table = self.relative_position_bias_table
+        needs_grad = torch.is_grad_enabled() and table.requires_grad
+        tracing = torch.onnx.is_in_onnx_export() or torch.jit.is_tracing()
+        cacheable = not needs_grad and not tracing
+        # the version of a tensor is bumped by in-place updates, e.g. when
+        # loading a checkpoint
+        key = (table.data_ptr(), table._version, table.device, table.dtype)
+        if cacheable and self._bias_cache_key == key:
+            return self._bias_cache
+
+        num_tokens = self.window_size[0] * self.window_size[1]
+        relative_position_bias = table[self.relative_position_index.view(
+            -1)].view(num_tokens, num_tokens, -1)  # Wh*Ww,Wh*Ww,nH
+        relative_position_bias = relative_position_bias.permute(
+            2, 0, 1).contiguous()  # nH, Wh*Ww, Wh*Ww
+        if cacheable:
+            self._bias_cache = relative_position_bias
+            self._bias_cache_key = key
+        return relative_position_bias
+
     @staticmethod
     def double_step_seq(step1, len1, step2, len2):
         seq1 = torch.arange(0, step1 * len1, step1)
@@ -142,6 +170,10 @@ class ShiftWindowMSA(BaseModule):
             Defaults: 0.
         dropout_layer (dict, optional): The dropout_layer used before output.
             Defaults: dict(type='DropPath', drop_prob=0.).
+        attn_mask_cache (:obj:`PriorCache`, optional): The cache of the
+            attention masks of the shifted windows, which may be shared by
+            the blocks of a stage. If None, the module has its own cache.
+            Default: None.
         init_cfg (dict, optional): The extra config for initialization.
             Default: None.
     """
@@ -156,12 +188,16 @@ class ShiftWindowMSA(BaseModule):
                  attn_drop_rate=0,
                  proj_drop_rate=0,
                  dropout_layer=dict(type='DropPath', drop_prob=0.),
+                 attn_mask_cache=None,
                  init_cfg=None):
         super().__init__(init_cfg)
 
         self.window_size = window_size
         self.shift_size = shift_size
         assert 0 <= self.shift_size < self.window_size
+        if attn_mask_cache is None:
+            attn_mask_cache = PriorCache()
+        self.attn_mask_cache = attn_mask_cache
 
         self.w_msa = WindowMSA(
             embed_dims=embed_dims,
@@ -194,28 +230,8 @@ class ShiftWindowMSA(BaseModule):
                 shifts=(-self.shift_size, -self.shift_size),
                 dims=(1, 2))
 
-            # calculate attention mask for SW-MSA
-            img_mask = torch.zeros((1, H_pad, W_pad, 1), device=query.device)
-            h_slices = (slice(0, -self.window_size),
-                        slice(-self.window_size,
-                              -self.shift_size), slice(-self.shift_size, None))
-            w_slices = (slice(0, -self.window_size),
-                        slice(-self.window_size,
-                              -self.shift_size), slice(-self.shift_size, None))
-            cnt = 0
-            for h in h_slices:
-                for w in w_slices:
-                    img_mask[:, h, w, :] = cnt
-                    cnt += 1
-
-            # nW, window_size, window_size, 1
-            mask_windows = self.window_partition(img_mask)
-            mask_windows = mask_windows.view(
-                -1, self.window_size * self.window_size)
-            attn_mask = mask_windows.unsqueeze(1) - mask_windows.unsqueeze(2)
-            attn_mask = attn_mask.masked_fill(attn_mask != 0,
-                                              float(-100.0)).masked_fill(
-                                                  attn_mask == 0, float(0.0))
+            # attention mask for SW-MSA
+            attn_mask = self.get_attn_mask(H_pad, W_pad, query.device)
         else:
             shifted_query = query
             attn_mask = None
@@ -251,6 +267,50 @@ class ShiftWindowMSA(BaseModule):
         x = self.drop(x)
         return x
 
+    def get_attn_mask(self, H_pad, W_pad, device):
+        """Get the attention mask of the shifted windows of a padded feature
+        map.
+
+        The mask only depends on the padded shape, the window, the shift and
+        the device, so it is looked up in :attr:`attn_mask_cache`.
+
+        Args:
+            H_pad (int): Height of the padded feature map.
+            W_pad (int): Width of the padded feature map.
+            device (torch.device): Device of the mask.
+
+        Returns:
+            Tensor: The mask of shape (nW, window_size**2, window_size**2),
+                of which the values are 0 or -100.
+        """
+        key = (H_pad, W_pad, self.window_size, self.shift_size, str(device))
+        return self.attn_mask_cache.get(
+            key, lambda: [self._compute_attn_mask(H_pad, W_pad, device)])[0]
+
+    def _compute_attn_mask(self, H_pad, W_pad, device):
+        img_mask = torch.zeros((1, H_pad, W_pad, 1), device=device)
+        h_slices = (slice(0, -self.window_size),
+                    slice(-self.window_size,
+                          -self.shift_size), slice(-self.shift_size, None))
+        w_slices = (slice(0, -self.window_size),
+                    slice(-self.window_size,
+                          -self.shift_size), slice(-self.shift_size, None))
+        cnt = 0
+        for h in h_slices:
+            for w in w_slices:
+                img_mask[:, h, w, :] = cnt
+                cnt += 1
+
+        # nW, window_size, window_size, 1
+        mask_windows = self.window_partition(img_mask)
+        mask_windows = mask_windows.view(-1,
+                                         self.window_size * self.window_size)
+        attn_mask = mask_windows.unsqueeze(1) - mask_windows.unsqueeze(2)
+        attn_mask = attn_mask.masked_fill(attn_mask != 0,
+                                          float(-100.0)).masked_fill(
+                                              attn_mask == 0, float(0.0))
+        return attn_mask
+
     def window_reverse(self, windows, H, W):
         """
         Args:
@@ -304,6 +364,8 @@ class SwinBlock(BaseModule):
         with_cp (bool, optional): Use checkpoint or not. Using checkpoint
             will save some memory while slowing down the training speed.
             Default: False.
+        attn_mask_cache (:obj:`PriorCache`, optional): The cache of the
+            attention masks of the shifted windows. Default: None.
         init_cfg (dict | list | None, optional): The init config.
             Default: None.
     """
@@ -322,6 +384,7 @@ class SwinBlock(BaseModule):
                  act_cfg=dict(type='GELU'),
                  norm_cfg=dict(type='LN'),
                  with_cp=False,
+                 attn_mask_cache=None,
                  init_cfg=None):
 
         super(SwinBlock, self).__init__()
@@ -340,6 +403,7 @@ class SwinBlock(BaseModule):
             attn_drop_rate=attn_drop_rate,
             proj_drop_rate=drop_rate,
             dropout_layer=dict(type='DropPath', drop_prob=drop_path_rate),
+            attn_mask_cache=attn_mask_cache,
             init_cfg=None)
 
         self.norm2 = build_norm_layer(norm_cfg, embed_dims)[1]
@@ -401,6 +465,9 @@ class SwinBlockSequence(BaseModule):
         with_cp (bool, optional): Use checkpoint or not. Using checkpoint
             will save some memory while slowing down the training speed.
             Default: False.
+        attn_mask_cache_size (int, optional): The maximum number of
+            attention masks of the shifted windows kept for the blocks of
+            the stage, 0 disables the cache. Default: 16.
         init_cfg (dict | list | None, optional): The init config.
             Default: None.
     """
@@ -420,6 +487,7 @@ class SwinBlockSequence(BaseModule):
                  act_cfg=dict(type='GELU'),
                  norm_cfg=dict(type='LN'),
                  with_cp=False,
+                 attn_mask_cache_size=16,
                  init_cfg=None):
         super().__init__(init_cfg=init_cfg)
 
@@ -429,6 +497,8 @@ class SwinBlockSequence(BaseModule):
         else:
             drop_path_rates = [deepcopy(drop_path_rate) for _ in range(depth)]
 
+        # the blocks of a stage share the shapes of their inputs
+        self.attn_mask_cache = PriorCache(attn_mask_cache_size)
         self.blocks = ModuleList()
         for i in range(depth):
             block = SwinBlock(
@@ -445,6 +515,7 @@ class SwinBlockSequence(BaseModule):
                 act_cfg=act_cfg,
                 norm_cfg=norm_cfg,
                 with_cp=with_cp,
+                attn_mask_cache=self.attn_mask_cache,
                 init_cfg=None)
             self.blocks.append(block)
 
@@ -515,6 +586,9 @@ class SwinTransformer(BaseModule):
             Default: False.
         frozen_stages (int): Stages to be frozen (stop grad and set eval mode).
             -1 means not freezing any parameters.
+        attn_mask_cache_size (int): The maximum number of attention masks of
+            the shifted windows kept for each stage, 0 disables the cache.
+            Default: 16.
         init_cfg (dict, optional): The Config for initialization.
             Defaults to None.
     """
@@ -543,6 +617,7 @@ class SwinTransformer(BaseModule):
                  pretrained=None,
                  convert_weights=False,
                  frozen_stages=-1,
+                 attn_mask_cache_size=16,
                  init_cfg=None):
         self.convert_weights = convert_weights
         self.frozen_stages = frozen_stages
@@ -626,6 +701,7 @@ class SwinTransformer(BaseModule):
                 act_cfg=act_cfg,
                 norm_cfg=norm_cfg,
                 with_cp=with_cp,
+                attn_mask_cache_size=attn_mask_cache_size,
                 init_cfg=None)
             self.stages.append(stage)
             if downsample:
@@ -46,7 +46,15 @@ def build_loss(cfg):
 
 
 def build_detector(cfg, train_cfg=None, test_cfg=None):
-    """Build detector."""
+    """Build detector.
+
+    ``batch_preprocessor`` in ``cfg`` holds the arguments of a
+    :class:`BatchPreprocessor` that normalizes and pads the images of the
+    collated batches on the device instead of in the data pipeline.
+    ``batched_aug_test=True`` in ``cfg`` extracts the features of the
+    test-time augmentations of the same shape in one pass, see
+    :meth:`BaseDetector.extract_feats`.
+    """
     if train_cfg is not None or test_cfg is not None:
         warnings.warn(
             'train_cfg and test_cfg is deprecated, '
@@ -55,5 +63,16 @@ def build_detector(cfg, train_cfg=None, test_cfg=None):
         'train_cfg specified in both outer field and model field '
     assert cfg.get('test_cfg') is None or test_cfg is None, \
         'test_cfg specified in both outer field and model field '
-    return DETECTORS.build(
+    batch_preprocessor = cfg.get('batch_preprocessor')
+    batched_aug_test = cfg.get('batched_aug_test', False)
+    if 'batch_preprocessor' in cfg or 'batched_aug_test' in cfg:
+        cfg = cfg.copy()
+        cfg.pop('batch_preprocessor', None)
+        cfg.pop('batched_aug_test', None)
+    detector = DETECTORS.build(
         cfg, default_args=dict(train_cfg=train_cfg, test_cfg=test_cfg))
+    detector.batched_aug_test = batched_aug_test
+    if batch_preprocessor is not None:
+        from .utils import BatchPreprocessor
+        detector.batch_preprocessor = BatchPreprocessor(**batch_preprocessor)
+    return detector
@@ -3,9 +3,11 @@ import torch
 import torch.nn as nn
 from mmcv.runner import force_fp32
 
-from mmdet.core import (anchor_inside_flags, build_anchor_generator,
-                        build_assigner, build_bbox_coder, build_sampler,
-                        images_to_levels, multi_apply, multiclass_nms, unmap)
+from mmdet.core import (AssignResult, BboxOverlaps2D, MaxIoUAssigner,
+                        PseudoSampler, RandomSampler, anchor_inside_flags,
+                        build_anchor_generator, build_assigner,
+                        build_bbox_coder, build_sampler, images_to_levels,
+                        multi_apply, unmap)
 from ..builder import HEADS, build_loss
 from .base_dense_head import BaseDenseHead
 from .dense_test_mixins import BBoxTestMixin
@@ -161,11 +163,9 @@ class AnchorHead(BaseDenseHead, BBoxTestMixin):
         anchor_list = [multi_level_anchors for _ in range(num_imgs)]
 
         # for each image, we compute valid flags of multi level anchors
-        valid_flag_list = []
-        for img_id, img_meta in enumerate(img_metas):
-            multi_level_flags = self.anchor_generator.valid_flags(
-                featmap_sizes, img_meta['pad_shape'], device)
-            valid_flag_list.append(multi_level_flags)
+        valid_flag_list = self.anchor_generator.batch_valid_flags(
+            featmap_sizes, [img_meta['pad_shape'] for img_meta in img_metas],
+            device)
 
         return anchor_list, valid_flag_list
 
@@ -267,6 +267,116 @@ class AnchorHead(BaseDenseHead, BBoxTestMixin):
         return (labels, label_weights, bbox_targets, bbox_weights, pos_inds,
                 neg_inds, sampling_result)
 
+    def _can_batch_targets(self, unmap_outputs, return_sampling_results):
+        """Whether :meth:`get_targets` can use :meth:`_get_batch_targets`.
+
+        The batched targets are enabled by ``batch_targets=True`` in the
+        training config and support :obj:`MaxIoUAssigner` with the default
+        IoU calculator, and :obj:`PseudoSampler` or :obj:`RandomSampler`.
+        """
+        # heads that customize the targets of each image are not supported
+        custom_single = type(self)._get_targets_single is not \
+            AnchorHead._get_targets_single
+        return (self.train_cfg.get('batch_targets', False) and unmap_outputs
+                and not return_sampling_results and not custom_single
+                and type(self.assigner) is MaxIoUAssigner
+                and type(self.assigner.iou_calculator) is BboxOverlaps2D
+                and self.assigner.tile_size <= 0
+                and self.assigner.gpu_assign_thr <= 0
+                and type(self.sampler) in (PseudoSampler, RandomSampler))
+
+    def _get_batch_targets(self, anchors, valid_flags, gt_bboxes_list,
+                           img_metas, gt_bboxes_ignore_list, gt_labels_list):
+        """Compute regression and classification targets for anchors in
+        multiple images at once.
+
+        The anchors are assigned by :meth:`MaxIoUAssigner.batch_assign` and
+        the targets of all images are computed by batched tensor ops. The
+        targets are the same as those of :meth:`_get_targets_single`. The
+        random sampling is still done for each image in turn, so the same
+        random numbers are drawn.
+
+        Args:
+            anchors (Tensor): Multi-level anchors of the images concatenated
+                into a single tensor of shape (B, num_anchors, 4).
+            valid_flags (Tensor): Multi level valid flags of the images,
+                shape (B, num_anchors).
+            gt_bboxes_list (list[Tensor]): Ground truth bboxes of each image.
+            img_metas (list[dict]): Meta info of each image.
+            gt_bboxes_ignore_list (list[Tensor]): Ground truth bboxes to be
+                ignored of each image.
+            gt_labels_list (list[Tensor]): Ground truth labels of each image.
+
+        Returns:
+            tuple: The labels, label weights, bbox targets and bbox weights of
+                shape (B, num_anchors, ...), and the numbers of positive and
+                negative anchors of each image. None if an image has no valid
+                anchors.
+        """
+        num_imgs = anchors.size(0)
+        img_shapes = anchors.new_tensor(
+            [img_meta['img_shape'][:2] for img_meta in img_metas])
+        inside_flags = anchor_inside_flags(
+            anchors, valid_flags, (img_shapes[:, :1], img_shapes[:, 1:]),
+            self.train_cfg.allowed_border)
+        if not inside_flags.any(dim=1).all():
+            return None
+
+        assigned_gt_inds, max_overlaps = self.assigner.batch_assign(
+            anchors, gt_bboxes_list, gt_bboxes_ignore_list, inside_flags)
+        if type(self.sampler) is PseudoSampler:
+            pos_flags = assigned_gt_inds > 0
+            neg_flags = assigned_gt_inds == 0
+        else:
+            pos_flags = torch.zeros_like(inside_flags)
+            neg_flags = torch.zeros_like(inside_flags)
+            for i in range(num_imgs):
+                inside_inds = inside_flags[i].nonzero(
+                    as_tuple=False).squeeze(1)
+                assign_result = AssignResult(gt_bboxes_list[i].size(0),
+                                             assigned_gt_inds[i, inside_inds],
+                                             max_overlaps[i, inside_inds])
+                sampling_result = self.sampler.sample(assign_result,
+                                                      anchors[i, inside_inds],
+                                                      gt_bboxes_list[i])
+                pos_flags[i, inside_inds[sampling_result.pos_inds]] = True
+                neg_flags[i, inside_inds[sampling_result.neg_inds]] = True
+
+        bbox_targets = torch.zeros_like(anchors)
+        bbox_weights = torch.zeros_like(anchors)
+        labels = assigned_gt_inds.new_full(assigned_gt_inds.shape,
+                                           self.num_classes)
+        label_weights = anchors.new_zeros(
+            assigned_gt_inds.shape, dtype=torch.float)
+
+        # indices of the assigned gts in the gts of all images
+        num_gts = [gt_bboxes.size(0) for gt_bboxes in gt_bboxes_list]
+        gt_offsets = assigned_gt_inds.new_tensor([0] + num_gts[:-1]).cumsum(0)
+        pos_assigned_gt_inds = (assigned_gt_inds - 1 +
+                                gt_offsets[:, None])[pos_flags]
+        pos_gt_bboxes = torch.cat(gt_bboxes_list)[pos_assigned_gt_inds]
+        if not self.reg_decoded_bbox:
+            pos_bbox_targets = self.bbox_coder.encode(anchors[pos_flags],
+                                                      pos_gt_bboxes)
+        else:
+            pos_bbox_targets = pos_gt_bboxes
+        bbox_targets[pos_flags] = pos_bbox_targets
+        bbox_weights.masked_fill_(pos_flags[..., None], 1.0)
+        if gt_labels_list[0] is None:
+            # Only rpn gives gt_labels as None
+            # Foreground is the first class since v2.5.0
+            labels.masked_fill_(pos_flags, 0)
+        else:
+            labels[pos_flags] = torch.cat(gt_labels_list)[pos_assigned_gt_inds]
+        if self.train_cfg.pos_weight <= 0:
+            label_weights.masked_fill_(pos_flags, 1.0)
+        else:
+            label_weights.masked_fill_(pos_flags, self.train_cfg.pos_weight)
+        label_weights.masked_fill_(neg_flags, 1.0)
+
+        return (labels, label_weights, bbox_targets, bbox_weights,
+                pos_flags.sum(dim=1), neg_flags.sum(dim=1))
+
     def get_targets(self,
                     anchor_list,
                     valid_flag_list,
@@ -315,6 +425,11 @@ class AnchorHead(BaseDenseHead, BBoxTestMixin):
                 `self._get_targets_single`. These returns are currently refined
                 to properties at each feature map (i.e. having HxW dimension).
                 The results will be concatenated after the end
+
+        Note:
+            If ``batch_targets=True`` is set in the training config, the
+            targets of all images are computed at once by
+            :meth:`_get_batch_targets` where it is supported.
         """
         num_imgs = len(img_metas)
         assert len(anchor_list) == len(valid_flag_list) == num_imgs
@@ -334,6 +449,24 @@ class AnchorHead(BaseDenseHead, BBoxTestMixin):
             gt_bboxes_ignore_list = [None for _ in range(num_imgs)]
         if gt_labels_list is None:
             gt_labels_list = [None for _ in range(num_imgs)]
+        if self._can_batch_targets(unmap_outputs, return_sampling_results):
+            results = self._get_batch_targets(
+                torch.stack(concat_anchor_list),
+                torch.stack(concat_valid_flag_list), gt_bboxes_list, img_metas,
+                gt_bboxes_ignore_list, gt_labels_list)
+            if results is None:
+                return None
+            num_pos, num_neg = results[4:]
+            # sampled anchors of all images
+            num_total_pos = int(num_pos.clamp(min=1).sum())
+            num_total_neg = int(num_neg.clamp(min=1).sum())
+            # split targets to a list w.r.t. multiple levels
+            targets_list = [
+                list(targets.split(num_level_anchors, dim=1))
+                for targets in results[:4]
+            ]
+            return tuple(targets_list) + (num_total_pos, num_total_neg)
+
         results = multi_apply(
             self._get_targets_single,
             concat_anchor_list,
@@ -710,13 +843,8 @@ class AnchorHead(BaseDenseHead, BBoxTestMixin):
             batch_mlvl_scores = torch.cat([batch_mlvl_scores, padding], dim=-1)
 
         if with_nms:
-            det_results = []
-            for (mlvl_bboxes, mlvl_scores) in zip(batch_mlvl_bboxes,
-                                                  batch_mlvl_scores):
-                det_bbox, det_label = multiclass_nms(mlvl_bboxes, mlvl_scores,
-                                                     cfg.score_thr, cfg.nms,
-                                                     cfg.max_per_img)
-                det_results.append(tuple([det_bbox, det_label]))
+            det_results = self._multiclass_nms_batch(batch_mlvl_bboxes,
+                                                     batch_mlvl_scores, cfg)
         else:
             det_results = [
                 tuple(mlvl_bs)
@@ -3,6 +3,8 @@ from abc import ABCMeta, abstractmethod
 
 from mmcv.runner import BaseModule
 
+from mmdet.core import batched_multiclass_nms, multiclass_nms
+
 
 class BaseDenseHead(BaseModule, metaclass=ABCMeta):
     """Base class for DenseHeads."""
@@ -20,6 +22,56 @@ class BaseDenseHead(BaseModule, metaclass=ABCMeta):
         """Transform network output for a batch into bbox predictions."""
         pass
 
+    def _multiclass_nms_batch(self,
+                              batch_bboxes,
+                              batch_scores,
+                              cfg,
+                              batch_score_factors=None):
+        """Apply multi-class NMS to the boxes of each image in a batch.
+
+        If ``cfg.batch_nms`` is True, the images are processed together by
+        :func:`batched_multiclass_nms`, which also keeps only the top
+        ``cfg.nms_topk`` boxes of each image and ``cfg.max_per_class`` boxes
+        of each class before NMS if they are set.
+
+        Args:
+            batch_bboxes (Tensor): Boxes of shape (N, n, 4).
+            batch_scores (Tensor): Scores of shape (N, n, #class), where the
+                last column is the background class.
+            cfg (mmcv.Config): Test / postprocessing configuration.
+            batch_score_factors (Tensor, optional): The factors multiplied to
+                scores before NMS, shape (N, n). Default: None.
+
+        Returns:
+            list[tuple[Tensor, Tensor]]: The dets of shape (k, 5) and labels
+                of shape (k, ) of each image.
+        """
+        if cfg.get('batch_nms', False):
+            return batched_multiclass_nms(
+                batch_bboxes,
+                batch_scores,
+                cfg.score_thr,
+                cfg.nms,
+                cfg.max_per_img,
+                score_factors=batch_score_factors,
+                topk=cfg.get('nms_topk', -1),
+                max_per_class=cfg.get('max_per_class', -1))
+        if batch_score_factors is None:
+            batch_score_factors = [None] * len(batch_bboxes)
+        det_results = []
+        for (mlvl_bboxes, mlvl_scores,
+             mlvl_score_factors) in zip(batch_bboxes, batch_scores,
+                                        batch_score_factors):
+            det_bbox, det_label = multiclass_nms(
+                mlvl_bboxes,
+                mlvl_scores,
+                cfg.score_thr,
+                cfg.nms,
+                cfg.max_per_img,
+                score_factors=mlvl_score_factors)
+            det_results.append(tuple([det_bbox, det_label]))
+        return det_results
+
     def forward_train(self,
                       x,
                       img_metas,
@@ -3,7 +3,6 @@ import copy
 
 import torch
 import torch.nn as nn
-import torch.nn.functional as F
 from mmcv.cnn import Linear, bias_init_with_prob, constant_init
 from mmcv.runner import force_fp32
 
@@ -120,22 +119,8 @@ class DeformableDETRHead(DETRHead):
                 `None` would be returned.
         """
 
-        batch_size = mlvl_feats[0].size(0)
-        input_img_h, input_img_w = img_metas[0]['batch_input_shape']
-        img_masks = mlvl_feats[0].new_ones(
-            (batch_size, input_img_h, input_img_w))
-        for img_id in range(batch_size):
-            img_h, img_w, _ = img_metas[img_id]['img_shape']
-            img_masks[img_id, :img_h, :img_w] = 0
-
-        mlvl_masks = []
-        mlvl_positional_encodings = []
-        for feat in mlvl_feats:
-            mlvl_masks.append(
-                F.interpolate(img_masks[None],
-                              size=feat.shape[-2:]).to(torch.bool).squeeze(0))
-            mlvl_positional_encodings.append(
-                self.positional_encoding(mlvl_masks[-1]))
+        mlvl_masks, mlvl_positional_encodings = \
+            self.get_masks_and_pos_embeds(mlvl_feats, img_metas)
 
         query_embeds = None
         if not self.as_two_stage:
@@ -229,11 +214,14 @@ class DeformableDETRHead(DETRHead):
             gt_bboxes_ignore for _ in range(num_dec_layers)
         ]
         img_metas_list = [img_metas for _ in range(num_dec_layers)]
+        all_assign_results = self.batch_assign(all_cls_scores, all_bbox_preds,
+                                               gt_bboxes_list, gt_labels_list,
+                                               img_metas)
 
         losses_cls, losses_bbox, losses_iou = multi_apply(
             self.loss_single, all_cls_scores, all_bbox_preds,
             all_gt_bboxes_list, all_gt_labels_list, img_metas_list,
-            all_gt_bboxes_ignore_list)
+            all_gt_bboxes_ignore_list, all_assign_results)
 
         loss_dict = dict()
         # loss of proposal generated from encode feature map.
@@ -242,10 +230,16 @@ class DeformableDETRHead(DETRHead):
                 torch.zeros_like(gt_labels_list[i])
                 for i in range(len(img_metas))
             ]
+            enc_assign_results = self.batch_assign(enc_cls_scores[None],
+                                                   enc_bbox_preds[None],
+                                                   gt_bboxes_list,
+                                                   binary_labels_list,
+                                                   img_metas)[0]
             enc_loss_cls, enc_losses_bbox, enc_losses_iou = \
                 self.loss_single(enc_cls_scores, enc_bbox_preds,
                                  gt_bboxes_list, binary_labels_list,
-                                 img_metas, gt_bboxes_ignore)
+                                 img_metas, gt_bboxes_ignore,
+                                 enc_assign_results)
             loss_dict['enc_loss_cls'] = enc_loss_cls
             loss_dict['enc_loss_bbox'] = enc_losses_bbox
             loss_dict['enc_loss_iou'] = enc_losses_iou
@@ -6,7 +6,7 @@ from mmcv.cnn import Conv2d, Linear, build_activation_layer
 from mmcv.cnn.bricks.transformer import FFN, build_positional_encoding
 from mmcv.runner import force_fp32
 
-from mmdet.core import (bbox_cxcywh_to_xyxy, bbox_xyxy_to_cxcywh,
+from mmdet.core import (PriorCache, bbox_cxcywh_to_xyxy, bbox_xyxy_to_cxcywh,
                         build_assigner, build_sampler, multi_apply,
                         reduce_mean)
 from mmdet.models.utils import build_transformer
@@ -43,6 +43,10 @@ class DETRHead(AnchorFreeHead):
             transformer head.
         test_cfg (obj:`mmcv.ConfigDict`|dict): Testing config of
             transformer head.
+        cache_size (int): The maximum number of image shapes of which the
+            masks and positional encodings are kept in :attr:`pos_cache`,
+            0 disables the cache. They are only cached if the positional
+            encoding has no parameters. Default: 16.
         init_cfg (dict or list[dict], optional): Initialization config dict.
             Default: None
     """
@@ -76,6 +80,7 @@ class DETRHead(AnchorFreeHead):
                          iou_cost=dict(
                              type='IoUCost', iou_mode='giou', weight=2.0))),
                  test_cfg=dict(max_per_img=100),
+                 cache_size=16,
                  init_cfg=None,
                  **kwargs):
         # NOTE here use `AnchorFreeHead` instead of `TransformerHead`,
@@ -140,6 +145,10 @@ class DETRHead(AnchorFreeHead):
         self.activate = build_activation_layer(self.act_cfg)
         self.positional_encoding = build_positional_encoding(
             positional_encoding)
+        # learned positional encodings change with their parameters
+        if any(True for _ in self.positional_encoding.parameters()):
+            cache_size = 0
+        self.pos_cache = PriorCache(cache_size)
         self.transformer = build_transformer(transformer)
         self.embed_dims = self.transformer.embed_dims
         assert 'num_feats' in positional_encoding
@@ -239,22 +248,12 @@ class DETRHead(AnchorFreeHead):
                 head with normalized coordinate format (cx, cy, w, h).
                 Shape [nb_dec, bs, num_query, 4].
         """
-        # construct binary masks which used for the transformer.
-        # NOTE following the official DETR repo, non-zero values representing
-        # ignored positions, while zero values means valid positions.
-        batch_size = x.size(0)
-        input_img_h, input_img_w = img_metas[0]['batch_input_shape']
-        masks = x.new_ones((batch_size, input_img_h, input_img_w))
-        for img_id in range(batch_size):
-            img_h, img_w, _ = img_metas[img_id]['img_shape']
-            masks[img_id, :img_h, :img_w] = 0
+        # binary masks which used for the transformer and position encoding
+        # pos_embed: [bs, embed_dim, h, w]
+        masks, pos_embed = self.get_masks_and_pos_embeds([x], img_metas)
+        masks, pos_embed = masks[0], pos_embed[0]
 
         x = self.input_proj(x)
-        # interpolate masks to have the same spatial shape with x
-        masks = F.interpolate(
-            masks.unsqueeze(1), size=x.shape[-2:]).to(torch.bool).squeeze(1)
-        # position encoding
-        pos_embed = self.positional_encoding(masks)  # [bs, embed_dim, h, w]
         # outs_dec: [nb_dec, bs, num_query, embed_dim]
         outs_dec, _ = self.transformer(x, masks, self.query_embedding.weight,
                                        pos_embed)
@@ -264,6 +263,64 @@ class DETRHead(AnchorFreeHead):
             self.reg_ffn(outs_dec))).sigmoid()
         return all_cls_scores, all_bbox_preds
 
+    def get_masks_and_pos_embeds(self, mlvl_feats, img_metas):
+        """Get the padding masks and positional encodings of feature maps.
+
+        Those of an image only depend on the padded shape of the batch, the
+        shape of the image and the shapes of the feature maps, so they are
+        looked up in :attr:`pos_cache`, and those of the image shapes that
+        are not cached are computed together.
+
+        Args:
+            mlvl_feats (list[Tensor]): Feature maps of shape (N, C, H, W).
+            img_metas (list[dict]): List of image information.
+
+        Returns:
+            tuple[list[Tensor]]: The masks of shape (N, H, W), of which
+                non-zero values represent ignored positions, and the
+                positional encodings of shape (N, embed_dims, H, W) of
+                each feature map. They may share memory with the cache and
+                should not be modified in place.
+        """
+        device = mlvl_feats[0].device
+        batch_input_shape = tuple(img_metas[0]['batch_input_shape'])
+        feat_shapes = tuple(tuple(feat.shape[-2:]) for feat in mlvl_feats)
+        keys = [(batch_input_shape, tuple(img_meta['img_shape'][:2]),
+                 feat_shapes, str(device)) for img_meta in img_metas]
+        values = self.pos_cache.get_many(
+            keys,
+            lambda keys: self._compute_masks_and_pos_embeds(keys, device))
+        # values of each image: masks of each level, then pos_embeds
+        if len(values) == 1:
+            # a single image shares the cached values instead of copying them
+            values = [value[None] for value in values[0]]
+        else:
+            values = [torch.stack(value) for value in zip(*values)]
+        num_levels = len(mlvl_feats)
+        return values[:num_levels], values[num_levels:]
+
+    def _compute_masks_and_pos_embeds(self, keys, device):
+        """Compute the masks and positional encodings of the image shapes
+        of :meth:`get_masks_and_pos_embeds`."""
+        # NOTE following the official DETR repo, non-zero values representing
+        # ignored positions, while zero values means valid positions.
+        (input_img_h, input_img_w), _, feat_shapes, _ = keys[0]
+        img_masks = torch.ones((len(keys), input_img_h, input_img_w),
+                               device=device)
+        for img_id, (_, (img_h, img_w), _, _) in enumerate(keys):
+            img_masks[img_id, :img_h, :img_w] = 0
+
+        mlvl_masks = []
+        mlvl_pos_embeds = []
+        for feat_shape in feat_shapes:
+            # interpolate masks to have the same spatial shape with feats
+            masks = F.interpolate(
+                img_masks[None], size=feat_shape).to(torch.bool).squeeze(0)
+            mlvl_masks.append(masks)
+            mlvl_pos_embeds.append(self.positional_encoding(masks))
+        values = mlvl_masks + mlvl_pos_embeds
+        return [[value[i] for value in values] for i in range(len(keys))]
+
     @force_fp32(apply_to=('all_cls_scores_list', 'all_bbox_preds_list'))
     def loss(self,
              all_cls_scores_list,
@@ -309,11 +366,14 @@ class DETRHead(AnchorFreeHead):
             gt_bboxes_ignore for _ in range(num_dec_layers)
         ]
         img_metas_list = [img_metas for _ in range(num_dec_layers)]
+        all_assign_results = self.batch_assign(all_cls_scores, all_bbox_preds,
+                                               gt_bboxes_list, gt_labels_list,
+                                               img_metas)
 
         losses_cls, losses_bbox, losses_iou = multi_apply(
             self.loss_single, all_cls_scores, all_bbox_preds,
             all_gt_bboxes_list, all_gt_labels_list, img_metas_list,
-            all_gt_bboxes_ignore_list)
+            all_gt_bboxes_ignore_list, all_assign_results)
 
         loss_dict = dict()
         # loss from the last decoder layer
@@ -331,13 +391,46 @@ class DETRHead(AnchorFreeHead):
             num_dec_layer += 1
         return loss_dict
 
+    def batch_assign(self, all_cls_scores, all_bbox_preds, gt_bboxes_list,
+                     gt_labels_list, img_metas):
+        """Assign the predictions of all decoder layers at once.
+
+        The matchings of all decoder layers and images are solved together by
+        ``batch_assign`` of the assigner, if it has one and the head is not
+        configured with ``batch_assign=False`` in ``train_cfg``.
+
+        Args:
+            all_cls_scores (Tensor): Classification outputs of all decoder
+                layers, shape [nb_dec, bs, num_query, cls_out_channels].
+            all_bbox_preds (Tensor): Sigmoid regression outputs of all
+                decoder layers, shape [nb_dec, bs, num_query, 4].
+            gt_bboxes_list (list[Tensor]): Ground truth bboxes for each image
+                with shape (num_gts, 4) in [tl_x, tl_y, br_x, br_y] format.
+            gt_labels_list (list[Tensor]): Ground truth class indices for each
+                image with shape (num_gts, ).
+            img_metas (list[dict]): List of image meta information.
+
+        Returns:
+            list: The :obj:`AssignResult` of each image of each decoder
+                layer, or None for each layer if the predictions are
+                assigned image by image in :meth:`_get_target_single`.
+        """
+        num_dec_layers = len(all_cls_scores)
+        if not hasattr(self.assigner, 'batch_assign') or \
+                not self.train_cfg.get('batch_assign', True):
+            return [None for _ in range(num_dec_layers)]
+        return self.assigner.batch_assign(all_bbox_preds, all_cls_scores,
+                                          gt_bboxes_list, gt_labels_list,
+                                          img_metas)
+
     def loss_single(self,
                     cls_scores,
                     bbox_preds,
                     gt_bboxes_list,
                     gt_labels_list,
                     img_metas,
-                    gt_bboxes_ignore_list=None):
+                    gt_bboxes_ignore_list=None,
+                    assign_results=None):
         """"Loss function for outputs from a single decoder layer of a single
         feature level.
 
@@ -354,6 +447,9 @@ class DETRHead(AnchorFreeHead):
             img_metas (list[dict]): List of image meta information.
             gt_bboxes_ignore_list (list[Tensor], optional): Bounding
                 boxes which can be ignored for each image. Default None.
+            assign_results (list[:obj:`AssignResult`], optional): The
+                assigned results of each image, computed in
+                :meth:`_get_target_single` if not given. Default None.
 
         Returns:
             dict[str, Tensor]: A dictionary of loss components for outputs from
@@ -364,7 +460,8 @@ class DETRHead(AnchorFreeHead):
         bbox_preds_list = [bbox_preds[i] for i in range(num_imgs)]
         cls_reg_targets = self.get_targets(cls_scores_list, bbox_preds_list,
                                            gt_bboxes_list, gt_labels_list,
-                                           img_metas, gt_bboxes_ignore_list)
+                                           img_metas, gt_bboxes_ignore_list,
+                                           assign_results)
         (labels_list, label_weights_list, bbox_targets_list, bbox_weights_list,
          num_total_pos, num_total_neg) = cls_reg_targets
         labels = torch.cat(labels_list, 0)
@@ -422,7 +519,8 @@ class DETRHead(AnchorFreeHead):
                     gt_bboxes_list,
                     gt_labels_list,
                     img_metas,
-                    gt_bboxes_ignore_list=None):
+                    gt_bboxes_ignore_list=None,
+                    assign_results=None):
         """"Compute regression and classification targets for a batch image.
 
         Outputs from a single decoder layer of a single feature level are used.
@@ -441,6 +539,8 @@ class DETRHead(AnchorFreeHead):
             img_metas (list[dict]): List of image meta information.
             gt_bboxes_ignore_list (list[Tensor], optional): Bounding
                 boxes which can be ignored for each image. Default None.
+            assign_results (list[:obj:`AssignResult`], optional): The
+                assigned results of each image. Default None.
 
         Returns:
             tuple: a tuple containing the following targets.
@@ -463,11 +563,14 @@ class DETRHead(AnchorFreeHead):
         gt_bboxes_ignore_list = [
             gt_bboxes_ignore_list for _ in range(num_imgs)
         ]
+        if assign_results is None:
+            assign_results = [None for _ in range(num_imgs)]
 
-        (labels_list, label_weights_list, bbox_targets_list,
-         bbox_weights_list, pos_inds_list, neg_inds_list) = multi_apply(
-             self._get_target_single, cls_scores_list, bbox_preds_list,
-             gt_bboxes_list, gt_labels_list, img_metas, gt_bboxes_ignore_list)
+        targets = multi_apply(self._get_target_single, cls_scores_list,
+                              bbox_preds_list, gt_bboxes_list, gt_labels_list,
+                              img_metas, gt_bboxes_ignore_list, assign_results)
+        (labels_list, label_weights_list, bbox_targets_list, bbox_weights_list,
+         pos_inds_list, neg_inds_list) = targets
         num_total_pos = sum((inds.numel() for inds in pos_inds_list))
         num_total_neg = sum((inds.numel() for inds in neg_inds_list))
         return (labels_list, label_weights_list, bbox_targets_list,
@@ -479,7 +582,8 @@ class DETRHead(AnchorFreeHead):
                            gt_bboxes,
                            gt_labels,
                            img_meta,
-                           gt_bboxes_ignore=None):
+                           gt_bboxes_ignore=None,
+                           assign_result=None):
         """"Compute regression and classification targets for one image.
 
         Outputs from a single decoder layer of a single feature level are used.
@@ -497,6 +601,9 @@ class DETRHead(AnchorFreeHead):
             img_meta (dict): Meta information for one image.
             gt_bboxes_ignore (Tensor, optional): Bounding boxes
                 which can be ignored. Default None.
+            assign_result (:obj:`AssignResult`, optional): The assigned
+                result of the image, computed by the assigner if not given.
+                Default None.
 
         Returns:
             tuple[Tensor]: a tuple containing the following for one image.
@@ -511,9 +618,10 @@ class DETRHead(AnchorFreeHead):
 
         num_bboxes = bbox_pred.size(0)
         # assigner and sampler
-        assign_result = self.assigner.assign(bbox_pred, cls_score, gt_bboxes,
-                                             gt_labels, img_meta,
-                                             gt_bboxes_ignore)
+        if assign_result is None:
+            assign_result = self.assigner.assign(bbox_pred, cls_score,
+                                                 gt_bboxes, gt_labels,
+                                                 img_meta, gt_bboxes_ignore)
         sampling_result = self.sampler.sample(assign_result, bbox_pred,
                                               gt_bboxes)
         pos_inds = sampling_result.pos_inds
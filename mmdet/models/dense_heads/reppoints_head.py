@@ -316,11 +316,9 @@ class RepPointsHead(AnchorFreeHead):
                        for _ in range(num_imgs)]
 
         # for each image, we compute valid flags of multi level grids
-        valid_flag_list = []
-        for img_id, img_meta in enumerate(img_metas):
-            multi_level_flags = self.point_generator.valid_flags(
-                featmap_sizes, img_meta['pad_shape'])
-            valid_flag_list.append(multi_level_flags)
+        valid_flag_list = self.point_generator.batch_valid_flags(
+            featmap_sizes, [img_meta['pad_shape'] for img_meta in img_metas],
+            device)
 
         return points_list, valid_flag_list
 
@@ -7,7 +7,7 @@ import torch.nn.functional as F
 from mmcv.cnn import ConvModule
 
 from mmdet.core import InstanceData, mask_matrix_nms, multi_apply
-from mmdet.core.utils import center_of_mass, generate_coordinate
+from mmdet.core.utils import generate_coordinate
 from mmdet.models.builder import HEADS, build_loss
 from .base_mask_head import BaseMaskHead
 
@@ -318,6 +318,11 @@ class SOLOHead(BaseMaskHead):
         device = gt_labels.device
         gt_areas = torch.sqrt((gt_bboxes[:, 2] - gt_bboxes[:, 0]) *
                               (gt_bboxes[:, 3] - gt_bboxes[:, 1]))
+        upsampled_size = (featmap_sizes[0][0] * 4, featmap_sizes[0][1] * 4)
+        center_hs, center_ws, mask_areas = self._mask_centers_and_areas(
+            gt_masks)
+        # make sure the masks have a value
+        valid_mask_flags = mask_areas > 0
 
         mlvl_pos_mask_targets = []
         mlvl_labels = []
@@ -326,10 +331,6 @@ class SOLOHead(BaseMaskHead):
                 in zip(self.scale_ranges, self.strides,
                        featmap_sizes, self.num_grids):
 
-            mask_target = torch.zeros(
-                [num_grid**2, featmap_size[0], featmap_size[1]],
-                dtype=torch.uint8,
-                device=device)
             # FG cat_id: [0, num_classes -1], BG cat_id: num_classes
             labels = torch.zeros([num_grid, num_grid],
                                  dtype=torch.int64,
@@ -338,84 +339,149 @@ class SOLOHead(BaseMaskHead):
                                    dtype=torch.bool,
                                    device=device)
 
-            gt_inds = ((gt_areas >= lower_bound) &
-                       (gt_areas <= upper_bound)).nonzero().flatten()
+            gt_inds = ((gt_areas >= lower_bound) & (gt_areas <= upper_bound)
+                       & valid_mask_flags).nonzero().flatten()
             if len(gt_inds) == 0:
                 mlvl_pos_mask_targets.append(
-                    mask_target.new_zeros(0, featmap_size[0], featmap_size[1]))
+                    torch.zeros([0, featmap_size[0], featmap_size[1]],
+                                dtype=torch.uint8,
+                                device=device))
                 mlvl_labels.append(labels)
                 mlvl_pos_masks.append(pos_mask)
                 continue
             hit_gt_bboxes = gt_bboxes[gt_inds]
-            hit_gt_labels = gt_labels[gt_inds]
-            hit_gt_masks = gt_masks[gt_inds, ...]
+            center_h = center_hs[gt_inds]
+            center_w = center_ws[gt_inds]
 
             pos_w_ranges = 0.5 * (hit_gt_bboxes[:, 2] -
                                   hit_gt_bboxes[:, 0]) * self.pos_scale
             pos_h_ranges = 0.5 * (hit_gt_bboxes[:, 3] -
                                   hit_gt_bboxes[:, 1]) * self.pos_scale
 
-            # Make sure hit_gt_masks has a value
-            valid_mask_flags = hit_gt_masks.sum(dim=-1).sum(dim=-1) > 0
-            output_stride = stride / 2
-
-            for gt_mask, gt_label, pos_h_range, pos_w_range, \
-                valid_mask_flag in \
-                    zip(hit_gt_masks, hit_gt_labels, pos_h_ranges,
-                        pos_w_ranges, valid_mask_flags):
-                if not valid_mask_flag:
-                    continue
-                upsampled_size = (featmap_sizes[0][0] * 4,
-                                  featmap_sizes[0][1] * 4)
-                center_h, center_w = center_of_mass(gt_mask)
-
-                coord_w = int(
-                    (center_w / upsampled_size[1]) // (1. / num_grid))
-                coord_h = int(
-                    (center_h / upsampled_size[0]) // (1. / num_grid))
-
-                # left, top, right, down
-                top_box = max(
-                    0,
-                    int(((center_h - pos_h_range) / upsampled_size[0]) //
-                        (1. / num_grid)))
-                down_box = min(
-                    num_grid - 1,
-                    int(((center_h + pos_h_range) / upsampled_size[0]) //
-                        (1. / num_grid)))
-                left_box = max(
-                    0,
-                    int(((center_w - pos_w_range) / upsampled_size[1]) //
-                        (1. / num_grid)))
-                right_box = min(
-                    num_grid - 1,
-                    int(((center_w + pos_w_range) / upsampled_size[1]) //
-                        (1. / num_grid)))
-
-                top = max(top_box, coord_h - 1)
-                down = min(down_box, coord_h + 1)
-                left = max(coord_w - 1, left_box)
-                right = min(right_box, coord_w + 1)
-
-                labels[top:(down + 1), left:(right + 1)] = gt_label
-                # ins
-                gt_mask = np.uint8(gt_mask.cpu().numpy())
-                # Follow the original implementation, F.interpolate is
-                # different from cv2 and opencv
-                gt_mask = mmcv.imrescale(gt_mask, scale=1. / output_stride)
-                gt_mask = torch.from_numpy(gt_mask).to(device=device)
-
-                for i in range(top, down + 1):
-                    for j in range(left, right + 1):
-                        index = int(i * num_grid + j)
-                        mask_target[index, :gt_mask.shape[0], :gt_mask.
-                                    shape[1]] = gt_mask
-                        pos_mask[index] = True
-            mlvl_pos_mask_targets.append(mask_target[pos_mask])
+            def to_grid(coords, size):
+                return ((coords / size) // (1. / num_grid)).long()
+
+            coord_w = to_grid(center_w, upsampled_size[1])
+            coord_h = to_grid(center_h, upsampled_size[0])
+            # left, top, right, down
+            top_box = to_grid(center_h - pos_h_ranges,
+                              upsampled_size[0]).clamp(min=0)
+            down_box = to_grid(center_h + pos_h_ranges,
+                               upsampled_size[0]).clamp(max=num_grid - 1)
+            left_box = to_grid(center_w - pos_w_ranges,
+                               upsampled_size[1]).clamp(min=0)
+            right_box = to_grid(center_w + pos_w_ranges,
+                                upsampled_size[1]).clamp(max=num_grid - 1)
+
+            top = torch.max(top_box, coord_h - 1)
+            down = torch.min(down_box, coord_h + 1)
+            left = torch.max(coord_w - 1, left_box)
+            right = torch.min(right_box, coord_w + 1)
+
+            # the center region of a gt is in the 3x3 cells around its
+            # center, the cells of the later gts overwrite the earlier ones
+            offsets = torch.arange(-1, 2, device=device)
+            rows = coord_h[:, None] + offsets
+            cols = coord_w[:, None] + offsets
+            in_rows = (rows >= top[:, None]) & (rows <= down[:, None])
+            in_cols = (cols >= left[:, None]) & (cols <= right[:, None])
+            in_region = in_rows[:, :, None] & in_cols[:, None, :]
+            region_gt_inds, _, _ = in_region.nonzero(as_tuple=True)
+            cells = (rows[:, :, None] * num_grid + cols[:, None, :])[in_region]
+            num_hit_gts = len(gt_inds)
+            keys, _ = torch.sort(
+                cells * num_hit_gts + region_gt_inds, descending=True)
+            cells = keys // num_hit_gts
+            is_last = torch.ones_like(cells, dtype=torch.bool)
+            is_last[1:] = cells[1:] != cells[:-1]
+            # in the ascending order of the cells
+            cells = cells[is_last].flip(0)
+            cell_gt_inds = (keys[is_last] % num_hit_gts).flip(0)
+
+            labels.view(-1)[cells] = gt_labels[gt_inds][cell_gt_inds]
+            pos_mask[cells] = True
+            # Follow the original implementation, F.interpolate is
+            # different from cv2 and opencv
+            hit_gt_masks = self._rescale_masks(gt_masks[gt_inds], stride / 2)
+            mask_target = hit_gt_masks.new_zeros(
+                [num_hit_gts, featmap_size[0], featmap_size[1]])
+            mask_h = min(hit_gt_masks.size(1), featmap_size[0])
+            mask_w = min(hit_gt_masks.size(2), featmap_size[1])
+            mask_target[:, :mask_h, :mask_w] = \
+                hit_gt_masks[:, :mask_h, :mask_w]
+            mlvl_pos_mask_targets.append(mask_target[cell_gt_inds])
             mlvl_labels.append(labels)
             mlvl_pos_masks.append(pos_mask)
         return mlvl_pos_mask_targets, mlvl_labels, mlvl_pos_masks
 
+    @staticmethod
+    def _mask_centers_and_areas(masks, esp=1e-6):
+        """Calculate the centroid coordinates of multiple masks, the same as
+        :func:`center_of_mass` for each mask, and their areas.
+
+        Args:
+            masks (Tensor): The masks of shape (n, h, w).
+            esp (float): Avoid dividing by zero. Default: 1e-6.
+
+        Returns:
+            tuple[Tensor]: The center heights, center widths and areas of
+                the masks, each of shape (n, ).
+        """
+        n, h, w = masks.shape
+        grid_h = torch.arange(h, device=masks.device)
+        grid_w = torch.arange(w, device=masks.device)
+        if masks.is_floating_point():
+            areas = masks.flatten(1).sum(dim=1)
+            moment_h = (masks * grid_h[:, None]).flatten(1).sum(dim=1)
+            moment_w = (masks * grid_w).flatten(1).sum(dim=1)
+        else:
+            # the sums of integers are exact in any order, so they are
+            # computed from the sums of each row and column
+            if masks.dtype == torch.bool:
+                masks = masks.view(torch.uint8)
+            row_sums = masks.sum(dim=2, dtype=torch.int32)
+            col_sums = masks.sum(dim=1, dtype=torch.int32)
+            areas = row_sums.sum(dim=1)
+            moment_h = (row_sums * grid_h).sum(dim=1)
+            moment_w = (col_sums * grid_w).sum(dim=1)
+        normalizer = areas.float().clamp(min=esp)
+        return moment_h / normalizer, moment_w / normalizer, areas
+
+    @staticmethod
+    def _rescale_masks(masks, output_stride):
+        """Downsample masks as ``mmcv.imrescale`` with a scale of ``1 /
+        output_stride``.
+
+        With an even integer ``output_stride`` that divides the mask size,
+        the bilinear interpolation of cv2 averages the 2x2 pixels at the
+        center of each ``output_stride`` x ``output_stride`` block (with
+        rounding half up), which is computed on the device. Otherwise the
+        masks are rescaled by ``mmcv.imrescale`` one by one.
+
+        Args:
+            masks (Tensor): The masks of shape (n, h, w).
+            output_stride (float): The downsampling factor.
+
+        Returns:
+            Tensor: The uint8 rescaled masks.
+        """
+        n, h, w = masks.shape
+        stride = int(output_stride)
+        if stride == output_stride and stride % 2 == 0 and \
+                h % stride == 0 and w % stride == 0:
+            top = stride // 2 - 1
+            offsets = (top, top + 1)
+            blocks = sum(masks[:, i::stride, j::stride].to(torch.int32)
+                         for i in offsets for j in offsets)
+            return ((blocks + 2) // 4).to(torch.uint8)
+        rescaled_masks = [
+            mmcv.imrescale(mask, scale=1. / output_stride)
+            for mask in np.uint8(masks.cpu().numpy())
+        ]
+        return masks.new_tensor(
+            np.stack(rescaled_masks).reshape(n, *rescaled_masks[0].shape[:2]),
+            dtype=torch.uint8)
+
     def get_results(self, mlvl_mask_preds, mlvl_cls_scores, img_metas,
                     **kwargs):
         """Get multi-image mask results.
@@ -369,13 +369,18 @@ class YOLOXHead(BaseDenseHead, BBoxTestMixin):
         flatten_objectness = torch.cat(flatten_objectness, dim=1)
         flatten_priors = torch.cat(mlvl_priors)
         flatten_bboxes = self._bbox_decode(flatten_priors, flatten_bbox_preds)
+        assign_results = self.batch_assign(flatten_cls_preds.detach(),
+                                           flatten_objectness.detach(),
+                                           flatten_priors,
+                                           flatten_bboxes.detach(), gt_bboxes,
+                                           gt_labels)
 
         (pos_masks, cls_targets, obj_targets, bbox_targets, l1_targets,
          num_fg_imgs) = multi_apply(
              self._get_target_single, flatten_cls_preds.detach(),
              flatten_objectness.detach(),
              flatten_priors.unsqueeze(0).repeat(num_imgs, 1, 1),
-             flatten_bboxes.detach(), gt_bboxes, gt_labels)
+             flatten_bboxes.detach(), gt_bboxes, gt_labels, assign_results)
 
         num_total_samples = max(sum(num_fg_imgs), 1)
         pos_masks = torch.cat(pos_masks, 0)
@@ -406,8 +411,54 @@ class YOLOXHead(BaseDenseHead, BBoxTestMixin):
         return loss_dict
 
     @torch.no_grad()
-    def _get_target_single(self, cls_preds, objectness, priors, decoded_bboxes,
-                           gt_bboxes, gt_labels):
+    def batch_assign(self, cls_preds, objectness, priors, decoded_bboxes,
+                     gt_bboxes, gt_labels):
+        """Assign the priors of all images at once.
+
+        The priors are assigned by ``batch_assign`` of the assigner, if it
+        has one and the head is not configured with ``batch_assign=False``
+        in ``train_cfg``.
+
+        Args:
+            cls_preds (Tensor): Classification predictions of all images,
+                a 3D-Tensor with shape [num_imgs, num_priors, num_classes].
+            objectness (Tensor): Objectness predictions of all images,
+                a 2D-Tensor with shape [num_imgs, num_priors].
+            priors (Tensor): All priors of one image, a 2D-Tensor with shape
+                [num_priors, 4] in [cx, xy, stride_w, stride_y] format.
+            decoded_bboxes (Tensor): Decoded bboxes predictions of all
+                images, a 3D-Tensor with shape [num_imgs, num_priors, 4] in
+                [tl_x, tl_y, br_x, br_y] format.
+            gt_bboxes (list[Tensor]): Ground truth bboxes of each image.
+            gt_labels (list[Tensor]): Ground truth labels of each image.
+
+        Returns:
+            list: The :obj:`AssignResult` of each image, or None for each
+                image if the priors are assigned image by image in
+                :meth:`_get_target_single`.
+        """
+        num_imgs = len(gt_bboxes)
+        if not hasattr(self.assigner, 'batch_assign') or \
+                not self.train_cfg.get('batch_assign', True):
+            return [None for _ in range(num_imgs)]
+        # YOLOX uses center priors with 0.5 offset to assign targets,
+        # but use center priors without offset to regress bboxes.
+        offset_priors = torch.cat(
+            [priors[:, :2] + priors[:, 2:] * 0.5, priors[:, 2:]], dim=-1)
+        gt_bboxes = [bboxes.to(decoded_bboxes.dtype) for bboxes in gt_bboxes]
+        return self.assigner.batch_assign(
+            cls_preds.sigmoid() * objectness.unsqueeze(2).sigmoid(),
+            offset_priors, decoded_bboxes, gt_bboxes, gt_labels)
+
+    @torch.no_grad()
+    def _get_target_single(self,
+                           cls_preds,
+                           objectness,
+                           priors,
+                           decoded_bboxes,
+                           gt_bboxes,
+                           gt_labels,
+                           assign_result=None):
         """Compute classification, regression, and objectness targets for
         priors in a single image.
         Args:
@@ -424,6 +475,9 @@ class YOLOXHead(BaseDenseHead, BBoxTestMixin):
                 with shape [num_gts, 4] in [tl_x, tl_y, br_x, br_y] format.
             gt_labels (Tensor): Ground truth labels of one image, a Tensor
                 with shape [num_gts].
+            assign_result (:obj:`AssignResult`, optional): The assigned
+                result of the image, computed by the assigner if not given.
+                Default None.
         """
 
         num_priors = priors.size(0)
@@ -439,14 +493,14 @@ class YOLOXHead(BaseDenseHead, BBoxTestMixin):
             return (foreground_mask, cls_target, obj_target, bbox_target,
                     l1_target, 0)
 
-        # YOLOX uses center priors with 0.5 offset to assign targets,
-        # but use center priors without offset to regress bboxes.
-        offset_priors = torch.cat(
-            [priors[:, :2] + priors[:, 2:] * 0.5, priors[:, 2:]], dim=-1)
-
-        assign_result = self.assigner.assign(
-            cls_preds.sigmoid() * objectness.unsqueeze(1).sigmoid(),
-            offset_priors, decoded_bboxes, gt_bboxes, gt_labels)
+        if assign_result is None:
+            # YOLOX uses center priors with 0.5 offset to assign targets,
+            # but use center priors without offset to regress bboxes.
+            offset_priors = torch.cat(
+                [priors[:, :2] + priors[:, 2:] * 0.5, priors[:, 2:]], dim=-1)
+            assign_result = self.assigner.assign(
+                cls_preds.sigmoid() * objectness.unsqueeze(1).sigmoid(),
+                offset_priors, decoded_bboxes, gt_bboxes, gt_labels)
 
         sampling_result = self.sampler.sample(assign_result, priors, gt_bboxes)
         pos_inds = sampling_result.pos_inds
@@ -4,6 +4,7 @@ from collections import OrderedDict
 
 import mmcv
 import numpy as np
+import pycocotools.mask as mask_util
 import torch
 import torch.distributed as dist
 from mmcv.runner import BaseModule, auto_fp16
@@ -11,12 +12,24 @@ from mmcv.runner import BaseModule, auto_fp16
 from mmdet.core.visualization import imshow_det_bboxes
 
 
+def _split_feats(feats, sizes):
+    """Split (nested lists or tuples of) batched features into views."""
+    if isinstance(feats, torch.Tensor):
+        return feats.split(sizes)
+    views = zip(*[_split_feats(feat, sizes) for feat in feats])
+    return [type(feats)(view) for view in views]
+
+
 class BaseDetector(BaseModule, metaclass=ABCMeta):
     """Base class for detectors."""
 
     def __init__(self, init_cfg=None):
         super(BaseDetector, self).__init__(init_cfg)
         self.fp16_enabled = False
+        # set by build_detector if ``batch_preprocessor`` is in the config
+        self.batch_preprocessor = None
+        # set by build_detector if ``batched_aug_test`` is in the config
+        self.batched_aug_test = False
 
     @property
     def with_neck(self):
@@ -50,6 +63,10 @@ class BaseDetector(BaseModule, metaclass=ABCMeta):
     def extract_feats(self, imgs):
         """Extract features from multiple images.
 
+        If ``batched_aug_test`` is set, the images of the same shape (e.g. the
+        flips of a scale) are stacked and their features are extracted in a
+        single pass.
+
         Args:
             imgs (list[torch.Tensor]): A list of images. The images are
                 augmented from the same image but in different ways.
@@ -58,7 +75,22 @@ class BaseDetector(BaseModule, metaclass=ABCMeta):
             list[torch.Tensor]: Features of different images
         """
         assert isinstance(imgs, list)
-        return [self.extract_feat(img) for img in imgs]
+        if not self.batched_aug_test:
+            return [self.extract_feat(img) for img in imgs]
+
+        groups = {}
+        for i, img in enumerate(imgs):
+            groups.setdefault(tuple(img.shape[1:]), []).append(i)
+        feats = [None] * len(imgs)
+        for inds in groups.values():
+            if len(inds) == 1:
+                feats[inds[0]] = self.extract_feat(imgs[inds[0]])
+                continue
+            batch_feats = self.extract_feat(torch.cat([imgs[i] for i in inds]))
+            sizes = [imgs[i].size(0) for i in inds]
+            for i, feat in zip(inds, _split_feats(batch_feats, sizes)):
+                feats[i] = feat
+        return feats
 
     def forward_train(self, imgs, img_metas, **kwargs):
         """
@@ -168,6 +200,16 @@ class BaseDetector(BaseModule, metaclass=ABCMeta):
             assert len(img_metas) == 1
             return self.onnx_export(img[0], img_metas[0])
 
+        if self.batch_preprocessor is not None:
+            if return_loss:
+                img, kwargs = self.batch_preprocessor(
+                    img, img_metas, training=self.training, **kwargs)
+            else:
+                img = [
+                    self.batch_preprocessor(aug_img, aug_img_metas)[0]
+                    for aug_img, aug_img_metas in zip(img, img_metas)
+                ]
+
         if return_loss:
             return self.forward_train(img, img_metas, **kwargs)
         else:
@@ -317,7 +359,17 @@ class BaseDetector(BaseModule, metaclass=ABCMeta):
         segms = None
         if segm_result is not None and len(labels) > 0:  # non empty
             segms = mmcv.concat_list(segm_result)
-            if isinstance(segms[0], torch.Tensor):
+            if isinstance(segms[0], dict):
+                # only decode the RLE masks that are drawn
+                if score_thr > 0 and bboxes.shape[1] == 5:
+                    inds = bboxes[:, -1] > score_thr
+                    bboxes, labels = bboxes[inds], labels[inds]
+                    segms = [segm for segm, ind in zip(segms, inds) if ind]
+                if len(segms) > 0:
+                    segms = mask_util.decode(segms).transpose(2, 0, 1)
+                else:
+                    segms = None
+            elif isinstance(segms[0], torch.Tensor):
                 segms = torch.stack(segms, dim=0).detach().cpu().numpy()
             else:
                 segms = np.stack(segms, axis=0)
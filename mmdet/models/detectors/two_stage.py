@@ -81,7 +81,11 @@ class TwoStageDetector(BaseDetector):
         if self.with_rpn:
             rpn_outs = self.rpn_head(x)
             outs = outs + (rpn_outs, )
-        proposals = torch.randn(1000, 4).to(img.device)
+        # random boxes in the image, roi_align rejects invalid boxes on CPU
+        height, width = img.shape[2:]
+        corners = torch.rand(1000, 2, 2) * torch.tensor([width, height])
+        proposals = torch.cat(corners.sort(dim=1)[0].unbind(1), dim=1)
+        proposals = proposals.to(img.device)
         # roi_head
         roi_outs = self.roi_head.forward_dummy(x, proposals)
         outs = outs + (roi_outs, )
@@ -5,7 +5,8 @@ import torch.nn.functional as F
 from mmcv.runner import BaseModule, auto_fp16, force_fp32
 from torch.nn.modules.utils import _pair
 
-from mmdet.core import build_bbox_coder, multi_apply, multiclass_nms
+from mmdet.core import (batched_multiclass_nms, build_bbox_coder, multi_apply,
+                        multiclass_nms)
 from mmdet.models.builder import HEADS, build_loss
 from mmdet.models.losses import accuracy
 from mmdet.models.utils import build_linear_layer
@@ -376,6 +377,62 @@ class BBoxHead(BaseModule):
 
             return det_bboxes, det_labels
 
+    def batch_get_bboxes(self,
+                         rois,
+                         cls_scores,
+                         bbox_preds,
+                         img_shapes,
+                         scale_factors,
+                         rescale=False,
+                         cfg=None):
+        """Transform network outputs of several images into bbox predictions
+        with a single NMS.
+
+        The boxes of each image are decoded by :meth:`get_bboxes`, and the NMS
+        of all images is done by :func:`batched_multiclass_nms`, which also
+        keeps only the top ``cfg.nms_topk`` boxes of each image and
+        ``cfg.max_per_class`` boxes of each class before NMS if they are set.
+
+        Args:
+            rois (list[Tensor]): Boxes of each image, shape (num_boxes, 5).
+            cls_scores (list[Tensor]): Box scores of each image, shape
+                (num_boxes, num_classes + 1).
+            bbox_preds (list[Tensor]): Box deltas of each image, shape
+                (num_boxes, num_classes * 4), or None.
+            img_shapes (Sequence[tuple]): Shape of each image.
+            scale_factors (Sequence[ndarray]): Scale factor of each image.
+            rescale (bool): If True, return boxes in original image space.
+                Default: False.
+            cfg (obj:`ConfigDict`): `test_cfg` of Bbox Head.
+
+        Returns:
+            tuple[list[Tensor], list[Tensor]]: The `det_bboxes` of shape
+                (num_boxes, 5) and labels of shape (num_boxes, ) of each
+                image.
+        """
+        mlvl_bboxes, mlvl_scores = [], []
+        for i in range(len(rois)):
+            bboxes, scores = self.get_bboxes(
+                rois[i],
+                cls_scores[i],
+                bbox_preds[i],
+                img_shapes[i],
+                scale_factors[i],
+                rescale=rescale,
+                cfg=None)
+            mlvl_bboxes.append(bboxes)
+            mlvl_scores.append(scores)
+        det_results = batched_multiclass_nms(
+            mlvl_bboxes,
+            mlvl_scores,
+            cfg.score_thr,
+            cfg.nms,
+            cfg.max_per_img,
+            topk=cfg.get('nms_topk', -1),
+            max_per_class=cfg.get('max_per_class', -1))
+        det_bboxes, det_labels = zip(*det_results)
+        return list(det_bboxes), list(det_labels)
+
     @force_fp32(apply_to=('bbox_preds', ))
     def refine_bboxes(self, rois, labels, bbox_preds, pos_is_gts, img_metas):
         """Refine bboxes during training.
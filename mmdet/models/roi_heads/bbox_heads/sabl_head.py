@@ -511,6 +511,34 @@ class SABLHead(BaseModule):
 
             return det_bboxes, det_labels
 
+    def batch_get_bboxes(self,
+                         rois,
+                         cls_scores,
+                         bbox_preds,
+                         img_shapes,
+                         scale_factors,
+                         rescale=False,
+                         cfg=None):
+        """Apply :meth:`get_bboxes` to each image.
+
+        The bucketing confidences are used as score factors of the NMS and
+        :meth:`get_bboxes` does not return them without NMS, so the NMS of
+        SABL is not batched.
+        """
+        det_bboxes, det_labels = [], []
+        for i in range(len(rois)):
+            det_bbox, det_label = self.get_bboxes(
+                rois[i],
+                cls_scores[i],
+                bbox_preds[i],
+                img_shapes[i],
+                scale_factors[i],
+                rescale=rescale,
+                cfg=cfg)
+            det_bboxes.append(det_bbox)
+            det_labels.append(det_label)
+        return det_bboxes, det_labels
+
     @force_fp32(apply_to=('bbox_preds', ))
     def refine_bboxes(self, rois, labels, bbox_preds, pos_is_gts, img_metas):
         """Refine bboxes during training.
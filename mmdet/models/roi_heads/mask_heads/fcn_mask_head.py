@@ -10,7 +10,7 @@ from mmcv.ops.carafe import CARAFEPack
 from mmcv.runner import BaseModule, ModuleList, auto_fp16, force_fp32
 from torch.nn.modules.utils import _pair
 
-from mmdet.core import mask_target
+from mmdet.core import encode_cropped_mask, mask_target
 from mmdet.models.builder import HEADS, build_loss
 
 BYTES_PER_FLOAT = 4
@@ -187,7 +187,10 @@ class FCNMaskHead(BaseModule):
                 it will be converted to numpy array outside of this method.
             det_bboxes (Tensor): shape (n, 4/5)
             det_labels (Tensor): shape (n, )
-            rcnn_test_cfg (dict): rcnn testing config
+            rcnn_test_cfg (dict): rcnn testing config. If its
+                ``encode_masks`` is True and ``mask_thr_binary`` is not
+                negative, each mask is only pasted in the region around its
+                box and encoded to RLE, without creating full-size masks.
             ori_shape (Tuple): original image height and width, shape (2,)
             scale_factor(ndarray | Tensor): If ``rescale is True``, box
                 coordinates are divided by this scale factor to fit
@@ -199,7 +202,7 @@ class FCNMaskHead(BaseModule):
             list[list]: encoded masks. The c-th item in the outer list
                 corresponds to the c-th class. Given the c-th outer list, the
                 i-th item in that inner list is the mask for the i-th box with
-                class label c.
+                class label c, a bitmap of the image size or a RLE dict.
 
         Example:
             >>> import mmcv
@@ -256,6 +259,26 @@ class FCNMaskHead(BaseModule):
             img_w = np.round(ori_shape[1] * w_scale.item()).astype(np.int32)
 
         N = len(mask_pred)
+        threshold = rcnn_test_cfg.mask_thr_binary
+        if not self.class_agnostic:
+            mask_pred = mask_pred[range(N), labels][:, None]
+
+        if rcnn_test_cfg.get('encode_masks', False) and threshold >= 0:
+            img_h, img_w = int(img_h), int(img_w)
+            for i, label in enumerate(labels.tolist()):
+                # the same as pasting the masks one by one on CPU below
+                mask, (rows, cols) = _do_paste_mask(
+                    mask_pred[i:i + 1],
+                    bboxes[i:i + 1],
+                    img_h,
+                    img_w,
+                    skip_empty=True)
+                mask = (mask[0] >= threshold).cpu().numpy()
+                bbox = [cols.start, rows.start, cols.stop, rows.stop]
+                cls_segms[label].append(
+                    encode_cropped_mask(mask, bbox, img_h, img_w))
+            return cls_segms
+
         # The actual implementation split the input into chunks,
         # and paste them chunk by chunk.
         if device.type == 'cpu':
@@ -278,7 +301,6 @@ class FCNMaskHead(BaseModule):
                     N), 'Default GPU_MEM_LIMIT is too small; try increasing it'
         chunks = torch.chunk(torch.arange(N, device=device), num_chunks)
 
-        threshold = rcnn_test_cfg.mask_thr_binary
         im_mask = torch.zeros(
             N,
             img_h,
@@ -286,9 +308,6 @@ class FCNMaskHead(BaseModule):
             device=device,
             dtype=torch.bool if threshold >= 0 else torch.uint8)
 
-        if not self.class_agnostic:
-            mask_pred = mask_pred[range(N), labels][:, None]
-
         for inds in chunks:
             masks_chunk, spatial_inds = _do_paste_mask(
                 mask_pred[inds],
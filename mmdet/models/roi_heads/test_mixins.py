@@ -109,11 +109,26 @@ class BBoxTestMixin:
         else:
             bbox_pred = (None, ) * len(proposals)
 
+        batch_inds = []
+        if rcnn_test_cfg is not None and rcnn_test_cfg.get('batch_nms', False):
+            # apply the NMS of all images with proposals at once
+            batch_inds = [
+                i for i in range(len(proposals)) if rois[i].shape[0] > 0
+            ]
+            batch_inputs = [(rois[i], cls_score[i], bbox_pred[i],
+                             img_shapes[i], scale_factors[i])
+                            for i in batch_inds]
+            batch_dets = self.bbox_head.batch_get_bboxes(
+                *zip(*batch_inputs), rescale=rescale, cfg=rcnn_test_cfg)
+            batch_dets = dict(zip(batch_inds, zip(*batch_dets)))
+
         # apply bbox post-processing to each image individually
         det_bboxes = []
         det_labels = []
         for i in range(len(proposals)):
-            if rois[i].shape[0] == 0:
+            if i in batch_inds:
+                det_bbox, det_label = batch_dets[i]
+            elif rois[i].shape[0] == 0:
                 # There is no proposal in the single image
                 det_bbox = rois[i].new_zeros(0, 5)
                 det_label = rois[i].new_zeros((0, ), dtype=torch.long)
@@ -0,0 +1,197 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import math
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+
+class BatchPreprocessor:
+    """Normalize, pad and flip a collated batch of images on the device.
+
+    It replaces the ``Normalize``, ``Pad`` and ``RandomFlip`` transforms of
+    the data pipeline, so that the workers only resize the images and send
+    uint8 tensors instead of float32 ones. The results are identical to the
+    ones of the pipeline transforms: the images are normalized in float32,
+    each image is padded with ``pad_val`` after normalization and
+    ``img_norm_cfg``, ``pad_shape``, ``flip`` and ``flip_direction`` in the
+    image metas are set accordingly.
+
+    It is enabled by ``batch_preprocessor`` in the model config, see
+    :func:`mmdet.models.build_detector`. The pipelines must then use
+    ``DefaultFormatBundle`` (not ``ImageToTensor``) without ``Normalize``
+    and ``Pad``. Keep ``RandomFlip`` with ``flip_ratio=0.`` if ``flip_ratio``
+    is set here, because ``Collect`` expects the flip keys.
+
+    Args:
+        mean (Sequence[float]): Mean values of the channels.
+        std (Sequence[float]): Std values of the channels.
+        to_rgb (bool): Whether to convert the images from BGR to RGB.
+            Default: True.
+        size_divisor (int, optional): The padded height and width of each
+            image are multiples of it. Default: None.
+        pad_val (float): Padding value of the normalized images. Default: 0.
+        flip_ratio (float, optional): Probability of flipping each image
+            during training. The ground truth boxes and masks are flipped
+            accordingly. Default: None.
+        flip_direction (str): Flip direction, 'horizontal', 'vertical' or
+            'diagonal'. Default: 'horizontal'.
+
+    Example:
+        >>> preprocessor = BatchPreprocessor(
+        ...     mean=[123.675, 116.28, 103.53], std=[58.395, 57.12, 57.375],
+        ...     size_divisor=32)
+        >>> img = torch.randint(0, 256, (2, 3, 50, 60), dtype=torch.uint8)
+        >>> img_metas = [dict(img_shape=(50, 60, 3)),
+        ...              dict(img_shape=(40, 60, 3))]
+        >>> img, _ = preprocessor(img, img_metas)
+        >>> img.shape, img.dtype
+        (torch.Size([2, 3, 64, 64]), torch.float32)
+        >>> img_metas[1]['pad_shape']
+        (64, 64, 3)
+    """
+
+    def __init__(self,
+                 mean,
+                 std,
+                 to_rgb=True,
+                 size_divisor=None,
+                 pad_val=0,
+                 flip_ratio=None,
+                 flip_direction='horizontal'):
+        self.mean = torch.tensor(mean, dtype=torch.float32).view(-1, 1, 1)
+        self.std = torch.tensor(std, dtype=torch.float32).view(-1, 1, 1)
+        self.to_rgb = to_rgb
+        self.size_divisor = size_divisor
+        self.pad_val = pad_val
+        if flip_ratio is not None:
+            assert 0 <= flip_ratio <= 1
+        assert flip_direction in ['horizontal', 'vertical', 'diagonal']
+        self.flip_ratio = flip_ratio
+        self.flip_direction = flip_direction
+        self.img_norm_cfg = dict(
+            mean=np.array(mean, dtype=np.float32),
+            std=np.array(std, dtype=np.float32),
+            to_rgb=to_rgb)
+
+    def __call__(self, img, img_metas, training=False, **kwargs):
+        """Preprocess a batch of images.
+
+        Args:
+            img (Tensor): Images of shape (N, C, H, W), usually uint8. The
+                valid part of each image is given by ``img_shape`` of its
+                meta, the rest is padding added by the collate function.
+            img_metas (list[dict]): Image metas, updated in place.
+            training (bool): Whether to randomly flip the images.
+                Default: False.
+            kwargs (dict): Other inputs of the detector. ``gt_bboxes``,
+                ``gt_bboxes_ignore`` and ``gt_masks`` are flipped with the
+                images. ``gt_masks`` is padded like in ``Pad`` and
+                ``gt_semantic_seg`` is set to 255 (ignored) outside the
+                ``img_shape`` of each image, including the padding added by
+                the collate function.
+
+        Returns:
+            tuple[Tensor, dict]: The normalized and padded images and the
+                updated ``kwargs``.
+        """
+        num_imgs, _, height, width = img.shape
+        device = img.device
+        img_hs = torch.tensor([meta['img_shape'][0] for meta in img_metas],
+                              device=device)
+        img_ws = torch.tensor([meta['img_shape'][1] for meta in img_metas],
+                              device=device)
+
+        if training and self.flip_ratio is not None:
+            flips = np.random.rand(num_imgs) < self.flip_ratio
+            img, kwargs = self._flip(img, img_metas, flips, img_hs, img_ws,
+                                     kwargs)
+
+        if self.to_rgb:
+            assert img.size(1) == 3
+            img = img.flip(1)
+        dtype = img.dtype if img.is_floating_point() else torch.float32
+        # the division matches the float32 results of mmcv.imnormalize
+        img = (img.float() - self.mean.to(device)) / self.std.to(device)
+
+        # the segmentation is padded only if it has the size of the images
+        seg = kwargs.get('gt_semantic_seg')
+        pad_seg = seg is not None and seg.shape[-2:] == (height, width)
+        if self.size_divisor is not None:
+            divisor = self.size_divisor
+            pad_h = int(math.ceil(height / divisor)) * divisor
+            pad_w = int(math.ceil(width / divisor)) * divisor
+            img = F.pad(img, (0, pad_w - width, 0, pad_h - height))
+            if pad_seg:
+                seg = F.pad(seg, (0, pad_w - width, 0, pad_h - height))
+            height, width = pad_h, pad_w
+        ys = torch.arange(height, device=device).view(1, 1, -1, 1)
+        xs = torch.arange(width, device=device).view(1, 1, 1, -1)
+        padding = (ys >= img_hs.view(-1, 1, 1, 1)) | \
+            (xs >= img_ws.view(-1, 1, 1, 1))
+        img = img.masked_fill(padding, self.pad_val).to(dtype)
+        if pad_seg:
+            kwargs['gt_semantic_seg'] = seg.masked_fill(padding, 255)
+
+        for meta in img_metas:
+            h, w, c = meta['img_shape']
+            if self.size_divisor is not None:
+                h = int(math.ceil(h / self.size_divisor)) * self.size_divisor
+                w = int(math.ceil(w / self.size_divisor)) * self.size_divisor
+            meta['pad_shape'] = (h, w, c)
+            meta['img_norm_cfg'] = self.img_norm_cfg
+        if kwargs.get('gt_masks') is not None:
+            kwargs['gt_masks'] = [
+                masks.pad(meta['pad_shape'][:2], pad_val=0)
+                for masks, meta in zip(kwargs['gt_masks'], img_metas)
+            ]
+        return img, kwargs
+
+    def _flip(self, img, img_metas, flips, img_hs, img_ws, kwargs):
+        assert 'gt_semantic_seg' not in kwargs, \
+            'Flipping the semantic segmentation is not supported, ' \
+            'use RandomFlip in the pipeline instead.'
+        direction = self.flip_direction
+        flips_t = torch.from_numpy(flips).to(img.device)
+        if direction in ['horizontal', 'diagonal']:
+            img = self._flip_axis(img, flips_t, img_ws, dim=3)
+        if direction in ['vertical', 'diagonal']:
+            img = self._flip_axis(img, flips_t, img_hs, dim=2)
+
+        for i, meta in enumerate(img_metas):
+            if not flips[i]:
+                continue
+            meta['flip'] = True
+            meta['flip_direction'] = direction
+            for key in ['gt_bboxes', 'gt_bboxes_ignore']:
+                if kwargs.get(key) is not None:
+                    kwargs[key][i] = self._flip_bboxes(kwargs[key][i],
+                                                       meta['img_shape'],
+                                                       direction)
+            if kwargs.get('gt_masks') is not None:
+                kwargs['gt_masks'][i] = kwargs['gt_masks'][i].flip(direction)
+        return img, kwargs
+
+    @staticmethod
+    def _flip_axis(img, flips, sizes, dim):
+        # flip the valid part [0, size) of the flipped images along ``dim``
+        length = img.size(dim)
+        index = torch.arange(length, device=img.device).expand(len(img), -1)
+        flipped = sizes.view(-1, 1) - 1 - index
+        index = torch.where(flips.view(-1, 1) & (flipped >= 0), flipped, index)
+        shape = [len(img), 1, 1, 1]
+        shape[dim] = length
+        return img.gather(dim, index.view(shape).expand_as(img))
+
+    @staticmethod
+    def _flip_bboxes(bboxes, img_shape, direction):
+        # same as RandomFlip.bbox_flip
+        h, w = img_shape[:2]
+        flipped = bboxes.clone()
+        if direction in ['horizontal', 'diagonal']:
+            flipped[..., 0::4] = w - bboxes[..., 2::4]
+            flipped[..., 2::4] = w - bboxes[..., 0::4]
+        if direction in ['vertical', 'diagonal']:
+            flipped[..., 1::4] = h - bboxes[..., 3::4]
+            flipped[..., 3::4] = h - bboxes[..., 1::4]
+        return flipped
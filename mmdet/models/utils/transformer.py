@@ -17,6 +17,7 @@ from mmcv.runner.base_module import BaseModule
 from mmcv.utils import to_2tuple
 from torch.nn.init import normal_
 
+from mmdet.core import PriorCache
 from mmdet.models.utils.builder import TRANSFORMER
 
 try:
@@ -720,18 +721,23 @@ class DeformableDetrTransformer(Transformer):
             Default: 4.
         two_stage_num_proposals (int): Number of proposals when set
             `as_two_stage` as True. Default: 300.
+        cache_size (int): The maximum number of image shapes of which the
+            valid ratios, reference points and encoder proposals are kept
+            in :attr:`prior_cache`, 0 disables the cache. Default: 16.
     """
 
     def __init__(self,
                  as_two_stage=False,
                  num_feature_levels=4,
                  two_stage_num_proposals=300,
+                 cache_size=16,
                  **kwargs):
         super(DeformableDetrTransformer, self).__init__(**kwargs)
         self.as_two_stage = as_two_stage
         self.num_feature_levels = num_feature_levels
         self.two_stage_num_proposals = two_stage_num_proposals
         self.embed_dims = self.encoder.embed_dims
+        self.prior_cache = PriorCache(cache_size)
         self.init_layers()
 
     def init_layers(self):
@@ -760,8 +766,11 @@ class DeformableDetrTransformer(Transformer):
             xavier_init(self.reference_points, distribution='uniform', bias=0.)
         normal_(self.level_embeds)
 
-    def gen_encoder_output_proposals(self, memory, memory_padding_mask,
-                                     spatial_shapes):
+    def gen_encoder_output_proposals(self,
+                                     memory,
+                                     memory_padding_mask,
+                                     spatial_shapes,
+                                     proposals=None):
         """Generate proposals from encoded memory.
 
         Args:
@@ -773,6 +782,9 @@ class DeformableDetrTransformer(Transformer):
                 has shape (bs, num_key).
             spatial_shapes (Tensor): The shape of all feature maps.
                 has shape (num_level, 2).
+            proposals (tuple[Tensor], optional): The proposals and their
+                valid flags returned by :meth:`get_encoder_proposals`, if
+                they are computed already. Default: None.
 
         Returns:
             tuple: A tuple of feature map and bbox prediction.
@@ -785,8 +797,36 @@ class DeformableDetrTransformer(Transformer):
                     after a inverse sigmoid, has shape \
                     (bs, num_keys, 4).
         """
+        if proposals is None:
+            proposals = self.get_encoder_proposals(memory_padding_mask,
+                                                   spatial_shapes)
+        output_proposals, output_proposals_valid = proposals
 
-        N, S, C = memory.shape
+        output_memory = memory
+        output_memory = output_memory.masked_fill(
+            memory_padding_mask.unsqueeze(-1), float(0))
+        output_memory = output_memory.masked_fill(~output_proposals_valid,
+                                                  float(0))
+        output_memory = self.enc_output_norm(self.enc_output(output_memory))
+        return output_memory, output_proposals
+
+    @staticmethod
+    def get_encoder_proposals(memory_padding_mask, spatial_shapes):
+        """Get the proposals of all points of the encoded feature maps.
+
+        Args:
+            memory_padding_mask (Tensor): Padding mask for memory.
+                has shape (bs, num_key).
+            spatial_shapes (Tensor | list[tuple]): The shape of all feature
+                maps, has shape (num_level, 2).
+
+        Returns:
+            tuple[Tensor]: The normalized proposals after a inverse sigmoid,
+                has shape (bs, num_keys, 4), and whether they are valid, has
+                shape (bs, num_keys, 1).
+        """
+        N = memory_padding_mask.size(0)
+        device = memory_padding_mask.device
         proposals = []
         _cur = 0
         for lvl, (H, W) in enumerate(spatial_shapes):
@@ -797,9 +837,9 @@ class DeformableDetrTransformer(Transformer):
 
             grid_y, grid_x = torch.meshgrid(
                 torch.linspace(
-                    0, H - 1, H, dtype=torch.float32, device=memory.device),
+                    0, H - 1, H, dtype=torch.float32, device=device),
                 torch.linspace(
-                    0, W - 1, W, dtype=torch.float32, device=memory.device))
+                    0, W - 1, W, dtype=torch.float32, device=device))
             grid = torch.cat([grid_x.unsqueeze(-1), grid_y.unsqueeze(-1)], -1)
 
             scale = torch.cat([valid_W.unsqueeze(-1),
@@ -818,14 +858,7 @@ class DeformableDetrTransformer(Transformer):
             memory_padding_mask.unsqueeze(-1), float('inf'))
         output_proposals = output_proposals.masked_fill(
             ~output_proposals_valid, float('inf'))
-
-        output_memory = memory
-        output_memory = output_memory.masked_fill(
-            memory_padding_mask.unsqueeze(-1), float(0))
-        output_memory = output_memory.masked_fill(~output_proposals_valid,
-                                                  float(0))
-        output_memory = self.enc_output_norm(self.enc_output(output_memory))
-        return output_memory, output_proposals
+        return output_proposals, output_proposals_valid
 
     @staticmethod
     def get_reference_points(spatial_shapes, valid_ratios, device):
@@ -872,6 +905,92 @@ class DeformableDetrTransformer(Transformer):
         valid_ratio = torch.stack([valid_ratio_w, valid_ratio_h], -1)
         return valid_ratio
 
+    def get_priors(self, mlvl_masks, spatial_shapes):
+        """Get the tensors of a batch that only depend on the positions.
+
+        The valid ratios, the reference points of the encoder and the
+        proposals of the encoder (if `as_two_stage` is True) of an image
+        only depend on the feature map shapes and the valid shape of the
+        image on each of them. So they are looked up in
+        :attr:`prior_cache` by these shapes, which are read from the masks
+        at once, and those of the image shapes that are not cached are
+        computed together.
+
+        Args:
+            mlvl_masks (list(Tensor)): The key_padding_mask from
+                different level, each element has shape [bs, h, w].
+            spatial_shapes (list[tuple[int]]): The shape of all feature
+                maps.
+
+        Returns:
+            tuple: A tuple of valid ratios, reference points and proposals.
+
+                - valid_ratios (Tensor): The radios of valid points on the \
+                    feature map, has shape (bs, num_levels, 2).
+                - reference_points (Tensor): The reference points of the \
+                    encoder, has shape (bs, num_keys, num_levels, 2).
+                - proposals (tuple[Tensor] | None): The proposals of the \
+                    encoder and their valid flags if `as_two_stage` is \
+                    True and the values are cached, otherwise None.
+
+            The cached tensors may be shared and should not be modified in
+            place.
+        """
+        device = mlvl_masks[0].device
+        shapes_key = tuple(tuple(shape) for shape in spatial_shapes)
+        if not self.prior_cache.is_cacheable(shapes_key):
+            valid_ratios = torch.stack(
+                [self.get_valid_ratio(m) for m in mlvl_masks], 1)
+            reference_points = self.get_reference_points(
+                spatial_shapes, valid_ratios, device=device)
+            return valid_ratios, reference_points, None
+
+        # valid_shapes: (bs, num_levels, 2)
+        valid_shapes = torch.stack([
+            torch.stack([(~mask[:, :, 0]).sum(1), (~mask[:, 0, :]).sum(1)], -1)
+            for mask in mlvl_masks
+        ], 1).tolist()
+        keys = []
+        for img_shapes in valid_shapes:
+            img_shapes = tuple(tuple(shape) for shape in img_shapes)
+            keys.append((shapes_key, img_shapes, str(device)))
+        priors = self.prior_cache.get_many(
+            keys, lambda keys: self._compute_priors(keys, device))
+        if len(priors) == 1:
+            # a single image shares the cached priors instead of copying them
+            priors = [prior[None] for prior in priors[0]]
+        else:
+            priors = [torch.stack(prior) for prior in zip(*priors)]
+        valid_ratios, reference_points = priors[:2]
+        proposals = tuple(priors[2:]) if self.as_two_stage else None
+        return valid_ratios, reference_points, proposals
+
+    def _compute_priors(self, keys, device):
+        """Compute the priors of the image shapes of :meth:`get_priors`."""
+        spatial_shapes = keys[0][0]
+        # rebuild the masks of the valid shapes
+        valid_shapes = torch.tensor([key[1] for key in keys], device=device)
+        mlvl_masks = []
+        for lvl, (H, W) in enumerate(spatial_shapes):
+            ys = torch.arange(H, device=device)
+            xs = torch.arange(W, device=device)
+            valid_H = valid_shapes[:, lvl, 0, None, None]
+            valid_W = valid_shapes[:, lvl, 1, None, None]
+            mlvl_masks.append((ys[None, :, None] >= valid_H)
+                              | (xs[None, None, :] >= valid_W))
+        valid_ratios = torch.stack(
+            [self.get_valid_ratio(m) for m in mlvl_masks], 1)
+        priors = [
+            valid_ratios,
+            self.get_reference_points(
+                spatial_shapes, valid_ratios, device=device)
+        ]
+        if self.as_two_stage:
+            mask_flatten = torch.cat([m.flatten(1) for m in mlvl_masks], 1)
+            priors.extend(
+                self.get_encoder_proposals(mask_flatten, spatial_shapes))
+        return [[prior[i] for prior in priors] for i in range(len(keys))]
+
     def get_proposal_pos_embed(self,
                                proposals,
                                num_pos_feats=128,
@@ -967,17 +1086,12 @@ class DeformableDetrTransformer(Transformer):
         feat_flatten = torch.cat(feat_flatten, 1)
         mask_flatten = torch.cat(mask_flatten, 1)
         lvl_pos_embed_flatten = torch.cat(lvl_pos_embed_flatten, 1)
+        valid_ratios, reference_points, enc_proposals = self.get_priors(
+            mlvl_masks, spatial_shapes)
         spatial_shapes = torch.as_tensor(
             spatial_shapes, dtype=torch.long, device=feat_flatten.device)
         level_start_index = torch.cat((spatial_shapes.new_zeros(
             (1, )), spatial_shapes.prod(1).cumsum(0)[:-1]))
-        valid_ratios = torch.stack(
-            [self.get_valid_ratio(m) for m in mlvl_masks], 1)
-
-        reference_points = \
-            self.get_reference_points(spatial_shapes,
-                                      valid_ratios,
-                                      device=feat.device)
 
         feat_flatten = feat_flatten.permute(1, 0, 2)  # (H*W, bs, embed_dims)
         lvl_pos_embed_flatten = lvl_pos_embed_flatten.permute(
@@ -999,7 +1113,7 @@ class DeformableDetrTransformer(Transformer):
         if self.as_two_stage:
             output_memory, output_proposals = \
                 self.gen_encoder_output_proposals(
-                    memory, mask_flatten, spatial_shapes)
+                    memory, mask_flatten, spatial_shapes, enc_proposals)
             enc_outputs_class = cls_branches[self.decoder.num_layers](
                 output_memory)
             enc_outputs_coord_unact = \
@@ -0,0 +1,196 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+import torch
+from mmcv.parallel import DataContainer as DC
+from torch.utils.data import Dataset
+
+from mmdet.datasets import (DataPrefetcher, DataWaitTimeHook,
+                            PipelineProfileHook, build_dataloader,
+                            get_pipeline_profilers)
+from mmdet.datasets.pipelines import Compose
+
+
+class ToyDataset(Dataset):
+
+    def __init__(self, num=10, fail_at=None):
+        self.num = num
+        self.fail_at = fail_at
+        self.flag = torch.zeros(num, dtype=torch.uint8).numpy()
+
+    def __len__(self):
+        return self.num
+
+    def __getitem__(self, idx):
+        if idx == self.fail_at:
+            raise ValueError('broken sample')
+        return dict(
+            img=DC(torch.full((3, 4, 4), float(idx)), stack=True),
+            gt_labels=DC(torch.tensor([idx])),
+            img_metas=DC(dict(idx=idx), cpu_only=True))
+
+
+def _assert_batches_equal(batches, expected):
+    assert len(batches) == len(expected)
+    for batch, exp in zip(batches, expected):
+        assert batch['img'].stack and not batch['img'].cpu_only
+        assert batch['img_metas'].cpu_only
+        assert batch['img_metas'].data == exp['img_metas'].data
+        for key in ['img', 'gt_labels']:
+            for data, exp_data in zip(batch[key].data, exp[key].data):
+                if isinstance(data, list):
+                    for a, b in zip(data, exp_data):
+                        assert torch.equal(a.cpu(), b)
+                else:
+                    assert torch.equal(data.cpu(), exp_data)
+
+
+@pytest.mark.parametrize('workers_per_gpu', [0, 2])
+def test_build_dataloader_prefetch(workers_per_gpu):
+    dataset = ToyDataset()
+    expected = list(
+        build_dataloader(
+            dataset, 2, workers_per_gpu, dist=False, shuffle=False))
+
+    data_loader = build_dataloader(
+        dataset,
+        2,
+        workers_per_gpu,
+        dist=False,
+        shuffle=False,
+        persistent_workers=True,
+        pin_memory=True,
+        prefetch_factor=4,
+        device_prefetch=True,
+        num_prefetch=2)
+    assert isinstance(data_loader, DataPrefetcher)
+    assert data_loader.num_prefetch == 2
+    if workers_per_gpu > 0:
+        assert data_loader.persistent_workers
+        assert data_loader.prefetch_factor == 4
+    # the attributes of the DataLoader are still accessible
+    assert data_loader.dataset is dataset
+    assert data_loader.batch_size == 2
+    assert len(data_loader) == 5
+    if not torch.cuda.is_available():
+        assert data_loader.device is None
+        assert not data_loader.pin_memory
+
+    # iterate two epochs
+    for _ in range(2):
+        _assert_batches_equal(list(data_loader), expected)
+        assert data_loader.data_wait_time >= 0
+
+    # stopping early does not block the next epoch
+    for i, _ in enumerate(data_loader):
+        if i == 1:
+            break
+    _assert_batches_equal(list(data_loader), expected)
+
+    # no prefetcher by default
+    data_loader = build_dataloader(dataset, 2, 0, dist=False)
+    assert not isinstance(data_loader, DataPrefetcher)
+
+
+def test_data_prefetcher_error():
+    data_loader = build_dataloader(
+        ToyDataset(fail_at=5),
+        2,
+        0,
+        dist=False,
+        shuffle=False,
+        pin_memory=True)
+    data_iter = iter(data_loader)
+    next(data_iter)
+    next(data_iter)
+    with pytest.raises(ValueError):
+        next(data_iter)
+    with pytest.raises(StopIteration):
+        next(data_iter)
+
+
+def test_data_wait_time_hook():
+    data_loader = build_dataloader(
+        ToyDataset(), 2, 0, dist=False, pin_memory=True)
+    hook = DataWaitTimeHook()
+    runner = MagicMock()
+    runner.data_loader = data_loader
+    for _ in data_loader:
+        hook.after_train_iter(runner)
+        runner.log_buffer.update.assert_called_with(
+            dict(data_wait=data_loader.data_wait_time))
+    assert runner.log_buffer.update.call_count == 5
+
+    # the dataloader of IterBasedRunner is wrapped by IterLoader
+    runner = MagicMock()
+    runner.data_loader._dataloader = data_loader
+    hook.after_train_iter(runner)
+    runner.log_buffer.update.assert_called_once()
+
+    # nothing is logged without a prefetcher
+    runner = MagicMock()
+    runner.data_loader = build_dataloader(ToyDataset(), 2, 0, dist=False)
+    hook.after_train_iter(runner)
+    runner.log_buffer.update.assert_not_called()
+
+
+def _load_image(results):
+    results['img'] = np.zeros((8, 8, 3), dtype=np.uint8)
+    return results
+
+
+def _drop_odd(results):
+    return None if results['idx'] % 2 else results
+
+
+class ProfiledDataset(Dataset):
+
+    def __init__(self, num=10):
+        self.num = num
+        self.flag = np.zeros(num, dtype=np.uint8)
+        self.pipeline = Compose([_load_image, _drop_odd], profile=True)
+
+    def __len__(self):
+        return self.num
+
+    def __getitem__(self, idx):
+        results = self.pipeline(dict(idx=idx))
+        return torch.tensor([results is None])
+
+
+@pytest.mark.parametrize('workers_per_gpu', [0, 2])
+def test_pipeline_profiling(workers_per_gpu):
+    dataset = ProfiledDataset()
+    dataset.pipeline.profiler.flush_interval = 0
+    data_loader = build_dataloader(
+        dataset, 2, workers_per_gpu, dist=False, shuffle=False)
+    assert len(list(data_loader)) == 5
+    del data_loader
+    # the counters of all workers are summed up
+    load_stats, drop_stats = dataset.pipeline.profiler.stats()
+    assert load_stats['name'] == drop_stats['name'] == 'function'
+    assert load_stats['calls'] == drop_stats['calls'] == 10
+    assert load_stats['drops'] == 0
+    assert drop_stats['drops'] == 5
+    assert load_stats['in_bytes'] == 0
+    assert load_stats['out_bytes'] == drop_stats['in_bytes'] == 10 * 192
+    assert drop_stats['out_bytes'] == 5 * 192
+    assert load_stats['time'] > 0
+
+    hook = PipelineProfileHook(interval=1, topk=1)
+    runner = MagicMock()
+    runner.data_loader = build_dataloader(
+        dataset, 2, 0, dist=False, profile_pipeline=True)
+    assert get_pipeline_profilers(runner.data_loader.dataset) == \
+        [dataset.pipeline.profiler]
+    runner.iter = 0
+    hook.after_train_iter(runner)
+    next(iter(runner.data_loader))
+    hook.after_train_iter(runner)
+    # only the calls since the last report are logged
+    report = runner.logger.info.call_args[0][0]
+    assert report.splitlines()[2].split()[:2] == ['function', '2']
+    assert len(report.splitlines()) == 3
+    dataset.pipeline.profiler.close()
@@ -91,6 +91,28 @@ def test_custom_classes_override_default(dataset):
     print(custom_dataset)
 
 
+@patch('mmdet.datasets.CustomDataset.load_annotations', MagicMock())
+def test_custom_dataset_pipeline_cfg():
+    pipeline = [
+        dict(type='LoadImageFromFile'),
+        dict(type='Resize', img_scale=(320, 240), keep_ratio=True),
+        dict(type='RandomFlip', flip_ratio=0.5)
+    ]
+    custom_dataset = DATASETS.get('CustomDataset')(
+        ann_file=MagicMock(), pipeline=pipeline, test_mode=True)
+    assert len(custom_dataset.pipeline.transforms) == 3
+
+    # the geometric transforms of the pipeline are fused
+    custom_dataset = DATASETS.get('CustomDataset')(
+        ann_file=MagicMock(),
+        pipeline=pipeline,
+        test_mode=True,
+        pipeline_cfg=dict(fuse_geometric=True))
+    transforms = custom_dataset.pipeline.transforms
+    assert len(transforms) == 2
+    assert transforms[1].__class__.__name__ == 'FusedGeometric'
+
+
 class CustomDatasetTests(unittest.TestCase):
 
     def setUp(self):
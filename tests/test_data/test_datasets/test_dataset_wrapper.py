@@ -5,9 +5,13 @@ from collections import defaultdict
 from unittest.mock import MagicMock
 
 import numpy as np
+from mmcv.utils import build_from_cfg
 
 from mmdet.datasets import (ClassBalancedDataset, ConcatDataset, CustomDataset,
-                            MultiImageMixDataset, RepeatDataset)
+                            MultiImageMixDataset, RepeatDataset,
+                            enable_pipeline_cache, enable_pipeline_profiling,
+                            get_pipeline_profilers)
+from mmdet.datasets.builder import PIPELINES
 
 
 def test_dataset_wrapper():
@@ -140,3 +144,112 @@ def test_dataset_wrapper():
     for idx in range(len_a):
         results_ = multi_image_mix_dataset[idx]
         assert results_['img'].shape == (img_scale[0], img_scale[1], 3)
+
+
+class ToyDataset:
+    CLASSES = ('a', 'b')
+
+    def __init__(self, num_samples=10):
+        rng = np.random.RandomState(0)
+        self.samples = []
+        for _ in range(num_samples):
+            h, w = rng.randint(40, 80, 2)
+            bboxes = np.array([[5, 5, 30, 30], [10, 20, 35, 38]],
+                              dtype=np.float32)
+            self.samples.append(
+                dict(
+                    img=rng.randint(0, 256, (h, w, 3)).astype(np.uint8),
+                    gt_bboxes=bboxes,
+                    gt_labels=np.array([0, 1]),
+                    bbox_fields=['gt_bboxes']))
+        self.num_loads = 0
+
+    def __len__(self):
+        return len(self.samples)
+
+    def __getitem__(self, idx):
+        self.num_loads += 1
+        return self.samples[idx]
+
+    def get_ann_info(self, idx):
+        return dict(bboxes=self.samples[idx]['gt_bboxes'])
+
+
+def test_multi_image_mix_dataset_cache():
+    img_scale = (32, 32)
+    pipeline = [
+        dict(type='Mosaic', img_scale=img_scale),
+        dict(type='MixUp', img_scale=img_scale)
+    ]
+    dataset = ToyDataset()
+    copies = [{k: v.copy() for k, v in s.items()} for s in dataset.samples]
+    mix_dataset = MultiImageMixDataset(
+        dataset, pipeline, max_cached_samples=4, cache_img_scale=img_scale)
+    # the cache is filled by the sample and the partners of Mosaic, MixUp
+    # then draws its partner from the cache
+    mix_dataset[0]
+    assert dataset.num_loads == 4
+    assert len(mix_dataset._cache) == 4
+    for _ in range(3):
+        for idx in range(len(dataset)):
+            results = mix_dataset[idx]
+            assert results['img'].shape == (64, 64, 3)
+            assert len(results['gt_bboxes']) == len(results['gt_labels'])
+    # then only the sample itself is loaded
+    assert dataset.num_loads == 4 + 3 * len(dataset)
+    assert len(mix_dataset._cache) == 4
+    for sample in mix_dataset._cache.samples:
+        assert max(sample['img'].shape[:2]) == 32
+    # the samples of the dataset are not modified
+    for sample, sample_copy in zip(dataset.samples, copies):
+        for key in ['img', 'gt_bboxes', 'gt_labels']:
+            assert np.array_equal(sample[key], sample_copy[key])
+
+    # the samples resized by the pipeline of the dataset are resized again
+    resize = build_from_cfg(
+        dict(type='Resize', img_scale=(100, 60), keep_ratio=True), PIPELINES)
+    dataset.samples = [resize(dict(s)) for s in dataset.samples]
+    mix_dataset = MultiImageMixDataset(
+        dataset, pipeline, max_cached_samples=4, cache_img_scale=img_scale)
+    results = mix_dataset[0]
+    assert results['img'].shape == (64, 64, 3)
+    for sample in mix_dataset._cache.samples:
+        assert max(sample['img'].shape[:2]) == 32
+        assert sample['img_shape'] == sample['img'].shape
+
+    # the oldest sample is replaced without random_pop
+    mix_dataset = MultiImageMixDataset(
+        dataset, pipeline, max_cached_samples=2, random_pop=False)
+    mix_dataset[3]
+    mix_dataset[4]
+    assert mix_dataset._cache[1] is dataset.samples[4]
+
+
+def test_multi_image_mix_dataset_profiling(tmp_path):
+    img_scale = (32, 32)
+    pipeline = [
+        dict(type='Mosaic', img_scale=img_scale),
+        dict(type='MixUp', img_scale=img_scale)
+    ]
+    mix_dataset = MultiImageMixDataset(ToyDataset(), pipeline)
+    profilers = enable_pipeline_profiling(mix_dataset, flush_interval=0)
+    assert profilers == [mix_dataset.profiler]
+    assert get_pipeline_profilers(mix_dataset) == profilers
+    # the transforms of the wrapper are not a Compose pipeline
+    assert enable_pipeline_cache(mix_dataset, str(tmp_path)) == []
+
+    for idx in range(3):
+        results = mix_dataset[idx]
+    mix_dataset.update_skip_type_keys(['MixUp'])
+    mix_dataset[3]
+    mosaic_stats, mixup_stats = mix_dataset.profiler.stats()
+    assert mosaic_stats['name'] == 'Mosaic'
+    assert mixup_stats['name'] == 'MixUp'
+    assert mosaic_stats['calls'] == 4
+    assert mixup_stats['calls'] == 3
+    assert mosaic_stats['drops'] == mixup_stats['drops'] == 0
+    # uint8 mosaics of 64x64
+    assert mosaic_stats['out_bytes'] == 4 * 64 * 64 * 3
+    assert mixup_stats['out_bytes'] == 3 * results['img'].nbytes
+    assert mosaic_stats['time'] > 0
+    mix_dataset.profiler.close()
@@ -1,12 +1,23 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 import copy
+import multiprocessing as mp
+import os
 import os.path as osp
 
 import mmcv
 import numpy as np
+import pycocotools.mask as maskUtils
 
-from mmdet.datasets.pipelines import (LoadImageFromFile, LoadImageFromWebcam,
-                                      LoadMultiChannelImageFromFiles)
+from mmdet.core import BitmapMasks, CroppedBitmapMasks
+from mmdet.datasets.pipelines import (LoadAnnotations, LoadImageFromFile,
+                                      LoadImageFromWebcam,
+                                      LoadMultiChannelImageFromFiles,
+                                      SharedImageCache)
+from mmdet.datasets.pipelines.image_cache import _CacheIndex
+
+
+def _load_in_subprocess(transform, results):
+    transform(results)
 
 
 class TestLoading:
@@ -57,6 +68,78 @@ class TestLoading:
         assert results['img'].shape == (288, 512)
         assert results['img'].dtype == np.uint8
 
+    def test_load_img_with_cache(self):
+        results = dict(
+            img_prefix=self.data_prefix, img_info=dict(filename='color.jpg'))
+        expected = LoadImageFromFile()(copy.deepcopy(results))['img']
+
+        for mode in ['decoded', 'bytes']:
+            cache_cfg = dict(max_bytes=2 * expected.nbytes, mode=mode)
+            transform = LoadImageFromFile(cache_cfg=cache_cfg)
+            assert repr(transform).endswith(f'cache_cfg={cache_cfg})')
+            for _ in range(3):
+                img = transform(copy.deepcopy(results))['img']
+                assert np.array_equal(img, expected)
+            stats = transform.cache.stats()
+            assert stats['hits'] == 2
+            assert stats['misses'] == 1
+            transform.cache.close()
+
+        # images cached by a worker process are visible to the others
+        transform = LoadImageFromFile(
+            to_float32=True, cache_cfg=dict(max_bytes=2 * expected.nbytes))
+        worker = mp.get_context('fork').Process(
+            target=_load_in_subprocess,
+            args=(transform, copy.deepcopy(results)))
+        worker.start()
+        worker.join()
+        img = transform(copy.deepcopy(results))['img']
+        assert img.dtype == np.float32
+        assert np.array_equal(img, expected)
+        stats = transform.cache.stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+        transform.cache.close()
+
+    def test_shared_image_cache(self):
+        cache = SharedImageCache(max_bytes=100)
+        assert cache.get('a') is None
+        assert cache.put('a', np.arange(40, dtype=np.uint8))
+        assert cache.put('b', b'x' * 40)
+        # already cached
+        assert not cache.put('b', b'y' * 40)
+        # larger than the memory budget
+        assert not cache.put('c', np.zeros(101, dtype=np.uint8))
+        assert np.array_equal(cache.get('a'), np.arange(40))
+        # 'b' is the least recently used one and gets evicted
+        assert cache.put('c', np.ones((2, 5), dtype=np.float32))
+        assert cache.get('b') is None
+        value = cache.get('c')
+        assert value.shape == (2, 5) and value.dtype == np.float32
+        stats = cache.stats()
+        assert stats['hits'] == 2
+        assert stats['misses'] == 2
+        assert stats['evictions'] == 1
+        assert stats['num_entries'] == 2
+        assert stats['used_bytes'] == 80
+        cache.close()
+
+    def test_shared_image_cache_dead_writer(self):
+        index = _CacheIndex(100)
+        # a writer that dies before committing its reservation
+        writer = mp.get_context('spawn').Process(target=int)
+        writer.start()
+        writer.join()
+        assert index.reserve('a', 60, writer.pid) == 0
+        assert index.reserve('b', 60, os.getpid()) == 0
+        assert index.stats()['num_entries'] == 1
+        index.commit('b', None)
+        # the key of the dead writer can be cached again
+        assert index.reserve('a', 40, os.getpid()) == 60
+        # a commit of a released reservation is ignored
+        index.commit('c', None)
+        assert index.stats()['used_bytes'] == 100
+
     def test_load_multi_channel_img(self):
         results = dict(
             img_prefix=self.data_prefix,
@@ -89,3 +172,26 @@ class TestLoading:
         assert results['img'].dtype == np.uint8
         assert results['img_shape'] == (288, 512, 3)
         assert results['ori_shape'] == (288, 512, 3)
+
+    def test_load_cropped_masks(self):
+        polygons = [[[10, 10, 30, 12, 25, 40, 8, 30]],
+                    [[0, 0, 63, 0, 63, 5.5, 0, 5.5], [40, 40, 50, 45, 42, 60]]]
+        rle = maskUtils.encode(
+            np.asfortranarray(
+                np.pad(np.ones((5, 6), np.uint8), ((20, 39), (30, 28)))))
+        results = dict(
+            img_info=dict(height=64, width=64),
+            ann_info=dict(masks=polygons + [rle]),
+            mask_fields=[])
+        transform = LoadAnnotations(
+            with_bbox=False, with_label=False, with_mask=True)
+        expected = transform(copy.deepcopy(results))['gt_masks']
+        transform = LoadAnnotations(
+            with_bbox=False, with_label=False, with_mask=True, crop_masks=True)
+        cropped = transform(copy.deepcopy(results))['gt_masks']
+        assert isinstance(expected, BitmapMasks)
+        assert isinstance(cropped, CroppedBitmapMasks)
+        assert len(cropped) == 3
+        assert (cropped.to_ndarray() == expected.masks).all()
+        assert cropped.masks[2].shape == (5, 6)
+        assert (cropped.bboxes[2] == [30, 20, 36, 25]).all()
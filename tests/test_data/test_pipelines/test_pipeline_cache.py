@@ -0,0 +1,94 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import copy
+import os
+import os.path as osp
+import shutil
+
+import numpy as np
+import torch
+
+from mmdet.datasets.pipelines import Compose
+
+img_norm_cfg = dict(
+    mean=[123.675, 116.28, 103.53], std=[58.395, 57.12, 57.375], to_rgb=True)
+
+test_pipeline = [
+    dict(type='LoadImageFromFile'),
+    dict(
+        type='MultiScaleFlipAug',
+        img_scale=[(256, 128), (128, 64)],
+        flip=True,
+        transforms=[
+            dict(type='Resize', keep_ratio=True),
+            dict(type='RandomFlip'),
+            dict(type='Normalize', **img_norm_cfg),
+            dict(type='Pad', size_divisor=32),
+            dict(type='ImageToTensor', keys=['img']),
+            dict(type='Collect', keys=['img']),
+        ])
+]
+
+
+def _assert_results_equal(results, expected):
+    assert len(results['img']) == len(expected['img']) == 4
+    for img, exp_img in zip(results['img'], expected['img']):
+        assert torch.equal(img, exp_img)
+    for meta, exp_meta in zip(results['img_metas'], expected['img_metas']):
+        meta, exp_meta = meta.data, exp_meta.data
+        assert meta.keys() == exp_meta.keys()
+        for key in meta:
+            if key == 'img_norm_cfg':
+                for k, v in meta[key].items():
+                    assert np.all(v == exp_meta[key][k])
+            else:
+                assert np.all(meta[key] == exp_meta[key])
+
+
+def test_pipeline_cache(tmp_path):
+    img_prefix = str(tmp_path / 'imgs')
+    os.makedirs(img_prefix)
+    shutil.copy(
+        osp.join(osp.dirname(__file__), '../../data/color.jpg'), img_prefix)
+    results = dict(img_prefix=img_prefix, img_info=dict(filename='color.jpg'))
+    expected = Compose(test_pipeline)(copy.deepcopy(results))
+
+    cache_dir = str(tmp_path / 'cache')
+    pipeline = Compose(test_pipeline, cache_dir=cache_dir)
+    cache = pipeline.cache
+    # LoadImageFromFile, Resize and RandomFlip are cached
+    assert cache.num_transforms == 2
+    assert len(cache.tta_prefix) == 2
+    # the cache is filled in the first run and used in the second
+    for _ in range(2):
+        _assert_results_equal(pipeline(copy.deepcopy(results)), expected)
+        assert sorted(os.listdir(cache.cache_dir))[0].endswith('.npy')
+        assert len(os.listdir(cache.cache_dir)) == 2
+    cached = cache._load(
+        osp.join(img_prefix, 'color.jpg'),
+        cache._get_source_stat(osp.join(img_prefix, 'color.jpg')))
+    assert [r['img'].dtype for r in cached] == [np.uint8] * 4
+    assert [r['flip'] for r in cached] == [False, True, False, True]
+
+    # the cache is invalidated when the image changes
+    filename = osp.join(img_prefix, 'color.jpg')
+    mtime = os.stat(filename).st_mtime_ns
+    os.utime(filename, ns=(mtime + 10**9, mtime + 10**9))
+    assert cache._load(filename, cache._get_source_stat(filename)) is None
+    pipeline(copy.deepcopy(results))
+    assert cache._load(filename, cache._get_source_stat(filename)) is not None
+
+    # a different configuration uses a different cache
+    other_pipeline = copy.deepcopy(test_pipeline)
+    other_pipeline[1]['img_scale'] = [(256, 128)]
+    other_cache = Compose(other_pipeline, cache_dir=cache_dir).cache
+    assert other_cache.cache_dir != cache.cache_dir
+    # the normalization is not cached
+    other_pipeline = copy.deepcopy(test_pipeline)
+    other_pipeline[1]['transforms'][2]['mean'] = [0, 0, 0]
+    other_cache = Compose(other_pipeline, cache_dir=cache_dir).cache
+    assert other_cache.cache_dir == cache.cache_dir
+
+    # pipelines that do not load images are not cached
+    pipeline = Compose(test_pipeline[1:])
+    assert pipeline.enable_cache(cache_dir) is None
+    assert pipeline.cache is None
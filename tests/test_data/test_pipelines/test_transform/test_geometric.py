@@ -0,0 +1,209 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import copy
+
+import numpy as np
+import pytest
+
+from mmdet.core.mask import BitmapMasks, CroppedBitmapMasks, PolygonMasks
+from mmdet.datasets.pipelines import (AutoAugment, Compose, FusedGeometric,
+                                      RandomAffine, Rotate,
+                                      fuse_geometric_transforms)
+
+
+def _demo_results(h=120, w=160):
+    rng = np.random.RandomState(0)
+    img = rng.randint(0, 256, (h, w, 3), dtype=np.uint8)
+    bboxes = np.array([[20, 30, 70, 90], [90, 10, 140, 60]], dtype=np.float32)
+    masks = np.zeros((2, h, w), dtype=np.uint8)
+    seg = np.zeros((h, w), dtype=np.uint8)
+    for i, (x1, y1, x2, y2) in enumerate(bboxes.astype(int)):
+        masks[i, y1:y2, x1:x2] = 1
+        seg[y1:y2, x1:x2] = i + 1
+    return dict(
+        img=img,
+        img_shape=img.shape,
+        ori_shape=img.shape,
+        img_fields=['img'],
+        gt_bboxes=bboxes,
+        gt_labels=np.array([1, 2]),
+        bbox_fields=['gt_bboxes'],
+        gt_masks=BitmapMasks(masks, h, w),
+        mask_fields=['gt_masks'],
+        gt_semantic_seg=seg,
+        seg_fields=['gt_semantic_seg'])
+
+
+def _run(pipeline, results, seed=0):
+    np.random.seed(seed)
+    results = pipeline(copy.deepcopy(results))
+    # the next random number shows whether the same numbers were sampled
+    return results, np.random.rand()
+
+
+@pytest.mark.parametrize('cfg', [
+    dict(type='RandomFlip', flip_ratio=1., direction='diagonal'),
+    dict(type='Shear', level=5, prob=1.),
+    dict(type='Rotate', level=5, prob=1.),
+    dict(type='Translate', level=1, prob=1., direction='vertical')
+])
+def test_fused_geometric_single(cfg):
+    results = _demo_results()
+    expected, expected_rand = _run(Compose([cfg]), results)
+    fused, fused_rand = _run(FusedGeometric([cfg]), results)
+    assert fused_rand == expected_rand
+    assert np.array_equal(fused['img'], expected['img'])
+    assert np.allclose(fused['gt_bboxes'], expected['gt_bboxes'], atol=1e-4)
+    assert fused['gt_bboxes'].dtype == np.float32
+    # the masks use nearest neighbor instead of bilinear interpolation
+    mismatch = fused['gt_masks'].masks != expected['gt_masks'].masks
+    assert mismatch.mean() < 1e-3
+
+
+def test_fused_geometric_resize():
+    results = _demo_results()
+    cfg = dict(
+        type='Resize',
+        img_scale=[(200, 100), (400, 300)],
+        multiscale_mode='range',
+        keep_ratio=True)
+    expected, expected_rand = _run(Compose([cfg]), results)
+    fused, fused_rand = _run(FusedGeometric([cfg]), results)
+    assert fused_rand == expected_rand
+    for key in ['scale', 'img_shape', 'pad_shape', 'keep_ratio']:
+        assert fused[key] == expected[key]
+    assert np.array_equal(fused['scale_factor'], expected['scale_factor'])
+    assert np.allclose(fused['gt_bboxes'], expected['gt_bboxes'])
+    # cv2.resize and cv2.warpAffine round differently
+    diff = np.abs(fused['img'].astype(np.float32) - expected['img'])
+    assert diff.mean() < 2
+    mismatch = fused['gt_masks'].masks != expected['gt_masks'].masks
+    assert mismatch.mean() < 0.02
+    mismatch = fused['gt_semantic_seg'] != expected['gt_semantic_seg']
+    assert mismatch.mean() < 0.02
+
+
+def test_fused_geometric_chain():
+    results = _demo_results()
+    cfgs = [
+        dict(type='Resize', img_scale=(320, 240), keep_ratio=True),
+        dict(type='RandomFlip', flip_ratio=0.5),
+        dict(type='Rotate', level=1, prob=1.),
+        dict(type='Shear', level=1, prob=0.5),
+        dict(type='Translate', level=0.5, prob=1.)
+    ]
+    for seed in range(4):
+        expected, expected_rand = _run(Compose(cfgs), results, seed)
+        fused, fused_rand = _run(
+            Compose(cfgs, fuse_geometric=True), results, seed)
+        assert fused_rand == expected_rand
+        for key in ['flip', 'flip_direction', 'img_shape', 'pad_shape']:
+            assert fused[key] == expected[key]
+        assert np.array_equal(fused['scale_factor'], expected['scale_factor'])
+        # the fused boxes are tighter
+        fused_bboxes, bboxes = fused['gt_bboxes'], expected['gt_bboxes']
+        assert np.all(fused_bboxes[:, :2] >= bboxes[:, :2] - 1e-3)
+        assert np.all(fused_bboxes[:, 2:] <= bboxes[:, 2:] + 1e-3)
+        assert np.array_equal(fused['gt_labels'], expected['gt_labels'])
+        assert fused['gt_masks'].masks.shape == \
+            expected['gt_masks'].masks.shape
+        assert fused['gt_semantic_seg'].shape == \
+            expected['gt_semantic_seg'].shape
+        # the images are only interpolated once
+        diff = np.abs(fused['img'].astype(np.float32) - expected['img'])
+        assert np.median(diff) < 30
+
+
+def test_fused_geometric_filter():
+    results = _demo_results()
+    # the second box is translated out of the image
+    cfgs = [
+        dict(type='Translate', level=10, prob=1., random_negative_prob=0.),
+        dict(type='Rotate', level=0, prob=1.)
+    ]
+    expected, _ = _run(Compose(cfgs), results)
+    fused, _ = _run(FusedGeometric(cfgs), results)
+    assert len(expected['gt_bboxes']) == 0
+    assert len(fused['gt_bboxes']) == 0
+    assert len(fused['gt_labels']) == 0
+    assert len(fused['gt_masks']) == 0
+
+    # RandomAffine also supports the masks
+    results['gt_masks'] = PolygonMasks(
+        [[np.array([x1, y1, x2, y1, x2, y2, x1, y2], dtype=np.float64)]
+         for x1, y1, x2, y2 in results['gt_bboxes']], 120, 160)
+    cfgs = [
+        dict(type='RandomFlip', flip_ratio=1.),
+        dict(type='RandomAffine', border=(-20, -20))
+    ]
+    fused, _ = _run(FusedGeometric(cfgs), results)
+    assert fused['img'].shape == (80, 120, 3)
+    assert fused['gt_semantic_seg'].shape == (80, 120)
+    assert len(fused['gt_masks']) == len(fused['gt_labels']) == \
+        len(fused['gt_bboxes'])
+    assert np.allclose(fused['gt_masks'].get_bboxes(), fused['gt_bboxes'])
+
+
+@pytest.mark.parametrize('mask_type', [PolygonMasks, CroppedBitmapMasks])
+def test_fused_geometric_masks(mask_type):
+    results = _demo_results()
+    bitmaps = results['gt_masks']
+    if mask_type is PolygonMasks:
+        results['gt_masks'] = PolygonMasks(
+            [[np.array([x1, y1, x2, y1, x2, y2, x1, y2], dtype=np.float64)]
+             for x1, y1, x2, y2 in results['gt_bboxes']], 120, 160)
+    else:
+        results['gt_masks'] = CroppedBitmapMasks.from_bitmaps(bitmaps)
+    cfgs = [
+        dict(type='RandomFlip', flip_ratio=1.),
+        dict(type='Translate', level=1, prob=1.),
+        dict(type='Rotate', level=10, prob=1.)
+    ]
+    fused, _ = _run(FusedGeometric(cfgs), results)
+    assert isinstance(fused['gt_masks'], mask_type)
+    results['gt_masks'] = bitmaps
+    fused_bitmaps, _ = _run(FusedGeometric(cfgs), results)
+    mismatch = fused['gt_masks'].to_ndarray() != \
+        fused_bitmaps['gt_masks'].to_ndarray()
+    assert mismatch.mean() < 0.02
+
+
+def test_fuse_geometric_transforms():
+    transforms = Compose([
+        dict(type='Resize', img_scale=(320, 240), keep_ratio=True),
+        dict(type='RandomFlip', flip_ratio=0.5),
+        dict(type='Rotate', level=1, img_fill_val=0),
+        dict(type='Translate', level=1, img_fill_val=0),
+        dict(type='Shear', level=1, img_fill_val=128),
+        dict(type='Normalize', mean=[0, 0, 0], std=[1, 1, 1]),
+        dict(type='Rotate', level=1)
+    ]).transforms
+    fused = fuse_geometric_transforms(transforms)
+    # different fill values and other transforms split the runs
+    assert len(fused) == 4
+    assert isinstance(fused[0], FusedGeometric)
+    assert fused[0].transforms == transforms[:4]
+    assert fused[1:] == transforms[4:]
+    assert 'FusedGeometric' in repr(fused[0])
+
+    with pytest.raises(AssertionError):
+        FusedGeometric([
+            dict(type='Rotate', level=1, img_fill_val=0),
+            dict(type='Shear', level=1, img_fill_val=128)
+        ])
+    with pytest.raises(AssertionError):
+        FusedGeometric(
+            [dict(type='Resize', img_scale=(320, 240), backend='pillow')])
+
+    augment = AutoAugment([[
+        dict(type='Rotate', level=1, prob=1.),
+        dict(type='Translate', level=1, prob=1.)
+    ], [dict(type='Rotate', level=1, prob=1.)]],
+                          fuse_geometric=True)
+    assert isinstance(augment.transforms[0].transforms[0], FusedGeometric)
+    assert isinstance(augment.transforms[1].transforms[0], Rotate)
+    assert not isinstance(
+        Compose([dict(type='RandomAffine'),
+                 dict(type='RandomAffine')]).transforms[0], FusedGeometric)
+    assert isinstance(
+        Compose([dict(type='RandomAffine')],
+                fuse_geometric=True).transforms[0], RandomAffine)
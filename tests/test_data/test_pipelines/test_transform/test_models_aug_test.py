@@ -2,6 +2,7 @@
 import os.path as osp
 
 import mmcv
+import numpy as np
 import torch
 from mmcv.parallel import collate
 from mmcv.utils import build_from_cfg
@@ -129,3 +130,98 @@ def test_cornernet_aug_test():
     with torch.no_grad():
         aug_result = model(return_loss=False, rescale=True, **results)
     assert len(aug_result[0]) == 80
+
+
+def test_multi_scale_flip_aug_shared_transforms():
+
+    class CountCalls:
+
+        def __init__(self, transform):
+            self.transform = transform
+            self.num_calls = 0
+
+        def __call__(self, results):
+            self.num_calls += 1
+            return self.transform(results)
+
+    img_norm_cfg = dict(
+        mean=[123.675, 116.28, 103.53],
+        std=[58.395, 57.12, 57.375],
+        to_rgb=True)
+    transform = build_from_cfg(
+        dict(
+            type='MultiScaleFlipAug',
+            img_scale=[(320, 240), (256, 192)],
+            flip=True,
+            flip_direction=['horizontal', 'vertical'],
+            transforms=[
+                dict(type='Resize', keep_ratio=True),
+                dict(type='RandomFlip'),
+                dict(type='Normalize', **img_norm_cfg),
+                dict(type='Pad', size_divisor=32),
+                dict(type='ImageToTensor', keys=['img']),
+                dict(type='Collect', keys=['img']),
+            ]), PIPELINES)
+    load = build_from_cfg(dict(type='LoadImageFromFile'), PIPELINES)
+    results = load(
+        dict(
+            img_prefix=osp.join(osp.dirname(__file__), '../../../data'),
+            img_info=dict(filename='color.jpg')))
+    expected = [transform.transforms(r) for r in transform._augment(results)]
+
+    resize = CountCalls(transform.transforms.transforms[0])
+    transform.transforms.transforms[0] = resize
+    aug_results = transform(results)
+    # the image is resized once per scale
+    assert resize.num_calls == 2
+    assert len(aug_results['img']) == len(expected) == 6
+    for img, meta, exp in zip(aug_results['img'], aug_results['img_metas'],
+                              expected):
+        assert torch.equal(img, exp['img'])
+        assert meta.data['flip_direction'] == \
+            exp['img_metas'].data['flip_direction']
+        assert meta.data['img_shape'] == exp['img_metas'].data['img_shape']
+
+
+def test_batched_aug_test():
+    cfg = mmcv.Config.fromfile(
+        'configs/retinanet/retinanet_r50_fpn_1x_coco.py')
+    cfg.model.pretrained = None
+    cfg.model.train_cfg = None
+    cfg.model.backbone.depth = 18
+    cfg.model.backbone.init_cfg = None
+    cfg.model.neck.in_channels = [64, 128, 256, 512]
+    cfg.model.batched_aug_test = True
+    model = build_detector(cfg.model)
+    assert model.batched_aug_test
+
+    load_cfg, multi_scale_cfg = cfg.test_pipeline
+    multi_scale_cfg['flip'] = True
+    multi_scale_cfg['img_scale'] = [(320, 240), (256, 192)]
+    load = build_from_cfg(load_cfg, PIPELINES)
+    transform = build_from_cfg(multi_scale_cfg, PIPELINES)
+    results = dict(
+        img_prefix=osp.join(osp.dirname(__file__), '../../../data'),
+        img_info=dict(filename='color.jpg'))
+    results = transform(load(results))
+    results['img'] = [collate([x]) for x in results['img']]
+    results['img_metas'] = [collate([x]).data[0] for x in results['img_metas']]
+
+    model.eval()
+    num_calls = []
+    model.backbone.register_forward_hook(
+        lambda *args: num_calls.append(args[1][0].size(0)))
+    with torch.no_grad():
+        feats = model.extract_feats(results['img'])
+        batched_result = model(return_loss=False, rescale=True, **results)
+        # the two flips of each scale are a batch
+        assert num_calls == [2, 2, 2, 2]
+        model.batched_aug_test = False
+        expected_feats = model.extract_feats(results['img'])
+        result = model(return_loss=False, rescale=True, **results)
+    for feat, expected_feat in zip(feats, expected_feats):
+        assert isinstance(feat, tuple)
+        for level, expected_level in zip(feat, expected_feat):
+            assert torch.allclose(level, expected_level, atol=1e-5)
+    for bboxes, expected_bboxes in zip(batched_result[0], result[0]):
+        assert np.allclose(bboxes, expected_bboxes, atol=1e-3)
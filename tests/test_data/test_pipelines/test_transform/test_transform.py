@@ -472,6 +472,45 @@ def test_normalize():
     assert np.allclose(results['img'], converted_img)
 
 
+def test_photo_metric_distortion():
+    rng = np.random.RandomState(0)
+    ys, xs = np.mgrid[:64, :96]
+    img = np.stack([xs * 2.5, ys * 3.5, (xs + ys) * 1.5], axis=-1)
+    img = (img + rng.randint(0, 20, img.shape)).clip(0, 255).astype(np.uint8)
+    transform = dict(type='PhotoMetricDistortion')
+    transform = build_from_cfg(transform, PIPELINES)
+    with pytest.raises(AssertionError):
+        transform(dict(img=img.astype(np.float64)))
+
+    diffs, float_stats, uint8_stats = [], [], []
+    for seed in range(200):
+        np.random.seed(seed)
+        float_img = transform(dict(img=img.astype(np.float32)))['img']
+        float_rand = np.random.rand()
+        np.random.seed(seed)
+        uint8_img = transform(dict(img=img.copy()))['img']
+        # the same random parameters are sampled
+        assert np.random.rand() == float_rand
+        assert uint8_img.dtype == np.uint8
+        assert uint8_img.shape == img.shape
+        float_img = float_img.clip(0, 255)
+        diffs.append(np.abs(float_img - uint8_img).mean())
+        float_stats.append([float_img.mean((0, 1)), float_img.std((0, 1))])
+        uint8_stats.append([uint8_img.mean((0, 1)), uint8_img.std((0, 1))])
+    # the uint8 images are clipped and quantized after each lookup
+    assert np.median(diffs) < 1
+    assert np.max(diffs) < 5
+    # the distributions of the channel means and stds are equivalent
+    float_stats, uint8_stats = np.array(float_stats), np.array(uint8_stats)
+    assert np.allclose(float_stats.mean(0), uint8_stats.mean(0), atol=0.5)
+    assert np.allclose(float_stats.std(0), uint8_stats.std(0), atol=0.5)
+    for q in [0.1, 0.5, 0.9]:
+        assert np.allclose(
+            np.quantile(float_stats, q, axis=0),
+            np.quantile(uint8_stats, q, axis=0),
+            atol=2)
+
+
 def test_albu_transform():
     results = dict(
         img_prefix=osp.join(osp.dirname(__file__), '../../../data'),
@@ -0,0 +1,136 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import numpy as np
+import pytest
+
+from mmdet.datasets import (AspectRatioBucketSampler, ClassBalancedDataset,
+                            ConcatDataset, DistributedGroupSampler,
+                            GroupSampler, RepeatDataset, build_dataloader)
+from mmdet.datasets.samplers import (get_img_shapes, padding_efficiency,
+                                     rescale_shapes)
+
+
+class ToyDataset:
+
+    CLASSES = ('a', 'b', 'c')
+
+    def __init__(self, num=200, seed=0):
+        rng = np.random.RandomState(seed)
+        heights = rng.choice([360, 480, 600, 720, 1080], num)
+        ratios = rng.choice([0.75, 1., 4 / 3, 16 / 9, 2.], num)
+        self.data_infos = [
+            dict(height=int(h), width=int(h * r))
+            for h, r in zip(heights, ratios)
+        ]
+        self.flag = np.array(
+            [info['width'] / info['height'] > 1 for info in self.data_infos],
+            dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.data_infos)
+
+    def __getitem__(self, idx):
+        return idx
+
+    def get_cat_ids(self, idx):
+        return [idx % 3]
+
+
+def test_get_img_shapes():
+    dataset = ToyDataset(10)
+    shapes = get_img_shapes(dataset)
+    assert shapes.shape == (10, 2)
+    assert shapes[3].tolist() == [
+        dataset.data_infos[3]['height'], dataset.data_infos[3]['width']
+    ]
+    repeated = RepeatDataset(dataset, 3)
+    assert (get_img_shapes(repeated) == np.tile(shapes, (3, 1))).all()
+    concat = ConcatDataset([dataset, ToyDataset(5, seed=1)])
+    assert len(get_img_shapes(concat)) == 15
+    balanced = ClassBalancedDataset(dataset, oversample_thr=0.5)
+    assert (get_img_shapes(balanced) == shapes[balanced.repeat_indices]).all()
+
+    rescaled = rescale_shapes(
+        np.array([[480., 640.], [1080., 1920.]]), (1333, 800))
+    assert rescaled.tolist() == [[800, 1067], [750, 1333]]
+
+
+def test_padding_efficiency():
+    shapes = np.array([[64., 64.], [32., 64.], [64., 32.], [32., 32.]])
+    assert padding_efficiency(shapes, [0, 3], 2) == pytest.approx(5 / 8)
+    assert padding_efficiency(shapes, [1, 2], 2) == pytest.approx(1 / 2)
+    assert padding_efficiency(shapes, [0, 1, 2, 3], 1) == 1
+    assert padding_efficiency(shapes, [], 2) == 1
+
+
+@pytest.mark.parametrize('num_replicas', [1, 3])
+def test_aspect_ratio_bucket_sampler(num_replicas):
+    dataset = ToyDataset()
+    samples_per_gpu = 4
+
+    def build(rank, epoch, seed=0):
+        sampler = AspectRatioBucketSampler(
+            dataset,
+            samples_per_gpu,
+            num_replicas,
+            rank,
+            seed=seed,
+            num_ratio_buckets=5,
+            num_size_buckets=2)
+        sampler.set_epoch(epoch)
+        return sampler
+
+    samplers = [build(rank, 0) for rank in range(num_replicas)]
+    indices = [list(sampler) for sampler in samplers]
+    for sampler, rank_indices in zip(samplers, indices):
+        assert len(rank_indices) == len(sampler)
+        assert len(rank_indices) % samples_per_gpu == 0
+        # every batch comes from one bucket
+        batch_flags = sampler.flag[np.array(rank_indices).reshape(
+            -1, samples_per_gpu)]
+        assert (batch_flags == batch_flags[:, :1]).all()
+        assert 0 < sampler.padding_efficiency <= 1
+    # all images are sampled by the processes together
+    assert set(sum(indices, [])) == set(range(len(dataset)))
+    assert len(sum(indices, [])) == samplers[0].total_size
+
+    # deterministic for the same seed and epoch
+    assert list(build(0, 0)) == indices[0]
+    assert list(build(0, 1)) != indices[0]
+    assert list(build(0, 0, seed=1)) != indices[0]
+
+    # the buckets reduce the padding compared to the two groups
+    group_sampler = DistributedGroupSampler(dataset, samples_per_gpu,
+                                            num_replicas, 0)
+    shapes = get_img_shapes(dataset)
+    assert samplers[0].padding_efficiency > padding_efficiency(
+        shapes, list(group_sampler), samples_per_gpu)
+
+
+def test_aspect_ratio_bucket_sampler_epoch():
+    sampler = AspectRatioBucketSampler(ToyDataset(), 2, 1, 0)
+    # the epoch advances without set_epoch
+    first, second = list(sampler), list(sampler)
+    assert first != second
+    assert sampler.epoch == 2
+    sampler.set_epoch(0)
+    assert list(sampler) == first
+    assert list(sampler) == first
+
+
+def test_build_dataloader_bucket_sampler():
+    dataset = ToyDataset()
+    bucket_cfg = dict(num_ratio_buckets=4, img_scale=(1333, 800))
+    data_loader = build_dataloader(
+        dataset, 2, 0, num_gpus=2, dist=False, bucket_cfg=bucket_cfg)
+    assert isinstance(data_loader.sampler, AspectRatioBucketSampler)
+    assert data_loader.sampler.samples_per_gpu == 4
+    assert data_loader.sampler.shapes.max() <= 1333
+    data_loader = build_dataloader(
+        dataset, 2, 0, dist=True, bucket_cfg=bucket_cfg)
+    assert isinstance(data_loader.sampler, AspectRatioBucketSampler)
+    # no bucketing without shuffling
+    data_loader = build_dataloader(
+        dataset, 2, 0, dist=False, shuffle=False, bucket_cfg=bucket_cfg)
+    assert not isinstance(data_loader.sampler, AspectRatioBucketSampler)
+    data_loader = build_dataloader(dataset, 2, 0, dist=False)
+    assert isinstance(data_loader.sampler, GroupSampler)
@@ -1,7 +1,8 @@
 import pytest
 import torch
 
-from mmdet.models.backbones.swin import SwinBlock, SwinTransformer
+from mmdet.models.backbones.swin import (SwinBlock, SwinBlockSequence,
+                                         SwinTransformer)
 
 
 def test_swin_block():
@@ -23,6 +24,57 @@ def test_swin_block():
     assert x_out.shape == torch.Size([1, 56 * 56, 64])
 
 
+def test_swin_block_caches():
+    torch.manual_seed(0)
+    block = SwinBlock(
+        embed_dims=32, num_heads=2, feedforward_channels=64, shift=True)
+    block.eval()
+    attn = block.attn
+    x = torch.randn(1, 20 * 27, 32)
+    with torch.no_grad():
+        x_out = block(x, (20, 27))
+        attn_mask = attn._compute_attn_mask(21, 28, x.device)
+        # the cached mask is the one of the padded shape
+        assert torch.equal(attn.get_attn_mask(21, 28, x.device), attn_mask)
+        assert attn.attn_mask_cache.info()['misses'] == 1
+        assert attn.attn_mask_cache.info()['hits'] == 1
+        assert torch.equal(block(x, (20, 27)), x_out)
+        assert len(attn.attn_mask_cache) == 1
+
+    # the relative position bias is kept without gradients
+    w_msa = attn.w_msa
+    with torch.no_grad():
+        bias = w_msa.get_relative_position_bias()
+        assert w_msa.get_relative_position_bias() is bias
+        # and updated with the table
+        w_msa.relative_position_bias_table.add_(1)
+        assert torch.allclose(w_msa.get_relative_position_bias(), bias + 1)
+    bias = w_msa.get_relative_position_bias()
+    assert bias.requires_grad
+    assert w_msa.get_relative_position_bias() is not bias
+
+    # the blocks of a stage share the cache
+    stage = SwinBlockSequence(
+        embed_dims=32, num_heads=2, feedforward_channels=64, depth=4)
+    caches = [block.attn.attn_mask_cache for block in stage.blocks]
+    assert all(cache is stage.attn_mask_cache for cache in caches)
+    with torch.no_grad():
+        stage(x, (20, 27))
+    assert stage.attn_mask_cache.info()['misses'] == 1
+    assert stage.attn_mask_cache.info()['hits'] == 1
+
+    # the cache can be disabled
+    stage = SwinBlockSequence(
+        embed_dims=32,
+        num_heads=2,
+        feedforward_channels=64,
+        depth=2,
+        attn_mask_cache_size=0)
+    with torch.no_grad():
+        stage(x, (20, 27))
+    assert len(stage.attn_mask_cache) == 0
+
+
 def test_swin_transformer():
     """Test Swin Transformer backbone."""
 
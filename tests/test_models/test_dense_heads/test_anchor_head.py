@@ -1,5 +1,6 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 import mmcv
+import pytest
 import torch
 
 from mmdet.models.dense_heads import AnchorHead
@@ -68,3 +69,72 @@ def test_anchor_head_loss():
     onegt_box_loss = sum(one_gt_losses['loss_bbox'])
     assert onegt_cls_loss.item() > 0, 'cls loss should be non-zero'
     assert onegt_box_loss.item() > 0, 'box loss should be non-zero'
+
+
+@pytest.mark.parametrize('sampler', ['RandomSampler', 'PseudoSampler'])
+@pytest.mark.parametrize('assigner', [
+    dict(),
+    dict(gt_max_assign_all=False, ignore_wrt_candidates=False),
+])
+def test_anchor_head_batch_targets(sampler, assigner):
+    s = 128
+    img_metas = [{
+        'img_shape': shape,
+        'scale_factor': 1,
+        'pad_shape': (s, s, 3)
+    } for shape in [(s, s, 3), (s - 40, s, 3), (s, s - 24, 3)]]
+    cfg = mmcv.Config(
+        dict(
+            assigner=dict(
+                type='MaxIoUAssigner',
+                pos_iou_thr=0.5,
+                neg_iou_thr=0.4,
+                min_pos_iou=0,
+                ignore_iof_thr=0.5,
+                **assigner),
+            sampler=dict(
+                type=sampler,
+                num=64,
+                pos_fraction=0.5,
+                neg_pos_ub=-1,
+                add_gt_as_proposals=False),
+            allowed_border=0,
+            pos_weight=-1,
+            debug=False))
+    self = AnchorHead(num_classes=4, in_channels=1, train_cfg=cfg)
+    featmap_sizes = [(s // stride, s // stride)
+                     for stride in [4, 8, 16, 32, 64]]
+    anchor_list, valid_flag_list = self.get_anchors(featmap_sizes, img_metas,
+                                                    'cpu')
+    # the second image has no gts
+    gt_bboxes = [
+        torch.Tensor([[10, 12, 60, 70], [50, 40, 120, 100], [0, 0, 8, 8]]),
+        torch.empty((0, 4)),
+        torch.Tensor([[30, 30, 90, 60]])
+    ]
+    gt_labels = [
+        torch.LongTensor([1, 2, 3]),
+        torch.LongTensor([]),
+        torch.LongTensor([0])
+    ]
+    gt_bboxes_ignore = [
+        torch.Tensor([[64, 0, 128, 32]]),
+        torch.empty((0, 4)),
+        torch.empty((0, 4))
+    ]
+
+    for labels in [gt_labels, None]:
+        torch.manual_seed(0)
+        self.train_cfg.batch_targets = False
+        expected = self.get_targets(anchor_list, valid_flag_list, gt_bboxes,
+                                    img_metas, gt_bboxes_ignore, labels)
+        torch.manual_seed(0)
+        self.train_cfg.batch_targets = True
+        targets = self.get_targets(anchor_list, valid_flag_list, gt_bboxes,
+                                   img_metas, gt_bboxes_ignore, labels)
+        assert targets[4:] == expected[4:]
+        for level_targets, expected_level_targets in zip(
+                targets[:4], expected[:4]):
+            for target, expected_target in zip(level_targets,
+                                               expected_level_targets):
+                assert torch.equal(target, expected_target)
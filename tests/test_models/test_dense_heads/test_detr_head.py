@@ -1,5 +1,8 @@
 # Copyright (c) OpenMMLab. All rights reserved.
+import copy
+
 import torch
+import torch.nn.functional as F
 from mmcv import ConfigDict
 
 from mmdet.models.dense_heads import DETRHead
@@ -97,8 +100,89 @@ def test_detr_head_loss():
         assert loss.item(
         ) > 0, 'cls loss, or box loss, or iou loss should be non-zero'
 
+    # the matchings of all decoder layers are the same as those of each
+    # layer and image
+    self.train_cfg['batch_assign'] = False
+    single_losses = self.loss(cls_scores, bbox_preds, gt_bboxes, gt_labels,
+                              img_metas, gt_bboxes_ignore)
+    self.train_cfg['batch_assign'] = True
+    for key, loss in single_losses.items():
+        assert torch.equal(loss, one_gt_losses[key])
+
     # test forward_train
     self.forward_train(feat, img_metas, gt_bboxes, gt_labels)
 
     # test inference mode
     self.get_bboxes(cls_scores, bbox_preds, img_metas, rescale=True)
+
+
+def test_detr_head_masks_and_pos_embeds():
+    layer_cfg = dict(
+        attn_cfgs=dict(type='MultiheadAttention', embed_dims=256, num_heads=4),
+        feedforward_channels=64)
+    config = ConfigDict(
+        dict(
+            type='DETRHead',
+            num_classes=4,
+            in_channels=256,
+            transformer=dict(
+                type='Transformer',
+                encoder=dict(
+                    type='DetrTransformerEncoder',
+                    num_layers=1,
+                    transformerlayers=dict(
+                        type='BaseTransformerLayer',
+                        operation_order=('self_attn', 'norm', 'ffn', 'norm'),
+                        **layer_cfg)),
+                decoder=dict(
+                    type='DetrTransformerDecoder',
+                    return_intermediate=True,
+                    num_layers=1,
+                    transformerlayers=dict(
+                        type='DetrTransformerDecoderLayer',
+                        operation_order=('self_attn', 'norm', 'cross_attn',
+                                         'norm', 'ffn', 'norm'),
+                        **layer_cfg))),
+            positional_encoding=dict(
+                type='SinePositionalEncoding', num_feats=128, normalize=True),
+            loss_cls=dict(
+                type='CrossEntropyLoss',
+                bg_cls_weight=0.1,
+                use_sigmoid=False,
+                loss_weight=1.0,
+                class_weight=1.0)))
+    head = DETRHead(**copy.deepcopy(config))
+    img_metas = [
+        dict(img_shape=(64, 50, 3), batch_input_shape=(64, 64)),
+        dict(img_shape=(40, 64, 3), batch_input_shape=(64, 64)),
+        dict(img_shape=(64, 50, 3), batch_input_shape=(64, 64))
+    ]
+    feats = [torch.rand(3, 256, 8, 8), torch.rand(3, 256, 4, 4)]
+
+    # the same as the masks and encodings computed from the img_metas
+    mlvl_masks, mlvl_pos_embeds = head.get_masks_and_pos_embeds(
+        feats, img_metas)
+    img_masks = torch.ones(3, 64, 64)
+    for img_id, img_meta in enumerate(img_metas):
+        img_h, img_w, _ = img_meta['img_shape']
+        img_masks[img_id, :img_h, :img_w] = 0
+    for feat, masks, pos_embeds in zip(feats, mlvl_masks, mlvl_pos_embeds):
+        expected_masks = F.interpolate(
+            img_masks[None], size=feat.shape[-2:]).to(torch.bool).squeeze(0)
+        assert torch.equal(masks, expected_masks)
+        assert torch.equal(pos_embeds,
+                           head.positional_encoding(expected_masks))
+    # the distinct image shapes are computed once
+    assert head.pos_cache.info()['misses'] == 2
+
+    head.get_masks_and_pos_embeds(feats, img_metas)
+    assert head.pos_cache.info()['misses'] == 2
+    assert head.pos_cache.info()['hits'] == 2
+
+    # learned positional encodings are not cached
+    config.positional_encoding = dict(
+        type='LearnedPositionalEncoding', num_feats=128)
+    head = DETRHead(**copy.deepcopy(config))
+    assert head.pos_cache.max_size == 0
+    head.get_masks_and_pos_embeds(feats, img_metas)
+    assert len(head.pos_cache) == 0
@@ -1,3 +1,5 @@
+import mmcv
+import numpy as np
 import pytest
 import torch
 
@@ -282,3 +284,95 @@ def test_desolo_light_head_loss():
             for feat_size in [4, 8, 16, 32]
         ]
         self.forward(feat)
+
+
+def _loop_solo_targets(self, gt_bboxes, gt_labels, gt_masks, featmap_sizes):
+    """The targets of SOLO computed by a loop over the gts and grids."""
+    from mmdet.core.utils import center_of_mass
+    gt_areas = torch.sqrt((gt_bboxes[:, 2] - gt_bboxes[:, 0]) *
+                          (gt_bboxes[:, 3] - gt_bboxes[:, 1]))
+    upsampled_size = (featmap_sizes[0][0] * 4, featmap_sizes[0][1] * 4)
+    mlvl_pos_mask_targets, mlvl_labels, mlvl_pos_masks = [], [], []
+    for (lower_bound, upper_bound), stride, featmap_size, num_grid in zip(
+            self.scale_ranges, self.strides, featmap_sizes, self.num_grids):
+        mask_target = torch.zeros([num_grid**2, *featmap_size],
+                                  dtype=torch.uint8)
+        labels = torch.full([num_grid, num_grid], self.num_classes)
+        pos_mask = torch.zeros([num_grid**2], dtype=torch.bool)
+        for i in range(len(gt_labels)):
+            if not lower_bound <= gt_areas[i] <= upper_bound or \
+                    gt_masks[i].sum() == 0:
+                continue
+            pos_w_range = 0.5 * (gt_bboxes[i, 2] -
+                                 gt_bboxes[i, 0]) * self.pos_scale
+            pos_h_range = 0.5 * (gt_bboxes[i, 3] -
+                                 gt_bboxes[i, 1]) * self.pos_scale
+            center_h, center_w = center_of_mass(gt_masks[i])
+
+            def to_grid(coord, size):
+                return int((coord / size) // (1. / num_grid))
+
+            coord_w = to_grid(center_w, upsampled_size[1])
+            coord_h = to_grid(center_h, upsampled_size[0])
+            top = max(0, to_grid(center_h - pos_h_range, upsampled_size[0]),
+                      coord_h - 1)
+            down = min(num_grid - 1,
+                       to_grid(center_h + pos_h_range, upsampled_size[0]),
+                       coord_h + 1)
+            left = max(0, to_grid(center_w - pos_w_range, upsampled_size[1]),
+                       coord_w - 1)
+            right = min(num_grid - 1,
+                        to_grid(center_w + pos_w_range, upsampled_size[1]),
+                        coord_w + 1)
+            labels[top:(down + 1), left:(right + 1)] = gt_labels[i]
+            gt_mask = mmcv.imrescale(
+                np.uint8(gt_masks[i].numpy()), scale=2. / stride)
+            gt_mask = torch.from_numpy(gt_mask)
+            for row in range(top, down + 1):
+                for col in range(left, right + 1):
+                    index = row * num_grid + col
+                    mask_target[
+                        index, :gt_mask.shape[0], :gt_mask.shape[1]] = gt_mask
+                    pos_mask[index] = True
+        mlvl_pos_mask_targets.append(mask_target[pos_mask])
+        mlvl_labels.append(labels)
+        mlvl_pos_masks.append(pos_mask)
+    return mlvl_pos_mask_targets, mlvl_labels, mlvl_pos_masks
+
+
+@pytest.mark.parametrize('mask_size', [256, 250])
+def test_solo_head_get_targets(mask_size):
+    torch.manual_seed(0)
+    self = SOLOHead(
+        num_classes=4,
+        in_channels=1,
+        strides=[8, 8, 16, 32, 32],
+        scale_ranges=((1, 96), (48, 192), (96, 384), (192, 768), (384, 2048)),
+        loss_mask=dict(type='DiceLoss', use_sigmoid=True, loss_weight=3.0),
+        loss_cls=dict(type='FocalLoss', use_sigmoid=True, loss_weight=1.0))
+    featmap_sizes = [(64, 64), (64, 64), (32, 32), (16, 16), (16, 16)]
+    num_gts = 30
+    xy = torch.rand((num_gts, 2)) * 200
+    wh = torch.rand((num_gts, 2)) * 200 + 4
+    gt_bboxes = torch.cat([xy, (xy + wh).clamp(max=mask_size - 1)], dim=1)
+    gt_labels = torch.randint(0, 4, (num_gts, ))
+    grid_y = torch.arange(mask_size)[None, :, None]
+    grid_x = torch.arange(mask_size)[None, None, :]
+    gt_masks = (grid_x >= gt_bboxes[:, 0, None, None]) & (
+        grid_x <= gt_bboxes[:, 2, None, None]) & (
+            grid_y >= gt_bboxes[:, 1, None, None]) & (
+                grid_y <= gt_bboxes[:, 3, None, None])
+    # random holes and an empty mask
+    gt_masks &= torch.rand(gt_masks.shape) > 0.3
+    gt_masks[3] = False
+
+    for masks in (gt_masks, gt_masks.float()):
+        targets = self._get_targets_single(gt_bboxes, gt_labels, masks,
+                                           featmap_sizes)
+        expected_targets = _loop_solo_targets(self, gt_bboxes, gt_labels,
+                                              masks, featmap_sizes)
+        assert sum(len(t) for t in targets[0]) > 0
+        for results, expected_results in zip(targets, expected_targets):
+            for result, expected in zip(results, expected_results):
+                assert result.dtype == expected.dtype
+                assert torch.equal(result, expected)
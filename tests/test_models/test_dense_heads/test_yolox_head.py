@@ -70,3 +70,11 @@ def test_yolox_head_loss():
     assert onegt_box_loss.item() > 0, 'box loss should be non-zero'
     assert onegt_obj_loss.item() > 0, 'obj loss should be non-zero'
     assert onegt_l1_loss.item() > 0, 'l1 loss should be non-zero'
+
+    # the priors of all images are assigned at once as image by image
+    self.train_cfg['batch_assign'] = False
+    single_losses = self.loss(cls_scores, bbox_preds, objectnesses, gt_bboxes,
+                              gt_labels, img_metas)
+    self.train_cfg['batch_assign'] = True
+    for key, loss in single_losses.items():
+        assert torch.equal(loss, one_gt_losses[key])
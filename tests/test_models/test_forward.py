@@ -435,6 +435,40 @@ def test_single_stage_forward_cpu(cfg_file):
             batch_results.append(result)
 
 
+def test_batch_preprocessor_forward():
+    model = _get_detector_cfg('retinanet/retinanet_r50_fpn_1x_coco.py')
+    model = _replace_r50_with_r18(model)
+    model.backbone.init_cfg = None
+    model.batch_preprocessor = dict(
+        mean=[123.675, 116.28, 103.53],
+        std=[58.395, 57.12, 57.375],
+        size_divisor=32,
+        flip_ratio=0.5)
+
+    from mmdet.models import build_detector
+    detector = build_detector(model)
+    assert detector.batch_preprocessor is not None
+
+    mm_inputs = _demo_mm_inputs((2, 3, 200, 250))
+    imgs = torch.randint(0, 256, (2, 3, 200, 250), dtype=torch.uint8)
+    img_metas = mm_inputs.pop('img_metas')
+    losses = detector.forward(
+        imgs,
+        img_metas,
+        gt_bboxes=mm_inputs['gt_bboxes'],
+        gt_labels=mm_inputs['gt_labels'],
+        return_loss=True)
+    assert isinstance(losses, dict)
+    assert img_metas[0]['pad_shape'] == (224, 256, 3)
+
+    detector.eval()
+    with torch.no_grad():
+        img_metas = [dict(img_metas[0], flip=False)]
+        result = detector.forward([imgs[:1]], [img_metas], return_loss=False)
+    assert len(result) == 1
+    assert img_metas[0]['pad_shape'] == (224, 256, 3)
+
+
 def _demo_mm_inputs(input_shape=(1, 3, 300, 300),
                     num_items=None, num_classes=10,
                     with_semantic=False):  # yapf: disable
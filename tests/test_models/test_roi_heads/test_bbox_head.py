@@ -86,6 +86,46 @@ def test_bbox_head_get_bboxes(num_sample):
         assert det_labels.shape == cls_score.shape
 
 
+def test_bbox_head_batch_get_bboxes():
+    self = BBoxHead(num_classes=5, reg_class_agnostic=False)
+    cfg = mmcv.Config(
+        dict(
+            score_thr=0.05,
+            nms=dict(type='nms', iou_threshold=0.5),
+            max_per_img=20))
+
+    rois, cls_scores, bbox_preds = [], [], []
+    for num_sample in [10, 30]:
+        xy = torch.rand(num_sample, 2) * 50
+        wh = torch.rand(num_sample, 2) * 20 + 1
+        rois.append(torch.cat([xy.new_zeros(num_sample, 1), xy, xy + wh], 1))
+        cls_scores.append(torch.rand(num_sample, 6))
+        bbox_preds.append(torch.rand(num_sample, 20) * 0.1)
+    img_shapes = [(64, 64, 3)] * 2
+    scale_factors = [np.array([2.0, 2.0, 2.0, 2.0])] * 2
+
+    # the same as get_bboxes of each image
+    det_bboxes, det_labels = self.batch_get_bboxes(
+        rois,
+        cls_scores,
+        bbox_preds,
+        img_shapes,
+        scale_factors,
+        rescale=True,
+        cfg=cfg)
+    for i in range(2):
+        expected_bboxes, expected_labels = self.get_bboxes(
+            rois[i],
+            cls_scores[i],
+            bbox_preds[i],
+            img_shapes[i],
+            scale_factors[i],
+            rescale=True,
+            cfg=cfg)
+        assert torch.allclose(det_bboxes[i], expected_bboxes)
+        assert torch.equal(det_labels[i], expected_labels)
+
+
 def test_refine_boxes():
     """Mirrors the doctest in
     ``mmdet.models.bbox_heads.bbox_head.BBoxHead.refine_boxes`` but checks for
@@ -68,3 +68,34 @@ def test_mask_head_loss():
     loss_mask_iou = mask_iou_head.loss(pos_mask_iou_pred, mask_iou_targets)
     onegt_mask_iou_loss = loss_mask_iou['loss_mask_iou'].sum()
     assert onegt_mask_iou_loss.item() >= 0
+
+
+def test_mask_head_get_seg_masks_encoded():
+    """Test encoding the masks without pasting them into the image."""
+    import numpy as np
+    import pycocotools.mask as mask_util
+    self = FCNMaskHead(num_convs=0, in_channels=8, num_classes=4)
+    torch.manual_seed(0)
+    mask_pred = torch.randn(6, 4, 28, 28)
+    # boxes inside, crossing and covering the image
+    det_bboxes = torch.Tensor([[10, 12, 40, 50, 0.9], [0, 0, 120, 90, 0.8],
+                               [100, 70, 140, 120, 0.7], [3, 5, 4, 6, 0.6],
+                               [-20, -5, 30, 95, 0.5], [50, 40, 50, 60, 0.4]])
+    det_labels = torch.LongTensor([0, 1, 2, 1, 3, 0])
+    rcnn_test_cfg = mmcv.Config(dict(mask_thr_binary=0.5))
+    ori_shape = (90, 120, 3)
+    for rescale, scale_factor in [(False, np.array([1.5, 1.5, 1.5, 1.5])),
+                                  (True, np.array([1., 2., 1., 2.]))]:
+        cls_segms = self.get_seg_masks(mask_pred, det_bboxes, det_labels,
+                                       rcnn_test_cfg, ori_shape, scale_factor,
+                                       rescale)
+        rcnn_test_cfg.encode_masks = True
+        cls_rles = self.get_seg_masks(mask_pred, det_bboxes, det_labels,
+                                      rcnn_test_cfg, ori_shape, scale_factor,
+                                      rescale)
+        rcnn_test_cfg.encode_masks = False
+        for segms, rles in zip(cls_segms, cls_rles):
+            assert len(segms) == len(rles)
+            for segm, rle in zip(segms, rles):
+                assert rle == mask_util.encode(
+                    np.asfortranarray(segm.astype(np.uint8)))
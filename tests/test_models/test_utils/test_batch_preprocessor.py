@@ -0,0 +1,162 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import copy
+
+import numpy as np
+import pytest
+import torch
+from mmcv.parallel import collate
+
+from mmdet.core import BitmapMasks
+from mmdet.datasets.pipelines import Compose
+from mmdet.models.utils import BatchPreprocessor
+
+img_norm_cfg = dict(
+    mean=[123.675, 116.28, 103.53], std=[58.395, 57.12, 57.375], to_rgb=True)
+
+
+def _demo_results(h, w, rng):
+    img = rng.randint(0, 256, (h, w, 3), dtype=np.uint8)
+    x1y1 = rng.rand(4, 2) * [w / 2, h / 2]
+    wh = rng.rand(4, 2) * [w / 2, h / 2]
+    bboxes = np.concatenate([x1y1, x1y1 + wh], axis=1).astype(np.float32)
+    masks = rng.randint(0, 2, (4, h, w), dtype=np.uint8)
+    return dict(
+        filename='demo.jpg',
+        ori_filename='demo.jpg',
+        img=img,
+        img_shape=img.shape,
+        ori_shape=img.shape,
+        scale_factor=np.ones(4, dtype=np.float32),
+        img_fields=['img'],
+        gt_bboxes=bboxes,
+        gt_labels=np.arange(4),
+        gt_masks=BitmapMasks(masks, h, w),
+        bbox_fields=['gt_bboxes'],
+        mask_fields=['gt_masks'])
+
+
+def _collate(results):
+    batch = collate(results, samples_per_gpu=len(results))
+    return {key: value.data[0] for key, value in batch.items()}
+
+
+@pytest.mark.parametrize('flip_direction',
+                         ['horizontal', 'vertical', 'diagonal'])
+def test_batch_preprocessor(flip_direction):
+    rng = np.random.RandomState(0)
+    samples = [_demo_results(h, w, rng) for h, w in [(50, 60), (35, 66)]]
+    collect = dict(
+        type='Collect', keys=['img', 'gt_bboxes', 'gt_labels', 'gt_masks'])
+    pipeline = Compose([
+        dict(type='RandomFlip', flip_ratio=1., direction=flip_direction),
+        dict(type='Normalize', **img_norm_cfg),
+        dict(type='Pad', size_divisor=32),
+        dict(type='DefaultFormatBundle'), collect
+    ])
+    batch_pipeline = Compose([
+        dict(type='RandomFlip', flip_ratio=0.),
+        dict(type='DefaultFormatBundle'), collect
+    ])
+    expected = _collate([pipeline(copy.deepcopy(s)) for s in samples])
+    batch = _collate([batch_pipeline(copy.deepcopy(s)) for s in samples])
+    assert batch['img'].dtype == torch.uint8
+
+    preprocessor = BatchPreprocessor(
+        **img_norm_cfg,
+        size_divisor=32,
+        flip_ratio=1.,
+        flip_direction=flip_direction)
+    # no flipping at test time
+    img, _ = preprocessor(batch['img'], copy.deepcopy(batch['img_metas']))
+    assert img.shape == expected['img'].shape
+    assert not torch.equal(img, expected['img'])
+
+    img_metas = batch.pop('img_metas')
+    img, kwargs = preprocessor(
+        batch.pop('img'), img_metas, training=True, **batch)
+    assert img.dtype == torch.float32
+    assert torch.equal(img, expected['img'])
+    for key in ['flip', 'flip_direction', 'pad_shape', 'img_shape']:
+        assert [meta[key] for meta in img_metas] == \
+            [meta[key] for meta in expected['img_metas']]
+    for meta, exp_meta in zip(img_metas, expected['img_metas']):
+        for key in ['mean', 'std', 'to_rgb']:
+            assert np.all(
+                meta['img_norm_cfg'][key] == exp_meta['img_norm_cfg'][key])
+    for i in range(2):
+        assert torch.equal(kwargs['gt_bboxes'][i], expected['gt_bboxes'][i])
+        assert np.all(
+            kwargs['gt_masks'][i].masks == expected['gt_masks'][i].masks)
+
+    # flipping of the segmentation is not supported
+    with pytest.raises(AssertionError):
+        preprocessor(
+            img, img_metas, training=True, gt_semantic_seg=torch.zeros(1))
+
+
+def test_batch_preprocessor_no_pad():
+    rng = np.random.RandomState(0)
+    samples = [_demo_results(h, w, rng) for h, w in [(50, 60), (35, 66)]]
+    pipeline = Compose([
+        dict(type='Normalize', **img_norm_cfg),
+        dict(type='ImageToTensor', keys=['img']),
+        dict(type='Collect', keys=['img'], meta_keys=['img_shape'])
+    ])
+    expected = [pipeline(copy.deepcopy(s))['img'] for s in samples]
+
+    preprocessor = BatchPreprocessor(**img_norm_cfg, pad_val=-1)
+    img = torch.zeros((2, 3, 50, 66), dtype=torch.uint8)
+    img_metas = []
+    for i, sample in enumerate(samples):
+        h, w = sample['img_shape'][:2]
+        img[i, :, :h, :w] = torch.from_numpy(sample['img']).permute(2, 0, 1)
+        img_metas.append(dict(img_shape=sample['img_shape']))
+    # half precision inputs stay half precision
+    img, _ = preprocessor(img.half(), img_metas)
+    assert img.shape == (2, 3, 50, 66)
+    assert img.dtype == torch.half
+    for i, exp_img in enumerate(expected):
+        h, w = exp_img.shape[1:]
+        assert torch.equal(img[i, :, :h, :w], exp_img.half())
+        assert img_metas[i]['pad_shape'] == img_metas[i]['img_shape']
+    assert (img[1, :, 35:] == -1).all()
+    assert (img[0, :, :, 60:] == -1).all()
+
+
+def test_batch_preprocessor_semantic_seg():
+    rng = np.random.RandomState(0)
+    # the padded shapes differ, so that the collate function pads too
+    samples = [_demo_results(h, w, rng) for h, w in [(50, 60), (20, 30)]]
+    for sample in samples:
+        h, w = sample['img_shape'][:2]
+        sample['gt_semantic_seg'] = rng.randint(0, 80, (h, w), np.uint8)
+        sample['seg_fields'] = ['gt_semantic_seg']
+    collect = dict(type='Collect', keys=['img', 'gt_semantic_seg'])
+    flip = dict(type='RandomFlip', flip_ratio=0.)
+    pipeline = Compose([
+        flip,
+        dict(type='Normalize', **img_norm_cfg),
+        dict(type='Pad', size_divisor=32),
+        dict(type='DefaultFormatBundle'), collect
+    ])
+    batch_pipeline = Compose([flip, dict(type='DefaultFormatBundle'), collect])
+    expected = _collate([pipeline(copy.deepcopy(s)) for s in samples])
+    batch = _collate([batch_pipeline(copy.deepcopy(s)) for s in samples])
+
+    preprocessor = BatchPreprocessor(**img_norm_cfg, size_divisor=32)
+    img_metas = batch.pop('img_metas')
+    img, kwargs = preprocessor(
+        batch.pop('img'), img_metas, training=True, **batch)
+    assert torch.equal(img, expected['img'])
+    seg = kwargs['gt_semantic_seg']
+    exp_seg = expected['gt_semantic_seg']
+    assert seg.shape == exp_seg.shape == (2, 1, 64, 64)
+    for i, meta in enumerate(img_metas):
+        pad_h, pad_w = meta['pad_shape'][:2]
+        assert torch.equal(seg[i, :, :pad_h, :pad_w],
+                           exp_seg[i, :, :pad_h, :pad_w])
+    assert (seg[1, :, 20:] == 255).all()
+    assert (seg[1, :, :, 30:] == 255).all()
+    # the padding of the collate function is ignored too
+    assert (exp_seg[1, :, 32:] == 0).all()
+    assert (seg[1, :, 32:] == 255).all()
@@ -4,6 +4,7 @@ import torch
 from mmcv.utils import ConfigDict
 
 from mmdet.models.utils.transformer import (AdaptivePadding,
+                                            DeformableDetrTransformer,
                                             DetrTransformerDecoder,
                                             DetrTransformerEncoder, PatchEmbed,
                                             PatchMerging, Transformer)
@@ -567,3 +568,77 @@ def test_transformer():
             )))
     transformer = Transformer(**config)
     transformer.init_weights()
+
+
+@pytest.mark.parametrize('as_two_stage', [False, True])
+def test_deformable_detr_transformer_priors(as_two_stage):
+    config = ConfigDict(
+        dict(
+            as_two_stage=as_two_stage,
+            num_feature_levels=2,
+            encoder=dict(
+                type='DetrTransformerEncoder',
+                num_layers=1,
+                transformerlayers=dict(
+                    type='BaseTransformerLayer',
+                    attn_cfgs=dict(
+                        type='MultiScaleDeformableAttention',
+                        embed_dims=256,
+                        num_levels=2),
+                    feedforward_channels=64,
+                    operation_order=('self_attn', 'norm', 'ffn', 'norm'))),
+            decoder=dict(
+                type='DeformableDetrTransformerDecoder',
+                num_layers=1,
+                transformerlayers=dict(
+                    type='DetrTransformerDecoderLayer',
+                    attn_cfgs=[
+                        dict(
+                            type='MultiheadAttention',
+                            embed_dims=256,
+                            num_heads=4),
+                        dict(
+                            type='MultiScaleDeformableAttention',
+                            embed_dims=256,
+                            num_levels=2)
+                    ],
+                    feedforward_channels=64,
+                    operation_order=('self_attn', 'norm', 'cross_attn', 'norm',
+                                     'ffn', 'norm')))))
+    transformer = DeformableDetrTransformer(**config)
+    spatial_shapes = [(8, 10), (4, 5)]
+    # valid shapes of each image on each level, the last image is the same
+    # as the first one
+    valid_shapes = [[(8, 7), (4, 4)], [(5, 10), (3, 5)], [(8, 7), (4, 4)]]
+    mlvl_masks = []
+    for lvl, (H, W) in enumerate(spatial_shapes):
+        masks = torch.ones(3, H, W, dtype=torch.bool)
+        for img_id, img_valid_shapes in enumerate(valid_shapes):
+            valid_H, valid_W = img_valid_shapes[lvl]
+            masks[img_id, :valid_H, :valid_W] = False
+        mlvl_masks.append(masks)
+
+    # the same as the priors computed from the masks
+    valid_ratios, reference_points, proposals = transformer.get_priors(
+        mlvl_masks, spatial_shapes)
+    expected_valid_ratios = torch.stack(
+        [transformer.get_valid_ratio(m) for m in mlvl_masks], 1)
+    assert torch.equal(valid_ratios, expected_valid_ratios)
+    assert torch.equal(
+        reference_points,
+        transformer.get_reference_points(
+            torch.tensor(spatial_shapes), expected_valid_ratios, device='cpu'))
+    if as_two_stage:
+        mask_flatten = torch.cat([m.flatten(1) for m in mlvl_masks], 1)
+        expected_proposals = transformer.get_encoder_proposals(
+            mask_flatten, torch.tensor(spatial_shapes))
+        for prior, expected_prior in zip(proposals, expected_proposals):
+            assert torch.equal(prior, expected_prior)
+    else:
+        assert proposals is None
+    # the distinct image shapes are computed once
+    assert transformer.prior_cache.info()['misses'] == 2
+
+    transformer.get_priors(mlvl_masks, spatial_shapes)
+    assert transformer.prior_cache.info()['misses'] == 2
+    assert transformer.prior_cache.info()['hits'] == 2
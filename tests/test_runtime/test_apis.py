@@ -0,0 +1,221 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import threading
+import time
+
+import numpy as np
+import pycocotools.mask as mask_util
+import pytest
+import torch
+import torch.nn as nn
+from mmcv import Config
+from mmcv.cnn import ConvModule
+from mmcv.parallel import MMDataParallel
+from torch.nn.modules.batchnorm import _BatchNorm
+from torch.utils.data import DataLoader, Dataset
+
+from mmdet.apis import init_detector, optimize_for_inference, single_gpu_test
+from mmdet.apis.optimize import _HorizontalConvBranch, fold_bn
+from mmdet.apis.test import _PostprocessWorkers
+from mmdet.apis.train import _get_train_loader_cfg
+
+
+class ToyDataset(Dataset):
+
+    def __len__(self):
+        return 10
+
+    def __getitem__(self, idx):
+        return dict(idx=idx)
+
+
+class ToyMaskModel(nn.Module):
+
+    def __init__(self):
+        super().__init__()
+        self.conv = nn.Conv2d(1, 1, 1)
+
+    def forward(self, idx, return_loss=False, rescale=True):
+        results = []
+        for i in idx.tolist():
+            bboxes = np.array([[0, 0, 4, 4, i]], dtype=np.float32)
+            masks = np.zeros((8, 8), dtype=bool)
+            masks[:i % 8 + 1] = True
+            results.append(([bboxes], [[masks]]))
+        return results
+
+
+@pytest.mark.parametrize('num_workers', [0, 2])
+def test_single_gpu_test(num_workers):
+    model = MMDataParallel(ToyMaskModel())
+    data_loader = DataLoader(ToyDataset(), batch_size=3)
+    results = single_gpu_test(
+        model, data_loader, num_postprocess_workers=num_workers)
+    assert len(results) == 10
+    for i, (bbox_results, segm_results) in enumerate(results):
+        assert bbox_results[0][0, 4] == i
+        masks = np.zeros((8, 8), dtype=np.uint8)
+        masks[:i % 8 + 1] = 1
+        assert segm_results[0][0] == mask_util.encode(np.asfortranarray(masks))
+
+
+def test_postprocess_workers():
+    lock = threading.Lock()
+    running = []
+    max_running = [0]
+
+    def postprocess(i):
+        with lock:
+            running.append(i)
+            max_running[0] = max(max_running[0], len(running))
+        # later batches finish first
+        time.sleep(0.01 * (5 - i % 5))
+        with lock:
+            running.remove(i)
+        return i
+
+    workers = _PostprocessWorkers(num_workers=2, max_pending=3)
+    outputs = []
+    for i in range(10):
+        outputs.extend(workers.submit(postprocess, i))
+        # back-pressure
+        assert len(workers._pending) <= 3
+    outputs.extend(workers.finish())
+    assert outputs == list(range(10))
+    assert max_running[0] <= 2
+
+    # the errors of the workers are raised
+    def fail(i):
+        raise ValueError(i)
+
+    workers = _PostprocessWorkers(num_workers=1)
+    with pytest.raises(ValueError):
+        for i in range(3):
+            workers.submit(fail, i)
+        workers.finish()
+
+    # without workers, batches are processed at once
+    workers = _PostprocessWorkers()
+    assert workers.submit(torch.tensor, 1) == [torch.tensor(1)]
+    assert workers.finish() == []
+
+
+def test_get_train_loader_cfg():
+    cfg = Config(dict(data=dict(samples_per_gpu=2, workers_per_gpu=4)))
+    assert _get_train_loader_cfg(cfg) == dict(
+        samples_per_gpu=2, workers_per_gpu=4)
+    # the options of data.train_dataloader override the ones of data
+    cfg.data.train_dataloader = dict(
+        workers_per_gpu=8, device_prefetch=True, num_prefetch=2)
+    assert _get_train_loader_cfg(cfg) == dict(
+        samples_per_gpu=2,
+        workers_per_gpu=8,
+        device_prefetch=True,
+        num_prefetch=2)
+    # the arguments set by the training
+    cfg.data.train_dataloader = dict(seed=1)
+    with pytest.raises(ValueError):
+        _get_train_loader_cfg(cfg)
+
+
+def _randomize_bn(module):
+    for m in module.modules():
+        if isinstance(m, _BatchNorm):
+            m.running_mean.uniform_(-1, 1)
+            m.running_var.uniform_(0.5, 2)
+            m.weight.data.uniform_(0.5, 2)
+            m.bias.data.uniform_(-1, 1)
+
+
+def test_fold_bn():
+    norm_cfg = dict(type='BN')
+    model = nn.Sequential(
+        ConvModule(3, 4, 3, padding=1, norm_cfg=norm_cfg),
+        # the norm of a pre-activation module cannot be folded
+        ConvModule(
+            4,
+            4,
+            3,
+            padding=1,
+            norm_cfg=norm_cfg,
+            order=('norm', 'conv', 'act')),
+        nn.Sequential(nn.Conv2d(4, 4, 1), nn.BatchNorm2d(4)))
+    _randomize_bn(model)
+    model.eval()
+    x = torch.rand(2, 3, 8, 8)
+    with torch.no_grad():
+        ref_out = model(x)
+        fold_bn(model)
+        out = model(x)
+    assert isinstance(model[0].norm, nn.Identity)
+    assert isinstance(model[1].norm, nn.BatchNorm2d)
+    assert isinstance(model[2][1], nn.Identity)
+    assert torch.allclose(out, ref_out, atol=1e-5)
+
+
+def test_optimize_for_inference():
+    config = Config.fromfile('configs/retinanet/retinanet_r50_fpn_1x_coco.py')
+    config.model.backbone.update(depth=18, init_cfg=None)
+    config.model.neck.in_channels = [64, 128, 256, 512]
+    torch.manual_seed(0)
+    model = init_detector(config, device='cpu')
+    _randomize_bn(model)
+    img = torch.rand(1, 3, 128, 160)
+    with torch.no_grad():
+        ref_outs = model.forward_dummy(img)
+
+    with pytest.raises(ValueError):
+        optimize_for_inference(model, level=4)
+    optimized_model = optimize_for_inference(
+        model, level=3, verify_shape=(1, 3, 64, 64))
+    # the passes are verified on copies of the model
+    assert any(isinstance(m, _BatchNorm) for m in model.modules())
+    assert not any(
+        isinstance(m, _BatchNorm) for m in optimized_model.modules())
+    assert not any(p.requires_grad for p in optimized_model.parameters())
+    bbox_head = optimized_model.bbox_head
+    assert isinstance(bbox_head.cls_convs[0], _HorizontalConvBranch)
+    assert isinstance(bbox_head.reg_convs[0], _HorizontalConvBranch)
+    assert bbox_head.cls_convs[0].convs is bbox_head.reg_convs[0].convs
+    assert optimized_model.backbone.conv1.weight.is_contiguous(
+        memory_format=torch.channels_last)
+    with torch.no_grad():
+        outs = optimized_model.forward_dummy(img)
+    for out, ref_out in zip(outs, ref_outs):
+        for level_out, level_ref_out in zip(out, ref_out):
+            assert torch.allclose(level_out, level_ref_out, atol=1e-4)
+    convs = bbox_head.cls_convs[0].convs
+    assert convs._outputs is None
+    # the outputs of the fused conv are released with the input, even if
+    # a branch is never called
+    feat = torch.rand(1, 256, 8, 8)
+    with torch.no_grad():
+        cls_feat = bbox_head.cls_convs[0](feat.clone())
+    assert convs._outputs is None
+    # they are not cached if the input requires grad
+    assert torch.allclose(
+        bbox_head.cls_convs[0](feat.requires_grad_()), cls_feat, atol=1e-5)
+    assert convs._outputs is None
+
+    # the option of init_detector
+    model = init_detector(config, device='cpu', optimize_level=1)
+    assert not any(isinstance(m, _BatchNorm) for m in model.modules())
+    assert isinstance(model.bbox_head.cls_convs[0], ConvModule)
+
+
+class ToyViewModel(nn.Module):
+
+    def __init__(self):
+        super().__init__()
+        self.conv = ConvModule(3, 4, 3, norm_cfg=dict(type='BN'))
+
+    def forward_dummy(self, img):
+        # fails on channels-last features
+        return self.conv(img).view(-1)
+
+
+def test_optimize_for_inference_skip():
+    model = ToyViewModel()
+    with pytest.warns(UserWarning, match='channels_last pass is skipped'):
+        model = optimize_for_inference(model, level=3)
+    assert isinstance(model.conv.norm, nn.Identity)
+    assert model.conv.conv.weight.is_contiguous()
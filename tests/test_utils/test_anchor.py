@@ -765,3 +765,107 @@ def test_guided_anchor():
     anchors = ga_retina_head.square_anchor_generator.grid_anchors(
         featmap_sizes, device)
     assert len(anchors) == 5
+
+
+def test_prior_cache():
+    from mmdet.core.anchor import PriorCache
+
+    cache = PriorCache(max_size=2)
+    calls = []
+
+    def compute(value):
+        calls.append(value)
+        return [torch.tensor(value)]
+
+    assert cache.get(('a', 1), lambda: compute(1))[0] == 1
+    assert cache.get(('a', 1), lambda: compute(2))[0] == 1
+    assert calls == [1]
+    assert (cache.hits, cache.misses) == (1, 1)
+    # the least recently used entry is evicted
+    cache.get(('b', 1), lambda: compute(3))
+    cache.get(('a', 1), lambda: compute(4))
+    cache.get(('c', 1), lambda: compute(5))
+    assert len(cache) == 2
+    assert cache.get(('b', 1), lambda: compute(6))[0] == 6
+    assert cache.info()['hits'] == 2
+    assert cache.info()['hit_rate'] == 2 / 6
+
+    # the distinct missing keys are computed at once
+    cache.clear()
+    values = cache.get_many([('a', 1), ('b', 2), ('a', 1)],
+                            lambda keys: [[torch.tensor(k[1])] for k in keys])
+    assert [v[0].item() for v in values] == [1, 2, 1]
+    values = cache.get_many([('b', 2), ('c', 3)],
+                            lambda keys: [[torch.tensor(10 * k[1])]
+                                          for k in keys])
+    assert [v[0].item() for v in values] == [2, 30]
+    assert (cache.hits, cache.misses) == (1, 3)
+
+    # keys with tensors are not cached
+    key = ('a', (torch.tensor(1), 2))
+    assert cache.get(key, lambda: [torch.tensor(1)])[0] == 1
+    assert cache.get(key, lambda: [torch.tensor(2)])[0] == 2
+    # a cache of size 0 is disabled
+    cache = PriorCache(max_size=0)
+    cache.get(('a', 1), lambda: [torch.tensor(1)])
+    assert len(cache) == 0 and cache.misses == 0
+
+
+@pytest.mark.parametrize('generator_cfg', [
+    dict(
+        type='AnchorGenerator',
+        scales=[8],
+        ratios=[0.5, 1.0, 2.0],
+        strides=[8, 16, (32, 16)]),
+    dict(type='MlvlPointGenerator', strides=[8, 16, (32, 16)], offset=0)
+])
+def test_prior_generator_cache(generator_cfg):
+    from unittest.mock import patch
+
+    from mmdet.core.anchor import build_prior_generator
+    generator = build_prior_generator(generator_cfg)
+    uncached = build_prior_generator({**generator_cfg, 'cache_size': 0})
+    featmap_sizes = [(13, 20), (7, 10), (7, 5)]
+    pad_shapes = [(100, 160, 3), (96, 150, 3), (100, 160, 3), (40, 60, 3)]
+
+    priors = generator.grid_priors(featmap_sizes, device='cpu')
+    assert generator.grid_priors(featmap_sizes, device='cpu')[0] is priors[0]
+    assert generator.prior_cache.info()['hits'] == 1
+    for prior, expected in zip(
+            priors, uncached.grid_priors(featmap_sizes, device='cpu')):
+        assert torch.equal(prior, expected)
+
+    flags = generator.batch_valid_flags(featmap_sizes, pad_shapes, 'cpu')
+    assert len(flags) == len(pad_shapes)
+    assert flags[0][0] is flags[2][0]
+    for pad_shape, multi_level_flags in zip(pad_shapes, flags):
+        assert len(multi_level_flags) == 3
+        expected_flags = uncached.valid_flags(featmap_sizes, pad_shape, 'cpu')
+        for i, flag in enumerate(multi_level_flags):
+            assert flag.dtype == torch.bool
+            assert torch.equal(flag, expected_flags[i])
+            # the flags of a single level are the same as before
+            stride_w, stride_h = generator.strides[i]
+            feat_h, feat_w = featmap_sizes[i]
+            valid_h = min(-(-pad_shape[0] // stride_h), feat_h)
+            valid_w = min(-(-pad_shape[1] // stride_w), feat_w)
+            valid_size = (valid_h, valid_w)
+            if hasattr(generator, 'base_anchors'):
+                expected = generator.single_level_valid_flags(
+                    featmap_sizes[i],
+                    valid_size,
+                    generator.num_base_anchors[i],
+                    device='cpu')
+            else:
+                expected = generator.single_level_valid_flags(
+                    featmap_sizes[i], valid_size, device='cpu')
+            assert torch.equal(flag, expected)
+    assert len(uncached.prior_cache) == 0
+
+    # nothing is cached while tracing
+    generator.prior_cache.clear()
+    with patch('torch.jit.is_tracing', return_value=True):
+        generator.grid_priors(featmap_sizes, device='cpu')
+        generator.valid_flags(featmap_sizes, pad_shapes[0], 'cpu')
+    assert len(generator.prior_cache) == 0
+    assert generator.prior_cache.misses == 0
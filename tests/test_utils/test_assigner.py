@@ -5,6 +5,9 @@ CommandLine:
     pytest tests/test_utils/test_assigner.py
     xdoctest tests/test_utils/test_assigner.py zero
 """
+from unittest.mock import patch
+
+import pytest
 import torch
 
 from mmdet.core.bbox.assigners import (ApproxMaxIoUAssigner,
@@ -153,6 +156,64 @@ def test_max_iou_assigner_with_empty_boxes_and_gt():
     assert len(assign_result.gt_inds) == 0
 
 
+def _random_boxes(num, size=64, seed=0):
+    # integer boxes on a small canvas have many tied overlaps
+    rng = torch.Generator().manual_seed(seed)
+    xy = torch.randint(0, size, (num, 2), generator=rng)
+    wh = torch.randint(1, size // 2, (num, 2), generator=rng)
+    return torch.cat([xy, xy + wh], dim=1).float()
+
+
+def _assert_assign_result_equal(result, expected):
+    assert result.num_gts == expected.num_gts
+    assert torch.equal(result.gt_inds, expected.gt_inds)
+    assert torch.equal(result.max_overlaps, expected.max_overlaps)
+    if expected.labels is None:
+        assert result.labels is None
+    else:
+        assert torch.equal(result.labels, expected.labels)
+
+
+@pytest.mark.parametrize('cfg', [
+    dict(),
+    dict(neg_iou_thr=(0.1, 0.4)),
+    dict(gt_max_assign_all=False, min_pos_iou=0.1),
+    dict(match_low_quality=False),
+    dict(ignore_iof_thr=0.5),
+    dict(ignore_iof_thr=0.5, ignore_wrt_candidates=False),
+])
+def test_max_iou_assigner_tiled(cfg):
+    bboxes = _random_boxes(200)
+    gt_bboxes = _random_boxes(30, seed=1)
+    gt_bboxes_ignore = _random_boxes(3, seed=2)
+    gt_labels = torch.randint(0, 10, (30, ))
+    cfg = {**dict(pos_iou_thr=0.5, neg_iou_thr=0.4), **cfg}
+    expected = MaxIoUAssigner(**cfg).assign(bboxes, gt_bboxes,
+                                            gt_bboxes_ignore, gt_labels)
+    for tile_size in [1, 64, 1000]:
+        self = MaxIoUAssigner(tile_size=tile_size, **cfg)
+        result = self.assign(bboxes, gt_bboxes, gt_bboxes_ignore, gt_labels)
+        _assert_assign_result_equal(result, expected)
+
+    # the tiles of the approxs of the squares
+    approxs = _random_boxes(600, seed=3)
+    squares = approxs[::3]
+    expected = ApproxMaxIoUAssigner(**cfg).assign(approxs, squares, 3,
+                                                  gt_bboxes, gt_bboxes_ignore,
+                                                  gt_labels)
+    result = ApproxMaxIoUAssigner(
+        tile_size=64, **cfg).assign(approxs, squares, 3, gt_bboxes,
+                                    gt_bboxes_ignore, gt_labels)
+    _assert_assign_result_equal(result, expected)
+
+    # empty gts and bboxes
+    self = MaxIoUAssigner(tile_size=64, **cfg)
+    result = self.assign(bboxes, gt_bboxes[:0], gt_labels=gt_labels[:0])
+    assert torch.all(result.gt_inds == 0)
+    result = self.assign(bboxes[:0], gt_bboxes, gt_labels=gt_labels)
+    assert len(result.gt_inds) == 0
+
+
 def test_point_assigner():
     self = PointAssigner()
     points = torch.FloatTensor([  # [x, y, stride]
@@ -426,6 +487,160 @@ def test_hungarian_match_assigner():
     assert (assign_result.labels > -1).sum() == gt_bboxes.size(0)
 
 
+@pytest.mark.parametrize('cfg', [
+    dict(),
+    dict(num_workers=0),
+    dict(cls_cost=dict(type='FocalLossCost', weight=2.)),
+])
+def test_hungarian_match_assigner_batch_assign(cfg):
+    torch.manual_seed(0)
+    self = HungarianAssigner(**cfg)
+    img_metas = [
+        dict(img_shape=(48, 64, 3)),
+        dict(img_shape=(60, 40, 3)),
+        dict(img_shape=(32, 32, 3))
+    ]
+    # more gts than queries in the last image
+    num_gts = [3, 0, 12]
+    gt_bboxes_list = [_random_boxes(num, 32) for num in num_gts]
+    gt_labels_list = [torch.randint(0, 80, (num, )) for num in num_gts]
+    bbox_preds = torch.rand((2, 3, 10, 4))
+    cls_preds = torch.rand((2, 3, 10, 81))
+    assign_results = self.batch_assign(bbox_preds, cls_preds, gt_bboxes_list,
+                                       gt_labels_list, img_metas)
+    assert len(assign_results) == 2
+    for layer in range(2):
+        for i in range(3):
+            expected = self.assign(bbox_preds[layer, i], cls_preds[layer, i],
+                                   gt_bboxes_list[i], gt_labels_list[i],
+                                   img_metas[i])
+            assert assign_results[layer][i].num_gts == expected.num_gts
+            assert torch.equal(assign_results[layer][i].gt_inds,
+                               expected.gt_inds)
+            assert torch.equal(assign_results[layer][i].labels,
+                               expected.labels)
+
+    # no gts in any image
+    empty_bboxes = [torch.zeros((0, 4))] * 3
+    empty_labels = [torch.zeros((0, ), dtype=torch.long)] * 3
+    assign_results = self.batch_assign(bbox_preds, cls_preds, empty_bboxes,
+                                       empty_labels, img_metas)
+    for layer in range(2):
+        for i in range(3):
+            assert assign_results[layer][i].num_gts == 0
+            assert (assign_results[layer][i].gt_inds == 0).all()
+            assert (assign_results[layer][i].labels == -1).all()
+
+
+@pytest.mark.parametrize('cost_cfg', [
+    dict(type='ClassificationCost'),
+    dict(type='FocalLossCost'),
+    dict(type='BBoxL1Cost'),
+    dict(type='IoUCost'),
+])
+def test_match_cost_batched_inputs(cost_cfg):
+    from mmdet.core.bbox.match_costs import build_match_cost
+    torch.manual_seed(0)
+    match_cost = build_match_cost(cost_cfg)
+    if cost_cfg['type'] in ('ClassificationCost', 'FocalLossCost'):
+        preds = torch.rand((3, 10, 81))
+        gts = torch.randint(0, 80, (3, 5))
+    else:
+        preds = _random_boxes(30, 32).view(3, 10, 4)
+        gts = _random_boxes(15, 32).view(3, 5, 4)
+    cost = match_cost(preds, gts)
+    assert cost.shape == (3, 10, 5)
+    for i in range(3):
+        assert torch.allclose(cost[i], match_cost(preds[i], gts[i]))
+
+
+def test_auction_assignment():
+    from scipy.optimize import linear_sum_assignment
+
+    from mmdet.core.bbox.assigners.hungarian_assigner import \
+        auction_assignment
+    torch.manual_seed(0)
+    cost = torch.rand((4, 6, 15)) * 10
+    row_valid = torch.ones((4, 6), dtype=torch.bool)
+    row_valid[1, 4:] = False
+    row_cols = auction_assignment(cost, row_valid, eps=1e-4)
+    assert (row_cols[~row_valid] == -1).all()
+    for i in range(4):
+        num_rows = int(row_valid[i].sum())
+        cols = row_cols[i, :num_rows]
+        assert len(set(cols.tolist())) == num_rows
+        rows, expected_cols = linear_sum_assignment(cost[i, :num_rows])
+        expected_cost = cost[i, rows, expected_cols].sum()
+        assert cost[i, rows, cols].sum() <= expected_cost + num_rows * 1e-4
+
+    # the auction solver of the assigner
+    self = HungarianAssigner(solver='auction', auction_eps=1e-4)
+    img_metas = [dict(img_shape=(48, 64, 3)), dict(img_shape=(32, 32, 3))]
+    num_gts = [4, 12]
+    gt_bboxes_list = [_random_boxes(num, 32) for num in num_gts]
+    gt_labels_list = [torch.randint(0, 80, (num, )) for num in num_gts]
+    bbox_preds = torch.rand((2, 2, 10, 4))
+    cls_preds = torch.rand((2, 2, 10, 81))
+    assign_results = self.batch_assign(bbox_preds, cls_preds, gt_bboxes_list,
+                                       gt_labels_list, img_metas)
+    for layer in range(2):
+        for i in range(2):
+            gt_inds = assign_results[layer][i].gt_inds
+            pos_inds = gt_inds > 0
+            assert int(pos_inds.sum()) == min(num_gts[i], 10)
+            assert len(gt_inds[pos_inds].unique()) == pos_inds.sum()
+            assert torch.equal(assign_results[layer][i].labels[pos_inds],
+                               gt_labels_list[i][gt_inds[pos_inds] - 1])
+    assign_result = self.assign(bbox_preds[0, 0], cls_preds[0, 0],
+                                gt_bboxes_list[0], gt_labels_list[0],
+                                img_metas[0])
+    assert (assign_result.gt_inds > 0).sum() == 4
+
+
+def test_sim_ota_assigner_batch_assign():
+    from mmdet.core.bbox.assigners import SimOTAAssigner
+    torch.manual_seed(0)
+    self = SimOTAAssigner()
+    xs, ys = torch.meshgrid(torch.arange(16.), torch.arange(16.))
+    priors = torch.stack([xs.reshape(-1), ys.reshape(-1)], dim=1) * 4 + 2
+    priors = torch.cat([priors, priors.new_full(priors.shape, 4)], dim=1)
+    num_gts = [3, 0, 8]
+    # the gts contain enough prior centers, otherwise the priors with tied
+    # costs may be selected differently
+    gt_bboxes_list = []
+    for num in num_gts:
+        gt_xy = torch.rand((num, 2)) * 40
+        gt_wh = torch.rand((num, 2)) * 16 + 12
+        gt_bboxes_list.append(torch.cat([gt_xy, gt_xy + gt_wh], dim=1))
+    gt_labels_list = [torch.randint(0, 4, (num, )) for num in num_gts]
+    xy = torch.rand((3, 256, 2)) * 56
+    decoded_bboxes = torch.cat([xy, xy + torch.rand((3, 256, 2)) * 16 + 2],
+                               dim=2)
+    pred_scores = torch.rand((3, 256, 4))
+    assign_results = self.batch_assign(pred_scores, priors, decoded_bboxes,
+                                       gt_bboxes_list, gt_labels_list)
+    for i in range(3):
+        expected = self.assign(pred_scores[i], priors, decoded_bboxes[i],
+                               gt_bboxes_list[i], gt_labels_list[i])
+        assert (expected.gt_inds > 0).any() == (num_gts[i] > 0)
+        _assert_assign_result_equal(assign_results[i], expected)
+
+    # each image is assigned separately when the device is out of memory
+    inputs = (pred_scores, priors, decoded_bboxes, gt_bboxes_list,
+              gt_labels_list)
+    oom = RuntimeError('CUDA out of memory. Tried to allocate 2.00 GiB')
+    with patch.object(self, '_batch_assign', side_effect=oom):
+        with pytest.warns(UserWarning, match='OOM'):
+            oom_results = self.batch_assign(*inputs)
+    for i in range(3):
+        _assert_assign_result_equal(oom_results[i], assign_results[i])
+    # other errors are raised
+    error = RuntimeError('shape mismatch')
+    with patch.object(self, '_batch_assign', side_effect=error):
+        with pytest.raises(RuntimeError, match='shape mismatch'):
+            self.batch_assign(*inputs)
+
+
 def test_uniform_assigner():
     self = UniformAssigner(0.15, 0.7, 1)
     pred_bbox = torch.FloatTensor([
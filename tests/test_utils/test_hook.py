@@ -323,3 +323,41 @@ def test_check_invalid_loss_hook(set_loss):
         with pytest.raises(AssertionError):
             runner.run([loader], [('train', 1)])
     shutil.rmtree(runner.work_dir)
+
+
+def test_image_cache_hook():
+    from mmdet.datasets import ImageCacheHook
+    from mmdet.datasets.pipelines import Compose, SharedImageCache
+
+    class CachedTransform:
+
+        def __init__(self):
+            self.cache = SharedImageCache(max_bytes=16)
+
+        def __call__(self, results):
+            if self.cache.get('img') is None:
+                self.cache.put('img', np.ones(8, dtype=np.uint8))
+            return results
+
+    class DemoDataset(Dataset):
+
+        def __init__(self):
+            self.pipeline = Compose([CachedTransform()])
+
+        def __getitem__(self, item):
+            self.pipeline({})
+            return torch.ones(2)
+
+        def __len__(self):
+            return 5
+
+    dataset = DemoDataset()
+    loader = DataLoader(dataset)
+    runner = _build_demo_runner()
+    hook = ImageCacheHook(interval=1)
+    runner.register_hook(hook)
+    runner.run([loader], [('train', 1)])
+    assert hook._log_vars['cache_hit_rate'] == 0.8
+    assert hook._log_vars['cache_mem'] == 8 / 1024 / 1024
+    dataset.pipeline.transforms[0].cache.close()
+    shutil.rmtree(runner.work_dir)
@@ -1,9 +1,12 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 import numpy as np
+import pycocotools.mask as mask_util
 import pytest
 import torch
 
-from mmdet.core import BitmapMasks, PolygonMasks
+from mmdet.core import (BitmapMasks, CroppedBitmapMasks, PolygonMasks,
+                        encode_cropped_mask, encode_mask_results)
+from mmdet.core.mask.structures import polygon_to_bitmap
 
 
 def dummy_raw_bitmap_masks(size):
@@ -17,6 +20,24 @@ def dummy_raw_bitmap_masks(size):
     return np.random.randint(0, 2, size, dtype=np.uint8)
 
 
+def dummy_sparse_bitmap_masks(size):
+    """
+    Args:
+        size (tuple): expected shape of dummy masks, (N, H, W)
+
+    Return:
+        ndarray: dummy masks whose foreground is within a random box, which
+            may touch the border
+    """
+    num_obj, height, width = size
+    masks = np.zeros(size, dtype=np.uint8)
+    for i in range(num_obj):
+        x1, x2 = np.sort(np.random.randint(0, width + 1, 2))
+        y1, y2 = np.sort(np.random.randint(0, height + 1, 2))
+        masks[i, y1:y2, x1:x2] = np.random.randint(0, 2, (y2 - y1, x2 - x1))
+    return masks
+
+
 def dummy_raw_polygon_masks(size):
     """
     Args:
@@ -687,3 +708,179 @@ def test_polygon_mask_iter():
     polygon_masks = PolygonMasks(raw_masks, 28, 28)
     for i, polygon_mask in enumerate(polygon_masks):
         assert np.equal(polygon_mask, raw_masks[i]).all()
+
+
+def test_cropped_bitmap_mask_init():
+    # init with empty masks
+    cropped_masks = CroppedBitmapMasks([], np.zeros((0, 4)), 28, 28)
+    assert len(cropped_masks) == 0
+    assert cropped_masks.to_ndarray().shape == (0, 28, 28)
+
+    # init from bitmap masks contain 3 instances
+    raw_masks = dummy_sparse_bitmap_masks((3, 28, 28))
+    raw_masks[0] = 0
+    cropped_masks = CroppedBitmapMasks.from_bitmaps(
+        BitmapMasks(raw_masks, 28, 28))
+    assert len(cropped_masks) == 3
+    assert cropped_masks.height == 28
+    assert cropped_masks.width == 28
+    assert cropped_masks.masks[0].shape == (0, 0)
+    assert (cropped_masks.to_ndarray() == raw_masks).all()
+    assert (cropped_masks.to_bitmap().masks == raw_masks).all()
+    assert (cropped_masks.areas == raw_masks.sum((1, 2))).all()
+    expected_bboxes = BitmapMasks(raw_masks, 28, 28).get_bboxes()
+    assert (cropped_masks.get_bboxes() == expected_bboxes).all()
+
+    # crop of the wrong shape
+    with pytest.raises(AssertionError):
+        CroppedBitmapMasks([np.ones((2, 2), dtype=np.uint8)], [[0, 0, 3, 3]],
+                           28, 28)
+
+    # init from polygon masks
+    raw_polygons = dummy_raw_polygon_masks((3, 28, 28))
+    polygon_masks = PolygonMasks(raw_polygons, 28, 28)
+    cropped_masks = CroppedBitmapMasks.from_polygons(polygon_masks)
+    assert (cropped_masks.to_ndarray() == polygon_masks.to_ndarray()).all()
+    for polygons, crop, bbox in zip(raw_polygons, cropped_masks.masks,
+                                    cropped_masks.bboxes):
+        x1, y1, x2, y2 = bbox
+        assert crop.shape == (y2 - y1, x2 - x1)
+        bitmap = polygon_to_bitmap(polygons, 28, 28)
+        assert (bitmap[y1:y2, x1:x2] == crop).all()
+
+
+def test_cropped_bitmap_mask_geometric():
+    raw_masks = dummy_sparse_bitmap_masks((5, 28, 36))
+    bitmap_masks = BitmapMasks(raw_masks, 28, 36)
+    cropped_masks = CroppedBitmapMasks.from_bitmaps(bitmap_masks)
+
+    def _assert_equal(cropped, bitmap):
+        assert isinstance(cropped, CroppedBitmapMasks)
+        assert cropped.height == bitmap.height
+        assert cropped.width == bitmap.width
+        assert (cropped.to_ndarray() == bitmap.to_ndarray()).all()
+
+    # nearest resizing gives the same pixels as cv2.resize
+    for scale in [(56, 72), (17, 23), (28, 36), (60, 20)]:
+        _assert_equal(cropped_masks.resize(scale), bitmap_masks.resize(scale))
+        _assert_equal(
+            cropped_masks.rescale(scale), bitmap_masks.rescale(scale))
+    for direction in ['horizontal', 'vertical', 'diagonal']:
+        _assert_equal(
+            cropped_masks.flip(direction), bitmap_masks.flip(direction))
+    _assert_equal(cropped_masks.pad((32, 40)), bitmap_masks.pad((32, 40)))
+    with pytest.raises(AssertionError):
+        cropped_masks.pad((32, 40), pad_val=1)
+    crop_bbox = np.array([5, 3, 20, 19])
+    _assert_equal(cropped_masks.crop(crop_bbox), bitmap_masks.crop(crop_bbox))
+    _assert_equal(
+        cropped_masks.expand(56, 56, 12, 14),
+        bitmap_masks.expand(56, 56, 12, 14))
+    _assert_equal(
+        cropped_masks.translate((28, 36), 5, direction='vertical'),
+        bitmap_masks.translate((28, 36), 5, direction='vertical'))
+    _assert_equal(
+        cropped_masks.rotate((28, 36), 90), bitmap_masks.rotate((28, 36), 90))
+    _assert_equal(cropped_masks[np.array([0, 2])],
+                  bitmap_masks[np.array([0, 2])])
+    for cropped, bitmap in zip(cropped_masks, bitmap_masks):
+        assert (cropped == bitmap).all()
+
+    # warps with interpolation only differ at a few boundary pixels
+    sheared_cropped = cropped_masks.shear((28, 36), 0.3).to_ndarray()
+    sheared_bitmap = bitmap_masks.shear((28, 36), 0.3).to_ndarray()
+    assert (sheared_cropped != sheared_bitmap).mean() < 0.01
+    resized_cropped = cropped_masks.resize((40, 50), 'bilinear').to_ndarray()
+    resized_bitmap = bitmap_masks.resize((40, 50), 'bilinear').to_ndarray()
+    assert (resized_cropped != resized_bitmap).mean() < 0.05
+
+
+def test_cropped_bitmap_mask_crop_and_resize():
+    raw_masks = dummy_sparse_bitmap_masks((4, 28, 28))
+    # make sure that some of the crops touch the border
+    raw_masks[0, 20:, 20:] = 1
+    raw_masks[1, :5, :5] = 1
+    bitmap_masks = BitmapMasks(raw_masks, 28, 28)
+    cropped_masks = CroppedBitmapMasks.from_bitmaps(bitmap_masks)
+    bboxes = np.concatenate([
+        dummy_bboxes(6, 28, 28),
+        np.array([[18, 18, 28, 28], [0, 0, 6, 7]], dtype=np.float32)
+    ])
+    inds = np.array([0, 1, 2, 3, 3, 1, 0, 1])
+
+    expected = bitmap_masks.crop_and_resize(
+        bboxes, (14, 14), inds, binarize=False).masks
+    targets = cropped_masks.crop_and_resize(
+        bboxes, (14, 14), torch.from_numpy(inds), binarize=False)
+    assert isinstance(targets, BitmapMasks)
+    assert len(targets) == 8
+    np.testing.assert_allclose(targets.masks, expected, atol=1e-5)
+    # binarized targets can only differ where a value rounds to exactly 0.5
+    expected = bitmap_masks.crop_and_resize(bboxes, (14, 14), inds).masks
+    targets = cropped_masks.crop_and_resize(bboxes, (14, 14), inds)
+    assert (targets.masks != expected).mean() < 0.01
+
+    # crop and resize with empty masks
+    empty_masks = CroppedBitmapMasks([], np.zeros((0, 4)), 28, 28)
+    targets = empty_masks.crop_and_resize(bboxes, (14, 14), inds)
+    assert len(targets) == 0
+    assert targets.height == 14 and targets.width == 14
+
+
+@pytest.mark.parametrize('soft_mask_target', [False, True])
+def test_bitmap_mask_target(soft_mask_target):
+    from mmcv import Config
+
+    from mmdet.core.mask import mask_target
+    from mmdet.core.mask.mask_target import mask_target_single
+    cfg = Config(dict(mask_size=(7, 9), soft_mask_target=soft_mask_target))
+    rng = np.random.RandomState(0)
+    # images of different sizes, one without positive proposals
+    shapes = [(28, 32), (20, 36), (24, 24)]
+    num_pos = [6, 0, 5]
+    proposals_list, inds_list, gt_masks_list = [], [], []
+    for (h, w), num in zip(shapes, num_pos):
+        gt_masks = (rng.rand(4, h, w) > 0.5).astype(np.uint8)
+        gt_masks_list.append(BitmapMasks(gt_masks, h, w))
+        xy = rng.rand(num, 2) * [w, h] - 2
+        wh = rng.rand(num, 2) * [w, h] / 2 + 1
+        proposals_list.append(
+            torch.from_numpy(np.hstack([xy, xy + wh])).float())
+        inds_list.append(torch.from_numpy(rng.randint(0, 4, num)))
+
+    targets = mask_target(proposals_list, inds_list, gt_masks_list, cfg)
+    expected = torch.cat([
+        mask_target_single(*args, cfg)
+        for args in zip(proposals_list, inds_list, gt_masks_list)
+    ])
+    assert targets.shape == (11, 7, 9)
+    assert targets.dtype == torch.float32
+    assert torch.allclose(targets, expected, atol=1e-6)
+
+    # no positive proposals
+    targets = mask_target([p[:0] for p in proposals_list],
+                          [i[:0] for i in inds_list], gt_masks_list, cfg)
+    assert targets.shape == (0, 7, 9)
+
+
+def test_encode_cropped_mask():
+    rng = np.random.RandomState(0)
+    for _ in range(200):
+        height, width = rng.randint(1, 16, size=2)
+        x1, y1 = rng.randint(0, width), rng.randint(0, height)
+        x2, y2 = rng.randint(x1, width + 1), rng.randint(y1, height + 1)
+        # crops touching the borders, empty and full crops
+        if rng.rand() < 0.3:
+            x1, y1, x2, y2 = 0, 0, width, height
+        mask = rng.rand(y2 - y1, x2 - x1) < rng.choice([0, 0.5, 1])
+        full_mask = np.zeros((height, width), dtype=np.uint8)
+        full_mask[y1:y2, x1:x2] = mask
+        rle = encode_cropped_mask(mask, [x1, y1, x2, y2], height, width)
+        assert rle == mask_util.encode(np.asfortranarray(full_mask))
+
+    # RLE masks are kept by encode_mask_results
+    mask_results = [[np.eye(4, dtype=bool)], [rle]]
+    encoded = encode_mask_results(mask_results)
+    assert encoded[0][0] == mask_util.encode(
+        np.asfortranarray(np.eye(4, dtype=np.uint8)))
+    assert encoded[1][0] is rle
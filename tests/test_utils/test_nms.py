@@ -1,7 +1,10 @@
 import pytest
 import torch
+from mmcv.ops import batched_nms
 
-from mmdet.core.post_processing import mask_matrix_nms
+from mmdet.core.post_processing import (batched_multiclass_nms,
+                                        mask_matrix_nms, multiclass_nms)
+from mmdet.core.post_processing.bbox_nms import _grouped_nms
 
 
 def _create_mask(N, h, w):
@@ -73,3 +76,84 @@ def test_nms_input_errors():
                         filter_thr=0.5)
     assert len(score) == 1
     assert score[0] == 1
+
+
+def _random_dets(num_boxes, num_classes, class_specific):
+    xy = torch.rand(num_boxes, 1, 2) * 100
+    wh = torch.rand(num_boxes, 1, 2) * 50 + 1
+    scores = torch.rand(num_boxes, num_classes + 1).softmax(-1)
+    bboxes = torch.cat([xy, xy + wh], dim=-1)
+    if not class_specific:
+        return bboxes.view(num_boxes, 4), scores
+    bboxes = bboxes + torch.rand(num_boxes, num_classes, 4) * 5
+    return bboxes.view(num_boxes, num_classes * 4), scores
+
+
+@pytest.mark.parametrize('nms_cfg', [
+    dict(type='nms', iou_threshold=0.5),
+    dict(type='nms', iou_threshold=0.5, class_agnostic=True),
+    dict(type='soft_nms', iou_threshold=0.3, min_score=0.05)
+])
+@pytest.mark.parametrize('class_specific', [True, False])
+def test_batched_multiclass_nms(nms_cfg, class_specific):
+    torch.manual_seed(0)
+    num_classes = 5
+    multi_bboxes, multi_scores, score_factors = [], [], []
+    # the last image has no boxes
+    for num_boxes in [30, 60, 20, 0]:
+        bboxes, scores = _random_dets(num_boxes, num_classes, class_specific)
+        multi_bboxes.append(bboxes)
+        multi_scores.append(scores)
+        score_factors.append(torch.rand(num_boxes))
+
+    # the same as multiclass_nms
+    results = batched_multiclass_nms(
+        multi_bboxes,
+        multi_scores,
+        0.1,
+        nms_cfg,
+        max_num=10,
+        score_factors=score_factors,
+        return_inds=True)
+    assert len(results) == 4
+    assert len(results[3][0]) == 0
+    for i, (dets, labels, inds) in enumerate(results[:3]):
+        expected = multiclass_nms(
+            multi_bboxes[i],
+            multi_scores[i],
+            0.1,
+            nms_cfg,
+            max_num=10,
+            score_factors=score_factors[i],
+            return_inds=True)
+        for result, expected_result in zip((dets, labels, inds), expected):
+            assert torch.allclose(result, expected_result)
+
+    # only the top boxes of each image and class are kept before NMS
+    nms_cfg = dict(type='nms', iou_threshold=1.0)
+    results = batched_multiclass_nms(
+        multi_bboxes, multi_scores, 0, nms_cfg, topk=25, max_per_class=4)
+    for i, (dets, labels) in enumerate(results):
+        num_boxes = len(multi_scores[i])
+        assert len(dets) == min(num_boxes * num_classes, 25,
+                                min(num_boxes, 4) * num_classes)
+        assert torch.bincount(labels, minlength=num_classes).max() <= 4
+        # the kept boxes are the top ones of their classes
+        for label in labels.unique():
+            class_scores = multi_scores[i][:, label]
+            kept_scores = dets[labels == label, -1]
+            assert torch.allclose(kept_scores,
+                                  class_scores.topk(len(kept_scores)).values)
+
+
+def test_grouped_nms():
+    torch.manual_seed(0)
+    bboxes, scores = _random_dets(200, 1, False)
+    scores = scores[:, 0]
+    # sparse group ids, e.g. image id * num classes + label
+    groups = torch.randint(0, 6, (200, )) * 1203 + 5
+    nms_cfg = dict(type='nms', iou_threshold=0.5)
+    dets, keep = _grouped_nms(bboxes, scores, groups, nms_cfg)
+    expected_dets, expected_keep = batched_nms(bboxes, scores, groups, nms_cfg)
+    assert torch.equal(keep.sort().values, expected_keep.sort().values)
+    assert torch.allclose(dets, expected_dets)
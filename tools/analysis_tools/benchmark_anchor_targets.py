@@ -0,0 +1,132 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import argparse
+import time
+
+import numpy as np
+import torch
+from mmcv import Config, DictAction
+
+from mmdet.models import build_head
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Compare the per-image and batched target assignment of '
+        'an anchor head')
+    parser.add_argument('config', help='train config file path')
+    parser.add_argument(
+        '--head',
+        default='bbox_head',
+        choices=['bbox_head', 'rpn_head'],
+        help='the anchor head of the model')
+    parser.add_argument(
+        '--batch-sizes',
+        type=int,
+        nargs='+',
+        default=[1, 2, 4, 8, 16],
+        help='batch sizes to benchmark')
+    parser.add_argument(
+        '--num-gts', type=int, default=20, help='number of gts per image')
+    parser.add_argument(
+        '--img-scale',
+        type=int,
+        nargs=2,
+        default=[1333, 800],
+        help='width and height of the images')
+    parser.add_argument(
+        '--repeat', type=int, default=20, help='number of repetitions')
+    parser.add_argument(
+        '--device',
+        default='cuda' if torch.cuda.is_available() else 'cpu',
+        help='device of the benchmark')
+    parser.add_argument(
+        '--cfg-options',
+        nargs='+',
+        action=DictAction,
+        help='override some settings in the used config, the key-value pair '
+        'in xxx=yyy format will be merged into config file. If the value to '
+        'be overwritten is a list, it should be like key="[a,b]" or key=a,b '
+        'It also allows nested list/tuple values, e.g. key="[(a,b),(c,d)]" '
+        'Note that the quotation marks are necessary and that no white space '
+        'is allowed.')
+    return parser.parse_args()
+
+
+def build_anchor_head(cfg, head):
+    head_cfg = cfg.model[head].copy()
+    train_cfg = cfg.model.train_cfg
+    if head == 'rpn_head':
+        train_cfg = train_cfg.rpn
+    head_cfg.update(train_cfg=train_cfg)
+    if head == 'rpn_head':
+        head_cfg.pop('num_classes', None)
+    return build_head(head_cfg)
+
+
+def random_gts(num_imgs, num_gts, img_w, img_h, device, seed=0):
+    rng = np.random.RandomState(seed)
+    gt_bboxes, gt_labels = [], []
+    for _ in range(num_imgs):
+        xy = rng.rand(num_gts, 2) * [img_w, img_h]
+        wh = rng.rand(num_gts, 2) * [img_w, img_h] / 4 + 8
+        bboxes = np.hstack([xy, np.minimum(xy + wh, [img_w, img_h])])
+        gt_bboxes.append(
+            torch.tensor(bboxes, dtype=torch.float32, device=device))
+        gt_labels.append(torch.zeros(num_gts, dtype=torch.long, device=device))
+    return gt_bboxes, gt_labels
+
+
+def benchmark(head, inputs, batch_targets, repeat, device):
+    """Return the mean time of ``get_targets`` in ms."""
+    head.train_cfg.batch_targets = batch_targets
+    times = []
+    for i in range(repeat + 1):
+        if device.startswith('cuda'):
+            torch.cuda.synchronize()
+        start = time.perf_counter()
+        head.get_targets(*inputs)
+        if device.startswith('cuda'):
+            torch.cuda.synchronize()
+        # the first run is a warmup
+        if i > 0:
+            times.append(time.perf_counter() - start)
+    return np.mean(times) * 1000
+
+
+def main():
+    args = parse_args()
+    cfg = Config.fromfile(args.config)
+    if args.cfg_options is not None:
+        cfg.merge_from_dict(args.cfg_options)
+    head = build_anchor_head(cfg, args.head).to(args.device)
+    img_w, img_h = args.img_scale
+    pad_w, pad_h = int(np.ceil(img_w / 32)) * 32, int(np.ceil(img_h / 32)) * 32
+    featmap_sizes = [(int(np.ceil(pad_h / stride[1])),
+                      int(np.ceil(pad_w / stride[0])))
+                     for stride in head.anchor_generator.strides]
+
+    print(f'{head.__class__.__name__}, {args.num_gts} gts per image, '
+          f'{args.device}')
+    print(f'{"batch size":<12}{"per-image (ms)":>16}{"batched (ms)":>14}'
+          f'{"speedup":>10}')
+    for batch_size in args.batch_sizes:
+        img_metas = [
+            dict(img_shape=(img_h, img_w, 3), pad_shape=(pad_h, pad_w, 3))
+        ] * batch_size
+        anchor_list, valid_flag_list = head.get_anchors(
+            featmap_sizes, img_metas, device=args.device)
+        gt_bboxes, gt_labels = random_gts(batch_size, args.num_gts, img_w,
+                                          img_h, args.device)
+        if args.head == 'rpn_head':
+            gt_labels = None
+        inputs = (anchor_list, valid_flag_list, gt_bboxes, img_metas, None,
+                  gt_labels)
+        per_image_time = benchmark(head, inputs, False, args.repeat,
+                                   args.device)
+        batched_time = benchmark(head, inputs, True, args.repeat, args.device)
+        print(f'{batch_size:<12}{per_image_time:>16.2f}{batched_time:>14.2f}'
+              f'{per_image_time / batched_time:>9.2f}x')
+
+
+if __name__ == '__main__':
+    main()
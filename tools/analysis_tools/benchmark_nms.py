@@ -0,0 +1,138 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import argparse
+import time
+
+import numpy as np
+import torch
+
+from mmdet.core import batched_multiclass_nms, multiclass_nms
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Benchmark the multi-class NMS of a batch of images')
+    parser.add_argument(
+        '--batch-size', type=int, default=8, help='number of images')
+    parser.add_argument(
+        '--num-boxes',
+        type=int,
+        default=1000,
+        help='number of boxes per image before NMS')
+    parser.add_argument(
+        '--num-classes',
+        type=int,
+        nargs='+',
+        default=[80, 1203],
+        help='numbers of classes to benchmark, e.g. 80 for COCO and 1203 '
+        'for LVIS')
+    parser.add_argument(
+        '--score-thr', type=float, default=0.05, help='score threshold')
+    parser.add_argument(
+        '--iou-thr', type=float, default=0.5, help='IoU threshold of NMS')
+    parser.add_argument(
+        '--max-per-img',
+        type=int,
+        default=100,
+        help='number of boxes per image after NMS')
+    parser.add_argument(
+        '--topk',
+        type=int,
+        default=-1,
+        help='number of boxes per image kept before the batched NMS')
+    parser.add_argument(
+        '--max-per-class',
+        type=int,
+        default=-1,
+        help='number of boxes per class kept before the batched NMS')
+    parser.add_argument(
+        '--class-specific',
+        action='store_true',
+        help='whether the boxes are regressed for each class, as in R-CNN')
+    parser.add_argument(
+        '--repeat', type=int, default=20, help='number of repetitions')
+    parser.add_argument(
+        '--device',
+        default='cuda' if torch.cuda.is_available() else 'cpu',
+        help='device of the benchmark')
+    return parser.parse_args()
+
+
+def random_dets(batch_size,
+                num_boxes,
+                num_classes,
+                class_specific,
+                device,
+                seed=0):
+    """Random boxes of an 800x1333 image and sigmoid-like scores, most of
+    which are below the usual score thresholds."""
+    rng = np.random.RandomState(seed)
+    xy = rng.rand(batch_size, num_boxes, 1, 2) * [1333, 800]
+    wh = rng.rand(batch_size, num_boxes, 1, 2) * 200 + 8
+    bboxes = np.concatenate([xy, xy + wh], axis=-1)
+    if class_specific:
+        bboxes = bboxes + rng.rand(batch_size, num_boxes, num_classes, 4) * 8
+    bboxes = bboxes.reshape(batch_size, num_boxes, -1)
+    scores = rng.rand(batch_size, num_boxes, num_classes + 1)**32
+    scores[..., -1] = 0
+    return (torch.tensor(bboxes, dtype=torch.float32, device=device),
+            torch.tensor(scores, dtype=torch.float32, device=device))
+
+
+def benchmark(func, repeat, device):
+    """Return the mean time of ``func`` in ms."""
+    times = []
+    for i in range(repeat + 1):
+        if device.startswith('cuda'):
+            torch.cuda.synchronize()
+        start = time.perf_counter()
+        func()
+        if device.startswith('cuda'):
+            torch.cuda.synchronize()
+        # the first run is a warmup
+        if i > 0:
+            times.append(time.perf_counter() - start)
+    return np.mean(times) * 1000
+
+
+def main():
+    args = parse_args()
+    nms_cfg = dict(type='nms', iou_threshold=args.iou_thr)
+
+    def per_image_nms(batch_bboxes, batch_scores):
+        return [
+            multiclass_nms(bboxes, scores, args.score_thr, nms_cfg,
+                           args.max_per_img)
+            for bboxes, scores in zip(batch_bboxes, batch_scores)
+        ]
+
+    def batched_nms(batch_bboxes, batch_scores):
+        return batched_multiclass_nms(
+            batch_bboxes,
+            batch_scores,
+            args.score_thr,
+            nms_cfg,
+            args.max_per_img,
+            topk=args.topk,
+            max_per_class=args.max_per_class)
+
+    print(f'{args.batch_size} images, {args.num_boxes} boxes per image, '
+          f'{args.device}')
+    print(f'{"num classes":<14}{"per image (ms)":>16}{"batched (ms)":>14}'
+          f'{"speedup":>10}')
+    for num_classes in args.num_classes:
+        batch_bboxes, batch_scores = random_dets(args.batch_size,
+                                                 args.num_boxes, num_classes,
+                                                 args.class_specific,
+                                                 args.device)
+        per_image_time = benchmark(
+            lambda: per_image_nms(batch_bboxes, batch_scores), args.repeat,
+            args.device)
+        batched_time = benchmark(
+            lambda: batched_nms(batch_bboxes, batch_scores), args.repeat,
+            args.device)
+        print(f'{num_classes:<14}{per_image_time:>16.2f}{batched_time:>14.2f}'
+              f'{per_image_time / batched_time:>9.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import argparse
+import os.path as osp
+import time
+
+import numpy as np
+import torch
+from mmcv import Config, DictAction
+
+from mmdet.apis import init_detector
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Benchmark the inference of detectors at each level of '
+        'optimize_for_inference')
+    parser.add_argument('configs', nargs='+', help='test config file paths')
+    parser.add_argument(
+        '--levels',
+        type=int,
+        nargs='+',
+        default=[0, 1, 2, 3],
+        help='optimization levels to benchmark')
+    parser.add_argument(
+        '--img-scale',
+        type=int,
+        nargs=2,
+        default=[1333, 800],
+        help='width and height of the image')
+    parser.add_argument(
+        '--repeat', type=int, default=20, help='number of repetitions')
+    parser.add_argument(
+        '--device',
+        default='cuda:0' if torch.cuda.is_available() else 'cpu',
+        help='device of the benchmark')
+    parser.add_argument(
+        '--cfg-options',
+        nargs='+',
+        action=DictAction,
+        help='override some settings in the used configs, the key-value pair '
+        'in xxx=yyy format will be merged into config file. If the value to '
+        'be overwritten is a list, it should be like key="[a,b]" or key=a,b '
+        'It also allows nested list/tuple values, e.g. key="[(a,b),(c,d)]" '
+        'Note that the quotation marks are necessary and that no white space '
+        'is allowed.')
+    return parser.parse_args()
+
+
+def benchmark(func, repeat, device):
+    """Return the mean time of ``func`` in ms."""
+    times = []
+    for i in range(repeat + 1):
+        if device.startswith('cuda'):
+            torch.cuda.synchronize()
+        start = time.perf_counter()
+        func()
+        if device.startswith('cuda'):
+            torch.cuda.synchronize()
+        # the first run is a warmup
+        if i > 0:
+            times.append(time.perf_counter() - start)
+    return np.mean(times) * 1000
+
+
+def dummy_inputs(img_w, img_h, device):
+    """A random normalized image padded to a multiple of 32, with its
+    metas."""
+    pad_w, pad_h = int(np.ceil(img_w / 32)) * 32, int(np.ceil(img_h / 32)) * 32
+    img = torch.zeros(1, 3, pad_h, pad_w, device=device)
+    img[..., :img_h, :img_w] = torch.randn(3, img_h, img_w, device=device)
+    img_meta = dict(
+        img_shape=(img_h, img_w, 3),
+        ori_shape=(img_h, img_w, 3),
+        pad_shape=(pad_h, pad_w, 3),
+        batch_input_shape=(pad_h, pad_w),
+        scale_factor=np.ones(4, dtype=np.float32),
+        flip=False,
+        flip_direction=None)
+    return img, img_meta
+
+
+def main():
+    args = parse_args()
+    img, img_meta = dummy_inputs(*args.img_scale, args.device)
+
+    print(f'{img.shape[3]}x{img.shape[2]} image, {args.device}')
+    titles = ''.join(f'{f"level {level} (ms)":>16}' for level in args.levels)
+    print(f'{"model":<40}{titles}{"speedup":>10}')
+    for config in args.configs:
+        cfg = Config.fromfile(config)
+        if args.cfg_options is not None:
+            cfg.merge_from_dict(args.cfg_options)
+        times = []
+        for level in args.levels:
+            # the same random weights at all levels
+            torch.manual_seed(0)
+            model = init_detector(
+                cfg, device=args.device, optimize_level=level)
+
+            def inference():
+                with torch.no_grad():
+                    model(
+                        return_loss=False,
+                        rescale=True,
+                        img=[img],
+                        img_metas=[[img_meta]])
+
+            times.append(benchmark(inference, args.repeat, args.device))
+        name = osp.splitext(osp.basename(config))[0]
+        level_times = ''.join(f'{t:>16.2f}' for t in times)
+        print(f'{name:<40}{level_times}{times[0] / min(times):>9.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import argparse
+import time
+
+import mmcv
+import numpy as np
+
+from mmdet.datasets.pipelines import PhotoMetricDistortion
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Compare PhotoMetricDistortion on float32 and uint8 '
+        'images')
+    parser.add_argument('img', help='image file')
+    parser.add_argument(
+        '--img-scale',
+        type=int,
+        nargs=2,
+        default=[1333, 800],
+        help='scale the image is resized to with keep_ratio=True')
+    parser.add_argument(
+        '--repeat', type=int, default=200, help='number of distortions')
+    return parser.parse_args()
+
+
+def benchmark(transform, img, repeat):
+    """Return the mean time in ms and the distorted images."""
+    outputs, times = [], []
+    for seed in range(repeat):
+        np.random.seed(seed)
+        results = dict(img=img.copy())
+        start = time.perf_counter()
+        results = transform(results)
+        times.append(time.perf_counter() - start)
+        outputs.append(results['img'])
+    return np.mean(times) * 1000, outputs
+
+
+def main():
+    args = parse_args()
+    img = mmcv.imrescale(mmcv.imread(args.img), tuple(args.img_scale))
+    transform = PhotoMetricDistortion()
+
+    float_time, float_imgs = benchmark(transform, img.astype(np.float32),
+                                       args.repeat)
+    uint8_time, uint8_imgs = benchmark(transform, img, args.repeat)
+    # the same seeds give the same random parameters
+    diffs = [
+        np.abs(np.clip(float_img, 0, 255) - uint8_img).mean()
+        for float_img, uint8_img in zip(float_imgs, uint8_imgs)
+    ]
+    print(f'image shape: {img.shape}, {args.repeat} distortions')
+    print(f'{"input":<10}{"time (ms)":>12}')
+    print(f'{"float32":<10}{float_time:>12.2f}')
+    print(f'{"uint8":<10}{uint8_time:>12.2f}')
+    print(f'speedup: {float_time / uint8_time:.2f}x, mean absolute '
+          f'difference of the clipped images: {np.mean(diffs):.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import argparse
+import logging
+import time
+
+import numpy as np
+from mmcv import Config, DictAction
+
+from mmdet.datasets import build_dataset
+from mmdet.datasets.samplers import (AspectRatioBucketSampler,
+                                     DistributedGroupSampler, get_img_shapes,
+                                     padding_efficiency, rescale_shapes)
+from mmdet.utils import get_root_logger
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Compare the padding of the batches of the samplers')
+    parser.add_argument('config', help='train config file path')
+    parser.add_argument(
+        '--samples-per-gpu',
+        type=int,
+        default=None,
+        help='batch size of each GPU, data.samples_per_gpu by default')
+    parser.add_argument(
+        '--num-replicas', type=int, default=8, help='number of GPUs')
+    parser.add_argument(
+        '--epochs', type=int, default=3, help='number of epochs to sample')
+    parser.add_argument(
+        '--img-scale',
+        type=int,
+        nargs=2,
+        default=None,
+        help='scale of a keep-ratio Resize applied before padding')
+    parser.add_argument(
+        '--size-divisor', type=int, default=32, help='size divisor of Pad')
+    parser.add_argument(
+        '--num-ratio-buckets',
+        type=int,
+        nargs='+',
+        default=[2, 4, 8, 16],
+        help='numbers of aspect ratio buckets to benchmark')
+    parser.add_argument(
+        '--num-size-buckets',
+        type=int,
+        default=1,
+        help='number of size buckets of AspectRatioBucketSampler')
+    parser.add_argument(
+        '--cfg-options',
+        nargs='+',
+        action=DictAction,
+        help='override some settings in the used config, the key-value pair '
+        'in xxx=yyy format will be merged into config file. If the value to '
+        'be overwritten is a list, it should be like key="[a,b]" or key=a,b '
+        'It also allows nested list/tuple values, e.g. key="[(a,b),(c,d)]" '
+        'Note that the quotation marks are necessary and that no white space '
+        'is allowed.')
+    return parser.parse_args()
+
+
+def benchmark(build_sampler, shapes, num_replicas, samples_per_gpu, epochs,
+              size_divisor):
+    """Return the mean padding efficiency and sampling time per epoch."""
+    efficiencies, times = [], []
+    for epoch in range(epochs):
+        for rank in range(num_replicas):
+            sampler = build_sampler(rank)
+            sampler.set_epoch(epoch)
+            start = time.perf_counter()
+            indices = list(sampler)
+            times.append(time.perf_counter() - start)
+            efficiencies.append(
+                padding_efficiency(shapes, indices, samples_per_gpu,
+                                   size_divisor))
+    return np.mean(efficiencies), np.sum(times) / epochs
+
+
+def main():
+    args = parse_args()
+    # silence the per-epoch logs of the samplers
+    get_root_logger(log_level=logging.WARNING)
+    cfg = Config.fromfile(args.config)
+    if args.cfg_options is not None:
+        cfg.merge_from_dict(args.cfg_options)
+    samples_per_gpu = args.samples_per_gpu or cfg.data.samples_per_gpu
+    dataset = build_dataset(cfg.data.train)
+    shapes = get_img_shapes(dataset)
+    if args.img_scale is not None:
+        shapes = rescale_shapes(shapes, args.img_scale)
+
+    samplers = dict(
+        DistributedGroupSampler=lambda rank: DistributedGroupSampler(
+            dataset, samples_per_gpu, args.num_replicas, rank))
+    for num_buckets in args.num_ratio_buckets:
+        samplers[f'AspectRatioBucketSampler({num_buckets}x'
+                 f'{args.num_size_buckets})'] = \
+            lambda rank, num_buckets=num_buckets: AspectRatioBucketSampler(
+                dataset, samples_per_gpu, args.num_replicas, rank,
+                num_ratio_buckets=num_buckets,
+                num_size_buckets=args.num_size_buckets,
+                img_scale=args.img_scale,
+                size_divisor=args.size_divisor)
+
+    print(f'{len(dataset)} images, {args.num_replicas} GPUs x '
+          f'{samples_per_gpu} images per GPU')
+    print(f'{"sampler":<40}{"padding efficiency":>20}{"time/epoch (s)":>16}')
+    for name, build_sampler in samplers.items():
+        efficiency, epoch_time = benchmark(build_sampler, shapes,
+                                           args.num_replicas, samples_per_gpu,
+                                           args.epochs, args.size_divisor)
+        print(f'{name:<40}{efficiency:>20.4f}{epoch_time:>16.3f}')
+
+
+if __name__ == '__main__':
+    main()
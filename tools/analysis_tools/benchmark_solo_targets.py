@@ -0,0 +1,129 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import argparse
+import time
+
+import mmcv
+import numpy as np
+import torch
+from mmcv import Config, DictAction
+
+from mmdet.models import build_head
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Benchmark the target generation of a SOLO head')
+    parser.add_argument('config', help='train config file path')
+    parser.add_argument(
+        '--num-gts',
+        type=int,
+        nargs='+',
+        default=[10, 50, 100],
+        help='numbers of gts per image to benchmark')
+    parser.add_argument(
+        '--img-scale',
+        type=int,
+        nargs=2,
+        default=[1333, 800],
+        help='width and height of the images')
+    parser.add_argument(
+        '--repeat', type=int, default=20, help='number of repetitions')
+    parser.add_argument(
+        '--device',
+        default='cuda' if torch.cuda.is_available() else 'cpu',
+        help='device of the benchmark')
+    parser.add_argument(
+        '--cfg-options',
+        nargs='+',
+        action=DictAction,
+        help='override some settings in the used config, the key-value pair '
+        'in xxx=yyy format will be merged into config file. If the value to '
+        'be overwritten is a list, it should be like key="[a,b]" or key=a,b '
+        'It also allows nested list/tuple values, e.g. key="[(a,b),(c,d)]" '
+        'Note that the quotation marks are necessary and that no white space '
+        'is allowed.')
+    return parser.parse_args()
+
+
+def random_gts(num_gts, img_w, img_h, pad_w, pad_h, device, seed=0):
+    rng = np.random.RandomState(seed)
+    xy = rng.rand(num_gts, 2) * [img_w, img_h]
+    wh = rng.rand(num_gts, 2) * [img_w, img_h] / 3 + 8
+    bboxes = np.hstack([xy, np.minimum(xy + wh, [img_w - 1, img_h - 1])])
+    masks = np.zeros((num_gts, pad_h, pad_w), dtype=bool)
+    for mask, (x1, y1, x2, y2) in zip(masks, bboxes.astype(np.int64)):
+        # an ellipse in the box
+        ys, xs = np.ogrid[y1:y2 + 1, x1:x2 + 1]
+        cy, cx = (y1 + y2) / 2, (x1 + x2) / 2
+        ry, rx = max((y2 - y1) / 2, 1), max((x2 - x1) / 2, 1)
+        dist = ((ys - cy) / ry)**2 + ((xs - cx) / rx)**2
+        mask[y1:y2 + 1, x1:x2 + 1] = dist <= 1
+    gt_bboxes = torch.tensor(bboxes, dtype=torch.float32, device=device)
+    gt_labels = torch.zeros(num_gts, dtype=torch.long, device=device)
+    gt_masks = torch.tensor(masks, device=device)
+    return gt_bboxes, gt_labels, gt_masks
+
+
+def benchmark(func, repeat, device):
+    """Return the mean time of ``func`` in ms."""
+    times = []
+    for i in range(repeat + 1):
+        if device.startswith('cuda'):
+            torch.cuda.synchronize()
+        start = time.perf_counter()
+        func()
+        if device.startswith('cuda'):
+            torch.cuda.synchronize()
+        # the first run is a warmup
+        if i > 0:
+            times.append(time.perf_counter() - start)
+    return np.mean(times) * 1000
+
+
+def rescale_masks_by_mmcv(masks, output_stride):
+    """Downsample the masks one by one on the host, as the targets of SOLO
+    used to be computed."""
+    rescaled_masks = [
+        mmcv.imrescale(mask, scale=1. / output_stride)
+        for mask in np.uint8(masks.cpu().numpy())
+    ]
+    return masks.new_tensor(np.stack(rescaled_masks), dtype=torch.uint8)
+
+
+def main():
+    args = parse_args()
+    cfg = Config.fromfile(args.config)
+    if args.cfg_options is not None:
+        cfg.merge_from_dict(args.cfg_options)
+    head_cfg = cfg.model.mask_head.copy()
+    head_cfg.update(train_cfg=cfg.model.get('train_cfg'))
+    head = build_head(head_cfg).to(args.device)
+    img_w, img_h = args.img_scale
+    pad_w, pad_h = int(np.ceil(img_w / 32)) * 32, int(np.ceil(img_h / 32)) * 32
+    # the mask predictions have half the strides of the grids
+    featmap_sizes = [(pad_h * 2 // stride, pad_w * 2 // stride)
+                     for stride in head.strides]
+    output_stride = head.strides[0] / 2
+
+    print(f'{head.__class__.__name__}, {pad_w}x{pad_h} masks, {args.device}')
+    print(f'{"num gts":<10}{"targets (ms)":>14}{"rescale (ms)":>14}'
+          f'{"mmcv rescale (ms)":>19}')
+    for num_gts in args.num_gts:
+        gt_bboxes, gt_labels, gt_masks = random_gts(num_gts, img_w, img_h,
+                                                    pad_w, pad_h, args.device)
+        targets_time = benchmark(
+            lambda: head._get_targets_single(
+                gt_bboxes, gt_labels, gt_masks, featmap_sizes=featmap_sizes),
+            args.repeat, args.device)
+        rescale_time = benchmark(
+            lambda: head._rescale_masks(gt_masks, output_stride), args.repeat,
+            args.device)
+        mmcv_rescale_time = benchmark(
+            lambda: rescale_masks_by_mmcv(gt_masks, output_stride),
+            args.repeat, args.device)
+        print(f'{num_gts:<10}{targets_time:>14.2f}{rescale_time:>14.2f}'
+              f'{mmcv_rescale_time:>19.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -7,17 +7,20 @@ import os.path as osp
 import mmcv
 import torch
 from mmcv import DictAction
-from mmcv.parallel import MMDataParallel, MMDistributedDataParallel
+from mmcv.parallel import MMDataParallel, MMDistributedDataParallel, collate
 from mmcv.runner import (get_dist_info, init_dist, load_checkpoint,
                          wrap_fp16_model)
 from pycocotools.coco import COCO
 from pycocotools.cocoeval import COCOeval
 from tools.analysis_tools.robustness_eval import get_results
+from torch.utils.data import DataLoader, Dataset
 
 from mmdet import datasets
 from mmdet.apis import multi_gpu_test, set_random_seed, single_gpu_test
-from mmdet.core import eval_map
+from mmdet.core import encode_mask_results, eval_map
 from mmdet.datasets import build_dataloader, build_dataset
+from mmdet.datasets.pipelines import Compose
+from mmdet.datasets.pipelines.transforms import Corrupt
 from mmdet.models import build_detector
 
 
@@ -90,6 +93,104 @@ def voc_eval_with_return(result_file,
     return mean_ap, eval_results
 
 
+class CorruptedVariants(Dataset):
+    """Load each image once and apply the pipeline to all its variants.
+
+    Every item is the list of the pipeline results of all ``(corruption,
+    severity)`` variants of an image, severity 0 being the clean image.
+
+    Args:
+        dataset (:obj:`CustomDataset`): The test dataset. The first step of
+            its pipeline must load the images.
+        variants (list[tuple[str, int]]): The corruptions and severities.
+    """
+
+    def __init__(self, dataset, variants):
+        self.dataset = dataset
+        self.variants = variants
+        transforms = dataset.pipeline.transforms
+        self.load = transforms[0]
+        self.pipeline = Compose(transforms[1:])
+        self.corrupts = [
+            Corrupt(corruption, severity) if severity > 0 else None
+            for corruption, severity in variants
+        ]
+
+    def __len__(self):
+        return len(self.dataset)
+
+    def __getitem__(self, idx):
+        results = dict(img_info=self.dataset.data_infos[idx])
+        if self.dataset.proposals is not None:
+            results['proposals'] = self.dataset.proposals[idx]
+        self.dataset.pre_pipeline(results)
+        results = self.load(results)
+        samples = []
+        for corrupt in self.corrupts:
+            _results = copy.deepcopy(results)
+            if corrupt is not None:
+                _results = corrupt(_results)
+            samples.append(self.pipeline(_results))
+        return samples
+
+
+def _unwrap(batch):
+    return batch[0]
+
+
+def single_pass_test(model, dataset, variants, workers, batch_size):
+    """Test all variants of every image after loading it once.
+
+    The variants are corrupted in the dataloader workers and, as they share
+    the shape of the image, batches of up to ``batch_size`` variants are
+    passed through the model at once.
+
+    Returns:
+        list[list]: The results of each variant.
+    """
+    model.eval()
+    data_loader = DataLoader(
+        CorruptedVariants(dataset, variants),
+        batch_size=1,
+        num_workers=workers,
+        collate_fn=_unwrap)
+    outputs = [[] for _ in variants]
+    prog_bar = mmcv.ProgressBar(len(dataset))
+    for samples in data_loader:
+        # test-time augmentation only supports a single image
+        if len(samples[0]['img_metas']) > 1:
+            batch_size = 1
+        for start in range(0, len(samples), batch_size):
+            chunk = samples[start:start + batch_size]
+            data = collate(chunk, samples_per_gpu=len(chunk))
+            with torch.no_grad():
+                result = model(return_loss=False, rescale=True, **data)
+            if isinstance(result[0], tuple):
+                result = [(bbox_results, encode_mask_results(mask_results))
+                          for bbox_results, mask_results in result]
+            for i, res in enumerate(result):
+                outputs[start + i].append(res)
+        prog_bar.update()
+    return outputs
+
+
+def build_model(cfg, checkpoint_file, dataset):
+    """Build the detector and load the checkpoint."""
+    cfg.model.train_cfg = None
+    model = build_detector(cfg.model, test_cfg=cfg.get('test_cfg'))
+    fp16_cfg = cfg.get('fp16', None)
+    if fp16_cfg is not None:
+        wrap_fp16_model(model)
+    checkpoint = load_checkpoint(model, checkpoint_file, map_location='cpu')
+    # old versions did not save class info in checkpoints,
+    # this walkaround is for backward compatibility
+    if 'CLASSES' in checkpoint.get('meta', {}):
+        model.CLASSES = checkpoint['meta']['CLASSES']
+    else:
+        model.CLASSES = dataset.CLASSES
+    return model
+
+
 def parse_args():
     parser = argparse.ArgumentParser(description='MMDet test detector')
     parser.add_argument('config', help='test config file path')
@@ -133,6 +234,17 @@ def parse_args():
         help='Print summaries for every corruption and severity')
     parser.add_argument(
         '--workers', type=int, default=32, help='workers per gpu')
+    parser.add_argument(
+        '--single-pass',
+        action='store_true',
+        help='load every image once and test all corruptions and severities '
+        'of it together (non-distributed only)')
+    parser.add_argument(
+        '--variant-batch-size',
+        type=int,
+        default=8,
+        help='number of variants of an image passed through the model at '
+        'once with --single-pass')
     parser.add_argument('--show', action='store_true', help='show results')
     parser.add_argument(
         '--show-dir', help='directory where painted images will be saved')
@@ -250,6 +362,25 @@ def main():
         corruptions = args.corruptions
 
     rank, _ = get_dist_info()
+    if args.single_pass:
+        assert not distributed, \
+            '--single-pass does not support distributed testing'
+        assert not (args.show or args.show_dir), \
+            '--single-pass does not support showing the results'
+        # severity 0 (= no corruption) is only evaluated once
+        variants = [(corruption, severity)
+                    for corr_i, corruption in enumerate(corruptions)
+                    for severity in args.severities
+                    if corr_i == 0 or severity > 0]
+        dataset = build_dataset(cfg.data.test)
+        model = MMDataParallel(
+            build_model(cfg, args.checkpoint, dataset), device_ids=[0])
+        print(f'\nTesting {len(variants)} corruptions and severities in a '
+              'single pass')
+        outputs = single_pass_test(model, dataset, variants, args.workers,
+                                   args.variant_batch_size)
+        variant_outputs = dict(zip(variants, outputs))
+
     aggregated_results = {}
     for corr_i, corruption in enumerate(corruptions):
         aggregated_results[corruption] = {}
@@ -260,62 +391,54 @@ def main():
                     aggregated_results[corruptions[0]][0]
                 continue
 
-            test_data_cfg = copy.deepcopy(cfg.data.test)
-            # assign corruption and severity
-            if corruption_severity > 0:
-                corruption_trans = dict(
-                    type='Corrupt',
-                    corruption=corruption,
-                    severity=corruption_severity)
-                # TODO: hard coded "1", we assume that the first step is
-                # loading images, which needs to be fixed in the future
-                test_data_cfg['pipeline'].insert(1, corruption_trans)
-
-            # print info
-            print(f'\nTesting {corruption} at severity {corruption_severity}')
-
-            # build the dataloader
-            # TODO: support multiple images per gpu
-            #       (only minor changes are needed)
-            dataset = build_dataset(test_data_cfg)
-            data_loader = build_dataloader(
-                dataset,
-                samples_per_gpu=1,
-                workers_per_gpu=args.workers,
-                dist=distributed,
-                shuffle=False)
-
-            # build the model and load checkpoint
-            cfg.model.train_cfg = None
-            model = build_detector(cfg.model, test_cfg=cfg.get('test_cfg'))
-            fp16_cfg = cfg.get('fp16', None)
-            if fp16_cfg is not None:
-                wrap_fp16_model(model)
-            checkpoint = load_checkpoint(
-                model, args.checkpoint, map_location='cpu')
-            # old versions did not save class info in checkpoints,
-            # this walkaround is for backward compatibility
-            if 'CLASSES' in checkpoint.get('meta', {}):
-                model.CLASSES = checkpoint['meta']['CLASSES']
-            else:
-                model.CLASSES = dataset.CLASSES
-
-            if not distributed:
-                model = MMDataParallel(model, device_ids=[0])
-                show_dir = args.show_dir
-                if show_dir is not None:
-                    show_dir = osp.join(show_dir, corruption)
-                    show_dir = osp.join(show_dir, str(corruption_severity))
-                    if not osp.exists(show_dir):
-                        osp.makedirs(show_dir)
-                outputs = single_gpu_test(model, data_loader, args.show,
-                                          show_dir, args.show_score_thr)
+            if args.single_pass:
+                outputs = variant_outputs[(corruption, corruption_severity)]
             else:
-                model = MMDistributedDataParallel(
-                    model.cuda(),
-                    device_ids=[torch.cuda.current_device()],
-                    broadcast_buffers=False)
-                outputs = multi_gpu_test(model, data_loader, args.tmpdir)
+                test_data_cfg = copy.deepcopy(cfg.data.test)
+                # assign corruption and severity
+                if corruption_severity > 0:
+                    corruption_trans = dict(
+                        type='Corrupt',
+                        corruption=corruption,
+                        severity=corruption_severity)
+                    # TODO: hard coded "1", we assume that the first step is
+                    # loading images, which needs to be fixed in the future
+                    test_data_cfg['pipeline'].insert(1, corruption_trans)
+
+                # print info
+                print(f'\nTesting {corruption} at severity '
+                      f'{corruption_severity}')
+
+                # build the dataloader
+                # TODO: support multiple images per gpu
+                #       (only minor changes are needed)
+                dataset = build_dataset(test_data_cfg)
+                data_loader = build_dataloader(
+                    dataset,
+                    samples_per_gpu=1,
+                    workers_per_gpu=args.workers,
+                    dist=distributed,
+                    shuffle=False)
+
+                # build the model and load checkpoint
+                model = build_model(cfg, args.checkpoint, dataset)
+
+                if not distributed:
+                    model = MMDataParallel(model, device_ids=[0])
+                    show_dir = args.show_dir
+                    if show_dir is not None:
+                        show_dir = osp.join(show_dir, corruption)
+                        show_dir = osp.join(show_dir, str(corruption_severity))
+                        if not osp.exists(show_dir):
+                            osp.makedirs(show_dir)
+                    outputs = single_gpu_test(model, data_loader, args.show,
+                                              show_dir, args.show_score_thr)
+                else:
+                    model = MMDistributedDataParallel(
+                        model.cuda(),
+                        device_ids=[torch.cuda.current_device()],
+                        broadcast_buffers=False)
+                    outputs = multi_gpu_test(model, data_loader, args.tmpdir)
 
             if args.out and rank == 0:
                 eval_results_filename = (
@@ -1,7 +1,7 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 import argparse
 import os
-from collections import Sequence
+from collections.abc import Sequence
 from pathlib import Path
 
 import mmcv
@@ -9,7 +9,9 @@ from mmcv import Config, DictAction
 
 from mmdet.core.utils import mask2ndarray
 from mmdet.core.visualization import imshow_det_bboxes
-from mmdet.datasets.builder import build_dataset
+from mmdet.datasets import enable_pipeline_profiling
+from mmdet.datasets.builder import build_dataloader, build_dataset
+from mmdet.datasets.pipelines.profiler import format_profile
 
 
 def parse_args():
@@ -32,6 +34,26 @@ def parse_args():
         type=float,
         default=2,
         help='the interval of show (s)')
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='run the whole pipeline and report the cost of each transform '
+        'instead of showing the images')
+    parser.add_argument(
+        '--num-samples',
+        type=int,
+        default=None,
+        help='number of samples to profile, the whole dataset by default')
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=0,
+        help='number of dataloader workers used for profiling')
+    parser.add_argument(
+        '--profile-out',
+        default=None,
+        type=str,
+        help='json file to dump the profiling stats to')
     parser.add_argument(
         '--cfg-options',
         nargs='+',
@@ -73,11 +95,41 @@ def retrieve_data_cfg(config_path, skip_type, cfg_options):
     return cfg
 
 
+def profile(dataset, args):
+    """Report the cost of each transform of the pipelines of a dataset."""
+    # report after every sample so that none of them is missing at the end
+    profilers = enable_pipeline_profiling(dataset, flush_interval=0)
+    data_loader = build_dataloader(
+        dataset, 1, args.workers, dist=False, shuffle=False)
+    num_samples = min(args.num_samples or len(dataset), len(dataset))
+    progress_bar = mmcv.ProgressBar(num_samples)
+    for i, _ in enumerate(data_loader):
+        progress_bar.update()
+        if i + 1 >= num_samples:
+            break
+    del data_loader
+
+    all_stats = []
+    for i, profiler in enumerate(profilers):
+        stats = profiler.stats()
+        all_stats.append(stats)
+        print(f'\nPipeline {i}:')
+        print(format_profile(stats))
+    if args.profile_out is not None:
+        mmcv.dump(all_stats, args.profile_out)
+
+
 def main():
     args = parse_args()
+    if args.profile:
+        # profile the whole pipeline
+        args.skip_type = []
     cfg = retrieve_data_cfg(args.config, args.skip_type, args.cfg_options)
 
     dataset = build_dataset(cfg.data.train)
+    if args.profile:
+        profile(dataset, args)
+        return
 
     progress_bar = mmcv.ProgressBar(len(dataset))
 
@@ -15,7 +15,7 @@ from mmcv.runner import (get_dist_info, init_dist, load_checkpoint,
 
 from mmdet.apis import multi_gpu_test, single_gpu_test
 from mmdet.datasets import (build_dataloader, build_dataset,
-                            replace_ImageToTensor)
+                            enable_pipeline_cache, replace_ImageToTensor)
 from mmdet.models import build_detector
 
 
@@ -57,6 +57,16 @@ def parse_args():
         '--gpu-collect',
         action='store_true',
         help='whether to use gpu to collect results.')
+    parser.add_argument(
+        '--pipeline-cache-dir',
+        help='directory to cache the loaded and resized images of the test '
+        'pipeline in, so that they are not decoded again in the next runs')
+    parser.add_argument(
+        '--postprocess-workers',
+        type=int,
+        default=0,
+        help='number of threads that encode the masks and draw the results '
+        'while the model runs the next batches')
     parser.add_argument(
         '--tmpdir',
         help='tmp directory used for collecting results from multiple '
@@ -175,6 +185,8 @@ def main():
 
     # build the dataloader
     dataset = build_dataset(cfg.data.test)
+    if args.pipeline_cache_dir is not None:
+        enable_pipeline_cache(dataset, args.pipeline_cache_dir)
     data_loader = build_dataloader(
         dataset,
         samples_per_gpu=samples_per_gpu,
@@ -201,14 +213,15 @@ def main():
     if not distributed:
         model = MMDataParallel(model, device_ids=[0])
         outputs = single_gpu_test(model, data_loader, args.show, args.show_dir,
-                                  args.show_score_thr)
+                                  args.show_score_thr,
+                                  args.postprocess_workers)
     else:
         model = MMDistributedDataParallel(
             model.cuda(),
             device_ids=[torch.cuda.current_device()],
             broadcast_buffers=False)
         outputs = multi_gpu_test(model, data_loader, args.tmpdir,
-                                 args.gpu_collect)
+                                 args.gpu_collect, args.postprocess_workers)
 
     rank, _ = get_dist_info()
     if rank == 0: